@@ -20,11 +20,13 @@ import unittest
 # IAdminCommandProvider implementations
 import trac.admin.api
 import trac.attachment
+import trac.notification.queue
 import trac.perm
 import trac.ticket.admin
 import trac.versioncontrol.admin
 import trac.versioncontrol.api
 import trac.versioncontrol.web_ui
+import trac.web.profiling
 import trac.wiki.admin
 
 from trac.admin.api import IAdminCommandProvider, get_console_locale
@@ -17,8 +17,6 @@
 #         Christopher Lenz <cmlenz@gmx.de>
 
 from datetime import datetime
-from tempfile import TemporaryFile
-from zipfile import ZipFile, ZIP_DEFLATED
 import errno
 import hashlib
 import os
@@ -29,14 +27,17 @@ from trac.admin import AdminCommandError, IAdminCommandProvider, PrefixList, \
                        console_datetime_format, get_dir_list
 from trac.config import BoolOption, IntOption
 from trac.core import *
+from trac.db.util import chunked_params
 from trac.mimeview import *
 from trac.perm import IPermissionPolicy
 from trac.resource import *
 from trac.search import search_to_sql, shorten_result
-from trac.util import content_disposition, create_zipinfo, file_or_std, \
-                      get_reporter_id, normalize_filename
+from trac.util import content_disposition, file_or_std, get_reporter_id, \
+                      normalize_filename
+from trac.util.archive import ZipArchiveWriter, open_stream
 from trac.util.datefmt import datetime_now, format_datetime, \
-                              from_utimestamp, to_datetime, to_utimestamp, utc
+                              from_utimestamp, http_date, to_datetime, \
+                              to_utimestamp, utc
 from trac.util.html import tag
 from trac.util.text import exception_to_unicode, path_to_unicode, \
                            pretty_size, print_table, unicode_unquote
@@ -276,7 +277,8 @@ class AttachmentModule(Component):
         a particular object realm.
 
         The tuples are in the form (change, realm, id, filename, time,
-        description, author). `change` can currently only be `created`.
+        description, author), newest first. `change` can currently only
+        be `created`.
 
         FIXME: no iterator
         """
@@ -284,6 +286,7 @@ class AttachmentModule(Component):
                 self.env.db_query("""
                 SELECT type, id, filename, time, description, author
                 FROM attachment WHERE time > %s AND time < %s AND type = %s
+                ORDER BY time DESC
                 """, (to_utimestamp(start), to_utimestamp(stop), realm)):
             time = from_utimestamp(ts or 0)
             yield 'created', realm, id_, filename, time, description, author
@@ -292,7 +295,7 @@ class AttachmentModule(Component):
         """Return an event generator suitable for ITimelineEventProvider.
 
         Events are changes to attachments on resources of the given
-        `resource_realm.realm`.
+        `resource_realm.realm`, newest first.
         """
         for change, realm, id_, filename, time, descr, author in \
                 self.get_history(start, stop, resource_realm.realm):
@@ -322,19 +325,39 @@ class AttachmentModule(Component):
         `resource_realm.realm` whose filename, description or author match
         the given terms.
         """
+        from trac.search.index import SearchIndex
+        hits = SearchIndex(self.env).search(self.realm, terms,
+                                            resource_realm.realm)
         with self.env.db_query as db:
-            sql_query, args = search_to_sql(
-                    db, ['filename', 'description', 'author'], terms)
-            for id, time, filename, desc, author in db("""
+            if hits is None:
+                sql_query, args = search_to_sql(
+                        db, ['filename', 'description', 'author'], terms)
+                rows = db("""
                     SELECT id, time, filename, description, author
                     FROM attachment WHERE type = %s AND """ + sql_query,
-                    (resource_realm.realm,) + args):
-                attachment = resource_realm(id=id).child(self.realm, filename)
-                if 'ATTACHMENT_VIEW' in req.perm(attachment):
-                    yield (get_resource_url(self.env, attachment, req.href),
-                           get_resource_shortname(self.env, attachment),
-                           from_utimestamp(time), author,
-                           shorten_result(desc, terms))
+                    (resource_realm.realm,) + args)
+                scores = {}
+            else:
+                scores = {(id, filename): score
+                          for filename, id, score in hits}
+                ids = sorted({id for id, filename in scores})
+                rows = []
+                for subset, holders in chunked_params(ids, reserved=1):
+                    rows.extend(row for row in db("""
+                        SELECT id, time, filename, description, author
+                        FROM attachment WHERE type=%%s AND id IN (%s)
+                        """ % holders, [resource_realm.realm] + subset)
+                        if (row[0], row[2]) in scores)
+        for id, time, filename, desc, author in rows:
+            attachment = resource_realm(id=id).child(self.realm, filename)
+            if 'ATTACHMENT_VIEW' in req.perm(attachment):
+                result = (get_resource_url(self.env, attachment, req.href),
+                          get_resource_shortname(self.env, attachment),
+                          from_utimestamp(time), author,
+                          shorten_result(desc, terms))
+                if (id, filename) in scores:
+                    result += (scores[(id, filename)],)
+                yield result
 
     # IResourceManager methods
 
@@ -488,40 +511,36 @@ class AttachmentModule(Component):
                               num=pretty_size(self.max_zip_size)),
                             _("Download failed"))
 
+        if attachments:
+            last_modified = max(attachment.date for attachment in attachments)
+            req.check_modified(last_modified,
+                               [(attachment.filename, attachment.size,
+                                 attachment.date, attachment.description)
+                                for attachment in attachments])
         req.send_response(200)
         req.send_header('Content-Type', 'application/zip')
         filename = 'attachments-%s-%s.zip' % \
                    (parent.realm, re.sub(r'[/\\:]', '-', str(parent.id)))
         req.send_header('Content-Disposition',
                         content_disposition('inline', filename))
+        if attachments:
+            req.send_header('Last-Modified', http_date(last_modified))
         req.end_headers()
 
-        def write_partial(fileobj, start):
-            end = fileobj.tell()
-            fileobj.seek(start, 0)
-            remaining = end - start
-            while remaining > 0:
-                chunk = fileobj.read(min(remaining, 4096))
-                req.write(chunk)
-                remaining -= len(chunk)
-            fileobj.seek(end, 0)
-            return end
-
-        pos = 0
-        with TemporaryFile(prefix='trac-', suffix='.zip') as fileobj:
-            with ZipFile(fileobj, 'w', ZIP_DEFLATED) as zipfile:
+        is_compressible = Mimeview(self.env).is_compressible
+        with open_stream(req.write) as fileobj:
+            with ZipArchiveWriter(fileobj) as writer:
                 for attachment in attachments:
-                    zipinfo = create_zipinfo(attachment.filename,
-                                             mtime=attachment.date,
-                                             comment=attachment.description)
                     try:
-                        with attachment.open() as fd:
-                            zipfile.writestr(zipinfo, fd.read())
+                        fd = attachment.open()
                     except ResourceNotFound:
-                        pass  # skip missing files
-                    else:
-                        pos = write_partial(fileobj, pos)
-            write_partial(fileobj, pos)
+                        continue  # skip missing files
+                    with fd:
+                        writer.add_file(
+                            attachment.filename, fd, size=attachment.size,
+                            mtime=attachment.date,
+                            comment=attachment.description,
+                            compress=is_compressible(attachment.filename))
         raise RequestDone
 
     def _render_list(self, req, parent):
@@ -596,6 +615,7 @@ class AttachmentModule(Component):
             return data
 
     def _format_link(self, formatter, ns, target, label):
+        formatter.depends_on(self.realm)
         link, params, fragment = formatter.split_link(target)
         ids = link.split(':', 2)
         attachment = None
@@ -1029,6 +1049,40 @@ class LegacyAttachmentPolicy(Component):
                 if decision is not None:
                     return decision
 
+    def check_permissions_batch(self, action, username, resources, perm):
+        perm_map = self._perm_maps.get(action)
+        if not perm_map:
+            return [None] * len(resources)
+        if action == 'ATTACHMENT_DELETE':
+            return [self.check_permission(action, username, resource,
+                                          perm(resource))
+                    for resource in resources]
+
+        # Check the legacy actions on all the parents at once.
+        parents = {}
+        for resource in resources:
+            if resource and resource.realm == self.realm:
+                legacy_action = perm_map.get(resource.parent.realm)
+                if legacy_action:
+                    parents.setdefault(legacy_action, []) \
+                           .append(resource.parent)
+        allowed = {legacy_action: set(perm.filter(legacy_action, parent_list))
+                   for legacy_action, parent_list in parents.items()}
+
+        decisions = []
+        for resource in resources:
+            if not resource or resource.realm != self.realm:
+                decisions.append(None)
+                continue
+            legacy_action = perm_map.get(resource.parent.realm)
+            if legacy_action:
+                decisions.append(resource.parent in allowed[legacy_action])
+            else:
+                decisions.append(self.check_permission(action, username,
+                                                       resource,
+                                                       perm(resource)))
+        return decisions
+
 
 class AttachmentAdmin(Component):
     """trac-admin command provider for attachment administration."""
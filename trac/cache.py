@@ -12,11 +12,24 @@
 # history and logs, available at https://trac.edgewall.org/.
 
 import functools
+import mmap
+import os
+import struct
 
-from trac.core import Component
+from trac.config import ConfigurationError, Option
+from trac.core import Component, ExtensionPoint, Interface, implements
+from trac.db.api import DatabaseManager, parse_connection_uri
 from trac.util.concurrency import ThreadLocal, threading
+from trac.util.profiling import get_profile
+from trac.util.text import exception_to_unicode
+from trac.util.translation import _
 
-__all__ = ['CacheManager', 'cached']
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+__all__ = ['CacheManager', 'ICacheInvalidationTransport', 'cached']
 
 _id_to_key = {}
 
@@ -180,16 +193,93 @@ def cached(fn_or_attr=None):
     return decorator
 
 
+class ICacheInvalidationTransport(Interface):
+    """Extension point interface for components propagating cache
+    invalidations between the processes serving an environment.
+
+    An active transport relieves the `CacheManager` from reading the
+    `cache` table at the start of every request.
+
+    :since: 1.7.1
+    """
+
+    def get_supported_schemes():
+        """Return the list of database schemes supported by the
+        transport, or `None` if it works with any database.
+        """
+
+    def publish(generations):
+        """Notify the other processes of committed invalidations.
+
+        `generations` is an `{id: generation}` dictionary of the
+        invalidated caches.
+        """
+
+    def receive():
+        """Return the `{id: generation}` dictionary of invalidations
+        published since the previous call in this process.
+
+        `None` must be returned on the first call, and whenever some
+        invalidations may have been missed, so that the generations
+        are reloaded from the `cache` table.
+        """
+
+
 class CacheManager(Component):
     """Cache manager."""
 
     required = True
 
+    transports = ExtensionPoint(ICacheInvalidationTransport)
+
+    cache_transport = Option('trac', 'cache_transport', '',
+        """Name of the component implementing
+        `ICacheInvalidationTransport` that propagates cache
+        invalidations between processes. The transports provided by
+        default are `PostgreSQLCacheTransport` (`LISTEN`/`NOTIFY`),
+        `SharedMemoryCacheTransport`, for processes running on a single
+        host, and `FileCacheTransport`, intended for tests.
+
+        When empty, the generations of the caches are read from the
+        database on each request.
+        (''since 1.7.1'')""")
+
     def __init__(self):
         self._cache = {}
+        self._meta = None
         self._local = ThreadLocal(meta=None, cache=None)
         self._lock = threading.RLock()
 
+    @property
+    def transport(self):
+        """The active `ICacheInvalidationTransport`, or `None` if the
+        generations are polled from the database.
+
+        :since: 1.7.1
+        """
+        name = self.cache_transport
+        if not name:
+            return None
+        for transport in self.transports:
+            if transport.__class__.__name__ == name:
+                break
+        else:
+            raise ConfigurationError(
+                _("Cannot find an implementation of the "
+                  "ICacheInvalidationTransport interface named %(name)s. "
+                  "Please check that the Component is enabled or update "
+                  "the option [trac] cache_transport in trac.ini.",
+                  name=name))
+        schemes = transport.get_supported_schemes()
+        if schemes is not None:
+            scheme = parse_connection_uri(
+                DatabaseManager(self.env).connection_uri)[0]
+            if scheme not in schemes:
+                raise ConfigurationError(
+                    _("The cache transport %(name)s does not support the "
+                      "%(scheme)s database.", name=name, scheme=scheme))
+        return transport
+
     # Public interface
 
     def reset_metadata(self):
@@ -203,17 +293,19 @@ class CacheManager(Component):
         local_cache = self._local.cache
         if local_meta is None:
             # First cache usage in this request, retrieve cache metadata
-            # from the database and make a thread-local copy of the cache
-            meta = self.env.db_query("SELECT id, generation FROM cache")
-            self._local.meta = local_meta = dict(meta)
+            # and make a thread-local copy of the cache
+            self._local.meta = local_meta = self._get_metadata()
             self._local.cache = local_cache = self._cache.copy()
 
         db_generation = local_meta.get(id, -1)
+        profile = get_profile()
 
         # Try the thread-local copy first
         try:
             data, generation = local_cache[id]
             if generation == db_generation:
+                if profile is not None:
+                    profile.add_cache(True)
                 return data
         except KeyError:
             pass
@@ -224,6 +316,8 @@ class CacheManager(Component):
                 try:
                     data, generation = local_cache[id] = self._cache[id]
                     if generation == db_generation:
+                        if profile is not None:
+                            profile.add_cache(True)
                         return data
                 except KeyError:
                     generation = None   # Force retrieval from the database
@@ -236,12 +330,17 @@ class CacheManager(Component):
                 else:
                     db_generation = -1
                 if db_generation == generation:
+                    if profile is not None:
+                        profile.add_cache(True)
                     return data
 
                 # Retrieve data from the database
+                if profile is not None:
+                    profile.add_cache(False)
                 data = retriever(instance)
                 local_cache[id] = self._cache[id] = data, db_generation
                 local_meta[id] = db_generation
+                self._update_metadata({id: db_generation})
                 return data
 
     def invalidate(self, id):
@@ -259,9 +358,16 @@ class CacheManager(Component):
                 #    and we can safely INSERT a new row.
                 db("UPDATE cache SET generation=generation+1 WHERE id=%s",
                    (id,))
-                if not db("SELECT generation FROM cache WHERE id=%s", (id,)):
+                for generation, in db(
+                        "SELECT generation FROM cache WHERE id=%s", (id,)):
+                    break
+                else:
+                    generation = 0
                     db("INSERT INTO cache VALUES (%s, %s, %s)",
-                       (id, 0, _id_to_key.get(id, '<unknown>')))
+                       (id, generation, _id_to_key.get(id, '<unknown>')))
+                if self.cache_transport:
+                    DatabaseManager(self.env).on_commit(
+                        functools.partial(self._publish, {id: generation}))
 
                 # Invalidate in this process
                 self._cache.pop(id, None)
@@ -271,3 +377,214 @@ class CacheManager(Component):
                     del self._local.cache[id]
                 except (KeyError, TypeError):
                     pass
+
+    # Internal methods
+
+    def _get_metadata(self):
+        transport = self.transport
+        if transport is None:
+            return dict(self.env.db_query("SELECT id, generation FROM cache"))
+        generations = transport.receive()
+        with self._lock:
+            if generations is None or self._meta is None:
+                self._meta = dict(self.env.db_query(
+                    "SELECT id, generation FROM cache"))
+            else:
+                self._update_metadata(generations)
+            return self._meta.copy()
+
+    def _update_metadata(self, generations):
+        # A notified generation may not be visible yet in the database,
+        # so the highest known generation wins. The cached data is then
+        # validated against the database until it catches up.
+        meta = self._meta
+        if meta is not None:
+            for id, generation in generations.items():
+                if generation > meta.get(id, -1):
+                    meta[id] = generation
+
+    def _publish(self, generations):
+        with self._lock:
+            self._update_metadata(generations)
+        try:
+            self.transport.publish(generations)
+        except Exception as e:
+            self.log.warning("Cannot publish cache invalidation: %s",
+                             exception_to_unicode(e))
+
+
+class FileCacheTransport(Component):
+    """Cache transport appending the invalidations to a file in the
+    environment.
+
+    The file grows without bounds, so this transport is meant for tests
+    and development setups.
+
+    :since: 1.7.1
+    """
+
+    implements(ICacheInvalidationTransport)
+
+    def __init__(self):
+        self._offset = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return os.path.join(self.env.files_dir, 'cache', 'invalidations')
+
+    # ICacheInvalidationTransport methods
+
+    def get_supported_schemes(self):
+        return None
+
+    def publish(self, generations):
+        data = ''.join('%d %d\n' % item for item in generations.items())
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Appending with a single write keeps concurrent records intact.
+        with open(self.path, 'ab') as f:
+            f.write(data.encode('ascii'))
+
+    def receive(self):
+        with self._lock:
+            try:
+                with open(self.path, 'rb') as f:
+                    f.seek(0, os.SEEK_END)
+                    size = f.tell()
+                    offset = self._offset
+                    if offset is None or offset > size:
+                        self._offset = size
+                        return None
+                    f.seek(offset)
+                    data = f.read(size - offset)
+            except FileNotFoundError:
+                offset = self._offset
+                self._offset = 0
+                return {} if offset == 0 else None
+            data = data[:data.rfind(b'\n') + 1]
+            self._offset = offset + len(data)
+        generations = {}
+        for line in data.splitlines():
+            id, generation = map(int, line.split())
+            generations[id] = max(generation, generations.get(id, -1))
+        return generations
+
+
+class SharedMemoryCacheTransport(Component):
+    """Cache transport storing the invalidations in a memory-mapped
+    file, for processes running on a single host.
+
+    Each cache id is assigned to one of the slots of a fixed-size
+    vector. A slot holds the last generation published for one of its
+    ids, along with a counter of the updates, which tells the readers
+    whether they missed an update, in which case the generations are
+    reloaded from the database.
+
+    On platforms lacking `fcntl`, the writers are only serialized
+    within a process.
+
+    :since: 1.7.1
+    """
+
+    implements(ICacheInvalidationTransport)
+
+    slots = 1024
+
+    # Number of attempts at reading a slot being written
+    read_retries = 100
+
+    _header = struct.Struct('<Q')
+    _slot = struct.Struct('<QIi')
+
+    def __init__(self):
+        self._fd = self._map = None
+        self._counters = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return os.path.join(self.env.files_dir, 'cache', 'generations')
+
+    # ICacheInvalidationTransport methods
+
+    def get_supported_schemes(self):
+        return None
+
+    def publish(self, generations):
+        with self._lock:
+            buf = self._open()
+            if fcntl:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                for id, generation in generations.items():
+                    offset = self._slot_offset(id)
+                    counter = self._slot.unpack_from(buf, offset)[0]
+                    # Odd counters denote a slot being written, and are
+                    # left behind by a writer which died while writing.
+                    counter += counter % 2
+                    self._slot.pack_into(buf, offset, counter + 1, 0, 0)
+                    self._slot.pack_into(buf, offset, counter + 2, id,
+                                         generation)
+                    total = self._header.unpack_from(buf, 0)[0]
+                    self._header.pack_into(buf, 0, total + 1)
+            finally:
+                if fcntl:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    def receive(self):
+        with self._lock:
+            buf = self._open()
+            counters = self._counters
+            total = self._header.unpack_from(buf, 0)[0]
+            if counters is not None and total == counters[0]:
+                return {}
+            slots = self._read_slots(buf)
+            if slots is None:
+                return None
+            self._counters = [total] + [slot[0] for slot in slots]
+        if counters is None:
+            return None
+        generations = {}
+        for (counter, id, generation), previous in zip(slots, counters[1:]):
+            if counter == previous:
+                continue
+            if counter - previous != 2:
+                return None
+            generations[id] = generation
+        return generations
+
+    # Internal methods
+
+    def _open(self):
+        if self._map is None:
+            size = self._header.size + self.slots * self._slot.size
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o666)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+                self._map = mmap.mmap(fd, size)
+            except Exception:
+                os.close(fd)
+                raise
+            self._fd = fd
+        return self._map
+
+    def _slot_offset(self, id):
+        return self._header.size + (id % self.slots) * self._slot.size
+
+    def _read_slots(self, buf):
+        """Return the slots, or `None` if one of them is still being
+        written after `read_retries` attempts.
+        """
+        slots = []
+        for offset in range(self._header.size, len(buf), self._slot.size):
+            for idx in range(self.read_retries):
+                slot = self._slot.unpack_from(buf, offset)
+                if slot[0] % 2 == 0 and \
+                        self._slot.unpack_from(buf, offset) == slot:
+                    break
+            else:
+                return None
+            slots.append(slot)
+        return slots
@@ -432,12 +432,14 @@ class Section(object):
 
     Objects of this class should not be instantiated directly.
     """
-    __slots__ = ['config', 'name', '_cache']
+    __slots__ = ['config', 'name', '_cache', '_values']
 
     def __init__(self, config, name):
         self.config = config
         self.name = name
         self._cache = {}
+        # Typed values of the `Option`s, keyed by `(name, option)`
+        self._values = {}
 
     def __repr__(self):
         return '<%s [%s]>' % (self.__class__.__name__, self.name)
@@ -590,6 +592,7 @@ class Section(object):
         These changes are not persistent unless saved with `save()`.
         """
         self._cache.pop(key, None)
+        self._values.clear()
         if not self.config.parser.has_section(self.name):
             self.config.parser.add_section(self.name)
         return self.config.parser.set(self.name, key, value)
@@ -601,6 +604,7 @@ class Section(object):
         called.
         """
         self._cache.pop(key, None)
+        self._values.clear()
         if self.config.parser.has_section(self.name):
             self.config.parser.remove_option(self.name, key)
             if not self.config.parser.options(self.name):
@@ -708,8 +712,14 @@ class Option(object):
             return self
         config = getattr(instance, 'config', None)
         if config and isinstance(config, Configuration):
+            # The parsed value is kept by the section until the option
+            # is changed or the configuration is parsed again
             section = config[self.section]
-            value = self.accessor(section, self.name, self.default)
+            key = (self.name, self)
+            value = section._values.get(key, _use_default)
+            if value is _use_default:
+                value = self.accessor(section, self.name, self.default)
+                section._values[key] = value
             return value
 
     def __set__(self, instance, value):
@@ -793,6 +803,11 @@ class ListOption(Option):
         Option.__init__(self, section, name, default, doc, doc_domain,
                         doc_args)
 
+    def __get__(self, instance, owner):
+        value = Option.__get__(self, instance, owner)
+        # Don't let the caller modify the cached list
+        return list(value) if isinstance(value, list) else value
+
     def accessor(self, section, name, default):
         return section.getlist(name, default, self.sep, self.keep_empty)
 
@@ -19,6 +19,7 @@ import os
 import time
 import urllib.parse
 from abc import ABCMeta, abstractmethod
+from contextlib import closing
 
 from trac import db_default
 from trac.api import IEnvironmentSetupParticipant, ISystemInfoProvider
@@ -56,6 +57,20 @@ class DbContextManager(object):
         with self as db:
             return db.executemany(query, params)
 
+    def iterate(self, query, params=None, batch_size=1000):
+        """Shortcut for lazily iterating over the rows of a SELECT query.
+
+        The connection is held until the iteration is complete or the
+        generator is closed. Stopping early is not considered an error
+        and doesn't roll back a transaction.
+        """
+        with self as db:
+            with closing(db.iterate(query, params, batch_size)) as rows:
+                try:
+                    yield from rows
+                except GeneratorExit:
+                    pass
+
 
 class TransactionContextManager(DbContextManager):
     """Transactioned Database Context Manager for retrieving a
@@ -78,13 +93,18 @@ class TransactionContextManager(DbContextManager):
 
     def __exit__(self, et, ev, tb):
         if self.db:
-            self.dbmgr._transaction_local.wdb = None
+            local = self.dbmgr._transaction_local
+            local.wdb = None
+            callbacks, local.callbacks = local.callbacks, None
             if et is None:
                 self.db.commit()
             else:
                 self.db.rollback()
-            if not self.dbmgr._transaction_local.rdb:
+            if not local.rdb:
                 self.db.close()
+            if et is None and callbacks:
+                for callback in callbacks:
+                    callback()
 
 
 class QueryContextManager(DbContextManager):
@@ -200,6 +220,17 @@ class ConnectionBase(object, metaclass=ABCMeta):
         to `id`."""
         pass
 
+    def streaming_cursor(self, batch_size=1000):
+        """Return a cursor which fetches the rows of a SELECT query
+        from the database server as they are consumed, `batch_size`
+        rows at a time, rather than buffering the whole result set.
+
+        The default implementation returns a regular `cursor()`.
+
+        :since: 1.7.1
+        """
+        return self.cursor()
+
 
 class IDatabaseConnector(Interface):
     """Extension point interface for components that support the
@@ -275,7 +306,8 @@ class DatabaseManager(Component):
 
     def __init__(self):
         self._cnx_pool = None
-        self._transaction_local = ThreadLocal(wdb=None, rdb=None)
+        self._transaction_local = ThreadLocal(wdb=None, rdb=None,
+                                              callbacks=None)
 
     def init_db(self):
         connector, args = self.get_connector()
@@ -408,6 +440,23 @@ class DatabaseManager(Component):
                                                col.name)
                     self.drop_tables((temp_table_name,))
 
+    def on_commit(self, callback):
+        """Call `callback` once the outermost transaction of the current
+        thread has been committed.
+
+        The callback is discarded if the transaction is rolled back,
+        and called immediately if no transaction is in progress.
+
+        :since: 1.7.1
+        """
+        local = self._transaction_local
+        if not local.wdb:
+            callback()
+        elif local.callbacks is None:
+            local.callbacks = [callback]
+        else:
+            local.callbacks.append(callback)
+
     def get_connection(self, readonly=False):
         """Get a database connection from the pool.
 
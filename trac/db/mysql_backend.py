@@ -59,6 +59,10 @@ else:
         def fetchall(self):
             return list(super().fetchall())
 
+    class MySQLUnbufferedCursor(MySQLUnicodeCursor,
+                                pymysql.cursors.SSCursor):
+        pass
+
     class MySQLSilentCursor(MySQLUnicodeCursor):
         def _show_warnings(self, conn=None):
             pass
@@ -421,6 +425,15 @@ class MySQLConnection(ConnectionBase, ConnectionWrapper):
     def cursor(self):
         return IterableCursor(MySQLUnicodeCursor(self.cnx), self.log)
 
+    def streaming_cursor(self, batch_size=1000):
+        """Return an unbuffered cursor. No other query can be executed
+        on the connection until its rows have been consumed or the
+        cursor is closed.
+        """
+        cursor = MySQLUnbufferedCursor(self.cnx)
+        cursor.arraysize = batch_size
+        return IterableCursor(cursor, self.log)
+
     def rollback(self):
         self.cnx.ping()
         try:
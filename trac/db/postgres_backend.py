@@ -16,18 +16,21 @@
 
 from ctypes.util import find_library
 import ctypes
+import itertools
 import os
 import re
 from pkg_resources import DistributionNotFound
 from subprocess import Popen, PIPE
 
+from trac.cache import ICacheInvalidationTransport
 from trac.core import *
 from trac.config import Option
-from trac.db.api import ConnectionBase, IDatabaseConnector, \
-                        parse_connection_uri
+from trac.db.api import ConnectionBase, DatabaseManager, \
+                        IDatabaseConnector, parse_connection_uri
 from trac.db.util import ConnectionWrapper, IterableCursor
 from trac.util import get_pkginfo, lazy
 from trac.util.compat import close_fds
+from trac.util.concurrency import threading
 from trac.util.html import Markup
 from trac.util.text import empty, exception_to_unicode, to_unicode
 from trac.util.translation import _
@@ -73,6 +76,8 @@ else:
 
 _like_escape_re = re.compile(r'([/_%])')
 
+_streaming_cursor_ids = itertools.count(1)
+
 # Mapping from "abstract" SQL types to DB-specific types
 _type_map = {
     'int64': 'bigint',
@@ -315,6 +320,89 @@ class PostgreSQLConnector(Component):
         return p.communicate()[0]
 
 
+class PostgreSQLCacheTransport(Component):
+    """Cache transport relying on the `LISTEN` and `NOTIFY` statements
+    of PostgreSQL.
+
+    Each process keeps a dedicated connection listening to the
+    invalidations. As notifications are only delivered once the
+    transaction sending them is committed, no invalidation can be
+    seen before the new generation is visible in the database.
+
+    :since: 1.7.1
+    """
+
+    implements(ICacheInvalidationTransport)
+
+    channel = 'trac_cache'
+
+    def __init__(self):
+        self._cnx = None
+        self._lock = threading.Lock()
+
+    @lazy
+    def schema(self):
+        args = parse_connection_uri(
+            DatabaseManager(self.env).connection_uri)[1]
+        return args.get('params', {}).get('schema', 'public')
+
+    # ICacheInvalidationTransport methods
+
+    def get_supported_schemes(self):
+        return ['postgres']
+
+    def publish(self, generations):
+        payload = ' '.join([self.schema] +
+                           ['%d:%d' % item for item in generations.items()])
+        self.env.db_transaction("SELECT pg_notify(%s, %s)",
+                                (self.channel, payload))
+
+    def receive(self):
+        with self._lock:
+            if self._cnx is None:
+                self._listen()
+                return None
+            try:
+                self._cnx.poll()
+            except psycopg.Error as e:
+                self.log.warning("Lost the cache invalidation listener: %s",
+                                 exception_to_unicode(e))
+                self._close()
+                return None
+            notifies = self._cnx.notifies[:]
+            del self._cnx.notifies[:]
+        generations = {}
+        for notify in notifies:
+            items = notify.payload.split(' ')
+            if items[0] != self.schema:
+                continue
+            for item in items[1:]:
+                id, generation = map(int, item.split(':'))
+                generations[id] = max(generation, generations.get(id, -1))
+        return generations
+
+    # Internal methods
+
+    def _listen(self):
+        connector, args = DatabaseManager(self.env).get_connector()
+        try:
+            cnx = connector.get_connection(**args).cnx
+            cnx.autocommit = True
+            cnx.cursor().execute('LISTEN ' + self.channel)
+        except psycopg.Error as e:
+            self.log.warning("Cannot listen to cache invalidations: %s",
+                             exception_to_unicode(e))
+        else:
+            self._cnx = cnx
+
+    def _close(self):
+        try:
+            self._cnx.close()
+        except psycopg.Error:
+            pass
+        self._cnx = None
+
+
 class PostgreSQLConnection(ConnectionBase, ConnectionWrapper):
     """Connection wrapper for PostgreSQL."""
 
@@ -344,6 +432,13 @@ class PostgreSQLConnection(ConnectionBase, ConnectionWrapper):
     def cursor(self):
         return IterableCursor(self.cnx.cursor(), self.log)
 
+    def streaming_cursor(self, batch_size=1000):
+        """Return a named, server-side cursor."""
+        name = 'trac_stream_%d' % next(_streaming_cursor_ids)
+        cursor = self.cnx.cursor(name)
+        cursor.arraysize = cursor.itersize = batch_size
+        return IterableCursor(cursor, self.log)
+
     def cast(self, column, type):
         # Temporary hack needed for the union of selects in the search module
         return 'CAST(%s AS %s)' % (column, _type_map.get(type, type))
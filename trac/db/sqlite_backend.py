@@ -24,7 +24,7 @@ from trac.config import ConfigurationError, ListOption
 from trac.core import Component, TracError, implements
 from trac.db.api import ConnectionBase, IDatabaseConnector
 from trac.db.schema import Table, Column, Index
-from trac.db.util import ConnectionWrapper, IterableCursor
+from trac.db.util import ConnectionWrapper, IterableCursor, StatementCache
 from trac.util import get_pkginfo, getuser, lazy
 from trac.util.html import tag
 from trac.util.translation import _, tag_
@@ -47,6 +47,15 @@ pysqlite_version_string = get_pkginfo(sqlite).get('version',
 min_sqlite_version = (3, 0, 0)
 
 
+def _to_qmark(key):
+    sql, num_args = key
+    return sql % (('?',) * num_args)
+
+
+#: Cache of the statements translated to the "qmark" parameter style
+_qmark_statements = StatementCache(_to_qmark)
+
+
 class PyFormatCursor(sqlite.Cursor):
 
     __slots__ = ['cnx']
@@ -60,14 +69,14 @@ class PyFormatCursor(sqlite.Cursor):
 
     def execute(self, sql, args=None):
         if args:
-            sql = sql % (('?',) * len(args))
+            sql = _qmark_statements.get((sql, len(args)))
         return self._rollback_on_error(sqlite.Cursor.execute, sql,
                                        args or [])
 
     def executemany(self, sql, args):
         if not args:
             return
-        sql = sql % (('?',) * len(args[0]))
+        sql = _qmark_statements.get((sql, len(args[0])))
         return self._rollback_on_error(sqlite.Cursor.executemany, sql,
                                        args)
 
@@ -312,10 +321,13 @@ class SQLiteConnection(ConnectionBase, ConnectionWrapper):
         timeout = int(params.get('timeout', 10.0))
         self._eager = params.get('cursor', 'eager') == 'eager'
         # eager is default, can be turned off by specifying ?cursor=
+        # size of the cache of prepared statements of the connection
+        cached_statements = int(params.get('cached_statements', 256))
         cnx = sqlite.connect(path, detect_types=sqlite.PARSE_DECLTYPES,
                              isolation_level=None,
                              check_same_thread=sqlite_version < (3, 3, 1),
-                             timeout=timeout)
+                             timeout=timeout,
+                             cached_statements=cached_statements)
         # load extensions
         extensions = params.get('extensions', [])
         if len(extensions) > 0:
@@ -336,6 +348,20 @@ class SQLiteConnection(ConnectionBase, ConnectionWrapper):
         cursor.cnx = self
         return IterableCursor(cursor, self.log)
 
+    def streaming_cursor(self, batch_size=1000):
+        """Return a `PyFormatCursor` regardless of the `cursor`
+        parameter, so that rows are stepped through lazily.
+
+        The pending statement keeps the database read-locked until it is
+        exhausted or closed, hence the eager cursor remains the default
+        for `cursor()`.
+        """
+        cursor = self.cnx.cursor(PyFormatCursor)
+        cursor.arraysize = batch_size
+        self._active_cursors[cursor] = True
+        cursor.cnx = self
+        return IterableCursor(cursor, self.log)
+
     def rollback(self):
         for cursor in self._active_cursors:
             cursor.close()
@@ -314,6 +314,69 @@ class ConnectionTestCase(unittest.TestCase):
                 """):
             self.fail("Transaction was not rolled back")
 
+    def test_on_commit(self):
+        """Callbacks are called after the outermost transaction is
+        committed.
+        """
+        called = []
+        with self.env.db_transaction:
+            with self.env.db_transaction:
+                self.dbm.on_commit(lambda: called.append(1))
+            self.assertEqual([], called)
+            self.dbm.on_commit(lambda: called.append(2))
+        self.assertEqual([1, 2], called)
+        self.dbm.on_commit(lambda: called.append(3))
+        self.assertEqual([1, 2, 3], called)
+
+    def test_on_commit_rollback(self):
+        """Callbacks are discarded when the transaction is rolled back.
+        """
+        called = []
+        try:
+            with self.env.db_transaction:
+                self.dbm.on_commit(lambda: called.append(1))
+                raise ValueError
+        except ValueError:
+            pass
+        with self.env.db_transaction:
+            pass
+        self.assertEqual([], called)
+
+    def test_iterate(self):
+        """Rows of a SELECT are generated lazily, in order."""
+        self.env.db_transaction.executemany(
+            "INSERT INTO blog (author) VALUES (%s)",
+            [('author%d' % i,) for i in range(10)])
+
+        rows = self.env.db_query.iterate(
+            "SELECT author FROM blog ORDER BY bid", batch_size=3)
+        self.assertEqual(('author0',), next(rows))
+        self.assertEqual(['author%d' % i for i in range(1, 10)],
+                         [author for author, in rows])
+        with self.env.db_query as db:
+            self.assertEqual([('author9',)],
+                             list(db.iterate("SELECT author FROM blog "
+                                             "WHERE bid=%s", (10,))))
+
+    def test_iterate_not_select(self):
+        """Only a SELECT can be iterated."""
+        with self.env.db_transaction as db:
+            rows = db.iterate("DELETE FROM blog")
+            self.assertRaises(ValueError, next, rows)
+
+    def test_iterate_closed_early_in_transaction(self):
+        """Transaction is committed when the iteration stops early."""
+        self.env.db_transaction.executemany(
+            "INSERT INTO blog (author) VALUES (%s)",
+            [('author%d' % i,) for i in range(5)])
+
+        rows = self.env.db_transaction.iterate("SELECT bid FROM blog")
+        next(rows)
+        rows.close()
+
+        self.assertEqual(5, self.env.db_query(
+            "SELECT COUNT(*) FROM blog")[0][0])
+
     def test_get_last_id(self):
         q = "INSERT INTO report (author) VALUES ('anonymous')"
         with self.env.db_transaction as db:
@@ -452,7 +515,7 @@ class DatabaseManagerTestCase(unittest.TestCase):
         new_db_version = default_db_version + 1
         self.dbm.set_database_version(new_db_version)
         self.assertEqual(new_db_version, self.dbm.get_database_version())
-        self.assertEqual([('INFO', 'Upgraded database_version from 45 to 46')],
+        self.assertEqual([('INFO', 'Upgraded database_version from 50 to 51')],
                          self.env.log_messages)
 
         # Restore the previous version to avoid destroying the database
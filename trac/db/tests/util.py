@@ -13,8 +13,10 @@
 
 import unittest
 
-from trac.db.util import sql_escape_percent
+from trac.db.util import StatementCache, chunked_params, \
+                          sql_escape_percent
 from trac.test import makeSuite
+from trac.util.profiling import start_profile, stop_profile
 
 # TODO: test IterableCursor, ConnectionWrapper
 
@@ -64,9 +66,78 @@ class SQLEscapeTestCase(unittest.TestCase):
                          sql_escape_percent('''"%?""`%s'%i'%%`%S"'''))
 
 
+class ChunkedParamsTestCase(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual([], list(chunked_params([])))
+
+    def test_single_chunk(self):
+        self.assertEqual([([1, 2, 3], '%s,%s,%s')],
+                         list(chunked_params([1, 2, 3])))
+
+    def test_chunks(self):
+        chunks = list(chunked_params(list(range(2000)), reserved=1))
+        self.assertEqual([998, 998, 4], [len(c) for c, h in chunks])
+        self.assertEqual(list(range(2000)), sum((c for c, h in chunks), []))
+        self.assertEqual(','.join(['%s'] * 4), chunks[-1][1])
+
+    def test_per_value(self):
+        chunks = list(chunked_params(list(range(500)), reserved=3,
+                                     per_value=5))
+        self.assertEqual([199, 199, 102], [len(c) for c, h in chunks])
+
+
+class StatementCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.translated = []
+
+        def translate(sql):
+            self.translated.append(sql)
+            return sql.lower()
+
+        self.cache = StatementCache(translate, size=2)
+
+    def tearDown(self):
+        stop_profile()
+
+    def test_hits_and_misses(self):
+        self.assertEqual('select 1', self.cache.get('SELECT 1'))
+        self.assertEqual('select 1', self.cache.get('SELECT 1'))
+        self.assertEqual(['SELECT 1'], self.translated)
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+    def test_least_recently_used_evicted(self):
+        self.cache.get('SELECT 1')
+        self.cache.get('SELECT 2')
+        self.cache.get('SELECT 1')
+        self.cache.get('SELECT 3')
+        self.assertEqual(2, len(self.cache))
+        self.cache.get('SELECT 1')
+        self.cache.get('SELECT 2')
+        self.assertEqual(['SELECT 1', 'SELECT 2', 'SELECT 3', 'SELECT 2'],
+                         self.translated)
+
+    def test_clear(self):
+        self.cache.get('SELECT 1')
+        self.cache.clear()
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual((0, 0), (self.cache.hits, self.cache.misses))
+
+    def test_profile(self):
+        profile = start_profile()
+        self.cache.get('SELECT 1')
+        self.cache.get('SELECT 1')
+        self.cache.get('SELECT 1')
+        self.assertEqual(2, profile.statement_cache_hits)
+        self.assertEqual(1, profile.statement_cache_misses)
+
+
 def test_suite():
     suite = unittest.TestSuite()
     suite.addTest(makeSuite(SQLEscapeTestCase))
+    suite.addTest(makeSuite(ChunkedParamsTestCase))
+    suite.addTest(makeSuite(StatementCacheTestCase))
     return suite
 
 if __name__ == '__main__':
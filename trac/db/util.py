@@ -16,8 +16,13 @@
 # Author: Christopher Lenz <cmlenz@gmx.de>
 
 import re
+import threading
+import time
+from collections import OrderedDict
 from contextlib import closing
 
+from trac.util.profiling import get_profile
+
 _sql_escape_percent_re = re.compile("""
     '(?:[^']+|'')*' |
     `(?:[^`]+|``)*` |
@@ -30,12 +35,91 @@ def sql_escape_percent(sql):
     return _sql_escape_percent_re.sub(repl, sql)
 
 
+def chunked_params(values, reserved=0, per_value=1):
+    """Generate `(chunk, placeholders)` tuples splitting the sequence
+    `values` in chunks which can be passed as the parameters of a single
+    statement, with `placeholders` the `%s,%s,...` string for the values
+    of the chunk, typically used in an `IN (...)` list.
+
+    This prevents "too many SQL variables" errors, as the maximum number
+    of parameters of a statement is 999 on SQLite.
+
+    :param reserved: number of the other parameters of the statement.
+    :param per_value: number of parameters used for each value.
+    :since: 1.7.1
+    """
+    delta = (999 - reserved) // per_value
+    for idx in range(0, len(values), delta):
+        chunk = values[idx:idx + delta]
+        yield chunk, ','.join(('%s',) * len(chunk))
+
+
+class StatementCache(object):
+    """Bounded LRU cache of SQL statements translated for the database
+    driver.
+
+    The same SQL text is typically executed many times, so the result
+    of `translate(key)` is kept for the `size` most recently used keys.
+    The lookups are reported to the active `RequestProfile`, and the
+    overall `hits` and `misses` are counted.
+
+    :since: 1.7.1
+    """
+
+    def __init__(self, translate, size=500):
+        self.translate = translate
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the translation of `key`, computing it if needed."""
+        entries = self._entries
+        profile = get_profile()
+        with self._lock:
+            try:
+                value = entries[key]
+            except KeyError:
+                pass
+            else:
+                entries.move_to_end(key)
+                self.hits += 1
+                if profile is not None:
+                    profile.add_statement_cache(True)
+                return value
+        value = self.translate(key)
+        with self._lock:
+            self.misses += 1
+            entries[key] = value
+            while len(entries) > self.size:
+                entries.popitem(last=False)
+        if profile is not None:
+            profile.add_statement_cache(False)
+        return value
+
+    def clear(self):
+        """Discard the cached statements and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+#: Cache of the statements with the "%"s inside literals escaped
+escaped_statements = StatementCache(sql_escape_percent)
+
+
 class IterableCursor(object):
     """Wrapper for DB-API cursor objects that makes the cursor iterable
     and escapes all "%"s used inside literal strings with parameterized
     queries.
 
-    Iteration will generate the rows of a SELECT query one by one.
+    Iteration will generate the rows of a SELECT query one by one,
+    fetching them `arraysize` rows at a time.
     """
     __slots__ = ['cursor', 'log']
 
@@ -47,19 +131,47 @@ class IterableCursor(object):
         return getattr(self.cursor, name)
 
     def __iter__(self):
+        arraysize = self.cursor.arraysize
+        if arraysize <= 1:
+            while True:
+                row = self.cursor.fetchone()
+                if not row:
+                    return
+                yield row
         while True:
-            row = self.cursor.fetchone()
-            if not row:
+            rows = self.cursor.fetchmany(arraysize)
+            if not rows:
                 return
-            yield row
+            yield from rows
 
     def execute(self, sql, args=None):
+        profile = get_profile()
+        if profile is None:
+            return self._execute(sql, args)
+        start = time.perf_counter()
+        try:
+            return self._execute(sql, args)
+        finally:
+            profile.add_sql(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, args):
+        profile = get_profile()
+        if profile is None or not args:
+            return self._executemany(sql, args)
+        start = time.perf_counter()
+        try:
+            return self._executemany(sql, args)
+        finally:
+            profile.add_sql(sql, time.perf_counter() - start, len(args))
+
+    def _execute(self, sql, args):
         if self.log:
             self.log.debug('SQL: %s', sql)
             try:
                 if args:
                     self.log.debug('args: %r', args)
-                    r = self.cursor.execute(sql_escape_percent(sql), args)
+                    r = self.cursor.execute(escaped_statements.get(sql),
+                                            args)
                 else:
                     r = self.cursor.execute(sql)
                 rows = getattr(self.cursor, 'rows', None)
@@ -70,10 +182,10 @@ class IterableCursor(object):
                 self.log.debug('execute exception: %r', e)
                 raise
         if args:
-            return self.cursor.execute(sql_escape_percent(sql), args)
+            return self.cursor.execute(escaped_statements.get(sql), args)
         return self.cursor.execute(sql)
 
-    def executemany(self, sql, args):
+    def _executemany(self, sql, args):
         if self.log:
             self.log.debug('SQL: %r', sql)
             self.log.debug('args: %r', args)
@@ -81,8 +193,8 @@ class IterableCursor(object):
                 return
             try:
                 if args[0]:
-                    return self.cursor.executemany(sql_escape_percent(sql),
-                                                   args)
+                    return self.cursor.executemany(
+                        escaped_statements.get(sql), args)
                 return self.cursor.executemany(sql, args)
             except Exception as e:
                 self.log.debug('executemany exception: %r', e)
@@ -90,7 +202,7 @@ class IterableCursor(object):
         if not args:
             return
         if args[0]:
-            return self.cursor.executemany(sql_escape_percent(sql), args)
+            return self.cursor.executemany(escaped_statements.get(sql), args)
         return self.cursor.executemany(sql, args)
 
 
@@ -132,6 +244,25 @@ class ConnectionWrapper(object):
 
     __call__ = execute
 
+    def iterate(self, query, params=None, batch_size=1000):
+        """Execute a SELECT `query` and generate its rows one by one.
+
+        Unlike `execute`, the rows are not all fetched up-front but
+        retrieved from the database `batch_size` rows at a time, using
+        the cursor returned by `streaming_cursor()`. The connection is
+        busy with the query until the iteration is complete or the
+        generator is closed: with MySQL, no other query should be
+        executed on the connection in the meantime.
+
+        :raise: `ValueError` if the query is not a SELECT.
+        :since: 1.7.1
+        """
+        if not self.check_select(query):
+            raise ValueError("only a SELECT can be iterated")
+        with closing(self.streaming_cursor(batch_size)) as cursor:
+            cursor.execute(query, params if params is not None else [])
+            yield from cursor
+
     def executemany(self, query, params=None):
         """Execute an SQL `query`, on a sequence of tuples ("executemany").
 
@@ -17,7 +17,7 @@
 from trac.db.schema import Table, Column, Index
 
 # Database version identifier. Used for automatic upgrades.
-db_version = 45
+db_version = 50
 
 def __mkreports(reports):
     """Utility function used to create report data in same syntax as the
@@ -106,6 +106,21 @@ schema = [
         Column('base_rev'),
         Index(['repos', 'rev', 'path']),
         Index(['repos', 'path', 'rev'])],
+    Table('node_last_change', key=('repos', 'rev', 'path', 'name'))[
+        Column('repos', type='int'),
+        Column('rev', key_size=40),
+        Column('path', key_size=255),
+        Column('name', key_size=255),
+        Column('change_rev')],
+    Table('node_diff_stats', key=('repos', 'rev', 'path'))[
+        Column('repos', type='int'),
+        Column('rev', key_size=40),
+        Column('path', key_size=255),
+        Column('old_size', type='int64'),
+        Column('new_size', type='int64'),
+        Column('is_binary', type='int'),
+        Column('added', type='int'),
+        Column('removed', type='int')],
 
     # Ticket system
     Table('ticket', key='id')[
@@ -167,6 +182,16 @@ schema = [
         Column('title'),
         Column('query'),
         Column('description')],
+    Table('query_result_set', key='id')[
+        Column('id'),
+        Column('time', type='int64'),
+        Column('size', type='int'),
+        Index(['time'])],
+    Table('query_result', key=('id', 'seq'))[
+        Column('id'),
+        Column('seq', type='int'),
+        Column('ticket', type='int'),
+        Index(['id', 'ticket'])],
 
     # Notification system
     Table('notify_subscription', key='id')[
@@ -191,6 +216,35 @@ schema = [
         Column('target'),
         Index(['sid', 'authenticated', 'class']),
         Index(['class', 'realm', 'target'])],
+    Table('notify_queue', key='id')[
+        Column('id', auto_increment=True),
+        Column('time', type='int64'),
+        Column('next_attempt', type='int64'),
+        Column('attempts', type='int'),
+        Column('from_addr'),
+        Column('recipients'),
+        Column('message'),
+        Column('error'),
+        Index(['next_attempt'])],
+    Table('request_stats', key='handler')[
+        Column('handler'),
+        Column('requests', type='int'),
+        Column('slow', type='int'),
+        Column('total_time', type='int64'),
+        Column('max_time', type='int64'),
+        Column('handler_time', type='int64'),
+        Column('filters_time', type='int64'),
+        Column('render_time', type='int64'),
+        Column('sql_count', type='int'),
+        Column('sql_time', type='int64'),
+        Column('cache_hits', type='int'),
+        Column('cache_misses', type='int')],
+    Table('request_sql_stats', key='id')[
+        Column('id'),
+        Column('statement'),
+        Column('executions', type='int'),
+        Column('total_time', type='int64'),
+        Column('max_time', type='int64')],
 ]
 
 
@@ -16,6 +16,7 @@
 
 """Trac Environment model and related APIs."""
 
+import collections
 from contextlib import contextmanager
 import hashlib
 import os.path
@@ -501,8 +502,17 @@ class Environment(Component, ComponentManager):
 
     def shutdown(self, tid=None):
         """Close the environment."""
+        from trac.notification.queue import QueuedEmailSender
         from trac.versioncontrol.api import RepositoryManager
+        from trac.web.profiling import RequestProfiler
         RepositoryManager(self).shutdown(tid)
+        if tid is None:
+            queue = self.components.get(QueuedEmailSender)
+            if queue is not None:
+                queue.shutdown()
+            profiler = self.components.get(RequestProfiler)
+            if profiler is not None:
+                profiler.flush()
         DatabaseManager(self).shutdown(tid)
         if tid is None:
             log.shutdown(self.log)
@@ -827,9 +837,18 @@ class Environment(Component, ComponentManager):
                           filename)
 
 
-env_cache = {}
+env_cache = collections.OrderedDict()
 env_cache_lock = threading.Lock()
 
+#: Maximum number of environments kept in `env_cache`, or `0` for no
+#: limit. The least recently used environments are shut down and
+#: removed from the cache when they have been idle for at least
+#: `env_cache_idle_time` seconds. (''since 1.7.1'')
+env_cache_size = 0
+env_cache_idle_time = 300
+
+_env_cache_access = {}
+
 
 def open_environment(env_path=None, use_cache=False):
     """Open an existing environment object, and verify that the database is up
@@ -860,10 +879,13 @@ def open_environment(env_path=None, use_cache=False):
                 env.shutdown()
                 del env_cache[env_path]
                 env = None
+            _env_cache_access[env_path] = time.time()
             if env is None:
                 env = env_cache.setdefault(env_path,
                                            open_environment(env_path))
+                _evict_idle_environments()
             else:
+                env_cache.move_to_end(env_path)
                 CacheManager(env).reset_metadata()
     else:
         env = Environment(env_path)
@@ -886,6 +908,25 @@ def open_environment(env_path=None, use_cache=False):
     return env
 
 
+def _evict_idle_environments():
+    """Shut down and remove the least recently used environments from
+    `env_cache` when it holds more than `env_cache_size` environments.
+    Must be called with `env_cache_lock` held.
+    """
+    if not env_cache_size or len(env_cache) <= env_cache_size:
+        return
+    idle_before = time.time() - env_cache_idle_time
+    for env_path in list(env_cache):
+        if len(env_cache) <= env_cache_size:
+            break
+        if _env_cache_access.get(env_path, 0) > idle_before:
+            break  # the remaining environments are used more recently
+        env = env_cache.pop(env_path)
+        _env_cache_access.pop(env_path, None)
+        env.log.info("Shutting down environment evicted from the cache")
+        env.shutdown()
+
+
 class EnvironmentAdmin(Component):
     """trac-admin command provider for environment administration."""
 
@@ -656,6 +656,17 @@ class Mimeview(Component):
         binary data.
         """)
 
+    archive_stored_types = ListOption('mimeviewer', 'archive_stored_types',
+        'image/gif, image/jpeg, image/png, image/webp, audio/*, video/*, '
+        'application/zip, application/x-7z-compressed, '
+        'application/x-rar-compressed',
+        doc="""Comma-separated list of MIME types of the files which are
+        stored without compression in the downloaded archives, as their
+        content is already compressed. A type like `video/*` matches
+        all the subtypes. Files compressed with gzip, bzip2 or xz are
+        always stored without compression. (''since 1.7.1'')
+        """)
+
     def __init__(self):
         self._mime_map = None
         self._mime_map_patterns = None
@@ -986,6 +997,22 @@ class Mimeview(Component):
             return True
         return False
 
+    def is_compressible(self, filename):
+        """Check if a file is worth compressing when added to an archive.
+
+        :since: 1.7.1
+        """
+        if mimetypes.guess_type(filename)[1]:
+            return False  # e.g. .gz
+        mimetype = get_mimetype(filename, None, self.mime_map,
+                                self.mime_map_patterns)
+        if not mimetype:
+            return True
+        mimetype = ct_mimetype(mimetype)
+        stored = self.archive_stored_types
+        return mimetype not in stored and \
+               mimetype.split('/', 1)[0] + '/*' not in stored
+
     def to_unicode(self, content, mimetype=None, charset=None):
         """Convert `content` (an encoded `bytes` object) to a `str` object.
 
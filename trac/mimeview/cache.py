@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/.
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from trac.config import IntOption
+from trac.core import Component
+from trac.util import create_unique_file
+from trac.util.concurrency import threading
+from trac.util.text import exception_to_unicode
+
+__all__ = ['RenderCache']
+
+
+class RenderCache(Component):
+    """Cache for the results of expensive rendering steps, like the
+    syntax highlighting of source files or the blame of files.
+
+    The entries are stored as JSON files in the `files/render-cache`
+    directory of the environment, so they are shared by the processes
+    and persist across restarts. The least recently used entries are
+    removed when the total size exceeds `[mimeviewer]
+    render_cache_size`. The most recently used entries are also kept
+    in memory.
+
+    :since: 1.7.1
+    """
+
+    max_size = IntOption('mimeviewer', 'render_cache_size', 52428800,
+        """Maximum total size in bytes of the rendered content cached
+        in the `files/render-cache` directory of the environment, like
+        syntax highlighted source files and blame information. The cache
+        is disabled when set to `0`. (''since 1.7.1'')
+        """)
+
+    max_memory_entries = 64
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._disk_size = None
+
+    @property
+    def cache_dir(self):
+        return os.path.join(self.env.files_dir, 'render-cache')
+
+    @staticmethod
+    def make_key(*parts):
+        """Return a key made of the `repr` of each of `parts`, which can
+        be `bytes` or `str` objects, or any other value with a stable
+        `repr`.
+        """
+        h = hashlib.sha1()
+        for part in parts:
+            if isinstance(part, str):
+                part = part.encode('utf-8')
+            elif not isinstance(part, bytes):
+                part = repr(part).encode('utf-8')
+            h.update(b'%d:' % len(part))
+            h.update(part)
+        return h.hexdigest()
+
+    def get(self, namespace, key):
+        """Return the value stored for `key` in `namespace`, or `None`.
+        """
+        if self.max_size <= 0:
+            return None
+        entry = (namespace, key)
+        with self._lock:
+            if entry in self._memory:
+                self._memory.move_to_end(entry)
+                return self._memory[entry]
+        path = self._get_path(namespace, key)
+        try:
+            with open(path, 'rb') as f:
+                value = json.loads(f.read().decode('utf-8'))
+            os.utime(path)  # most recently used
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.log.warning("Can't read render cache entry %s: %s", path,
+                             exception_to_unicode(e))
+            return None
+        self._remember(entry, value)
+        return value
+
+    def set(self, namespace, key, value):
+        """Store the JSON serializable `value` for `key` in `namespace`.
+        """
+        if self.max_size <= 0:
+            return
+        data = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        if len(data) > self.max_size:
+            return
+        path = self._get_path(namespace, key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path, f = create_unique_file(path + '.tmp')
+            with f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.log.warning("Can't write render cache entry %s: %s", path,
+                             exception_to_unicode(e))
+            return
+        self._remember((namespace, key), value)
+        with self._lock:
+            if self._disk_size is not None:
+                self._disk_size += len(data)
+            trim = self._disk_size is None or self._disk_size > self.max_size
+        if trim:
+            self._trim()
+
+    def clear(self):
+        """Remove all the entries."""
+        with self._lock:
+            self._memory.clear()
+            self._disk_size = None
+        for path, size, mtime in self._list_files():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    # Internal methods
+
+    def _get_path(self, namespace, key):
+        return os.path.join(self.cache_dir, namespace, key[:2], key + '.json')
+
+    def _remember(self, entry, value):
+        with self._lock:
+            self._memory[entry] = value
+            self._memory.move_to_end(entry)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _list_files(self):
+        files = []
+        for dirpath, dirnames, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if not filename.endswith('.json'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((path, st.st_size, st.st_mtime))
+        return files
+
+    def _trim(self):
+        """Remove the least recently used entries, down to 80% of the
+        maximum size, and recompute the total size.
+        """
+        files = self._list_files()
+        total = sum(size for path, size, mtime in files)
+        if total > self.max_size:
+            limit = self.max_size * 0.8
+            files.sort(key=lambda f: f[2])
+            for path, size, mtime in files:
+                if total <= limit:
+                    break
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+                total -= size
+            with self._lock:
+                self._memory.clear()
+        with self._lock:
+            self._disk_size = total
@@ -25,6 +25,7 @@ from trac.api import ISystemInfoProvider
 from trac.core import *
 from trac.config import ConfigSection, ListOption, Option
 from trac.mimeview.api import IHTMLPreviewRenderer, Mimeview
+from trac.mimeview.cache import RenderCache
 from trac.prefs import IPreferencePanelProvider
 from trac.util import get_pkginfo, lazy
 from trac.util.datefmt import http_date, localtz
@@ -254,13 +255,22 @@ class PygmentsRenderer(Component):
         lexer_options.update(self._lexer_options.get(lexer_name, {}))
         if context:
             lexer_options.update(context.get_hint('lexer_options', {}))
-        lexer = get_lexer_by_name(lexer_name, **lexer_options)
-        out = io.StringIO()
-        # Specify `lineseparator` to workaround exception with Pygments 2.2.0:
-        # "TypeError: str argument expected, got 'bytes'" with newline input
-        formatter = HtmlFormatter(nowrap=True, lineseparator='\n')
-        formatter.format(lexer.get_tokens(content), out)
-        return Markup(out.getvalue())
+        cache = RenderCache(self.env)
+        key = cache.make_key(content, lexer_name,
+                             sorted(lexer_options.items()),
+                             pygments.__version__)
+        result = cache.get('pygments', key)
+        if result is None:
+            lexer = get_lexer_by_name(lexer_name, **lexer_options)
+            out = io.StringIO()
+            # Specify `lineseparator` to workaround exception with Pygments
+            # 2.2.0: "TypeError: str argument expected, got 'bytes'" with
+            # newline input
+            formatter = HtmlFormatter(nowrap=True, lineseparator='\n')
+            formatter.format(lexer.get_tokens(content), out)
+            result = out.getvalue()
+            cache.set('pygments', key, result)
+        return Markup(result)
 
     def _lexer_alias_to_name(self, alias):
         return self._lexer_alias_name_map.get(alias, alias)
@@ -13,13 +13,14 @@
 
 import unittest
 
-from trac.mimeview.tests import api, patch, pygments, rst, txtl
+from trac.mimeview.tests import api, cache, patch, pygments, rst, txtl
 from trac.mimeview.tests.functional import functionalSuite
 
 
 def test_suite():
     suite = unittest.TestSuite()
     suite.addTest(api.test_suite())
+    suite.addTest(cache.test_suite())
     suite.addTest(patch.test_suite())
     suite.addTest(pygments.test_suite())
     suite.addTest(rst.test_suite())
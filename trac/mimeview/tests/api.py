@@ -79,6 +79,21 @@ class MimeviewTestCase(unittest.TestCase):
     def tearDown(self):
         pass
 
+    def test_is_compressible(self):
+        mimeview = Mimeview(self.env)
+        self.assertTrue(mimeview.is_compressible('README'))
+        self.assertTrue(mimeview.is_compressible('trac/core.py'))
+        self.assertTrue(mimeview.is_compressible('logo.svg'))
+        self.assertFalse(mimeview.is_compressible('logo.png'))
+        self.assertFalse(mimeview.is_compressible('movie.mp4'))
+        self.assertFalse(mimeview.is_compressible('Trac-1.6.tar.gz'))
+        self.assertFalse(mimeview.is_compressible('Trac-1.6.zip'))
+
+        self.env.config.set('mimeviewer', 'archive_stored_types',
+                            'image/*')
+        self.assertFalse(mimeview.is_compressible('logo.svg'))
+        self.assertTrue(mimeview.is_compressible('movie.mp4'))
+
     def test_get_supported_conversions(self):
         class Converter0(Component):
             implements(IContentConverter)
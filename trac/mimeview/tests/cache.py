@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/.
+
+import os
+import unittest
+
+from trac.mimeview.cache import RenderCache
+from trac.test import EnvironmentStub, makeSuite, mkdtemp
+
+
+class RenderCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub(path=mkdtemp())
+        self.cache = RenderCache(self.env)
+
+    def tearDown(self):
+        self.env.reset_db_and_disk()
+
+    def _files(self):
+        return sorted(os.path.basename(path) for path, size, mtime
+                      in self.cache._list_files())
+
+    def test_make_key(self):
+        key = RenderCache.make_key(b'content', 'python', [('a', 1)])
+        self.assertEqual(40, len(key))
+        self.assertEqual(key, RenderCache.make_key(b'content', 'python',
+                                                   [('a', 1)]))
+        self.assertNotEqual(key, RenderCache.make_key(b'content', 'pytho',
+                                                      [('na', 1)]))
+        self.assertNotEqual(key, RenderCache.make_key('content', 'python',
+                                                      [('a', 2)]))
+
+    def test_get_set(self):
+        key = self.cache.make_key('content')
+        self.assertIsNone(self.cache.get('ns', key))
+
+        self.cache.set('ns', key, {'lines': ['a', 'b'], 'revs': [1, 2]})
+
+        self.assertEqual({'lines': ['a', 'b'], 'revs': [1, 2]},
+                         self.cache.get('ns', key))
+        self.assertIsNone(self.cache.get('other', key))
+        self.assertEqual([key + '.json'], self._files())
+
+    def test_persistent(self):
+        key = self.cache.make_key('content')
+        self.cache.set('ns', key, 'rendered')
+        self.cache._memory.clear()
+
+        self.assertEqual('rendered', self.cache.get('ns', key))
+
+    def test_least_recently_used_removed(self):
+        self.env.config.set('mimeviewer', 'render_cache_size', 120)
+        keys = [self.cache.make_key(i) for i in range(4)]
+        for idx, key in enumerate(keys[:3]):
+            self.cache.set('ns', key, 'x' * 30)  # 32 bytes
+            path = self.cache._get_path('ns', key)
+            os.utime(path, (1000000 + idx, 1000000 + idx))
+        self.cache._memory.clear()
+        self.cache.get('ns', keys[0])  # used, so kept
+
+        self.cache.set('ns', keys[3], 'x' * 30)
+
+        self.assertEqual(sorted([keys[0] + '.json', keys[2] + '.json',
+                                 keys[3] + '.json']), self._files())
+
+    def test_entry_larger_than_maximum_size(self):
+        self.env.config.set('mimeviewer', 'render_cache_size', 10)
+        key = self.cache.make_key('content')
+
+        self.cache.set('ns', key, 'x' * 20)
+
+        self.assertIsNone(self.cache.get('ns', key))
+        self.assertEqual([], self._files())
+
+    def test_disabled(self):
+        self.env.config.set('mimeviewer', 'render_cache_size', 0)
+        key = self.cache.make_key('content')
+
+        self.cache.set('ns', key, 'rendered')
+
+        self.assertIsNone(self.cache.get('ns', key))
+        self.assertFalse(os.path.exists(self.cache.cache_dir))
+
+    def test_clear(self):
+        self.cache.set('ns', self.cache.make_key(1), 'rendered')
+        self.cache.set('ns', self.cache.make_key(2), 'rendered')
+
+        self.cache.clear()
+
+        self.assertIsNone(self.cache.get('ns', self.cache.make_key(1)))
+        self.assertEqual([], self._files())
+
+
+def test_suite():
+    return makeSuite(RenderCacheTestCase)
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
@@ -19,7 +19,7 @@ import unittest
 from pkg_resources import parse_version
 
 from trac.mimeview.api import ImageRenderer, LineNumberAnnotator, Mimeview
-from trac.test import EnvironmentStub, MockRequest, makeSuite
+from trac.test import EnvironmentStub, MockRequest, makeSuite, mkdtemp
 from trac.util import get_pkginfo
 from trac.web.chrome import Chrome, web_context
 from trac.wiki.formatter import format_to_html
@@ -29,6 +29,7 @@ try:
 except ImportError:
     pygments = None
 else:
+    from trac.mimeview.cache import RenderCache
     from trac.mimeview.pygments import PygmentsRenderer
     pygments_version = parse_version(get_pkginfo(pygments).get('version'))
 
@@ -275,10 +276,38 @@ class PygmentsRendererTestCase(unittest.TestCase):
                       rendered)
 
 
+class PygmentsRenderCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub(enable=[Chrome, PygmentsRenderer],
+                                   path=mkdtemp())
+        self.pygments = PygmentsRenderer(self.env)
+        self.context = web_context(MockRequest(self.env))
+
+    def tearDown(self):
+        self.env.reset_db_and_disk()
+
+    def test_rendered_content_cached(self):
+        content = 'def hello():\n    return "Hello World!"\n'
+        result = self.pygments.render(self.context, 'text/x-python',
+                                      content)
+        cache = RenderCache(self.env)
+        self.assertEqual(1, len(cache._list_files()))
+
+        cache._memory.clear()
+        self.assertEqual(result, self.pygments.render(self.context,
+                                                      'text/x-python',
+                                                      content))
+        self.assertEqual(1, len(cache._list_files()))
+        self.pygments.render(self.context, 'text/x-python', content + '\n')
+        self.assertEqual(2, len(cache._list_files()))
+
+
 def test_suite():
     suite = unittest.TestSuite()
     if pygments:
         suite.addTest(makeSuite(PygmentsRendererTestCase))
+        suite.addTest(makeSuite(PygmentsRenderCacheTestCase))
     else:
         print('SKIP: mimeview/tests/pygments (no pygments installed)')
     return suite
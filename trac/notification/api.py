@@ -224,7 +224,9 @@ class NotificationSystem(Component):
         This component is used by the notification system to send emails.
         Trac currently provides `SmtpEmailSender` for connecting to an SMTP
         server, and `SendmailEmailSender` for running a `sendmail`-compatible
-        executable.
+        executable. `QueuedEmailSender` stores the messages in a queue, from
+        which they are delivered in the background by the sender configured
+        in `queue_email_sender` (''since 1.7.1'').
         """)
 
     smtp_enabled = BoolOption('notification', 'smtp_enabled', 'false',
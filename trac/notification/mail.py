@@ -732,13 +732,79 @@ class SmtpEmailSender(Component):
             return smtplib.SMTP
 
     def send(self, from_addr, recipients, message):
-        global local_hostname
-
-        # Ensure the message complies with RFC2822: use CRLF line endings
-        message = fix_eol(message, CRLF)
-
         self.log.info("Sending notification through SMTP at %s:%d to %s",
                       self.smtp_server, self.smtp_port, recipients)
+        server = self._connect()
+        try:
+            self._login(server)
+            self._sendmail(server, from_addr, recipients, message)
+            self._quit(server)
+        except smtplib.SMTPException:
+            raise
+        except Exception as e:
+            self.log.error("Exception caught while sending notification "
+                           "through SMTP at %s:%d%s",
+                           self.smtp_server, self.smtp_port,
+                           exception_to_unicode(e, traceback=True))
+            raise
+        finally:
+            server.close()
+
+    def send_messages(self, messages):
+        """Send several messages through a single SMTP connection.
+
+        :param messages: a list of `(from_addr, recipients, message)`
+                         tuples.
+        :return: a list with the exception raised for each message, or
+                 `None` if the message has been sent.
+        :since: 1.7.1
+        """
+        self.log.info("Sending %d notifications through SMTP at %s:%d",
+                      len(messages), self.smtp_server, self.smtp_port)
+        errors = []
+        server = connect_error = None
+        try:
+            for from_addr, recipients, message in messages:
+                if server is None and connect_error is None:
+                    try:
+                        server = self._connect()
+                        self._login(server)
+                    except Exception as e:
+                        if server is not None:
+                            server.close()
+                            server = None
+                        connect_error = e
+                if connect_error is not None:
+                    errors.append(connect_error)
+                    continue
+                try:
+                    self._sendmail(server, from_addr, recipients, message)
+                except (smtplib.SMTPRecipientsRefused,
+                        smtplib.SMTPSenderRefused,
+                        smtplib.SMTPDataError) as e:
+                    # The connection is still usable
+                    errors.append(e)
+                except Exception as e:
+                    # Reconnect for the next message
+                    errors.append(e)
+                    server.close()
+                    server = None
+                else:
+                    errors.append(None)
+            if server is not None:
+                self._quit(server)
+        except Exception as e:
+            self.log.warning("Exception caught while closing SMTP "
+                             "connection to %s:%d: %s", self.smtp_server,
+                             self.smtp_port, exception_to_unicode(e))
+        finally:
+            if server is not None:
+                server.close()
+        return errors
+
+    def _connect(self):
+        global local_hostname
+
         try:
             server = self.smtp_class(self.smtp_server, self.smtp_port,
                                      local_hostname)
@@ -752,44 +818,41 @@ class SmtpEmailSender(Component):
                      option2=tag.code("[notification] smtp_port")))
         else:
             local_hostname = server.local_hostname
-
-        try:
-            # server.set_debuglevel(True)
-            if self.use_tls:
-                server.ehlo()
-                if 'starttls' not in server.esmtp_features:
-                    raise ConfigurationError(_("TLS enabled but server does "
-                                               "not support TLS"))
-                server.starttls()
-                server.ehlo()
-            if self.smtp_user:
-                server.login(self.smtp_user, self.smtp_password)
-            start = time_now()
-            server.sendmail(from_addr, recipients, message)
-            t = time_now() - start
-            if t > 5:
-                self.log.warning("Slow mail submission (%.2f s), "
-                                 "check your mail setup", t)
-            if self.use_tls:
-                # avoid false failure detection when the server closes
-                # the SMTP connection with TLS enabled
-                import socket
-                try:
-                    server.quit()
-                except socket.sslerror:
-                    pass
-            else:
+        return server
+
+    def _login(self, server):
+        # server.set_debuglevel(True)
+        if self.use_tls:
+            server.ehlo()
+            if 'starttls' not in server.esmtp_features:
+                raise ConfigurationError(_("TLS enabled but server does "
+                                           "not support TLS"))
+            server.starttls()
+            server.ehlo()
+        if self.smtp_user:
+            server.login(self.smtp_user, self.smtp_password)
+
+    def _sendmail(self, server, from_addr, recipients, message):
+        # Ensure the message complies with RFC2822: use CRLF line endings
+        message = fix_eol(message, CRLF)
+        start = time_now()
+        server.sendmail(from_addr, recipients, message)
+        t = time_now() - start
+        if t > 5:
+            self.log.warning("Slow mail submission (%.2f s), "
+                             "check your mail setup", t)
+
+    def _quit(self, server):
+        if self.use_tls:
+            # avoid false failure detection when the server closes
+            # the SMTP connection with TLS enabled
+            import socket
+            try:
                 server.quit()
-        except smtplib.SMTPException:
-            raise
-        except Exception as e:
-            self.log.error("Exception caught while sending notification "
-                           "through SMTP at %s:%d%s",
-                           self.smtp_server, self.smtp_port,
-                           exception_to_unicode(e, traceback=True))
-            raise
-        finally:
-            server.close()
+            except socket.sslerror:
+                pass
+        else:
+            server.quit()
 
 
 class SendmailEmailSender(Component):
@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+import threading
+
+from trac.admin import IAdminCommandProvider
+from trac.admin.api import console_datetime_format
+from trac.config import ConfigurationError, ExtensionOption, IntOption
+from trac.core import Component, implements
+from trac.db.api import DatabaseManager
+from trac.notification.api import IEmailSender
+from trac.util.datefmt import datetime_now, format_datetime, \
+                              from_utimestamp, to_utimestamp, utc
+from trac.util.text import exception_to_unicode, print_table, printout, \
+                           shorten_line
+from trac.util.translation import _, ngettext
+from trac.web.api import IRequestFilter
+
+__all__ = ['QueuedEmailSender']
+
+
+class QueuedEmailSender(Component):
+    """E-mail sender storing the messages in a queue in the database.
+
+    The queued messages are delivered by a background thread, started
+    when a message is queued or when the first request of the process
+    finds messages left in the queue, using the sender configured in
+    `[notification] queue_email_sender`. Messages are delivered in
+    batches, through a single connection to the SMTP server, and the
+    failed deliveries are retried with an increasing delay.
+
+    The queue can be inspected and delivered with the `notification
+    status` and `notification flush` commands of `trac-admin`.
+
+    :since: 1.7.1
+    """
+
+    implements(IAdminCommandProvider, IEmailSender, IRequestFilter)
+
+    queue_email_sender = ExtensionOption('notification',
+                                         'queue_email_sender', IEmailSender,
+                                         'SmtpEmailSender',
+        """Name of the component implementing `IEmailSender` which
+        delivers the messages queued by `QueuedEmailSender`.
+        (''since 1.7.1'')
+        """)
+
+    max_attempts = IntOption('notification', 'queue_max_attempts', 5,
+        """Number of attempts to deliver a queued message before giving
+        up. The messages which couldn't be delivered are kept in the
+        queue until delivered with the `notification flush` command of
+        `trac-admin`. (''since 1.7.1'')
+        """)
+
+    retry_delay = IntOption('notification', 'queue_retry_delay', 60,
+        """Delay in seconds before retrying to deliver a queued message.
+        The delay is doubled after each failed attempt.
+        (''since 1.7.1'')
+        """)
+
+    batch_size = IntOption('notification', 'queue_batch_size', 100,
+        """Maximum number of queued messages delivered through a single
+        connection. (''since 1.7.1'')
+        """)
+
+    #: Seconds during which a message being delivered is not delivered
+    #: by other processes
+    lease_time = 600
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._checked = False
+
+    # IAdminCommandProvider methods
+
+    def get_admin_commands(self):
+        yield ('notification flush', '',
+               """Deliver all the queued notification e-mails
+
+               The messages waiting for another delivery attempt and the
+               messages which couldn't be delivered are included.
+               """,
+               None, self._do_flush)
+        yield ('notification status', '',
+               'Show the queued notification e-mails',
+               None, self._do_status)
+
+    def _do_flush(self):
+        delivered, failed = self.deliver(flush=True)
+        printout(ngettext("%(num)s message delivered.",
+                          "%(num)s messages delivered.", delivered))
+        if failed:
+            printout(ngettext("%(num)s message failed.",
+                              "%(num)s messages failed.", failed))
+
+    def _do_status(self):
+        now = to_utimestamp(datetime_now(utc))
+        rows = []
+        for id, time, next_attempt, attempts, recipients, error in \
+                self.env.db_query("""
+                    SELECT id, time, next_attempt, attempts, recipients,
+                           error
+                    FROM notify_queue ORDER BY id"""):
+            if next_attempt is None:
+                status = _("failed")
+            elif next_attempt <= now:
+                status = _("pending")
+            else:
+                status = format_datetime(from_utimestamp(next_attempt),
+                                         console_datetime_format)
+            rows.append((id, format_datetime(from_utimestamp(time),
+                                             console_datetime_format),
+                         attempts, status,
+                         shorten_line(', '.join(recipients.splitlines()), 40),
+                         shorten_line(error or '', 40)))
+        print_table(rows, [_("Id"), _("Queued"), _("Attempts"),
+                           _("Next attempt"), _("Recipients"), _("Error")])
+
+    # IEmailSender methods
+
+    def send(self, from_addr, recipients, message):
+        try:
+            text = str(message, 'utf-8')
+        except UnicodeDecodeError:
+            self.log.info("Sending notification without queuing it, as it "
+                          "is not UTF-8 encoded")
+            self._get_sender().send(from_addr, recipients, message)
+            return
+        now = to_utimestamp(datetime_now(utc))
+        with self.env.db_transaction as db:
+            db("""INSERT INTO notify_queue
+                    (time, next_attempt, attempts, from_addr, recipients,
+                     message)
+                  VALUES (%s,%s,0,%s,%s,%s)
+                  """, (now, now, from_addr, '\n'.join(recipients), text))
+            DatabaseManager(self.env).on_commit(self._start_worker)
+        self.log.debug("Queued notification to %s", recipients)
+
+    # IRequestFilter methods
+
+    def pre_process_request(self, req, handler):
+        # The messages left in the queue by a previous process are
+        # delivered from the processes serving the requests, which can
+        # be forked after loading the component.
+        with self._lock:
+            checked = self._checked
+            self._checked = True
+        if not checked:
+            for count, in self.env.db_query("""
+                    SELECT COUNT(*) FROM notify_queue
+                    WHERE next_attempt IS NOT NULL"""):
+                if count:
+                    self._start_worker()
+        return handler
+
+    def post_process_request(self, req, template, data, metadata):
+        return template, data, metadata
+
+    # Public methods
+
+    def deliver(self, flush=False):
+        """Deliver the queued messages which are due.
+
+        :param flush: if `True`, deliver all the queued messages.
+        :return: a `(delivered, failed)` tuple with the number of
+                 messages delivered and the number of failed attempts.
+        """
+        sender = self._get_sender()
+        delivered = failed = 0
+        seen = set()
+        while True:
+            messages = self._claim(flush, seen)
+            if not messages:
+                break
+            send_messages = getattr(sender, 'send_messages', None)
+            items = [(from_addr, recipients, message)
+                     for id, attempts, from_addr, recipients, message
+                     in messages]
+            if send_messages is not None:
+                errors = send_messages(items)
+            else:
+                errors = []
+                for item in items:
+                    try:
+                        sender.send(*item)
+                    except Exception as e:
+                        errors.append(e)
+                    else:
+                        errors.append(None)
+            self._update(messages, errors)
+            failed += sum(1 for e in errors if e is not None)
+            delivered += sum(1 for e in errors if e is None)
+        return delivered, failed
+
+    def shutdown(self):
+        """Stop the delivery thread."""
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+            self._thread = None
+        self._wakeup.set()
+        if thread is not None:
+            thread.join()
+
+    # Internal methods
+
+    def _get_sender(self):
+        sender = self.queue_email_sender
+        if sender is self:
+            raise ConfigurationError(
+                _("%(option)s can't be %(component)s.",
+                  option="[notification] queue_email_sender",
+                  component=self.__class__.__name__))
+        return sender
+
+    def _start_worker(self):
+        with self._lock:
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(
+                    target=self._run, name='QueuedEmailSender')
+                self._thread.daemon = True
+                self._thread.start()
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.clear()
+            try:
+                self.deliver()
+                timeout = self._get_next_attempt_delay()
+            except Exception as e:
+                self.log.error("Failure delivering queued notifications: "
+                               "%s", exception_to_unicode(e, traceback=True))
+                timeout = self.retry_delay
+            self._wakeup.wait(timeout)
+
+    def _get_next_attempt_delay(self):
+        for next_attempt, in self.env.db_query("""
+                SELECT MIN(next_attempt) FROM notify_queue"""):
+            if next_attempt is not None:
+                now = to_utimestamp(datetime_now(utc))
+                return max(0, next_attempt - now) / 1000000.0
+
+    def _claim(self, flush, seen):
+        """Return the next batch of messages to deliver, after postponing
+        their next attempt so that they are not delivered by another
+        process in the meantime.
+        """
+        now = to_utimestamp(datetime_now(utc))
+        if flush:
+            where = ''
+            args = [self.batch_size + len(seen)]
+        else:
+            where = 'WHERE next_attempt<=%s'
+            args = [now, self.batch_size + len(seen)]
+        messages = []
+        with self.env.db_transaction as db:
+            rows = db("""
+                SELECT id, next_attempt, attempts, from_addr, recipients,
+                       message
+                FROM notify_queue %s ORDER BY id LIMIT %%s
+                """ % where, args)
+            cursor = db.cursor()
+            for id, next_attempt, attempts, from_addr, recipients, \
+                    message in rows:
+                if id in seen:
+                    continue
+                seen.add(id)
+                if next_attempt is None:
+                    cursor.execute("""
+                        UPDATE notify_queue SET next_attempt=%s
+                        WHERE id=%s AND next_attempt IS NULL
+                        """, (now + self.lease_time * 1000000, id))
+                else:
+                    cursor.execute("""
+                        UPDATE notify_queue SET next_attempt=%s
+                        WHERE id=%s AND next_attempt=%s
+                        """, (now + self.lease_time * 1000000, id,
+                              next_attempt))
+                if cursor.rowcount == 1:
+                    messages.append((id, attempts + 1, from_addr,
+                                     recipients.splitlines(),
+                                     message.encode('utf-8')))
+                if len(messages) >= self.batch_size:
+                    break
+        return messages
+
+    def _update(self, messages, errors):
+        now = to_utimestamp(datetime_now(utc))
+        with self.env.db_transaction as db:
+            for (id, attempts, from_addr, recipients, message), error \
+                    in zip(messages, errors):
+                if error is None:
+                    db("DELETE FROM notify_queue WHERE id=%s", (id,))
+                    continue
+                error = exception_to_unicode(error)
+                if attempts >= self.max_attempts:
+                    next_attempt = None
+                    self.log.error("Giving up delivering notification %s "
+                                   "to %s after %d attempts: %s", id,
+                                   recipients, attempts, error)
+                else:
+                    delay = self.retry_delay * 2 ** (attempts - 1)
+                    next_attempt = now + delay * 1000000
+                    self.log.warning("Failed to deliver notification %s to "
+                                     "%s, retrying in %d seconds: %s", id,
+                                     recipients, delay, error)
+                db("""UPDATE notify_queue
+                      SET next_attempt=%s, attempts=%s, error=%s
+                      WHERE id=%s
+                      """, (next_attempt, attempts, error, id))
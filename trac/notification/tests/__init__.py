@@ -13,7 +13,7 @@
 
 import unittest
 
-from . import api, mail, model, prefs
+from . import api, mail, model, prefs, queue
 
 
 def test_suite():
@@ -22,6 +22,7 @@ def test_suite():
     suite.addTest(mail.test_suite())
     suite.addTest(model.test_suite())
     suite.addTest(prefs.test_suite())
+    suite.addTest(queue.test_suite())
     return suite
 
 
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+import unittest
+
+from trac.admin.api import console_datetime_format
+from trac.admin.console import TracAdmin
+from trac.admin.test import TracAdminTestCaseBase
+from trac.config import ConfigurationError
+from trac.core import Component, ComponentMeta, implements
+from trac.notification.api import IEmailSender, NotificationSystem
+from trac.notification.queue import QueuedEmailSender
+from trac.test import EnvironmentStub, MockRequest, makeSuite
+from trac.util.datefmt import datetime_now, format_datetime, \
+                              from_utimestamp, to_utimestamp, utc
+
+
+class QueuedEmailSenderTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        class QueueTestEmailSender(Component):
+            implements(IEmailSender)
+
+            def __init__(self):
+                self.history = []
+                self.errors = {}
+
+            def send(self, from_addr, recipients, message):
+                error = self.errors.get(tuple(recipients))
+                if error:
+                    raise error
+                self.history.append((from_addr, recipients, message))
+
+        class QueueTestBatchEmailSender(QueueTestEmailSender):
+
+            def __init__(self):
+                super().__init__()
+                self.batches = []
+
+            def send_messages(self, messages):
+                self.batches.append(len(messages))
+                errors = []
+                for message in messages:
+                    try:
+                        self.send(*message)
+                    except Exception as e:
+                        errors.append(e)
+                    else:
+                        errors.append(None)
+                return errors
+
+        cls.sender_classes = [QueueTestEmailSender,
+                              QueueTestBatchEmailSender]
+
+    @classmethod
+    def tearDownClass(cls):
+        for component in cls.sender_classes:
+            ComponentMeta.deregister(component)
+
+    def setUp(self):
+        self.env = EnvironmentStub(enable=['trac.*'] + self.sender_classes)
+        self.env.config.set('notification', 'email_sender',
+                            'QueuedEmailSender')
+        self.env.config.set('notification', 'queue_email_sender',
+                            'QueueTestEmailSender')
+        self.queue = QueuedEmailSender(self.env)
+        self.started = []
+        self.queue._start_worker = lambda: self.started.append(True)
+
+    def tearDown(self):
+        self.env.reset_db()
+
+    def _send(self, recipient, body='body'):
+        NotificationSystem(self.env).send_email(
+            'trac@example.org', [recipient], b'Subject: test\n\n' +
+            body.encode('utf-8'))
+
+    def _queued(self):
+        return self.env.db_query("""
+            SELECT recipients, attempts, next_attempt, error
+            FROM notify_queue ORDER BY id""")
+
+    def test_send_queues_message(self):
+        self._send('joe@example.org', 'café')
+
+        sender = self.env[self.sender_classes[0]]
+        self.assertEqual([], sender.history)
+        self.assertEqual([True], self.started)
+        rows = self._queued()
+        self.assertEqual(1, len(rows))
+        self.assertEqual(('joe@example.org', 0, None),
+                         (rows[0][0], rows[0][1], rows[0][3]))
+
+    def test_worker_started_after_commit(self):
+        with self.env.db_transaction:
+            self._send('joe@example.org')
+            self.assertEqual([], self.started)
+        self.assertEqual([True], self.started)
+
+    def test_deliver(self):
+        self._send('joe@example.org', 'café')
+        self._send('jim@example.org')
+
+        self.assertEqual((2, 0), self.queue.deliver())
+
+        sender = self.env[self.sender_classes[0]]
+        self.assertEqual([('trac@example.org', ['joe@example.org'],
+                           'Subject: test\n\ncafé'.encode('utf-8')),
+                          ('trac@example.org', ['jim@example.org'],
+                           b'Subject: test\n\nbody')], sender.history)
+        self.assertEqual([], self._queued())
+        self.assertEqual((0, 0), self.queue.deliver())
+
+    def test_deliver_in_batches(self):
+        self.env.config.set('notification', 'queue_email_sender',
+                            'QueueTestBatchEmailSender')
+        self.env.config.set('notification', 'queue_batch_size', 2)
+        for i in range(5):
+            self._send('user%d@example.org' % i)
+
+        self.assertEqual((5, 0), self.queue.deliver())
+
+        sender = self.env[self.sender_classes[1]]
+        self.assertEqual([2, 2, 1], sender.batches)
+        self.assertEqual(['user%d@example.org' % i for i in range(5)],
+                         [h[1][0] for h in sender.history])
+
+    def test_retry_with_backoff(self):
+        self.env.config.set('notification', 'queue_retry_delay', 60)
+        sender = self.env[self.sender_classes[0]]
+        sender.errors[('joe@example.org',)] = Exception('Unavailable')
+        self._send('joe@example.org')
+        self._send('jim@example.org')
+
+        now = to_utimestamp(datetime_now(utc))
+        self.assertEqual((1, 1), self.queue.deliver())
+        rows = self._queued()
+        self.assertEqual(1, len(rows))
+        recipients, attempts, next_attempt, error = rows[0]
+        self.assertEqual(1, attempts)
+        self.assertEqual('Exception: Unavailable', error)
+        self.assertGreaterEqual(next_attempt, now + 60 * 1000000)
+        self.assertLess(next_attempt, now + 120 * 1000000)
+
+        # Not due yet
+        self.assertEqual((0, 0), self.queue.deliver())
+
+        self.env.db_transaction("UPDATE notify_queue SET next_attempt=0")
+        self.assertEqual((0, 1), self.queue.deliver())
+        recipients, attempts, next_attempt, error = self._queued()[0]
+        self.assertEqual(2, attempts)
+        self.assertGreaterEqual(next_attempt, now + 120 * 1000000)
+
+    def test_give_up_after_max_attempts(self):
+        self.env.config.set('notification', 'queue_max_attempts', 2)
+        sender = self.env[self.sender_classes[0]]
+        sender.errors[('joe@example.org',)] = Exception('Unavailable')
+        self._send('joe@example.org')
+
+        self.assertEqual((0, 1), self.queue.deliver())
+        self.env.db_transaction("UPDATE notify_queue SET next_attempt=0")
+        self.assertEqual((0, 1), self.queue.deliver())
+        self.assertEqual([('joe@example.org', 2, None,
+                           'Exception: Unavailable')], self._queued())
+        self.assertEqual((0, 0), self.queue.deliver())
+
+        del sender.errors[('joe@example.org',)]
+        self.assertEqual((1, 0), self.queue.deliver(flush=True))
+        self.assertEqual([], self._queued())
+
+    def test_claimed_messages_are_skipped(self):
+        self._send('joe@example.org')
+        later = to_utimestamp(datetime_now(utc)) + 600 * 1000000
+        self.env.db_transaction("UPDATE notify_queue SET next_attempt=%s",
+                                (later,))
+
+        self.assertEqual((0, 0), self.queue.deliver())
+
+    def test_worker_not_started_on_request_if_queue_empty(self):
+        self.queue.pre_process_request(MockRequest(self.env), None)
+        self.assertEqual([], self.started)
+
+    def test_worker_started_on_first_request(self):
+        self._send('joe@example.org')
+        del self.started[:]
+        req = MockRequest(self.env)
+        self.queue.pre_process_request(req, None)
+        self.queue.pre_process_request(req, None)
+        self.assertEqual([True], self.started)
+
+    def test_queue_email_sender_cannot_be_itself(self):
+        self.env.config.set('notification', 'queue_email_sender',
+                            'QueuedEmailSender')
+        self._send('joe@example.org')
+
+        self.assertRaises(ConfigurationError, self.queue.deliver)
+
+
+class QueuedEmailSenderCommandTestCase(TracAdminTestCaseBase):
+
+    expected_results_filename = 'queue-console-tests.txt'
+
+    def setUp(self):
+        self.env = EnvironmentStub(default_data=True, enable=('trac.*',),
+                                   disable=('trac.tests.*',))
+        self.admin = TracAdmin()
+        self.admin.env_set('', self.env)
+
+    def tearDown(self):
+        self.env.reset_db()
+
+    def test_status_empty(self):
+        rv, output = self.execute('notification status')
+        self.assertEqual(0, rv, output)
+        self.assertExpectedResult(output)
+
+    def test_status(self):
+        self.env.db_transaction.executemany("""
+            INSERT INTO notify_queue
+              (time, next_attempt, attempts, from_addr, recipients,
+               message, error)
+            VALUES (%s,%s,%s,'trac@example.org',%s,'',%s)
+            """, [(1000000, 1000000, 0, 'joe@example.org', None),
+                  (1000000, None, 5, 'jim@example.org\njoe@example.org',
+                   'Unavailable')])
+
+        rv, output = self.execute('notification status')
+        self.assertEqual(0, rv, output)
+        self.assertExpectedResult(output, {
+            'date': format_datetime(from_utimestamp(1000000),
+                                    console_datetime_format)})
+
+
+def test_suite():
+    suite = unittest.TestSuite()
+    suite.addTest(makeSuite(QueuedEmailSenderTestCase))
+    suite.addTest(makeSuite(QueuedEmailSenderCommandTestCase))
+    return suite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
@@ -161,6 +161,25 @@ class IPermissionPolicy(Interface):
         this will probably change in the future (e.g. `'VIEW' in ...`).
         """
 
+    def check_permissions_batch(action, username, resources, perm):
+        """Check that the action can be performed by username on each
+        of the resources.
+
+        This method is optional. Policies not implementing it are
+        consulted with `check_permission` for each resource.
+
+        :param resources: the list of resources on which the check
+                          applies.
+        :param perm: the permission cache for that username, which is
+                     not specific to any of the resources.
+
+        :return: an iterable of decisions, in the order of `resources`,
+                 with the same meaning as the return value of
+                 `check_permission`.
+
+        :since: 1.7.1
+        """
+
 
 class DefaultPermissionStore(Component):
     """Default implementation of permission storage and group management.
@@ -321,6 +340,11 @@ class DefaultPermissionPolicy(Component):
 
         return action in permissions or None
 
+    def check_permissions_batch(self, action, username, resources, perm):
+        # The decision only depends on the user.
+        decision = self.check_permission(action, username, None, perm)
+        return [decision] * len(resources)
+
 
 class PermissionSystem(Component):
     """Permission management sub-system."""
@@ -571,6 +595,48 @@ class PermissionSystem(Component):
                        username, action, resource)
         return False
 
+    def check_permissions_batch(self, action, username=None, resources=(),
+                                perm=None):
+        """Return a list telling, for each resource in `resources`,
+        whether permission to perform action is allowed.
+
+        The policies implementing `check_permissions_batch` decide for
+        all the resources at once.
+
+        :since: 1.7.1
+        """
+        if username is None:
+            username = 'anonymous'
+        resources = [None if resource and resource.realm is None
+                     else resource for resource in resources]
+        decisions = [None] * len(resources)
+        pending = list(range(len(resources)))
+        for policy in self.policies:
+            if not pending:
+                break
+            subset = [resources[idx] for idx in pending]
+            if hasattr(policy, 'check_permissions_batch'):
+                results = policy.check_permissions_batch(action, username,
+                                                         subset, perm)
+            else:
+                results = [policy.check_permission(
+                               action, username, resource,
+                               perm(resource) if perm else None)
+                           for resource in subset]
+            undecided = []
+            for idx, decision in zip(pending, results):
+                if decision is None:
+                    undecided.append(idx)
+                else:
+                    decisions[idx] = decision
+            if len(undecided) != len(pending):
+                self.log.debug("%s decided %s performing %s on %d of %d "
+                               "resources", policy.__class__.__name__,
+                               username, action,
+                               len(pending) - len(undecided), len(resources))
+            pending = undecided
+        return [bool(decision) for decision in decisions]
+
     # IPermissionRequestor methods
 
     def get_permission_actions(self):
@@ -672,6 +738,45 @@ class PermissionCache(object):
 
     __contains__ = has_permission
 
+    def filter(self, action, resources):
+        """Return the list of resources in `resources` on which the
+        action is allowed, in their original order.
+
+        The permissions are evaluated in a single pass of the policies
+        and cached, so that subsequent checks on the same resources
+        are cheap:
+
+            tickets = perm.filter('TICKET_VIEW', resources)
+
+        :since: 1.7.1
+        """
+        resources = list(resources)
+        unknown = []
+        for resource in resources:
+            key = (self.username, hash(resource), action)
+            cached = self._cache.get(key)
+            if not cached or resource != cached[1]:
+                # Avoid recursion in policies that call has_permission.
+                self._cache[key] = (False, resource)
+                unknown.append(resource)
+        if unknown:
+            decisions = PermissionSystem(self.env). \
+                        check_permissions_batch(action, self.username,
+                                                unknown, self)
+            for resource, decision in zip(unknown, decisions):
+                key = (self.username, hash(resource), action)
+                self._cache[key] = (decision, resource)
+        allowed = []
+        for resource in resources:
+            cached = self._cache.get((self.username, hash(resource), action))
+            if cached and resource == cached[1]:
+                decision = cached[0]
+            else:
+                decision = self._has_permission(action, resource)
+            if decision:
+                allowed.append(resource)
+        return allowed
+
     def require(self, action, realm_or_resource=None, id=False, version=False,
                 message=None):
         resource = self._normalize_resource(realm_or_resource, id, version)
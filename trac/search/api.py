@@ -37,7 +37,47 @@ class ISearchSource(Interface):
         being the name of the tuples returned by `get_search_events`.
 
         The events returned by this function must be tuples of the form
-        `(href, title, date, author, excerpt).`
+        `(href, title, date, author, excerpt)`. An optional sixth item
+        can provide a relevance score, in which case results are ranked
+        by descending score before date.
+        """
+
+
+class ISearchIndexBackend(Interface):
+    """Extension point interface for the storage engines of the
+    full-text search index.
+
+    :since: 1.7.1
+    """
+
+    def get_supported_schemes():
+        """Return the list of database schemes supported by the
+        backend, e.g. `['sqlite']`.
+        """
+
+    def create_index(db):
+        """Create the database structures holding the index."""
+
+    def drop_index(db):
+        """Drop the database structures holding the index."""
+
+    def insert_documents(db, documents):
+        """Add `documents` to the index.
+
+        Each document is a `(resource, text)` tuple, where `resource` is
+        a `Resource` with an optional parent.
+        """
+
+    def delete_documents(db, resources):
+        """Remove the documents of `resources` from the index."""
+
+    def search(db, realm, terms, parent_realm=None):
+        """Return the documents of `realm` matching all of `terms` as
+        `(id, parent_id, score)` tuples.
+
+        Each term matches words starting with its words. A higher score
+        denotes a better match. When `parent_realm` is given, only
+        the documents with a parent in that realm are considered.
         """
 
 
@@ -0,0 +1,641 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+import math
+import re
+from collections import defaultdict
+
+from trac.admin import IAdminCommandProvider
+from trac.api import IEnvironmentSetupParticipant
+from trac.attachment import IAttachmentChangeListener
+from trac.config import ConfigurationError, Option
+from trac.core import *
+from trac.db.api import DatabaseManager, parse_connection_uri
+from trac.db.schema import Column, Index, Table
+from trac.resource import Resource
+from trac.search.api import ISearchIndexBackend
+from trac.ticket.api import IMilestoneChangeListener, ITicketChangeListener
+from trac.util.text import printout
+from trac.util.translation import _
+from trac.versioncontrol.api import IRepositoryChangeListener, \
+                                    RepositoryManager
+from trac.wiki.api import IWikiChangeListener
+
+_word_re = re.compile(r'\w+', re.UNICODE)
+
+# Longer words are truncated, which keeps the index keys bounded.
+MAX_WORD_LENGTH = 64
+
+
+def tokenize(text):
+    """Split `text` into the lower case words stored in the index."""
+    return [word[:MAX_WORD_LENGTH]
+            for word in _word_re.findall((text or '').lower())]
+
+
+def _document_key(resource):
+    parent = resource.parent
+    return (resource.realm, str(resource.id),
+            parent.realm if parent else '',
+            str(parent.id) if parent else '')
+
+
+class SearchIndex(Component):
+    """Maintains the full-text index queried by the search sources.
+
+    The index is kept up to date by listening to changes of tickets,
+    milestones, wiki pages, attachments and changesets. It can be
+    rebuilt with the `search reindex` command of `trac-admin`.
+    """
+
+    implements(IAdminCommandProvider, IAttachmentChangeListener,
+               IEnvironmentSetupParticipant, IMilestoneChangeListener,
+               IRepositoryChangeListener, ITicketChangeListener,
+               IWikiChangeListener)
+
+    backends = ExtensionPoint(ISearchIndexBackend)
+
+    index_backend = Option('search', 'index_backend', '',
+        """Name of the component implementing `ISearchIndexBackend`
+        that stores the full-text search index. The backends provided
+        by default are `PythonSearchIndexBackend`, which works with
+        any database, `SQLiteSearchIndexBackend` (SQLite FTS5),
+        `PostgreSQLSearchIndexBackend` (`tsvector`) and
+        `MySQLSearchIndexBackend` (`FULLTEXT`).
+
+        When empty, searches scan the tables with `LIKE` clauses. The
+        environment needs to be upgraded after changing this option.
+        Changesets are indexed when they are reported through the
+        `changeset added` command of `trac-admin`, otherwise the index
+        must be rebuilt with `search reindex`.
+        (''since 1.7.1'')""")
+
+    system_entry = 'search_index_backend'
+
+    @property
+    def backend(self):
+        """The active `ISearchIndexBackend`, or `None` if the index is
+        disabled.
+        """
+        name = self.index_backend
+        if not name:
+            return None
+        for backend in self.backends:
+            if backend.__class__.__name__ == name:
+                break
+        else:
+            raise ConfigurationError(
+                _("Cannot find an implementation of the ISearchIndexBackend "
+                  "interface named %(name)s. Please check that the Component "
+                  "is enabled or update the option [search] index_backend "
+                  "in trac.ini.", name=name))
+        scheme = parse_connection_uri(
+            DatabaseManager(self.env).connection_uri)[0]
+        if scheme not in backend.get_supported_schemes():
+            raise ConfigurationError(
+                _("The search index backend %(name)s does not support the "
+                  "%(scheme)s database.", name=name, scheme=scheme))
+        return backend
+
+    def search(self, realm, terms, parent_realm=None):
+        """Return the documents of `realm` matching all of `terms` as
+        `(id, parent_id, score)` tuples, best match first.
+
+        `None` is returned when the index is disabled, in which case
+        the caller should fall back to scanning the tables.
+        """
+        backend = self.backend
+        if backend is None:
+            return None
+        with self.env.db_query as db:
+            hits = backend.search(db, realm, terms, parent_realm)
+        return sorted(hits, key=lambda hit: hit[2], reverse=True)
+
+    def reindex(self):
+        """Rebuild the whole index."""
+        backend = self.backend
+        if backend is None:
+            return
+        with self.env.db_transaction as db:
+            backend.drop_index(db)
+            backend.create_index(db)
+            for documents in (self._get_ticket_documents(db),
+                              self._get_milestone_documents(db),
+                              self._get_wiki_documents(db),
+                              self._get_attachment_documents(db),
+                              self._get_changeset_documents(db)):
+                backend.insert_documents(db, documents)
+
+    def update(self, documents=(), removed=()):
+        """Replace the indexed text of `documents`, given as
+        `(resource, text)` tuples, and remove the `removed` resources.
+        """
+        backend = self.backend
+        if backend is None:
+            return
+        documents = list(documents)
+        with self.env.db_transaction as db:
+            backend.delete_documents(db, list(removed) +
+                                         [resource for resource, text
+                                          in documents])
+            backend.insert_documents(db, documents)
+
+    # IAdminCommandProvider methods
+
+    def get_admin_commands(self):
+        yield ('search reindex', '',
+               """Rebuild the full-text search index
+
+               The index is only used when a backend is selected with the
+               `[search] index_backend` option.
+               """,
+               None, self._do_reindex)
+
+    def _do_reindex(self):
+        if self.backend is None:
+            printout(_("The search index is disabled."))
+            return
+        self.reindex()
+        printout(_("Search index rebuilt."))
+
+    # IEnvironmentSetupParticipant methods
+
+    def environment_created(self):
+        if self.index_backend:
+            self.upgrade_environment()
+
+    def environment_needs_upgrade(self):
+        return self._get_stored_backend() != self.index_backend
+
+    def upgrade_environment(self):
+        stored = self._get_stored_backend()
+        with self.env.db_transaction as db:
+            if stored:
+                for backend in self.backends:
+                    if backend.__class__.__name__ == stored:
+                        backend.drop_index(db)
+                db("DELETE FROM {0} WHERE name=%s"
+                   .format(db.quote('system')), (self.system_entry,))
+            if self.index_backend:
+                self.reindex()
+                db("INSERT INTO {0} (name, value) VALUES (%s, %s)"
+                   .format(db.quote('system')),
+                   (self.system_entry, self.index_backend))
+
+    def _get_stored_backend(self):
+        with self.env.db_query as db:
+            for value, in db("SELECT value FROM {0} WHERE name=%s"
+                             .format(db.quote('system')),
+                             (self.system_entry,)):
+                return value
+        return ''
+
+    # ITicketChangeListener methods
+
+    def ticket_created(self, ticket):
+        self._update_ticket(ticket.id)
+
+    def ticket_changed(self, ticket, comment, author, old_values):
+        self._update_ticket(ticket.id)
+
+    def ticket_deleted(self, ticket):
+        self.update(removed=[ticket.resource])
+
+    def ticket_comment_modified(self, ticket, cdate, author, comment,
+                                old_comment):
+        self._update_ticket(ticket.id)
+
+    def ticket_change_deleted(self, ticket, cdate, changes):
+        self._update_ticket(ticket.id)
+
+    def _update_ticket(self, id):
+        if self.backend is not None:
+            with self.env.db_query as db:
+                self.update(self._get_ticket_documents(db, id))
+
+    # IMilestoneChangeListener methods
+
+    def milestone_created(self, milestone):
+        self.update([(milestone.resource, self._milestone_text(
+                      milestone.name, milestone.description))])
+
+    def milestone_changed(self, milestone, old_values):
+        removed = []
+        if 'name' in old_values:
+            removed.append(Resource('milestone', old_values['name']))
+        self.update([(milestone.resource, self._milestone_text(
+                      milestone.name, milestone.description))], removed)
+
+    def milestone_deleted(self, milestone):
+        self.update(removed=[milestone.resource])
+
+    # IWikiChangeListener methods
+
+    def wiki_page_added(self, page):
+        self._update_wiki_page(page.name)
+
+    def wiki_page_changed(self, page, version, t, comment, author):
+        self._update_wiki_page(page.name)
+
+    def wiki_page_deleted(self, page):
+        self.update(removed=[page.resource])
+
+    def wiki_page_version_deleted(self, page):
+        self._update_wiki_page(page.name)
+
+    def wiki_page_renamed(self, page, old_name):
+        self._update_wiki_page(page.name, [Resource('wiki', old_name)])
+
+    def wiki_page_comment_modified(self, page, old_comment):
+        pass
+
+    def _update_wiki_page(self, name, removed=()):
+        if self.backend is not None:
+            with self.env.db_query as db:
+                self.update(self._get_wiki_documents(db, name), removed)
+
+    # IAttachmentChangeListener methods
+
+    def attachment_added(self, attachment):
+        self.update([(attachment.resource,
+                      self._attachment_text(attachment.filename,
+                                            attachment.description,
+                                            attachment.author))])
+
+    def attachment_deleted(self, attachment):
+        self.update(removed=[attachment.resource])
+
+    def attachment_moved(self, attachment, old_parent_realm, old_parent_id,
+                         old_filename):
+        old_resource = Resource(old_parent_realm, old_parent_id) \
+                       .child('attachment', old_filename)
+        self.update([(attachment.resource,
+                      self._attachment_text(attachment.filename,
+                                            attachment.description,
+                                            attachment.author))],
+                    [old_resource])
+
+    # IRepositoryChangeListener methods
+
+    def changeset_added(self, repos, changeset):
+        if not hasattr(repos, 'db_rev'):
+            return  # only cached repositories are searched
+        self.update([self._changeset_document(repos.id, changeset.rev,
+                                              changeset.author,
+                                              changeset.message)])
+
+    def changeset_modified(self, repos, changeset, old_changeset):
+        self.changeset_added(repos, changeset)
+
+    # Internal methods
+
+    def _get_ticket_documents(self, db, id=None):
+        if id is not None:
+            args = (id,)
+            where_ticket = " AND ticket=%s"
+            where_id = " WHERE id=%s"
+        else:
+            args = ()
+            where_ticket = where_id = ''
+        custom = defaultdict(list)
+        for tid, value in db("""
+                SELECT ticket, value FROM ticket_custom
+                WHERE value!=''""" + where_ticket, args):
+            custom[tid].append(value)
+        comments = defaultdict(list)
+        for tid, value in db("""
+                SELECT ticket, newvalue FROM ticket_change
+                WHERE field='comment' AND newvalue!=''""" + where_ticket,
+                args):
+            comments[tid].append(value)
+        ticket_realm = Resource('ticket')
+        for row in db("""
+                SELECT id, summary, keywords, description, reporter, cc
+                FROM ticket""" + where_id, args):
+            tid = row[0]
+            text = '\n'.join(str(value) for value
+                             in row + tuple(custom[tid]) +
+                                tuple(comments[tid]) if value)
+            yield ticket_realm(id=tid), text
+
+    def _get_milestone_documents(self, db):
+        milestone_realm = Resource('milestone')
+        for name, description in db("""
+                SELECT name, description FROM milestone"""):
+            yield (milestone_realm(id=name),
+                   self._milestone_text(name, description))
+
+    def _milestone_text(self, name, description):
+        return '\n'.join(filter(None, (name, description)))
+
+    def _get_wiki_documents(self, db, name=None):
+        where = ' AND w1.name=%s' if name is not None else ''
+        args = (name,) if name is not None else ()
+        wiki_realm = Resource('wiki')
+        for name, author, text in db("""
+                SELECT w1.name, w1.author, w1.text
+                FROM wiki w1, (SELECT name, max(version) AS ver
+                               FROM wiki GROUP BY name) w2
+                WHERE w1.version=w2.ver AND w1.name=w2.name""" + where,
+                args):
+            yield (wiki_realm(id=name),
+                   '\n'.join(filter(None, (name, author, text))))
+
+    def _get_attachment_documents(self, db):
+        for type, id, filename, description, author in db("""
+                SELECT type, id, filename, description, author
+                FROM attachment"""):
+            resource = Resource(type, id).child('attachment', filename)
+            yield resource, self._attachment_text(filename, description,
+                                                  author)
+
+    def _attachment_text(self, filename, description, author):
+        return '\n'.join(filter(None, (filename, description, author)))
+
+    def _get_changeset_documents(self, db):
+        for repos in RepositoryManager(self.env).get_real_repositories():
+            if not hasattr(repos, 'rev_db'):
+                continue  # only cached repositories have a revision table
+            for rev, author, message in db("""
+                    SELECT rev, author, message FROM revision
+                    WHERE repos=%s""", (repos.id,)):
+                yield self._changeset_document(repos.id, repos.rev_db(rev),
+                                               author, message)
+
+    def _changeset_document(self, repos_id, rev, author, message):
+        resource = Resource('repository', repos_id).child('changeset', rev)
+        return resource, '\n'.join(filter(None, (str(rev), author, message)))
+
+
+class QueryCountCacheInvalidator(Component):
+    """Clears the ticket counts and page keys cached by the ticket
+    queries when tickets change.
+
+    It is kept apart from the `QueryModule`, like the search index,
+    so that the request handler isn't a ticket change listener.
+    """
+
+    implements(ITicketChangeListener)
+
+    # ITicketChangeListener methods
+
+    def ticket_created(self, ticket):
+        self._clear()
+
+    def ticket_changed(self, ticket, comment, author, old_values):
+        self._clear()
+
+    def ticket_deleted(self, ticket):
+        self._clear()
+
+    def ticket_comment_modified(self, ticket, cdate, author, comment,
+                                old_comment):
+        pass
+
+    def ticket_change_deleted(self, ticket, cdate, changes):
+        self._clear()
+
+    def _clear(self):
+        from trac.ticket.query import QueryModule
+        module = self.env[QueryModule]
+        if module is not None:
+            module._clear_counts()
+
+
+class PythonSearchIndexBackend(Component):
+    """Search index stored as an inverted word list in a regular table.
+
+    It works with every database backend. Terms are matched as word
+    prefixes and documents are ranked by term frequency weighted with
+    the inverse document frequency.
+    """
+
+    implements(ISearchIndexBackend)
+
+    schema = [
+        Table('search_index', key=('realm', 'word', 'parent_realm',
+                                   'parent_id', 'id'))[
+            Column('realm'),
+            Column('word'),
+            Column('parent_realm'),
+            Column('parent_id'),
+            Column('id'),
+            Column('weight', type='int'),
+            Index(['realm', 'parent_realm', 'parent_id', 'id'])],
+    ]
+
+    # ISearchIndexBackend methods
+
+    def get_supported_schemes(self):
+        return ['sqlite', 'postgres', 'mysql']
+
+    def create_index(self, db):
+        DatabaseManager(self.env).create_tables(self.schema)
+
+    def drop_index(self, db):
+        DatabaseManager(self.env).drop_tables(self.schema)
+
+    def insert_documents(self, db, documents):
+        rows = []
+        for resource, text in documents:
+            realm, id, parent_realm, parent_id = _document_key(resource)
+            counts = defaultdict(int)
+            for word in tokenize(text):
+                counts[word] += 1
+            rows.extend((realm, word, parent_realm, parent_id, id, count)
+                        for word, count in counts.items())
+        db.executemany("""
+            INSERT INTO search_index
+              (realm,word,parent_realm,parent_id,id,weight)
+            VALUES (%s,%s,%s,%s,%s,%s)
+            """, rows)
+
+    def delete_documents(self, db, resources):
+        db.executemany("""
+            DELETE FROM search_index
+            WHERE realm=%s AND id=%s AND parent_realm=%s AND parent_id=%s
+            """, [_document_key(resource) for resource in resources])
+
+    def search(self, db, realm, terms, parent_realm=None):
+        where = ' AND parent_realm=%s' if parent_realm else ''
+        documents = None
+        matches = []
+        for word in {word for term in terms for word in tokenize(term)}:
+            counts = defaultdict(int)
+            for parent_id, id, weight in db("""
+                    SELECT parent_id, id, weight FROM search_index
+                    WHERE realm=%s AND word """ + db.prefix_match() + where,
+                    (realm, db.prefix_match_value(word)) +
+                    ((parent_realm,) if parent_realm else ())):
+                counts[(id, parent_id)] += weight
+            documents = set(counts) if documents is None \
+                        else documents & set(counts)
+            if not documents:
+                return []
+            matches.append(counts)
+        if not documents:
+            return []
+        total = len(set().union(*matches))
+        scores = defaultdict(float)
+        for counts in matches:
+            idf = math.log(1.0 + float(total) / len(counts))
+            for key in documents:
+                scores[key] += (1 + math.log(counts[key])) * idf
+        return [(id, parent_id, score)
+                for (id, parent_id), score in scores.items()]
+
+
+class _FullTextSearchIndexBackend(Component):
+    """Base class for the backends relying on the full-text search
+    support of a database.
+    """
+
+    abstract = True
+
+    table = 'search_fts'
+
+    # Number of times the query is passed to `_search_sql`.
+    _query_count = 1
+
+    def drop_index(self, db):
+        db.drop_table(self.table)
+
+    def delete_documents(self, db, resources):
+        db.executemany("""
+            DELETE FROM %s
+            WHERE realm=%%s AND id=%%s AND parent_realm=%%s AND parent_id=%%s
+            """ % self.table,
+            [_document_key(resource) for resource in resources])
+
+    def search(self, db, realm, terms, parent_realm=None):
+        query = self._to_query([tokenize(term) for term in terms])
+        if not query:
+            return []
+        args = [query] * self._query_count + [realm]
+        where = ''
+        if parent_realm:
+            where = ' AND parent_realm=%s'
+            args.append(parent_realm)
+        return [(id, parent_id, score) for id, parent_id, score
+                in db(self._search_sql + where, args)]
+
+
+class SQLiteSearchIndexBackend(_FullTextSearchIndexBackend):
+    """Search index stored in an SQLite FTS5 virtual table, ranked with
+    the `bm25` function.
+    """
+
+    implements(ISearchIndexBackend)
+
+    _search_sql = """
+        SELECT id, parent_id, -bm25(search_fts) FROM search_fts
+        WHERE search_fts MATCH %s AND realm=%s"""
+
+    # ISearchIndexBackend methods
+
+    def get_supported_schemes(self):
+        return ['sqlite']
+
+    def create_index(self, db):
+        db("""
+            CREATE VIRTUAL TABLE search_fts USING fts5(
+              realm UNINDEXED, id UNINDEXED, parent_realm UNINDEXED,
+              parent_id UNINDEXED, content)""")
+
+    def insert_documents(self, db, documents):
+        db.executemany("""
+            INSERT INTO search_fts (realm,id,parent_realm,parent_id,content)
+            VALUES (%s,%s,%s,%s,%s)
+            """, [_document_key(resource) + (text,)
+                  for resource, text in documents])
+
+    def _to_query(self, terms):
+        return ' AND '.join('"%s" *' % ' '.join(words)
+                            for words in terms if words)
+
+
+class PostgreSQLSearchIndexBackend(_FullTextSearchIndexBackend):
+    """Search index stored as a `tsvector` column with a GIN index,
+    ranked with the `ts_rank` function.
+    """
+
+    implements(ISearchIndexBackend)
+
+    _search_sql = """
+        SELECT id, parent_id, ts_rank(tsv, query)
+        FROM search_fts, to_tsquery('simple', %s) query
+        WHERE tsv @@ query AND realm=%s"""
+
+    # ISearchIndexBackend methods
+
+    def get_supported_schemes(self):
+        return ['postgres']
+
+    def create_index(self, db):
+        db("""
+            CREATE TABLE search_fts (
+              realm text, id text, parent_realm text, parent_id text,
+              tsv tsvector,
+              CONSTRAINT search_fts_pk
+                PRIMARY KEY (realm,id,parent_realm,parent_id))""")
+        db("CREATE INDEX search_fts_tsv_idx ON search_fts USING GIN (tsv)")
+
+    def insert_documents(self, db, documents):
+        db.executemany("""
+            INSERT INTO search_fts (realm,id,parent_realm,parent_id,tsv)
+            VALUES (%s,%s,%s,%s,to_tsvector('simple',%s))
+            """, [_document_key(resource) + (text,)
+                  for resource, text in documents])
+
+    def _to_query(self, terms):
+        return ' & '.join('(%s:*)' % ' <-> '.join(words)
+                          for words in terms if words)
+
+
+class MySQLSearchIndexBackend(_FullTextSearchIndexBackend):
+    """Search index stored in an InnoDB table with a `FULLTEXT` index,
+    searched in boolean mode.
+    """
+
+    implements(ISearchIndexBackend)
+
+    _search_sql = """
+        SELECT id, parent_id, MATCH (content) AGAINST (%s IN BOOLEAN MODE)
+        FROM search_fts
+        WHERE MATCH (content) AGAINST (%s IN BOOLEAN MODE) AND realm=%s"""
+
+    _query_count = 2
+
+    # ISearchIndexBackend methods
+
+    def get_supported_schemes(self):
+        return ['mysql']
+
+    def create_index(self, db):
+        db("""
+            CREATE TABLE search_fts (
+              realm varchar(64), id varchar(255), parent_realm varchar(64),
+              parent_id varchar(255), content longtext,
+              PRIMARY KEY (realm,id,parent_realm,parent_id),
+              FULLTEXT KEY search_fts_content_idx (content)
+            ) ENGINE=InnoDB""")
+
+    def insert_documents(self, db, documents):
+        db.executemany("""
+            INSERT INTO search_fts (realm,id,parent_realm,parent_id,content)
+            VALUES (%s,%s,%s,%s,%s)
+            """, [_document_key(resource) + (text,)
+                  for resource, text in documents])
+
+    def _to_query(self, terms):
+        return ' '.join('+%s*' % word for words in terms for word in words)
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+import io
+import unittest
+from datetime import datetime
+
+from trac.attachment import Attachment, AttachmentModule
+from trac.resource import Resource
+from trac.search.index import SearchIndex, tokenize
+from trac.search.web_ui import SearchModule
+from trac.test import EnvironmentStub, Mock, MockRequest, get_dburi, \
+                      makeSuite, mkdtemp
+from trac.ticket.model import Milestone
+from trac.ticket.test import insert_ticket
+from trac.ticket.web_ui import TicketModule
+from trac.util.datefmt import to_utimestamp, utc
+from trac.versioncontrol.api import Changeset, Repository, RepositoryManager
+from trac.versioncontrol.cache import CachedRepository
+from trac.versioncontrol.web_ui.changeset import ChangesetModule
+from trac.wiki.model import WikiPage
+
+
+class TokenizeTestCase(unittest.TestCase):
+
+    def test_tokenize(self):
+        self.assertEqual(['trac', 'is', 'ça', 'va', '123'],
+                         tokenize("Trac is: Ça-va #123"))
+        self.assertEqual([], tokenize(None))
+        self.assertEqual(['a' * 64], tokenize('a' * 100))
+
+
+class SearchIndexTestCase(object):
+
+    backend = None
+
+    def setUp(self):
+        self.env = EnvironmentStub(path=mkdtemp(),
+                                   config=[('search', 'index_backend',
+                                            self.backend)])
+        self.index = SearchIndex(self.env)
+        self.assertTrue(self.index.environment_needs_upgrade())
+        self.index.upgrade_environment()
+
+    def tearDown(self):
+        self.env.config.set('search', 'index_backend', '')
+        self.index.upgrade_environment()
+        self.env.reset_db_and_disk()
+
+    def _ids(self, realm, terms, parent_realm=None):
+        return [id for id, parent_id, score
+                in self.index.search(realm, terms, parent_realm)]
+
+    def test_upgrade(self):
+        self.assertFalse(self.index.environment_needs_upgrade())
+        self.env.config.set('search', 'index_backend', '')
+        self.assertTrue(self.index.environment_needs_upgrade())
+        self.index.upgrade_environment()
+        self.assertFalse(self.index.environment_needs_upgrade())
+        self.assertIsNone(self.index.search('ticket', ['foo']))
+
+    def test_ticket_created_and_deleted(self):
+        insert_ticket(self.env, summary='Unrelated summary')
+        ticket = insert_ticket(self.env, summary='Crash on startup',
+                               description='Segmentation fault')
+        self.assertEqual(['2'], self._ids('ticket', ['crash']))
+        self.assertEqual(['2'], self._ids('ticket', ['segm', 'start']))
+        self.assertEqual([], self._ids('ticket', ['crash', 'unrelated']))
+        ticket.delete()
+        self.assertEqual([], self._ids('ticket', ['crash']))
+
+    def test_ticket_changed(self):
+        ticket = insert_ticket(self.env, summary='Summary')
+        ticket['keywords'] = 'performance'
+        ticket.save_changes('joe', 'Slow query')
+        self.assertEqual(['1'], self._ids('ticket', ['performance']))
+        self.assertEqual(['1'], self._ids('ticket', ['slow']))
+
+    def test_wiki_page(self):
+        page = WikiPage(self.env, 'SandBox')
+        page.text = 'Playground for wiki formatting'
+        page.save('joe', 'Created')
+        self.assertEqual(['SandBox'], self._ids('wiki', ['playground']))
+        page.rename('PlayGround')
+        self.assertEqual(['PlayGround'], self._ids('wiki', ['playground']))
+        page.delete()
+        self.assertEqual([], self._ids('wiki', ['playground']))
+
+    def test_milestone_renamed(self):
+        milestone = Milestone(self.env)
+        milestone.name = 'Beta'
+        milestone.description = 'Feature freeze'
+        milestone.insert()
+        milestone.name = 'Gamma'
+        milestone.update()
+        self.assertEqual(['Gamma'], self._ids('milestone', ['freeze']))
+
+    def test_attachment(self):
+        insert_ticket(self.env, summary='Summary')
+        attachment = Attachment(self.env, 'ticket', 1)
+        attachment.description = 'Stack trace'
+        attachment.insert('trace.txt', io.BytesIO(b''), 0)
+        req = MockRequest(self.env)
+
+        results = list(AttachmentModule(self.env).get_search_results(
+            req, Resource('ticket'), ['stack']))
+
+        self.assertEqual(1, len(results))
+        self.assertEqual('/trac.cgi/attachment/ticket/1/trace.txt',
+                         results[0][0])
+        self.assertEqual([], self._ids('attachment', ['stack'], 'wiki'))
+        attachment.delete()
+        self.assertEqual([], self._ids('attachment', ['stack'], 'ticket'))
+
+    def test_attachment_only_match(self):
+        insert_ticket(self.env, summary='Summary')
+        attachment = Attachment(self.env, 'ticket', 1)
+        attachment.description = 'Stack trace'
+        attachment.insert('trace.txt', io.BytesIO(b''), 0)
+        req = MockRequest(self.env)
+
+        results = list(TicketModule(self.env).get_search_results(
+            req, ['stack'], ['ticket']))
+
+        self.assertEqual(['/trac.cgi/attachment/ticket/1/trace.txt'],
+                         [result[0] for result in results])
+
+    def test_changeset(self):
+        """Changesets of repositories storing padded revisions, like
+        Subversion, are found through the index.
+        """
+        class PaddedCachedRepository(CachedRepository):
+            def db_rev(self, rev):
+                return '%010d' % rev
+
+            def rev_db(self, rev):
+                return int(rev or 0)
+
+        t = datetime(2001, 1, 1, 1, 1, 1, 0, utc)
+        with self.env.db_transaction as db:
+            db.executemany("""
+                INSERT INTO repository (id, name, value) VALUES (%s,%s,%s)
+                """, [(1, 'name', 'repos'),
+                      (1, 'youngest_rev', '0000000002')])
+            db.executemany("""
+                INSERT INTO revision (repos, rev, time, author, message)
+                VALUES (1,%s,%s,'joe',%s)
+                """, [('0000000001', to_utimestamp(t), 'Import sources'),
+                      ('0000000002', to_utimestamp(t), 'Fix typo')])
+        repos = Mock(Repository, 'repos', {'name': 'repos', 'id': 1},
+                     self.env.log, get_changeset_uid=lambda rev: rev)
+        cache = PaddedCachedRepository(self.env, repos, self.env.log)
+        RepositoryManager(self.env).get_real_repositories = lambda: [cache]
+        for rev, message in ((1, 'Import sources'), (2, 'Fix typo')):
+            self.index.changeset_added(cache, Mock(Changeset, cache, rev,
+                                                   message, 'joe', t))
+        req = MockRequest(self.env)
+
+        results = list(ChangesetModule(self.env).get_search_results(
+            req, ['import'], ['changeset']))
+
+        self.assertEqual(['/trac.cgi/changeset/1/repos'],
+                         [result[0] for result in results])
+
+    def test_reindex(self):
+        insert_ticket(self.env, summary='Crash on startup')
+        with self.env.db_transaction as db:
+            db("DELETE FROM ticket")
+        self.assertEqual(['1'], self._ids('ticket', ['crash']))
+        self.index.reindex()
+        self.assertEqual([], self._ids('ticket', ['crash']))
+
+    def test_ranking(self):
+        insert_ticket(self.env, summary='Crash', description='Other')
+        insert_ticket(self.env, summary='Crash', description='Crash crash')
+        self.assertEqual(['2', '1'], self._ids('ticket', ['crash']))
+
+    def test_search_module_results(self):
+        insert_ticket(self.env, summary='Crash', description='Other')
+        insert_ticket(self.env, summary='Crash', description='Crash crash')
+        req = MockRequest(self.env, path_info='/search',
+                          args={'q': 'crash', 'ticket': 'on'})
+
+        data = SearchModule(self.env).process_request(req)[1]
+
+        self.assertEqual(['/trac.cgi/ticket/2', '/trac.cgi/ticket/1'],
+                         [result['href'] for result in data['results']])
+
+
+class PythonSearchIndexTestCase(SearchIndexTestCase, unittest.TestCase):
+
+    backend = 'PythonSearchIndexBackend'
+
+
+class SQLiteSearchIndexTestCase(SearchIndexTestCase, unittest.TestCase):
+
+    backend = 'SQLiteSearchIndexBackend'
+
+
+def test_suite():
+    suite = unittest.TestSuite()
+    suite.addTest(makeSuite(TokenizeTestCase))
+    suite.addTest(makeSuite(PythonSearchIndexTestCase))
+    if get_dburi().startswith('sqlite:'):
+        suite.addTest(makeSuite(SQLiteSearchIndexTestCase))
+    return suite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
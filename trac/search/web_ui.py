@@ -234,7 +234,10 @@ class SearchModule(Component):
         for source in self.search_sources:
             results.extend(source.get_search_results(req, terms, filters)
                            or [])
-        return sorted(results, key=lambda x: x[2], reverse=True)
+        # Rank by relevance score when provided, then by date
+        return sorted(results, key=lambda x: (x[5] if len(x) > 5 else 0,
+                                              x[2]),
+                      reverse=True)
 
     def _prepare_results(self, req, filters, results):
         page = req.args.getint('page', 1, min=1)
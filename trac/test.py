@@ -137,6 +137,9 @@ class MockPerm(object):
         return True
     __contains__ = has_permission
 
+    def filter(self, action, resources):
+        return list(resources)
+
     def __call__(self, realm_or_resource, id=False, version=False):
         return self
 
@@ -354,6 +357,9 @@ class EnvironmentStub(Environment):
         self.path = path
         if self.path is None:
             self.path = os.path.abspath(os.path.dirname(trac.__file__))
+            # The directory of the sources isn't an environment directory
+            config = [('mimeviewer', 'render_cache_size', '0')] + \
+                     list(config or [])
         self.path = os.path.normpath(os.path.normcase(self.path))
 
         # -- configuration
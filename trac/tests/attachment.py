@@ -582,6 +582,31 @@ class AttachmentModuleTestCase(unittest.TestCase):
         self.assertEqual(3, zinfo.file_size)
         self.assertEqual((2016, 12, 14, 23, 56, 30), zinfo.date_time)
         self.assertEqual(b'', zinfo.comment)
+        self.assertEqual(zipfile.ZIP_STORED, zinfo.compress_type)
+        self.assertEqual(zipfile.ZIP_DEFLATED,
+                         z.getinfo('föö.txt').compress_type)
+
+    def test_download_zip_not_modified(self):
+        att = Attachment(self.env, 'parent_realm', 'parent_id')
+        att.insert('foo.txt', io.BytesIO(b'foo'), 3,
+                   datetime(2016, 9, 23, 12, 34, 56, tzinfo=utc))
+        module = AttachmentModule(self.env)
+        req = MockRequest(self.env, args={'format': 'zip'},
+                          path_info='/attachment/parent_realm/parent_id/')
+        self.assertTrue(module.match_request(req))
+        self.assertRaises(RequestDone, module.process_request, req)
+        self.assertEqual(['200 Ok'], req.status_sent)
+        self.assertEqual('Fri, 23 Sep 2016 12:34:56 GMT',
+                         req.headers_sent['Last-Modified'])
+        etag = req.headers_sent['ETag']
+
+        req = MockRequest(self.env, args={'format': 'zip'},
+                          path_info='/attachment/parent_realm/parent_id/')
+        req.environ['HTTP_IF_NONE_MATCH'] = etag
+        self.assertTrue(module.match_request(req))
+        self.assertRaises(RequestDone, module.process_request, req)
+        self.assertEqual(['304 Not Modified'], req.status_sent)
+        self.assertEqual(b'', req.response_sent.getvalue())
 
     def test_preview_valid_xhtml(self):
         chrome = Chrome(self.env)
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+import unittest
+
+from trac.cache import CacheManager, cached
+from trac.config import ConfigurationError
+from trac.test import EnvironmentStub, makeSuite, mkdtemp
+
+
+class Cached(object):
+
+    def __init__(self, env):
+        self.env = env
+        self.calls = 0
+
+    @cached
+    def value(self):
+        self.calls += 1
+        return self.calls
+
+
+class CacheTestCase(object):
+
+    transport = ''
+
+    def setUp(self):
+        self.env = EnvironmentStub(path=mkdtemp(),
+                                   config=[('trac', 'cache_transport',
+                                            self.transport)])
+        self.manager = CacheManager(self.env)
+        self.obj = Cached(self.env)
+        self._new_request()
+        self.assertEqual(1, self.obj.value)
+        self.id = Cached.value.id
+
+    def tearDown(self):
+        self.env.reset_db_and_disk()
+
+    def _new_request(self):
+        self.manager.reset_metadata()
+
+    def _set_generation(self, generation):
+        with self.env.db_transaction as db:
+            db("DELETE FROM cache WHERE id=%s", (self.id,))
+            db("INSERT INTO cache VALUES (%s, %s, %s)",
+               (self.id, generation, 'trac.tests.cache.Cached.value'))
+
+    def test_cached(self):
+        self._new_request()
+        self.assertEqual(1, self.obj.value)
+
+    def test_invalidate(self):
+        del self.obj.value
+        self.assertEqual(2, self.obj.value)
+        self._new_request()
+        self.assertEqual(2, self.obj.value)
+
+
+class PollingCacheTestCase(CacheTestCase, unittest.TestCase):
+
+    def test_invalidated_in_other_process(self):
+        self._set_generation(5)
+        self.assertEqual(1, self.obj.value)
+        self._new_request()
+        self.assertEqual(2, self.obj.value)
+
+    def test_unknown_transport(self):
+        self.env.config.set('trac', 'cache_transport', 'UnknownTransport')
+        self._new_request()
+        self.assertRaises(ConfigurationError, getattr, self.obj, 'value')
+
+
+class TransportCacheTestCase(CacheTestCase):
+
+    def test_metadata_not_polled(self):
+        self._set_generation(5)
+        self._new_request()
+        self.assertEqual(1, self.obj.value)
+
+    def test_invalidated_in_other_process(self):
+        self._set_generation(5)
+        self.manager.transport.publish({self.id: 5})
+        self._new_request()
+        self.assertEqual(2, self.obj.value)
+        self._new_request()
+        self.assertEqual(2, self.obj.value)
+
+    def test_notification_ahead_of_database(self):
+        self._set_generation(4)
+        self.manager.transport.publish({self.id: 5})
+        self._new_request()
+        self.assertEqual(2, self.obj.value)
+        self._new_request()
+        self.assertEqual(2, self.obj.value)
+        self._set_generation(5)
+        self._new_request()
+        self.assertEqual(3, self.obj.value)
+
+    def test_invalidate_published_on_commit(self):
+        transport = self.manager.transport
+        with self.env.db_transaction:
+            del self.obj.value
+            self.assertEqual({}, transport.receive())
+        self.assertEqual({self.id: 0}, transport.receive())
+
+    def test_invalidate_rolled_back(self):
+        transport = self.manager.transport
+        try:
+            with self.env.db_transaction:
+                del self.obj.value
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual({}, transport.receive())
+
+
+class FileCacheTestCase(TransportCacheTestCase, unittest.TestCase):
+
+    transport = 'FileCacheTransport'
+
+
+class SharedMemoryCacheTestCase(TransportCacheTestCase, unittest.TestCase):
+
+    transport = 'SharedMemoryCacheTransport'
+
+    def test_missed_update(self):
+        transport = self.manager.transport
+        transport.publish({self.id: 1})
+        transport.publish({self.id: 2})
+        self.assertIsNone(transport.receive())
+        self.assertEqual({}, transport.receive())
+
+    def test_colliding_ids(self):
+        transport = self.manager.transport
+        transport.publish({1: 1, 1 + transport.slots: 1})
+        self.assertIsNone(transport.receive())
+
+    def test_slot_being_written(self):
+        transport = self.manager.transport
+        transport.receive()
+        buf = transport._open()
+        offset = transport._slot_offset(self.id)
+        transport._slot.pack_into(buf, offset, 1, 0, 0)
+        transport._header.pack_into(buf, 0, 1)
+        self.assertIsNone(transport.receive())
+        transport.publish({self.id: 1})
+        self.assertEqual(4, transport._slot.unpack_from(buf, offset)[0])
+
+
+def test_suite():
+    suite = unittest.TestSuite()
+    suite.addTest(makeSuite(PollingCacheTestCase))
+    suite.addTest(makeSuite(FileCacheTestCase))
+    suite.addTest(makeSuite(SharedMemoryCacheTestCase))
+    return suite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
@@ -915,6 +915,54 @@ class IntegrationTestCase(BaseTestCase):
             config.parse_if_needed()
             self.assertEqual('y', config.get('a', 'option'))
 
+    def test_typed_option_is_cached(self):
+        class Foo(object):
+            option_i = IntOption('a', 'int', 1)
+            option_l = ListOption('a', 'list', 'x, y')
+
+            def __init__(self):
+                self.config = config
+
+        self._write(['[a]', 'int = 42'])
+        config = self._read()
+        foo = Foo()
+        self.assertEqual(42, foo.option_i)
+        config.parser.set('a', 'int', '43')
+        self.assertEqual(42, foo.option_i)
+        self.assertEqual(['x', 'y'], foo.option_l)
+        foo.option_l.append('z')
+        self.assertEqual(['x', 'y'], foo.option_l)
+
+    def test_typed_option_invalidated(self):
+        class Foo(object):
+            option_b = BoolOption('a', 'bool', True)
+            option_c = ChoiceOption('a', 'choice', ['x', 'y'])
+
+            def __init__(self):
+                self.config = config
+
+        self._write(['[a]', 'bool = no'])
+        config = self._read()
+        foo = Foo()
+        self.assertFalse(foo.option_b)
+        self.assertEqual('x', foo.option_c)
+
+        config.set('a', 'bool', 'yes')
+        config.set('a', 'choice', 'y')
+        self.assertTrue(foo.option_b)
+        self.assertEqual('y', foo.option_c)
+
+        config.remove('a', 'choice')
+        self.assertEqual('x', foo.option_c)
+        config.set('a', 'bool', 'no')
+        self.assertFalse(foo.option_b)
+        config.remove('a')
+        self.assertTrue(foo.option_b)
+
+        self._write(['[a]', 'bool = no'])
+        config.parse_if_needed()
+        self.assertFalse(foo.option_b)
+
     def test_inherit_one_level(self):
         with self.inherited_file():
             self._write(['[a]', 'option = x'], site=True)
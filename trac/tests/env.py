@@ -21,6 +21,7 @@ import sys
 import textwrap
 import unittest
 
+import trac.env
 from trac import db_default
 from trac.admin.console import TracAdmin
 from trac.admin.test import TracAdminTestCaseBase
@@ -248,6 +249,49 @@ class EnvironmentDataTestCase(unittest.TestCase):
             self.assertFalse(WikiPage(self.env, name).readonly)
 
 
+class EnvironmentCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env_paths = []
+        for idx in range(2):
+            env_path = mkdtemp()
+            Environment(env_path, create=True).shutdown()
+            self.env_paths.append(env_path)
+
+    def tearDown(self):
+        trac.env.env_cache_size = 0
+        trac.env.env_cache_idle_time = 300
+        for env_path in self.env_paths:
+            env = trac.env.env_cache.pop(env_path, None)
+            if env is not None:
+                env.shutdown()
+            rmtree(env_path)
+
+    def test_cache_unbounded(self):
+        for env_path in self.env_paths:
+            open_environment(env_path, use_cache=True)
+        for env_path in self.env_paths:
+            self.assertIn(env_path, trac.env.env_cache)
+
+    def test_idle_environment_evicted(self):
+        trac.env.env_cache_size = 1
+        trac.env.env_cache_idle_time = 0
+        env1 = open_environment(self.env_paths[0], use_cache=True)
+        env2 = open_environment(self.env_paths[1], use_cache=True)
+
+        self.assertNotIn(self.env_paths[0], trac.env.env_cache)
+        self.assertIs(env2, trac.env.env_cache[self.env_paths[1]])
+        self.assertIsNot(env1, open_environment(self.env_paths[0],
+                                                use_cache=True))
+
+    def test_active_environment_not_evicted(self):
+        trac.env.env_cache_size = 1
+        for env_path in self.env_paths:
+            open_environment(env_path, use_cache=True)
+        for env_path in self.env_paths:
+            self.assertIn(env_path, trac.env.env_cache)
+
+
 class EnvironmentAttributesTestCase(unittest.TestCase):
     """Tests for attributes which don't require a real environment
     on disk, and therefore can be executed against an `EnvironmentStub`
@@ -1076,6 +1120,7 @@ def test_suite():
     suite.addTest(makeSuite(EnvironmentWithoutDataTestCase))
     suite.addTest(makeSuite(EnvironmentDataTestCase))
     suite.addTest(makeSuite(EnvironmentTestCase))
+    suite.addTest(makeSuite(EnvironmentCacheTestCase))
     suite.addTest(makeSuite(EnvironmentAttributesTestCase))
     suite.addTest(makeSuite(EnvironmentUpgradeTestCase))
     suite.addTest(makeSuite(KnownUsersTestCase))
@@ -254,6 +254,37 @@ class SmtpEmailSenderTestCase(unittest.TestCase):
         self.assertEqual(set(['foo@example.com']), set(smtpd.get_recipients()))
         self.assertEqual(self.message, smtpd.get_message())
 
+    def test_send_messages(self):
+        self.env.config.set('notification', 'smtp_server', '127.0.0.1')
+        self.env.config.set('notification', 'smtp_port', str(SMTP_TEST_PORT))
+        message = self.message.replace('foo@example.com', 'bar@example.com')
+
+        smtpd = SMTPThreadedServer(SMTP_TEST_PORT)
+        try:
+            smtpd.start()
+            sender = SmtpEmailSender(self.env)
+            errors = sender.send_messages([
+                ('admin@example.com', ['foo@example.com'], self.message),
+                ('admin@example.com', ['bar@example.com'], message)])
+        finally:
+            smtpd.stop()
+
+        self.assertEqual([None, None], errors)
+        self.assertEqual({'bar@example.com'}, set(smtpd.get_recipients()))
+        self.assertEqual(message, smtpd.get_message())
+
+    def test_send_messages_smtp_server_not_found(self):
+        sender = SmtpEmailSender(self.env)
+        self.env.config.set('notification', 'smtp_server', 'localhost')
+        self.env.config.set('notification', 'smtp_port', '65536')
+        errors = sender.send_messages([
+            ('admin@example.com', ['foo@example.com'], self.message),
+            ('admin@example.com', ['bar@example.com'], self.message)])
+
+        self.assertEqual(2, len(errors))
+        self.assertIsInstance(errors[0], ConfigurationError)
+        self.assertIs(errors[0], errors[1])
+
 
 def test_suite():
     suite = unittest.TestSuite()
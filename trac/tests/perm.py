@@ -454,6 +454,18 @@ class PermissionCacheTestCase(BaseTestCase):
         'TEST_ADMIN' in self.perm(None)
         self.assertEqual(1, len(self.perm._cache))
 
+    def test_filter(self):
+        resources = [Resource('ticket', id) for id in (1, 2, 3)]
+        self.assertEqual(resources,
+                         self.perm.filter('TEST_MODIFY', iter(resources)))
+        self.assertEqual([], self.perm.filter('TRAC_ADMIN', resources))
+        self.assertEqual(6, len(self.perm._cache))
+        self.perm_system.revoke_permission('testuser', 'TEST_MODIFY')
+        # Using cached GRANT here
+        self.assertIn('TEST_MODIFY', self.perm('ticket', 2))
+        self.assertEqual(resources,
+                         self.perm.filter('TEST_MODIFY', resources))
+
 
 class TestPermissionPolicy(Component):
     implements(perm.IPermissionPolicy)
@@ -474,12 +486,32 @@ class TestPermissionPolicy(Component):
         return result
 
 
+class TestBatchPermissionPolicy(Component):
+    """Allows actions on the odd ticket ids, for the resources checked
+    in batches.
+    """
+
+    implements(perm.IPermissionPolicy)
+
+    def __init__(self):
+        self.batches = []
+
+    def check_permission(self, action, username, resource, perm):
+        return self.check_permissions_batch(action, username, [resource],
+                                            perm)[0]
+
+    def check_permissions_batch(self, action, username, resources, perm):
+        self.batches.append([resource.id for resource in resources])
+        return [resource.id % 2 == 1 or None for resource in resources]
+
+
 class PermissionPolicyTestCase(BaseTestCase):
 
     def setUp(self):
         self.env = EnvironmentStub(enable=[perm.DefaultPermissionStore,
                                            perm.DefaultPermissionPolicy,
-                                           TestPermissionPolicy] +
+                                           TestPermissionPolicy,
+                                           TestBatchPermissionPolicy] +
                                           self.permission_requestors)
         self.env.config.set('trac', 'permission_policies',
                             'TestPermissionPolicy')
@@ -522,6 +554,33 @@ class PermissionPolicyTestCase(BaseTestCase):
                          {('testuser', 'TEST_MODIFY'): True,
                           ('testuser', 'TEST_ADMIN'): None})
 
+    def test_filter_policy_chaining(self):
+        self.env.config.set('trac', 'permission_policies',
+                            'TestBatchPermissionPolicy,TestPermissionPolicy')
+        batch_policy = TestBatchPermissionPolicy(self.env)
+        resources = [Resource('ticket', id) for id in (1, 2, 3, 4)]
+
+        self.assertEqual([resources[0], resources[2]],
+                         self.perm.filter('TEST_MODIFY', resources))
+        self.policy.grant('testuser', ['TEST_ADMIN'])
+        self.assertEqual(resources,
+                         self.perm.filter('TEST_ADMIN', resources))
+        self.assertEqual([[1, 2, 3, 4], [1, 2, 3, 4]], batch_policy.batches)
+        self.assertEqual({('testuser', 'TEST_MODIFY'): None,
+                          ('testuser', 'TEST_ADMIN'): True},
+                         self.policy.results)
+
+    def test_check_permissions_batch(self):
+        self.env.config.set('trac', 'permission_policies',
+                            'TestBatchPermissionPolicy')
+        system = perm.PermissionSystem(self.env)
+        resources = [Resource('ticket', id) for id in (1, 2, 3)]
+
+        self.assertEqual([True, False, True],
+                         system.check_permissions_batch('TEST_MODIFY',
+                                                        'testuser',
+                                                        resources))
+
 
 class RecursivePolicyTestCase(unittest.TestCase):
     """Test case for policies that perform recursive permission checks."""
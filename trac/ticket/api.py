@@ -16,6 +16,7 @@
 
 import contextlib
 import copy
+import hashlib
 import re
 from datetime import datetime
 
@@ -27,7 +28,7 @@ from trac.core import *
 from trac.perm import IPermissionRequestor, PermissionCache, PermissionSystem
 from trac.resource import IResourceManager
 from trac.util import Ranges, as_bool, as_int
-from trac.util.datefmt import parse_date, user_time
+from trac.util.datefmt import parse_date, time_now, user_time
 from trac.util.html import tag
 from trac.util.text import shorten_line, to_unicode
 from trac.util.translation import _, N_, deactivate, gettext, reactivate
@@ -611,6 +612,7 @@ class TicketSystem(Component):
             lambda x, y, z: self._format_link(x, 'ticket', y[1:], y, z))
 
     def _format_link(self, formatter, ns, target, label, fullmatch=None):
+        formatter.depends_on(self.realm)
         intertrac = formatter.shorthand_intertrac_helper(ns, target, label,
                                                          fullmatch)
         if intertrac:
@@ -651,6 +653,7 @@ class TicketSystem(Component):
         return tag.a(label, class_='missing ticket')
 
     def _format_comment_link(self, formatter, ns, target, label):
+        formatter.depends_on(self.realm)
         resource = None
         if ':' in target:
             elts = target.split(':')
@@ -764,6 +767,128 @@ class TicketSystem(Component):
             return False
 
 
+class QueryResultStore(Component):
+    """Persists the ticket ids of query and report results.
+
+    The ticket page uses the stored result sets to navigate through the
+    results of the last query or report, without keeping the ticket
+    ids in the session.
+
+    :since: 1.7.1
+    """
+
+    ttl = IntOption('query', 'result_set_ttl', 86400,
+        """Time in seconds during which the ticket ids of a query or
+        report result are kept for the navigation links on the ticket
+        page. Expired result sets are removed when results are saved.
+        (''since 1.7.1'')
+        """)
+
+    def get_key(self, req, *args):
+        """Return the string identifying the query or report described
+        by `args` for the user of `req`.
+
+        The anonymous users are identified by their session id, so
+        that they don't share their result sets.
+        """
+        user = req.authname if req.is_authenticated else \
+               (req.authname, req.session.sid)
+        return repr((user,) + args)
+
+    def get_id(self, key):
+        """Return the result set id for the string `key`, which
+        identifies the query and the user executing it.
+        """
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def get_tickets(self, id):
+        """Return the list of ticket ids of the result set `id`, or
+        `None` if the result set doesn't exist or has expired.
+        """
+        with self.env.db_query as db:
+            if self._exists(db, id) is None:
+                return None
+            return [ticket for ticket, in db("""
+                SELECT ticket FROM query_result WHERE id=%s ORDER BY seq
+                """, (id,))]
+
+    def save(self, key, tickets):
+        """Store the list of ticket ids `tickets` for the query
+        identified by `key` and return the result set id.
+
+        The rows are only rewritten if the ticket ids differ from the
+        stored ones.
+        """
+        id = self.get_id(key)
+        tickets = [int(t) for t in tickets]
+        now = int(time_now())
+        try:
+            with self.env.db_transaction as db:
+                db("""DELETE FROM query_result WHERE id IN (
+                        SELECT id FROM query_result_set WHERE time<%s)
+                      """, (now - self.ttl,))
+                db("DELETE FROM query_result_set WHERE time<%s",
+                   (now - self.ttl,))
+                if self.get_tickets(id) == tickets:
+                    db("UPDATE query_result_set SET time=%s WHERE id=%s",
+                       (now, id))
+                    return id
+                db("DELETE FROM query_result WHERE id=%s", (id,))
+                db("DELETE FROM query_result_set WHERE id=%s", (id,))
+                db("INSERT INTO query_result_set (id,time,size) "
+                   "VALUES (%s,%s,%s)", (id, now, len(tickets)))
+                db.executemany("""
+                    INSERT INTO query_result (id,seq,ticket)
+                    VALUES (%s,%s,%s)
+                    """, [(id, seq, ticket)
+                          for seq, ticket in enumerate(tickets)])
+        except self.env.db_exc.IntegrityError:
+            # Concurrently stored by another request for the same query
+            self.log.debug("Result set %s concurrently stored", id)
+        return id
+
+    def get_neighbors(self, id, ticket):
+        """Return a dictionary with the `'first'`, `'prev'`, `'next'`
+        and `'last'` ticket ids around `ticket` in the result set `id`.
+
+        Entries at the boundaries of the result set are omitted. `None`
+        is returned if `ticket` is not part of the result set.
+        """
+        with self.env.db_query as db:
+            size = self._exists(db, id)
+            if size is None:
+                return None
+            for seq, in db("""
+                    SELECT min(seq) FROM query_result
+                    WHERE id=%s AND ticket=%s
+                    """, (id, int(ticket))):
+                if seq is None:
+                    return None
+            positions = {}
+            if seq > 0:
+                positions['first'] = 0
+                positions['prev'] = seq - 1
+            if seq < size - 1:
+                positions['next'] = seq + 1
+                positions['last'] = size - 1
+            if not positions:
+                return {}
+            seqs = set(positions.values())
+            tickets = dict(db("""
+                SELECT seq, ticket FROM query_result
+                WHERE id=%%s AND seq IN (%s)
+                """ % ','.join(['%s'] * len(seqs)), [id] + sorted(seqs)))
+            return {name: tickets[seq] for name, seq in positions.items()
+                                       if seq in tickets}
+
+    def _exists(self, db, id):
+        for size, in db("""
+                SELECT size FROM query_result_set WHERE id=%s AND time>=%s
+                """, (id, int(time_now()) - self.ttl)):
+            return size
+        return None
+
+
 @contextlib.contextmanager
 def translation_deactivated(ticket=None):
     t = deactivate()
@@ -16,25 +16,29 @@
 # Author: Christopher Lenz <cmlenz@gmx.de>
 
 from datetime import datetime, timedelta
-from itertools import groupby
+from contextlib import closing
+from itertools import groupby, islice
 import operator
 from math import ceil
 import csv
 import io
 import re
 
-from trac.config import Option, IntOption
+from trac.config import BoolOption, IntOption, Option
 from trac.core import *
 from trac.db import get_column_names
 from trac.mimeview.api import IContentConverter, Mimeview
 from trac.resource import Resource
-from trac.ticket.api import TicketSystem, translation_deactivated
+from trac.ticket.api import QueryResultStore, TicketSystem, \
+                            translation_deactivated
 from trac.ticket.model import Milestone, _datetime_to_db_str
 from trac.ticket.roadmap import group_milestones
 from trac.util import Ranges, as_bool, as_int
+from trac.util.concurrency import threading
 from trac.util.datefmt import (datetime_now, from_utimestamp,
                                format_date_or_datetime, parse_date,
-                               to_timestamp, to_utimestamp, utc, user_time)
+                               time_now, to_timestamp, to_utimestamp, utc,
+                               user_time)
 from trac.util.html import tag
 from trac.util.presentation import Paginator
 from trac.util.text import empty, shorten_line, quote_query_string
@@ -270,12 +274,57 @@ class Query(object):
         return self._count(sql, args)
 
     def _count(self, sql, args):
-        cnt = self.env.db_query("SELECT COUNT(*) FROM (%s) AS x"
-                                % sql, args)[0][0]
-        # "AS x" is needed for MySQL ("Subqueries in the FROM Clause")
+        module = QueryModule(self.env)
+        cnt = module._get_cached_count(sql, args)
+        if cnt is None:
+            cnt = self.env.db_query("SELECT COUNT(*) FROM (%s) AS x"
+                                    % sql, args)[0][0]
+            # "AS x" is needed for MySQL ("Subqueries in the FROM Clause")
+            module._set_cached_count(sql, args, cnt)
         self.env.log.debug("Count results in Query: %d", cnt)
         return cnt
 
+    def _get_seek_column(self):
+        """Return the `(name, null_value)` tuple of the column on which
+        the results can be paged with a keyset, or `None` if the order
+        of the results is too complex.
+        """
+        if self.group:
+            return None
+        name = self.order
+        if name == 'id' or name in self.time_fields:
+            null = 0
+        else:
+            null = ''
+        field = self.fields.by_name(name, None)
+        if name != 'id' and (field is None or field.get('custom') or
+                             name in ('milestone', 'priority', 'resolution',
+                                      'severity', 'type', 'version')):
+            return None
+        return name, null
+
+    def _get_seek_sql(self, sql, args, seek_column, seek_key):
+        """Return the query selecting the results ordered after
+        `seek_key`, the `(is_null, value, id)` tuple of the last result
+        of the previous page.
+        """
+        name, null = seek_column
+        null = repr(null)
+        value = 'COALESCE(x.%s,%s)' % (name, null)
+        is_null = 'CASE WHEN %s=%s THEN 1 ELSE 0 END' % (value, null)
+        desc = ' DESC' if self.desc else ''
+        op = '<' if self.desc else '>'
+        sql = sql.rsplit('\nORDER BY ', 1)[0]
+        sql = ("SELECT * FROM (%(sql)s) AS x"
+               "\nWHERE %(is_null)s%(op)s%%s"
+               " OR (%(is_null)s=%%s AND (%(value)s%(op)s%%s"
+               " OR (%(value)s=%%s AND x.id>%%s)))"
+               "\nORDER BY %(is_null)s%(desc)s,%(value)s%(desc)s,x.id"
+               % {'sql': sql, 'is_null': is_null, 'value': value,
+                  'op': op, 'desc': desc})
+        is_null, value, id = seek_key
+        return sql, list(args) + [is_null, is_null, value, value, id]
+
     def execute(self, req=None, cached_ids=None, authname=None, href=None):
         """Retrieve the list of matching tickets.
         """
@@ -284,22 +333,37 @@ class Query(object):
 
         self.num_items = 0
         sql, args = self.get_sql(req, cached_ids, authname)
-        self.num_items = self._count(sql, args)
+        # Without paging, the number of items is the number of results
+        if self.max:
+            self.num_items = self._count(sql, args)
 
         if self.num_items <= self.max:
             self.has_more_pages = False
 
+        module = QueryModule(self.env)
+        seek_column = page_key = None
         if self.has_more_pages:
             max = self.max
             if self.group:
                 max += 1
-            sql += " LIMIT %d OFFSET %d" % (max, self.offset)
             if (self.page > int(ceil(float(self.num_items) / self.max)) and
                 self.num_items != 0):
                 raise TracError(_("Page %(page)s is beyond the number of "
                                   "pages in the query", page=self.page))
+            if module.keyset_pagination:
+                seek_column = self._get_seek_column()
+            if seek_column:
+                page_key = (sql, tuple(args), self.max)
+                seek_key = module._get_page_key(page_key, self.page - 1)
+            if seek_column and seek_key:
+                sql, args = self._get_seek_sql(sql, args, seek_column,
+                                               seek_key)
+                sql += " LIMIT %d" % max
+            else:
+                sql += " LIMIT %d OFFSET %d" % (max, self.offset)
 
         results = []
+        row = None
         with self.env.db_query as db:
             cursor = db.cursor()
             cursor.execute(sql, args)
@@ -307,23 +371,76 @@ class Query(object):
             fields = [self.fields.by_name(column, None) for column in columns]
 
             for row in cursor:
-                result = {}
-                for name, field, val in zip(columns, fields, row):
-                    if name == 'reporter':
-                        val = val or 'anonymous'
-                    elif name == 'id':
-                        val = int(val)
-                        if href is not None:
-                            result['href'] = href.ticket(val)
-                    elif name in self.time_fields:
-                        val = from_utimestamp(int(val)) if val else None
-                    elif field and field['type'] == 'checkbox':
-                        val = as_bool(val)
-                    elif val is None:
-                        val = ''
-                    result[name] = val
-                results.append(result)
-            return results
+                results.append(self._make_result(columns, fields, row, href))
+
+        if not self.max:
+            self.num_items = len(results)
+        if page_key and row and len(results) >= self.max:
+            # Remember where the page ends, the next page seeks from there
+            name, null = seek_column
+            value = row[columns.index(name)]
+            if value is None:
+                value = null
+            module._set_page_key(page_key, self.page,
+                                 (int(value == null), value,
+                                  row[columns.index('id')]))
+        return results
+
+    def iterate(self, req=None, authname=None, href=None, batch_size=1000):
+        """Generate the matching tickets one by one.
+
+        When the query is not paginated (`max=0`), the rows are read
+        from the cursor and converted `batch_size` at a time instead of
+        being collected in a list. Otherwise this is the same as
+        iterating over the results of `execute`.
+
+        A regular cursor is used, so that other queries can be executed
+        on the connection while the tickets are being consumed.
+
+        :since: 1.7.1
+        """
+        if self.max:
+            yield from self.execute(req, authname=authname, href=href)
+            return
+        if req is not None:
+            href = req.href
+
+        sql, args = self.get_sql(req, None, authname)
+        num_items = 0
+        with self.env.db_query as db:
+            with closing(db.cursor()) as cursor:
+                cursor.execute(sql, args)
+                columns = get_column_names(cursor)
+                fields = [self.fields.by_name(column, None)
+                          for column in columns]
+                while True:
+                    # The batch is read completely before being yielded
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    num_items += len(rows)
+                    yield from [self._make_result(columns, fields, row, href)
+                                for row in rows]
+        self.num_items = num_items
+        self.has_more_pages = False
+
+    def _make_result(self, columns, fields, row, href):
+        result = {}
+        for name, field, val in zip(columns, fields, row):
+            if name == 'reporter':
+                val = val or 'anonymous'
+            elif name == 'id':
+                val = int(val)
+                if href is not None:
+                    result['href'] = href.ticket(val)
+            elif name in self.time_fields:
+                val = from_utimestamp(int(val)) if val else None
+            elif field and field['type'] == 'checkbox':
+                val = as_bool(val)
+            elif val is None:
+                val = ''
+            result[name] = val
+        return result
 
     def get_href(self, href, id=None, order=None, desc=None, format=None,
                  max=None, page=None):
@@ -778,6 +895,11 @@ class Query(object):
             return ''
         field_names = sorted(fields, key=by_label)
 
+        # Evaluate the permissions of all the tickets at once, the checks
+        # done while rendering the results then hit the cache
+        context.perm.filter('TICKET_VIEW', [Resource('ticket', t['id'])
+                                            for t in tickets])
+
         groups = {}
         groupsequence = []
         for ticket in tickets:
@@ -881,6 +1003,35 @@ class QueryModule(Component):
         by default. Set to `0` to specify no limit.
         """)
 
+    count_cache_ttl = IntOption('query', 'count_cache_ttl', 0,
+        """Number of seconds during which the number of tickets matching
+        a query is cached, to avoid counting them again when turning
+        pages. The cache is cleared when tickets are changed, but only
+        in the process making the change. Set to `0` to disable the
+        cache. (''since 1.7.1'')
+        """)
+
+    keyset_pagination = BoolOption('query', 'keyset_pagination', False,
+        """Fetch the next page of a query by seeking past the last
+        ticket of the current page rather than with an `OFFSET`, which
+        keeps the cost of deep pages constant. This only applies to
+        queries which are not grouped and are ordered by a column of
+        the `ticket` table other than `milestone`, `version` and the
+        enumerations. Tickets with an empty value in the ordering column
+        are then ordered by id. (''since 1.7.1'')
+        """)
+
+    # Maximum number of ticket counts remembered
+    max_counts = 1000
+
+    # Maximum number of page keys remembered for keyset pagination
+    max_page_keys = 1000
+
+    def __init__(self):
+        self._counts = {}
+        self._page_keys = {}
+        self._lock = threading.Lock()
+
     # IContentConverter methods
 
     def get_supported_conversions(self):
@@ -981,7 +1132,7 @@ class QueryModule(Component):
 
         if 'update' in req.args:
             # Reset session vars
-            for var in ('query_constraints', 'query_time', 'query_tickets'):
+            for var in ('query_constraints', 'query_time', 'query_result'):
                 if var in req.session:
                     del req.session[var]
             req.redirect(query.get_href(req.href))
@@ -1008,6 +1159,46 @@ class QueryModule(Component):
     remove_re = re.compile(r'rm_filter_\d+_(.+)_(\d+)$')
     add_re = re.compile(r'add_(\d+)$')
 
+    def _get_cached_count(self, sql, args):
+        ttl = self.count_cache_ttl
+        if ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._counts.get((sql, tuple(args)))
+            if entry and time_now() - entry[0] >= ttl:
+                del self._counts[(sql, tuple(args))]
+                entry = None
+        if entry:
+            return entry[1]
+
+    def _set_cached_count(self, sql, args, count):
+        ttl = self.count_cache_ttl
+        if ttl > 0:
+            now = time_now()
+            with self._lock:
+                self._counts.pop((sql, tuple(args)), None)
+                self._counts[(sql, tuple(args))] = (now, count)
+                # Entries are kept in insertion order, so the expired
+                # ones come first
+                while len(self._counts) > self.max_counts or \
+                        now - next(iter(self._counts.values()))[0] >= ttl:
+                    del self._counts[next(iter(self._counts))]
+
+    def _clear_counts(self):
+        with self._lock:
+            self._counts.clear()
+            self._page_keys.clear()
+
+    def _get_page_key(self, query_key, page):
+        with self._lock:
+            return self._page_keys.get(query_key + (page,))
+
+    def _set_page_key(self, query_key, page, key):
+        with self._lock:
+            self._page_keys[query_key + (page,)] = key
+            while len(self._page_keys) > self.max_page_keys:
+                del self._page_keys[next(iter(self._page_keys))]
+
     def _get_constraints(self, req=None, arg_list=[]):
         fields = TicketSystem(self.env).get_ticket_fields()
         synonyms = TicketSystem(self.env).get_field_synonyms()
@@ -1091,6 +1282,7 @@ class QueryModule(Component):
 
     def display_html(self, req, query):
         # The most recent query is stored in the user session;
+        store = QueryResultStore(self.env)
         orig_list = None
         orig_time = datetime_now(utc)
         query_time = req.session.as_int('query_time', 0)
@@ -1102,11 +1294,9 @@ class QueryModule(Component):
                 tickets = query.execute(req)
                 # New or outdated query, (re-)initialize session vars
                 req.session['query_constraints'] = query_constraints
-                req.session['query_tickets'] = ' '.join(str(t['id'])
-                                                        for t in tickets)
             else:
-                orig_list = [int(id) for id
-                             in req.session.get('query_tickets', '').split()]
+                orig_list = store.get_tickets(
+                                req.session.get('query_result', '')) or []
                 tickets = query.execute(req, cached_ids=orig_list)
                 orig_time = query_time
         except QueryValueError as e:
@@ -1122,7 +1312,11 @@ class QueryModule(Component):
 
         req.session['query_href'] = query.get_href(context.href)
         req.session['query_time'] = to_timestamp(orig_time)
-        req.session['query_tickets'] = ' '.join(str(t['id']) for t in tickets)
+        key = store.get_key(req, query.constraints, query.order, query.desc,
+                            query.group, query.groupdesc, query.page,
+                            query.max)
+        req.session['query_result'] = \
+            store.save(key, [t['id'] for t in tickets])
         title = _("Custom Query")
 
         # Only interact with the report module if it is actually enabled.
@@ -1190,11 +1384,19 @@ class QueryModule(Component):
 
             chrome = Chrome(self.env)
             context = web_context(req)
-            results = query.execute(req)
             fields = dict((f['name'], f) for f in query.fields)
-            for result in results:
-                ticket = Resource(self.realm, result['id'])
-                if 'TICKET_VIEW' in req.perm(ticket):
+            results = query.iterate(req)
+            while True:
+                batch = list(islice(results, 1000))
+                if not batch:
+                    break
+                allowed = set(req.perm.filter(
+                    'TICKET_VIEW', [Resource(self.realm, result['id'])
+                                    for result in batch]))
+                for result in batch:
+                    ticket = Resource(self.realm, result['id'])
+                    if ticket not in allowed:
+                        continue
                     values = []
                     for col in cols:
                         value = result[col]
@@ -1218,7 +1420,7 @@ class QueryModule(Component):
         query_href = query.get_href(context.href)
         if 'description' not in query.rows:
             query.rows.append('description')
-        results = query.execute(req)
+        results = query.iterate(req)
         data = {
             'context': context,
             'results': results,
@@ -1472,8 +1674,10 @@ class TicketQueryMacro(WikiMacroBase):
         # Formats above had their own permission checks, here we need to
         # do it explicitly:
 
-        tickets = [t for t in tickets
-                   if 'TICKET_VIEW' in req.perm(self.realm, t['id'])]
+        allowed = {resource.id for resource in req.perm.filter(
+                       'TICKET_VIEW', [Resource(self.realm, t['id'])
+                                       for t in tickets])}
+        tickets = [t for t in tickets if t['id'] in allowed]
 
         if not tickets:
             return tag.span(_("No results"), class_='query_no_results')
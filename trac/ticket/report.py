@@ -25,7 +25,7 @@ from trac.core import *
 from trac.db.api import get_column_names
 from trac.perm import IPermissionRequestor
 from trac.resource import Resource, ResourceNotFound
-from trac.ticket.api import TicketSystem
+from trac.ticket.api import QueryResultStore, TicketSystem
 from trac.ticket.model import Report
 from trac.util import as_int, content_disposition
 from trac.util.datefmt import format_datetime, format_time, from_utimestamp
@@ -252,7 +252,7 @@ class ReportModule(Component):
         req.redirect(req.href.report(id))
 
     def _do_clear(self, req):
-        for name in ('query_href', 'query_tickets'):
+        for name in ('query_href', 'query_result'):
             if name in req.session:
                 del req.session[name]
         req.redirect(req.href.report())
@@ -543,7 +543,7 @@ class ReportModule(Component):
         #  - group cells the same way headers are grouped
         chrome = Chrome(self.env)
         row_groups = []
-        authorized_results = []
+        rows = []
         prev_group_value = None
         for row_idx, result in enumerate(results):
             col_idx = 0
@@ -590,8 +590,22 @@ class ReportModule(Component):
                                     parent=Resource(parent_realm, parent_id))
             else:
                 resource = Resource(realm, row.get('id'))
-            # FIXME: for now, we still need to hardcode the realm in the action
-            if resource.realm.upper() + '_VIEW' not in req.perm(resource):
+            rows.append((result, row, resource, email_cells,
+                         len(row_groups)))
+
+        # Check the permissions on all the rows at once
+        # FIXME: for now, we still need to hardcode the realm in the action
+        resources = {}
+        for result, row, resource, email_cells, num_groups in rows:
+            resources.setdefault(resource.realm.upper() + '_VIEW', []) \
+                     .append(resource)
+        allowed = set()
+        for action, realm_resources in resources.items():
+            allowed.update(req.perm.filter(action, realm_resources))
+
+        authorized_results = []
+        for result, row, resource, email_cells, num_groups in rows:
+            if resource not in allowed:
                 continue
             authorized_results.append(result)
             if email_cells:
@@ -600,7 +614,9 @@ class ReportModule(Component):
                                                   cell['value'])
                     result[cell['index']] = cell['value'] = emails
             row['resource'] = resource
-            if row_groups:
+            if num_groups:
+                row_group = row_groups[num_groups - 1][1]
+            elif row_groups:
                 row_group = row_groups[-1][1]
             else:
                 row_group = []
@@ -642,11 +658,12 @@ class ReportModule(Component):
             # the query navigation links on the ticket can be used to
             # navigate report results as well
             try:
-                req.session['query_tickets'] = \
-                    ' '.join(str(int(row['id']))
-                             for rg in row_groups for row in rg[1])
-                req.session['query_href'] = \
-                    req.session['query_href'] = report_href()
+                tickets = [int(row['id'])
+                           for rg in row_groups for row in rg[1]]
+                store = QueryResultStore(self.env)
+                key = store.get_key(req, 'report', id, report_href())
+                req.session['query_result'] = store.save(key, tickets)
+                req.session['query_href'] = report_href()
                 # Kludge: we have to clear the other query session
                 # variables, but only if the above succeeded
                 for var in ('query_constraints', 'query_time'):
@@ -774,6 +791,8 @@ class ReportModule(Component):
                 self.log.debug("Report {%d} SQL (order + limit): %s", id, sql)
             try:
                 cursor.execute(sql, args)
+                # Errors can also be raised while stepping through rows
+                rows = cursor.fetchall() or []
             except Exception as e:
                 self.log.warning('Exception caught while executing Report '
                                  '{%d}: %r, args %r%s', id, sql, args,
@@ -790,7 +809,6 @@ class ReportModule(Component):
                                       sort_column=SORT_COLUMN,
                                       limit_offset=LIMIT_OFFSET))
                 return e, sql
-            rows = cursor.fetchall() or []
             cols = get_column_names(cursor)
 
         return cols, rows, num_items, missing_args, limit_offset
@@ -967,6 +985,8 @@ class ReportModule(Component):
                lambda x, y, z: self._format_link(x, 'report', y[1:-1], y, z))
 
     def _format_link(self, formatter, ns, target, label, fullmatch=None):
+        # Reports are changed without notifying change listeners
+        formatter.set_volatile()
         intertrac = formatter.shorthand_intertrac_helper(ns, target, label,
                                                          fullmatch)
         if intertrac:
@@ -27,6 +27,7 @@ from trac.notification.api import NotificationSystem
 from trac.perm import IPermissionRequestor
 from trac.resource import *
 from trac.search import ISearchSource, search_to_regexps, shorten_result
+from trac.search.index import SearchIndex
 from trac.util import as_bool, partition
 from trac.util.datefmt import (datetime_now, format_date, format_datetime,
                                from_utimestamp, get_datetime_format_hint,
@@ -39,7 +40,7 @@ from trac.util.translation import _, tag_
 from trac.ticket.api import TicketSystem
 from trac.ticket.notification import BatchTicketChangeEvent
 from trac.ticket.model import Milestone, MilestoneCache, Ticket
-from trac.timeline.api import ITimelineEventProvider
+from trac.timeline.api import ITimelineEventProvider, merge_timeline_events
 from trac.web.api import HTTPBadRequest, IRequestHandler, RequestDone
 from trac.web.chrome import (Chrome, INavigationContributor, accesskey,
                              add_link, add_notice, add_stylesheet, add_warning,
@@ -331,10 +332,9 @@ def get_tickets_for_all_milestones(env, field='component'):
                      WHERE t.milestone != ''
                      ORDER BY t.milestone, c.value, t.id"""
             args = (field,)
-        cursor = db.cursor()
-        cursor.execute(sql, args)
         results = {}
-        for milestone, group in itertools.groupby(cursor, lambda row: row[3]):
+        for milestone, group in itertools.groupby(db.iterate(sql, args),
+                                                  lambda row: row[3]):
             results[milestone] = [{'id': row[0], 'status': row[1],
                                    field: row[2]} for row in group]
         return results
@@ -359,8 +359,10 @@ def get_num_tickets_for_milestone(env, milestone, exclude_closed=False):
 def apply_ticket_permissions(env, req, tickets):
     """Apply permissions to a set of milestone tickets as returned by
     `get_tickets_for_milestone()`."""
-    return [t for t in tickets
-            if 'TICKET_VIEW' in req.perm('ticket', t['id'])]
+    allowed = {resource.id for resource in req.perm.filter(
+                   'TICKET_VIEW', [Resource('ticket', t['id'])
+                                   for t in tickets])}
+    return [t for t in tickets if t['id'] in allowed]
 
 
 def milestone_stats_data(env, req, stat, name, grouped_by='component',
@@ -698,12 +700,18 @@ class MilestoneModule(Component):
         if 'MILESTONE_VIEW' in req.perm:
             yield ('milestone', _("Milestones completed"))
 
+    timeline_events_sorted = True
+
     def get_timeline_events(self, req, start, stop, filters):
         if 'milestone' in filters:
             milestone_realm = Resource(self.realm)
-            for name, due, completed, description \
-                    in MilestoneCache(self.env).milestones.values():
-                if completed and start <= completed <= stop:
+
+            def produce_events():
+                completed_milestones = [
+                    m for m in MilestoneCache(self.env).milestones.values()
+                    if m[2] and start <= m[2] <= stop]
+                completed_milestones.sort(key=lambda m: m[2], reverse=True)
+                for name, due, completed, description in completed_milestones:
                     # TODO: creation and (later) modifications should also be
                     #       reported
                     milestone = milestone_realm(id=name)
@@ -712,8 +720,11 @@ class MilestoneModule(Component):
                                (milestone, description))
 
             # Attachments
-            for event in AttachmentModule(self.env).get_timeline_events(
-                    req, milestone_realm, start, stop):
+            attachment_events = AttachmentModule(self.env) \
+                                .get_timeline_events(req, milestone_realm,
+                                                     start, stop)
+            for event in merge_timeline_events(produce_events(),
+                                               attachment_events):
                 yield event
 
     def render_timeline_event(self, context, field, event):
@@ -1078,6 +1089,8 @@ class MilestoneModule(Component):
         yield ('milestone', self._format_link)
 
     def _format_link(self, formatter, ns, name, label):
+        # The title shows the due or completion date relative to now
+        formatter.set_volatile()
         name, query, fragment = formatter.split_link(name)
         return self._render_link(formatter.context, name, label,
                                  query + fragment)
@@ -1164,19 +1177,29 @@ class MilestoneModule(Component):
     def get_search_results(self, req, terms, filters):
         if 'milestone' not in filters:
             return
-        term_regexps = search_to_regexps(terms)
+        milestones = MilestoneCache(self.env).milestones
+        hits = SearchIndex(self.env).search(self.realm, terms)
+        if hits is None:
+            term_regexps = search_to_regexps(terms)
+            matches = [(values, None) for values in milestones.values()
+                       if all(r.search(values[3]) or r.search(values[0])
+                              for r in term_regexps)]
+        else:
+            matches = [(milestones[name], score)
+                       for name, parent_id, score in hits
+                       if name in milestones]
         milestone_realm = Resource(self.realm)
-        for name, due, completed, description \
-                in MilestoneCache(self.env).milestones.values():
-            if all(r.search(description) or r.search(name)
-                   for r in term_regexps):
-                milestone = milestone_realm(id=name)
-                if 'MILESTONE_VIEW' in req.perm(milestone):
-                    dt = (completed if completed else
-                          due if due else datetime_now(utc))
-                    yield (get_resource_url(self.env, milestone, req.href),
-                           get_resource_name(self.env, milestone), dt,
-                           '', shorten_result(description, terms))
+        for (name, due, completed, description), score in matches:
+            milestone = milestone_realm(id=name)
+            if 'MILESTONE_VIEW' in req.perm(milestone):
+                dt = (completed if completed else
+                      due if due else datetime_now(utc))
+                result = (get_resource_url(self.env, milestone, req.href),
+                          get_resource_name(self.env, milestone), dt,
+                          '', shorten_result(description, terms))
+                if score is not None:
+                    result += (score,)
+                yield result
 
         # Attachments
         for result in AttachmentModule(self.env).get_search_results(
@@ -17,7 +17,7 @@ from trac.perm import PermissionCache, PermissionSystem
 from trac.resource import Resource
 from trac.test import EnvironmentStub, MockRequest, makeSuite
 from trac.ticket import model
-from trac.ticket.api import TicketSystem
+from trac.ticket.api import QueryResultStore, TicketSystem
 from trac.ticket.model import Milestone, Ticket, Version
 from trac.ticket.test import insert_ticket
 from trac.util.datefmt import datetime_now, utc
@@ -503,8 +503,82 @@ class TicketSystemTestCase(unittest.TestCase):
         self.assertFalse(self.ticket_system.resource_exists(r4))
 
 
+class QueryResultStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub()
+        self.store = QueryResultStore(self.env)
+
+    def tearDown(self):
+        self.env.reset_db()
+
+    def test_save_and_get_tickets(self):
+        id = self.store.save('query', [3, 1, 2])
+        self.assertEqual(self.store.get_id('query'), id)
+        self.assertEqual([3, 1, 2], self.store.get_tickets(id))
+
+    def test_save_replaces_tickets(self):
+        self.store.save('query', [3, 1, 2])
+        id = self.store.save('query', [4])
+        self.assertEqual([4], self.store.get_tickets(id))
+
+    def test_save_empty(self):
+        id = self.store.save('query', [])
+        self.assertEqual([], self.store.get_tickets(id))
+        self.assertIsNone(self.store.get_neighbors(id, 1))
+
+    def test_unknown_result_set(self):
+        self.assertIsNone(self.store.get_tickets('unknown'))
+        self.assertIsNone(self.store.get_neighbors('unknown', 1))
+
+    def test_expired_result_set(self):
+        id = self.store.save('query', [1, 2])
+        self.env.db_transaction("UPDATE query_result_set SET time=0")
+        self.assertIsNone(self.store.get_tickets(id))
+        self.assertIsNone(self.store.get_neighbors(id, 1))
+
+        self.store.save('other query', [3])
+        self.assertEqual([], self.env.db_query("""
+            SELECT * FROM query_result WHERE id=%s""", (id,)))
+
+    def test_get_neighbors(self):
+        id = self.store.save('query', [5, 3, 8, 1, 9])
+        self.assertEqual({'next': 3, 'last': 9},
+                         self.store.get_neighbors(id, 5))
+        self.assertEqual({'first': 5, 'prev': 5, 'next': 8, 'last': 9},
+                         self.store.get_neighbors(id, 3))
+        self.assertEqual({'first': 5, 'prev': 3, 'next': 1, 'last': 9},
+                         self.store.get_neighbors(id, 8))
+        self.assertEqual({'first': 5, 'prev': 1},
+                         self.store.get_neighbors(id, 9))
+        self.assertIsNone(self.store.get_neighbors(id, 2))
+
+    def test_get_neighbors_single_ticket(self):
+        id = self.store.save('query', [1])
+        self.assertEqual({}, self.store.get_neighbors(id, 1))
+
+    def test_get_key(self):
+        req1 = MockRequest(self.env, authname='joe')
+        req2 = MockRequest(self.env, authname='joe')
+        self.assertEqual(self.store.get_key(req1, 'report', 1),
+                         self.store.get_key(req2, 'report', 1))
+        self.assertNotEqual(self.store.get_key(req1, 'report', 1),
+                            self.store.get_key(req1, 'report', 2))
+
+    def test_get_key_anonymous(self):
+        req1 = MockRequest(self.env)
+        req2 = MockRequest(self.env)
+        req1.session.sid = 'session1'
+        req2.session.sid = 'session2'
+        self.assertNotEqual(self.store.get_key(req1, 'report', 1),
+                            self.store.get_key(req2, 'report', 1))
+
+
 def test_suite():
-    return makeSuite(TicketSystemTestCase)
+    suite = unittest.TestSuite()
+    suite.addTest(makeSuite(TicketSystemTestCase))
+    suite.addTest(makeSuite(QueryResultStoreTestCase))
+    return suite
 
 
 if __name__ == '__main__':
@@ -18,7 +18,7 @@ import unittest
 
 from trac.mimeview.api import Mimeview
 from trac.test import Mock, EnvironmentStub, MockPerm, MockRequest, makeSuite
-from trac.ticket.api import TicketSystem
+from trac.ticket.api import QueryResultStore, TicketSystem
 from trac.ticket.model import Milestone, Severity, Ticket, Version
 from trac.ticket.query import Query, QueryModule, TicketQueryMacro
 from trac.ticket.test import insert_ticket
@@ -1025,10 +1025,10 @@ ORDER BY COALESCE(%(version)s.value,'')='',%(version)s.value,t.id""" % quoted)
         self.env.config.set('ticket-custom', 'custom1.label', 'CustomOne')
         query = Mock(get_columns=lambda: ['id', 'owner', 'milestone',
                                           'custom1'],
-                     execute=lambda r: [{'id': 1,
-                                         'owner': 'joe@example.org',
-                                         'milestone': 'milestone1',
-                                         'custom1': 'val1'}],
+                     iterate=lambda r: iter([{'id': 1,
+                                              'owner': 'joe@example.org',
+                                              'milestone': 'milestone1',
+                                              'custom1': 'val1'}]),
                      fields=TicketSystem(self.env).get_ticket_fields(),
                      time_fields=['time', 'changetime'])
         req = Mock(href=self.env.href, perm=MockPerm())
@@ -1097,8 +1097,8 @@ ORDER BY COALESCE(c.%(ticket)s,'')='',c.%(ticket)s,t.id""" % quoted)
 
     def test_csv_escape(self):
         query = Mock(get_columns=lambda: ['id', 'col1'],
-                     execute=lambda r: [{'id': 1,
-                                         'col1': 'value, needs escaped'}],
+                     iterate=lambda r: iter([
+                         {'id': 1, 'col1': 'value, needs escaped'}]),
                      fields=TicketSystem(self.env).get_ticket_fields(),
                      time_fields=['time', 'changetime'])
         req = MockRequest(self.env)
@@ -1110,10 +1110,10 @@ ORDER BY COALESCE(c.%(ticket)s,'')='',c.%(ticket)s,t.id""" % quoted)
 
     def test_csv_obfuscation(self):
         query = Mock(get_columns=lambda: ['id', 'owner', 'reporter', 'cc'],
-                     execute=lambda r: [{'id': 1,
-                                         'owner': 'joe@example.org',
-                                         'reporter': 'foo@example.org',
-                                         'cc': 'cc1@example.org, cc2'}],
+                     iterate=lambda r: iter([{'id': 1,
+                                              'owner': 'joe@example.org',
+                                              'reporter': 'foo@example.org',
+                                              'cc': 'cc1@example.org, cc2'}]),
                      fields=TicketSystem(self.env).get_ticket_fields(),
                      time_fields=['time', 'changetime'])
         req = MockRequest(self.env, authname='anonymous')
@@ -1175,7 +1175,8 @@ ORDER BY COALESCE(c.%(ticket)s,'')='',c.%(ticket)s,t.id""" % quoted)
             db("UPDATE ticket SET changetime=NULL WHERE id>%s", (n,))
         req = MockRequest(self.env, path_info='/query', args={'id': '!0'})
         self._process_request(req)
-        self.assertNotEqual('', req.session['query_tickets'])
+        store = QueryResultStore(self.env)
+        self.assertNotEqual([], store.get_tickets(req.session['query_result']))
         self._process_request(req)  # TypeError not raised (#12029)
 
     def test_time_fields(self):
@@ -1412,6 +1413,74 @@ ORDER BY COALESCE(t.id,0)=0,t.id""".format(**quoted))
                     'add_filter_2'],
                    'status=closed&or&resolution=fixed&or&owner=joe')
 
+    def _execute_pages(self, **kwargs):
+        ids = []
+        page = 1
+        while True:
+            query = Query(self.env, max=3, page=page, **kwargs)
+            ids.extend(t['id'] for t in query.execute(self.req))
+            if not query.has_more_pages or \
+                    page * query.max >= query.num_items:
+                return ids
+            page += 1
+
+    def test_keyset_pagination(self):
+        for order, desc in (('id', 0), ('id', 1), ('time', 1),
+                            ('summary', 0), ('status', 0)):
+            expected = self._execute_pages(order=order, desc=desc)
+            self.assertEqual(self.n_tickets, len(expected))
+            self.env.config.set('query', 'keyset_pagination', 'enabled')
+            self.assertEqual(expected,
+                             self._execute_pages(order=order, desc=desc))
+            self.assertNotEqual({}, self.query_module._page_keys)
+            self.env.config.set('query', 'keyset_pagination', 'disabled')
+
+    def test_keyset_pagination_empty_values(self):
+        self.env.config.set('query', 'keyset_pagination', 'enabled')
+        for desc in (0, 1):
+            ids = self._execute_pages(order='owner', desc=desc)
+            self.assertEqual(sorted(self.tktids), sorted(ids))
+            owners = [Ticket(self.env, id)['owner'] or '' for id in ids]
+            self.assertEqual(sorted(owners, key=lambda o: (o == '', o),
+                                    reverse=bool(desc)),
+                             owners)
+
+    def test_keyset_pagination_not_applicable(self):
+        self.env.config.set('query', 'keyset_pagination', 'enabled')
+        for kwargs in ({'order': 'priority'}, {'order': 'milestone'},
+                       {'order': 'id', 'group': 'status'}):
+            self._execute_pages(**kwargs)
+            self.assertEqual({}, self.query_module._page_keys)
+
+    def test_count_cache(self):
+        self.env.config.set('query', 'count_cache_ttl', 60)
+        query = Query.from_string(self.env, 'status!=closed')
+        count = query.count()
+        self.env.db_transaction("UPDATE ticket SET status='closed'")
+        self.assertEqual(count, query.count())
+        insert_ticket(self.env, summary='New ticket', status='closed')
+        self.assertEqual(0, query.count())
+
+    def test_count_cache_bounded(self):
+        self.env.config.set('query', 'count_cache_ttl', 60)
+        self.query_module.max_counts = 2
+        for owner in ('joe', 'jim', 'jes'):
+            Query.from_string(self.env, 'owner=' + owner).count()
+        self.assertEqual(2, len(self.query_module._counts))
+
+    def test_ticket_change_clears_page_keys(self):
+        self.env.config.set('query', 'keyset_pagination', 'enabled')
+        self._execute_pages(order='id')
+        self.assertNotEqual({}, self.query_module._page_keys)
+        insert_ticket(self.env, summary='New ticket')
+        self.assertEqual({}, self.query_module._page_keys)
+
+    def test_max_zero_does_not_count(self):
+        query = Query.from_string(self.env, 'max=0')
+        tickets = query.execute(self.req)
+        self.assertEqual(self.n_tickets, query.num_items)
+        self.assertEqual(self.n_tickets, len(tickets))
+
 
 class QueryLinksTestCase(unittest.TestCase):
 
@@ -24,6 +24,7 @@ import re
 from trac.attachment import AttachmentModule
 from trac.config import BoolOption, Option
 from trac.core import *
+from trac.db.util import chunked_params
 from trac.mimeview.api import Mimeview, IContentConverter
 from trac.notification.api import NotificationSystem
 from trac.perm import IPermissionPolicy, PermissionSystem
@@ -32,11 +33,13 @@ from trac.resource import (
     get_resource_shortname
 )
 from trac.search import ISearchSource, search_to_sql, shorten_result
+from trac.search.index import SearchIndex
 from trac.ticket import model
-from trac.ticket.api import TicketSystem, ITicketManipulator, TicketFieldList
+from trac.ticket.api import (
+    ITicketManipulator, QueryResultStore, TicketFieldList, TicketSystem)
 from trac.ticket.notification import TicketChangeEvent
 from trac.ticket.roadmap import group_milestones
-from trac.timeline.api import ITimelineEventProvider
+from trac.timeline.api import ITimelineEventProvider, merge_timeline_events
 from trac.util import as_bool, as_int, get_reporter_id, lazy, to_list
 from trac.util.datefmt import (
     datetime_now, format_datetime, format_date_or_datetime, from_utimestamp,
@@ -179,38 +182,55 @@ class TicketModule(Component):
         if 'ticket' not in filters:
             return
         ticket_realm = Resource(self.realm)
+        hits = SearchIndex(self.env).search(self.realm, terms)
+        select = """SELECT summary, description, reporter, type, id,
+                           time, status, resolution
+                    FROM ticket WHERE id IN (%s)"""
         with self.env.db_query as db:
-            sql, args = search_to_sql(db, ['summary', 'keywords',
-                                           'description', 'reporter', 'cc',
-                                           db.cast('id', 'text')], terms)
-            sql2, args2 = search_to_sql(db, ['newvalue'], terms)
-            sql3, args3 = search_to_sql(db, ['value'], terms)
+            if hits is None:
+                sql, args = search_to_sql(db, ['summary', 'keywords',
+                                               'description', 'reporter',
+                                               'cc', db.cast('id', 'text')],
+                                          terms)
+                sql2, args2 = search_to_sql(db, ['newvalue'], terms)
+                sql3, args3 = search_to_sql(db, ['value'], terms)
+                sql = """
+                      SELECT id FROM ticket WHERE %s
+                    UNION
+                      SELECT ticket FROM ticket_change
+                      WHERE field='comment' AND %s
+                    UNION
+                      SELECT ticket FROM ticket_custom WHERE %s
+                    """ % (sql, sql2, sql3)
+                args = args + args2 + args3
+                rows = db(select % sql, args)
+                scores = {}
+            else:
+                scores = {int(id): score for id, parent_id, score in hits}
+                ids = list(scores)
+                rows = []
+                for subset, holders in chunked_params(ids):
+                    rows.extend(db(select % holders, subset))
             ticketsystem = TicketSystem(self.env)
+            allowed = set(req.perm.filter('TICKET_VIEW',
+                                          [ticket_realm(id=row[4])
+                                           for row in rows]))
             for summary, desc, author, type, tid, ts, status, resolution in \
-                    db("""SELECT summary, description, reporter, type, id,
-                                 time, status, resolution
-                          FROM ticket
-                          WHERE id IN (
-                              SELECT id FROM ticket WHERE %s
-                            UNION
-                              SELECT ticket FROM ticket_change
-                              WHERE field='comment' AND %s
-                            UNION
-                              SELECT ticket FROM ticket_custom WHERE %s
-                          )
-                          """ % (sql, sql2, sql3),
-                          args + args2 + args3):
+                    rows:
                 t = ticket_realm(id=tid)
-                if 'TICKET_VIEW' in req.perm(t):
-                    yield (req.href.ticket(tid),
-                           tag_("%(title)s: %(message)s",
-                                title=tag.span(
-                                    get_resource_shortname(self.env, t),
-                                    class_=status),
-                                message=ticketsystem.format_summary(
-                                    summary, status, resolution, type)),
-                           from_utimestamp(ts), author,
-                           shorten_result(desc, terms))
+                if t in allowed:
+                    result = (req.href.ticket(tid),
+                              tag_("%(title)s: %(message)s",
+                                   title=tag.span(
+                                       get_resource_shortname(self.env, t),
+                                       class_=status),
+                                   message=ticketsystem.format_summary(
+                                       summary, status, resolution, type)),
+                              from_utimestamp(ts), author,
+                              shorten_result(desc, terms))
+                    if tid in scores:
+                        result += (scores[tid],)
+                    yield result
 
         # Attachments
         for result in AttachmentModule(self.env).get_search_results(
@@ -225,6 +245,8 @@ class TicketModule(Component):
             if self.timeline_details:
                 yield ('ticket_details', _("Ticket updates"), True)
 
+    timeline_events_sorted = True
+
     def get_timeline_events(self, req, start, stop, filters):
         ts_start = to_utimestamp(start)
         ts_stop = to_utimestamp(stop)
@@ -280,7 +302,8 @@ class TicketModule(Component):
                         t.id = tc.ticket AND tc.time>=%%s AND tc.time<=%%s
                     LEFT OUTER JOIN enum p ON
                         p.type='priority' AND p.name=t.priority
-                    ORDER BY tc.time, COALESCE(p.value,'')='', %s, tc.ticket
+                    ORDER BY tc.time DESC, COALESCE(p.value,'')='', %s,
+                             tc.ticket
                     """ % db.cast('p.value', 'int'), (ts_start, ts_stop)):
                 if not (oldvalue or newvalue):
                     # ignore empty change corresponding to custom field
@@ -310,9 +333,8 @@ class TicketModule(Component):
                 if ev:
                     yield (ev, data[1])
 
-        # Ticket changes
-        with self.env.db_query as db:
-            if 'ticket' in filters or 'ticket_details' in filters:
+        def produce_change_events():
+            with self.env.db_query as db:
                 prev_t = None
                 prev_ev = None
                 batch_ev = None
@@ -342,21 +364,30 @@ class TicketModule(Component):
                 elif prev_ev:
                     yield prev_ev
 
-                # New tickets
-                if 'ticket' in filters:
-                    for row in db("""SELECT id, time, reporter, type, summary,
-                                            description, component
-                                     FROM ticket WHERE time>=%s AND time<=%s
-                                     """, (ts_start, ts_stop)):
-                        ev = produce_event(row, 'new', {}, None, None)
-                        if ev:
-                            yield ev
+        def produce_new_ticket_events():
+            for row in self.env.db_query("""
+                    SELECT id, time, reporter, type, summary, description,
+                           component
+                    FROM ticket WHERE time>=%s AND time<=%s
+                    ORDER BY time DESC
+                    """, (ts_start, ts_stop)):
+                ev = produce_event(row, 'new', {}, None, None)
+                if ev:
+                    yield ev
 
-            # Attachments
-            if 'ticket_details' in filters:
-                for event in AttachmentModule(self.env).get_timeline_events(
-                    req, ticket_realm, start, stop):
-                    yield event
+        streams = []
+        # Ticket changes
+        if 'ticket' in filters or 'ticket_details' in filters:
+            streams.append(produce_change_events())
+        # New tickets
+        if 'ticket' in filters:
+            streams.append(produce_new_ticket_events())
+        # Attachments
+        if 'ticket_details' in filters:
+            streams.append(AttachmentModule(self.env).get_timeline_events(
+                req, ticket_realm, start, stop))
+        for event in merge_timeline_events(*streams):
+            yield event
 
     def render_timeline_event(self, context, field, event):
         kind = event[0]
@@ -711,16 +742,13 @@ class TicketModule(Component):
         global_sequence = True
         # If the ticket is being shown in the context of a query, add
         # links to help navigate in the query result set
-        if 'query_tickets' in req.session:
-            tickets = req.session['query_tickets'].split()
-            if str(ticket.id) in tickets:
-                idx = tickets.index(str(ticket.id))
-                if idx > 0:
-                    add_ticket_link('first', tickets[0])
-                    add_ticket_link('prev', tickets[idx - 1])
-                if idx < len(tickets) - 1:
-                    add_ticket_link('next', tickets[idx + 1])
-                    add_ticket_link('last', tickets[-1])
+        if 'query_result' in req.session:
+            neighbors = QueryResultStore(self.env).get_neighbors(
+                req.session['query_result'], ticket.id)
+            if neighbors is not None:
+                for css_class in ('first', 'prev', 'next', 'last'):
+                    if css_class in neighbors:
+                        add_ticket_link(css_class, neighbors[css_class])
                 add_link(req, 'up', req.session['query_href'])
                 global_sequence = False
         if global_sequence:
@@ -1930,6 +1958,14 @@ class DefaultTicketPolicy(Component):
             if change and username == change['author']:
                 return True
 
+    def check_permissions_batch(self, action, username, resources, perm):
+        if action not in ('TICKET_CHG_MILESTONE', 'TICKET_EDIT_DESCRIPTION',
+                          'TICKET_EDIT_COMMENT'):
+            return [None] * len(resources)
+        return [self.check_permission(action, username, resource,
+                                      perm(resource))
+                for resource in resources]
+
     def _is_valid_resource(self, resource, expected_realm, exists=True):
         return resource and resource.realm == expected_realm and \
                (resource.id is not None if exists else resource.id is None)
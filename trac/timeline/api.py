@@ -17,6 +17,9 @@
 # Author: Jonas Borgström <jonas@edgewall.com>
 #         Christopher Lenz <cmlenz@gmx.de>
 
+import heapq
+from operator import itemgetter
+
 from trac.core import *
 
 
@@ -52,6 +55,13 @@ class ITimelineEventProvider(Interface):
         like this happens when calling `AttachmentModule.get_timeline_events()`
         the tuple can also specify explicitly the provider by returning tuples
         of the following form: `(kind, date, author, data, provider)`.
+
+        A provider which generates its events sorted by date, newest
+        first, can declare it with a `timeline_events_sorted = True`
+        class attribute. The timeline then merges the events lazily and
+        stops consuming them once enough events are shown, rather than
+        retrieving and sorting all of them. `merge_timeline_events` can
+        be used for combining several sorted sequences of events.
         """
 
     def render_timeline_event(context, field, event):
@@ -64,3 +74,12 @@ class ITimelineEventProvider(Interface):
                       the 'url'
         :param event: the event tuple, as returned by `get_timeline_events`
         """
+
+
+def merge_timeline_events(*events):
+    """Merge sequences of timeline events, each sorted by date with the
+    newest event first, into a single sorted iterator.
+
+    :since: 1.7.1
+    """
+    return heapq.merge(*events, key=itemgetter(1), reverse=True)
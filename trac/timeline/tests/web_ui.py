@@ -230,8 +230,22 @@ class TimelineEventProviderTestCase(unittest.TestCase):
             def render_timeline_event(self, context, field, event):
                 return event[3].render(context, field, event)
 
+        class SortedTimelineEventProvider(TimelineEventProvider):
+
+            timeline_events_sorted = True
+
+            def __init__(self):
+                super().__init__()
+                self.consumed = 0
+
+            def get_timeline_events(self, req, start, stop, filters):
+                for event in self._events or ():
+                    self.consumed += 1
+                    yield event
+
         cls.timeline_event_providers = {
             'normal': TimelineEventProvider,
+            'sorted': SortedTimelineEventProvider,
         }
 
     @classmethod
@@ -307,6 +321,49 @@ class TimelineEventProviderTestCase(unittest.TestCase):
         self.assertEqual('<?xml version="1.0"?>', output[:21])
         minidom.parseString(output)  # verify valid xml
 
+    def _events(self, kind, *hours):
+        now = datetime_now(utc)
+        return [(kind, now - timedelta(hours=h), 'joe', None) for h in hours]
+
+    def test_merge_sorted_and_unsorted_providers(self):
+        normal = self.timeline_event_providers['normal'](self.env)
+        normal._events = self._events('normal', 5, 1, 3)
+        sorted_ = self.timeline_event_providers['sorted'](self.env)
+        sorted_._events = self._events('sorted', 2, 4, 6)
+        req = MockRequest(self.env, path_info='/timeline')
+
+        data = TimelineModule(self.env).process_request(req)[1]
+
+        self.assertEqual(['normal', 'sorted', 'normal', 'sorted', 'normal',
+                          'sorted'], [e['kind'] for e in data['events']])
+        dates = [e['datetime'] for e in data['events']]
+        self.assertEqual(sorted(dates, reverse=True), dates)
+
+    def test_max_stops_consuming_sorted_provider(self):
+        sorted_ = self.timeline_event_providers['sorted'](self.env)
+        sorted_._events = self._events('sorted', *range(1, 101))
+        req = MockRequest(self.env, path_info='/timeline',
+                          args={'max': '10'})
+
+        data = TimelineModule(self.env).process_request(req)[1]
+
+        self.assertEqual(10, len(data['events']))
+        self.assertGreater(20, sorted_.consumed)
+
+    def test_max_applies_after_author_filter(self):
+        sorted_ = self.timeline_event_providers['sorted'](self.env)
+        now = datetime_now(utc)
+        sorted_._events = [('sorted', now - timedelta(hours=h),
+                            'jane' if h % 2 else 'joe', None)
+                           for h in range(1, 21)]
+        req = MockRequest(self.env, path_info='/timeline',
+                          args={'max': '5', 'authors': 'jane'})
+
+        data = TimelineModule(self.env).process_request(req)[1]
+
+        self.assertEqual(['jane'] * 5,
+                         [e['author'] for e in data['events']])
+
     def _process_request(self, req):
         mod = TimelineModule(self.env)
         req = MockRequest(self.env, path_info='/timeline',
@@ -17,6 +17,7 @@
 # Author: Jonas Borgström <jonas@edgewall.com>
 #         Christopher Lenz <cmlenz@gmx.de>
 
+import heapq
 import pkg_resources
 import re
 from datetime import datetime, timedelta
@@ -186,22 +187,17 @@ class TimelineModule(Component):
             else:
                 include.add(name)
 
-        # gather all events for the given period of time
+        # gather the events for the given period of time, newest first,
+        # until enough events are found
         events = []
-        for provider in self.event_providers:
-            with component_guard(self.env, req, provider):
-                for event in provider.get_timeline_events(req, start, stop,
-                                                          filters) or []:
-                    author = (event[2] or '').lower()
-                    if ((not include or author in include) and
-                        author not in exclude):
-                        events.append(
-                            self._event_data(req, provider, event, lastvisit))
-
-        # prepare sorted global list
-        events = sorted(events, key=lambda e: e['datetime'], reverse=True)
-        if maxrows:
-            events = events[:maxrows]
+        for event, provider in self._get_events(req, start, stop, filters):
+            author = (event[2] or '').lower()
+            if ((not include or author in include) and
+                author not in exclude):
+                events.append(self._event_data(req, provider, event,
+                                               lastvisit))
+                if maxrows and len(events) >= maxrows:
+                    break
 
         data['events'] = events
 
@@ -362,6 +358,34 @@ class TimelineModule(Component):
 
     # Internal methods
 
+    def _get_events(self, req, start, stop, filters):
+        """Generate `(event, provider)` tuples for the events of all the
+        providers in the given period of time, newest first.
+
+        The events of the providers which generate them sorted are
+        merged lazily, so that only the events which are consumed get
+        produced. The events of the other providers are retrieved and
+        sorted upfront.
+        """
+        def key(event):
+            return to_datetime(event[1], req.tz)
+
+        def guarded(provider, events):
+            with component_guard(self.env, req, provider):
+                for event in events:
+                    yield event, provider
+
+        streams = []
+        for provider in self.event_providers:
+            with component_guard(self.env, req, provider):
+                events = provider.get_timeline_events(req, start, stop,
+                                                      filters) or []
+                if not getattr(provider, 'timeline_events_sorted', False):
+                    events = sorted(events, key=key, reverse=True)
+                streams.append(guarded(provider, events))
+        return heapq.merge(*streams, key=lambda item: key(item[0]),
+                           reverse=True)
+
     def _event_data(self, req, provider, event, lastvisit):
         """Compose the timeline event date from the event tuple and prepared
         provider methods"""
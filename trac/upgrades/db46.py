@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/.
+
+from trac.db.api import DatabaseManager
+from trac.db.schema import Column, Index, Table
+
+
+def do_upgrade(env, version, cursor):
+    """Add the `query_result_set` and `query_result` tables, and remove
+    the `query_tickets` session attributes they replace.
+    """
+    new_schema = [
+        Table('query_result_set', key='id')[
+            Column('id'),
+            Column('time', type='int64'),
+            Column('size', type='int'),
+            Index(['time'])],
+        Table('query_result', key=('id', 'seq'))[
+            Column('id'),
+            Column('seq', type='int'),
+            Column('ticket', type='int'),
+            Index(['id', 'ticket'])],
+    ]
+
+    with env.db_transaction as db:
+        DatabaseManager(env).create_tables(new_schema)
+        db("DELETE FROM session_attribute WHERE name='query_tickets'")
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/.
+
+from trac.db.api import DatabaseManager
+from trac.db.schema import Column, Index, Table
+
+
+def do_upgrade(env, version, cursor):
+    """Add the `notify_queue` table."""
+    new_schema = [
+        Table('notify_queue', key='id')[
+            Column('id', auto_increment=True),
+            Column('time', type='int64'),
+            Column('next_attempt', type='int64'),
+            Column('attempts', type='int'),
+            Column('from_addr'),
+            Column('recipients'),
+            Column('message'),
+            Column('error'),
+            Index(['next_attempt'])],
+    ]
+
+    DatabaseManager(env).create_tables(new_schema)
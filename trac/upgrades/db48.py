@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/.
+
+from trac.db.api import DatabaseManager
+from trac.db.schema import Column, Table
+
+
+def do_upgrade(env, version, cursor):
+    """Add the `request_stats` and `request_sql_stats` tables."""
+    new_schema = [
+        Table('request_stats', key='handler')[
+            Column('handler'),
+            Column('requests', type='int'),
+            Column('slow', type='int'),
+            Column('total_time', type='int64'),
+            Column('max_time', type='int64'),
+            Column('handler_time', type='int64'),
+            Column('filters_time', type='int64'),
+            Column('render_time', type='int64'),
+            Column('sql_count', type='int'),
+            Column('sql_time', type='int64'),
+            Column('cache_hits', type='int'),
+            Column('cache_misses', type='int')],
+        Table('request_sql_stats', key='id')[
+            Column('id'),
+            Column('statement'),
+            Column('executions', type='int'),
+            Column('total_time', type='int64'),
+            Column('max_time', type='int64')],
+    ]
+
+    DatabaseManager(env).create_tables(new_schema)
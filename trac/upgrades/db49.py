@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/.
+
+from trac.db.api import DatabaseManager
+from trac.db.schema import Column, Table
+
+
+def do_upgrade(env, version, cursor):
+    """Add the `node_last_change` table."""
+    new_schema = [
+        Table('node_last_change', key=('repos', 'rev', 'path', 'name'))[
+            Column('repos', type='int'),
+            Column('rev', key_size=40),
+            Column('path', key_size=255),
+            Column('name', key_size=255),
+            Column('change_rev')],
+    ]
+
+    DatabaseManager(env).create_tables(new_schema)
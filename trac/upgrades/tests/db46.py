@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/.
+
+import unittest
+
+from trac.db.api import DatabaseManager
+from trac.test import EnvironmentStub, makeSuite, mkdtemp
+from trac.upgrades import db46
+
+VERSION = 46
+
+
+class UpgradeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub(path=mkdtemp())
+        self.dbm = DatabaseManager(self.env)
+        with self.env.db_transaction:
+            self.dbm.drop_tables(['query_result', 'query_result_set'])
+            self.dbm.set_database_version(VERSION - 1)
+
+    def tearDown(self):
+        self.env.reset_db_and_disk()
+
+    def test_tables_created(self):
+        """The query_result_set and query_result tables are created."""
+        db46.do_upgrade(self.env, VERSION, None)
+
+        self.assertEqual(['id', 'time', 'size'],
+                         self.dbm.get_column_names('query_result_set'))
+        self.assertEqual(['id', 'seq', 'ticket'],
+                         self.dbm.get_column_names('query_result'))
+
+    def test_query_tickets_removed(self):
+        """The query_tickets session attributes are removed."""
+        with self.env.db_transaction as db:
+            db.executemany("""
+                INSERT INTO session_attribute (sid,authenticated,name,value)
+                VALUES (%s,1,%s,%s)
+                """, [('user', 'query_tickets', '1 2 3'),
+                      ('user', 'query_href', '/query')])
+
+        db46.do_upgrade(self.env, VERSION, None)
+
+        self.assertEqual([('query_href',)], self.env.db_query("""
+            SELECT name FROM session_attribute WHERE sid='user'
+            """))
+
+
+def test_suite():
+    return makeSuite(UpgradeTestCase)
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/.
+
+import unittest
+
+from trac.db.api import DatabaseManager
+from trac.test import EnvironmentStub, makeSuite, mkdtemp
+from trac.upgrades import db47
+
+VERSION = 47
+
+
+class UpgradeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub(path=mkdtemp())
+        self.dbm = DatabaseManager(self.env)
+        with self.env.db_transaction:
+            self.dbm.drop_tables(['notify_queue'])
+            self.dbm.set_database_version(VERSION - 1)
+
+    def tearDown(self):
+        self.env.reset_db_and_disk()
+
+    def test_table_created(self):
+        """The notify_queue table is created."""
+        db47.do_upgrade(self.env, VERSION, None)
+
+        self.assertEqual(['id', 'time', 'next_attempt', 'attempts',
+                          'from_addr', 'recipients', 'message', 'error'],
+                         self.dbm.get_column_names('notify_queue'))
+
+
+def test_suite():
+    return makeSuite(UpgradeTestCase)
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/.
+
+import unittest
+
+from trac.db.api import DatabaseManager
+from trac.test import EnvironmentStub, makeSuite, mkdtemp
+from trac.upgrades import db48
+
+VERSION = 48
+
+
+class UpgradeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub(path=mkdtemp())
+        self.dbm = DatabaseManager(self.env)
+        with self.env.db_transaction:
+            self.dbm.drop_tables(['request_stats', 'request_sql_stats'])
+            self.dbm.set_database_version(VERSION - 1)
+
+    def tearDown(self):
+        self.env.reset_db_and_disk()
+
+    def test_tables_created(self):
+        """The request_stats and request_sql_stats tables are created."""
+        db48.do_upgrade(self.env, VERSION, None)
+
+        self.assertEqual(['handler', 'requests', 'slow', 'total_time',
+                          'max_time', 'handler_time', 'filters_time',
+                          'render_time', 'sql_count', 'sql_time',
+                          'cache_hits', 'cache_misses'],
+                         self.dbm.get_column_names('request_stats'))
+        self.assertEqual(['id', 'statement', 'executions', 'total_time',
+                          'max_time'],
+                         self.dbm.get_column_names('request_sql_stats'))
+
+
+def test_suite():
+    return makeSuite(UpgradeTestCase)
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
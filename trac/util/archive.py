@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/.
+
+"""Writers for archives which are generated on the fly.
+
+The archives are written sequentially to a file-like object which
+doesn't need to be seekable, like the response of a request, so that
+no temporary files are needed.
+"""
+
+from abc import ABCMeta, abstractmethod
+import io
+import tarfile
+import zipfile
+
+from trac.util import create_zipinfo
+from trac.util.datefmt import to_datetime, to_timestamp, utc
+
+__all__ = ['ArchiveWriter', 'TarGzArchiveWriter', 'ZipArchiveWriter',
+           'archive_writers', 'open_stream']
+
+BUFFER_SIZE = 65536
+
+
+class _WriteStream(io.RawIOBase):
+
+    def __init__(self, write):
+        self._write = write
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._write(bytes(b))
+        return len(b)
+
+
+def open_stream(write, buffer_size=BUFFER_SIZE):
+    """Return a non-seekable binary file-like object buffering up to
+    `buffer_size` bytes, so that `write` is called with large chunks
+    rather than for each small write.
+
+    :param write: callable taking `bytes`, like `Request.write`.
+    """
+    return io.BufferedWriter(_WriteStream(write), buffer_size)
+
+
+class ArchiveWriter(object, metaclass=ABCMeta):
+    """Base class for the archive writers.
+
+    The entries are added one by one using `add_file` and `add_dir`,
+    and the archive is finished by `close`. The `fileobj` isn't
+    closed.
+
+    :since: 1.7.1
+    """
+
+    format = None
+    mimetype = None
+    extension = None
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @abstractmethod
+    def add_file(self, name, content, size=None, mtime=None,
+                 executable=False, symlink=False, comment=None,
+                 compress=True):
+        """Add a file entry.
+
+        :param content: either a `bytes` string, or a file-like object
+                        which is read by chunks, in which case `size`
+                        must be given.
+        :param symlink: if `True`, `content` is the target of the link.
+        :param compress: if `False`, the content is stored without
+                         compression, if the format allows it.
+        """
+        pass
+
+    @abstractmethod
+    def add_dir(self, name, mtime=None):
+        """Add a directory entry."""
+        pass
+
+    @abstractmethod
+    def close(self):
+        """Write the end of the archive."""
+        pass
+
+
+def _iter_chunks(content, size):
+    if isinstance(content, bytes):
+        if content:
+            yield content
+        return
+    while size > 0:
+        chunk = content.read(min(size, BUFFER_SIZE))
+        if not chunk:
+            break
+        yield chunk
+        size -= len(chunk)
+
+
+class ZipArchiveWriter(ArchiveWriter):
+    """Write a ZIP archive.
+
+    Each entry is written as a local header, followed by the data
+    compressed on the fly and a data descriptor holding the CRC and
+    sizes, as the output isn't seekable.
+    """
+
+    format = 'zip'
+    mimetype = 'application/zip'
+    extension = 'zip'
+
+    def __init__(self, fileobj):
+        super().__init__(fileobj)
+        self._zipfile = zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED)
+
+    def add_file(self, name, content, size=None, mtime=None,
+                 executable=False, symlink=False, comment=None,
+                 compress=True):
+        if size is None:
+            size = len(content)
+        zipinfo = create_zipinfo(name, mtime=mtime, executable=executable,
+                                 symlink=symlink, comment=comment)
+        if not compress:
+            zipinfo.compress_type = zipfile.ZIP_STORED
+        # used to decide whether Zip64 extensions are needed
+        zipinfo.file_size = size
+        with self._zipfile.open(zipinfo, 'w') as f:
+            for chunk in _iter_chunks(content, size):
+                f.write(chunk)
+
+    def add_dir(self, name, mtime=None):
+        self._zipfile.writestr(create_zipinfo(name, mtime=mtime, dir=True),
+                               b'')
+
+    def close(self):
+        self._zipfile.close()
+
+
+class TarGzArchiveWriter(ArchiveWriter):
+    """Write a gzip compressed tar archive."""
+
+    format = 'tar.gz'
+    mimetype = 'application/gzip'
+    extension = 'tar.gz'
+
+    def __init__(self, fileobj):
+        super().__init__(fileobj)
+        self._tarfile = tarfile.open(fileobj=fileobj, mode='w|gz',
+                                     bufsize=BUFFER_SIZE,
+                                     format=tarfile.PAX_FORMAT)
+
+    def add_file(self, name, content, size=None, mtime=None,
+                 executable=False, symlink=False, comment=None,
+                 compress=True):
+        if size is None:
+            size = len(content)
+        tarinfo = self._create_tarinfo(name, mtime)
+        tarinfo.mode = 0o755 if executable else 0o644
+        if symlink:
+            if not isinstance(content, bytes):
+                content = content.read(size)
+            tarinfo.type = tarfile.SYMTYPE
+            tarinfo.mode = 0o777
+            tarinfo.linkname = content.decode('utf-8')
+            self._tarfile.addfile(tarinfo)
+        else:
+            if isinstance(content, bytes):
+                content = io.BytesIO(content)
+            tarinfo.size = size
+            self._tarfile.addfile(tarinfo, content)
+
+    def add_dir(self, name, mtime=None):
+        tarinfo = self._create_tarinfo(name, mtime)
+        tarinfo.type = tarfile.DIRTYPE
+        tarinfo.mode = 0o755
+        self._tarfile.addfile(tarinfo)
+
+    def close(self):
+        self._tarfile.close()
+
+    def _create_tarinfo(self, name, mtime):
+        tarinfo = tarfile.TarInfo(name.rstrip('/'))
+        if mtime is not None:
+            tarinfo.mtime = to_timestamp(to_datetime(mtime, utc))
+        return tarinfo
+
+
+archive_writers = {cls.format: cls for cls in (ZipArchiveWriter,
+                                               TarGzArchiveWriter)}
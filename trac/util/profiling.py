@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+"""Lightweight per-request profiling.
+
+A `RequestProfile` is attached to the current thread while a request
+is being processed, and the instrumented code (database cursors,
+cache lookups, request dispatching) reports to it. When no profile is
+active, the instrumentation costs a thread-local lookup.
+
+:since: 1.7.1
+"""
+
+import contextlib
+import re
+import time
+
+from trac.util.concurrency import ThreadLocal
+
+__all__ = ['RequestProfile', 'get_profile', 'normalize_sql', 'phase',
+           'start_profile', 'stop_profile']
+
+_local = ThreadLocal(profile=None)
+
+_sql_normalize_re = re.compile(r"""
+    (?P<str>'(?:[^']|'')*') |
+    (?P<quoted>"(?:[^"]|"")*"|`(?:[^`]|``)*`) |
+    (?P<num>\b[0-9]+(?:\.[0-9]+)?\b) |
+    (?P<param>%s) |
+    (?P<space>\s+)
+    """, re.VERBOSE)
+_sql_in_list_re = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+
+def normalize_sql(sql):
+    """Return the text of an SQL statement with the literal values and
+    the parameter placeholders replaced by `?`, and the whitespace
+    collapsed, so that the statements differing only by their values
+    are grouped together.
+
+    >>> normalize_sql("SELECT * FROM t  WHERE id IN (%s,%s) AND x='a'")
+    'SELECT * FROM t WHERE id IN (?) AND x=?'
+    """
+    def repl(match):
+        kind = match.lastgroup
+        if kind == 'space':
+            return ' '
+        if kind == 'quoted':
+            return match.group(0)
+        return '?'
+    sql = _sql_normalize_re.sub(repl, sql).strip()
+    return _sql_in_list_re.sub('(?)', sql)
+
+
+class RequestProfile(object):
+    """Timings and counters collected while processing a request.
+
+    The durations are in seconds. The `sql`, `cache`,
+    `statement_cache` and `gc` figures cover the whole request and
+    therefore overlap the durations of the phases. The `queue_time` is
+    the time spent by the request waiting for a thread of the server
+    before its processing started, if known.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.duration = None
+        self.handler = None
+        self.phases = {}
+        self._running = {}
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.statements = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.statement_cache_hits = 0
+        self.statement_cache_misses = 0
+        self.gc_count = 0
+        self.gc_time = 0.0
+        self.queue_time = None
+
+    def __repr__(self):
+        return '<%s %s %r>' % (self.__class__.__name__, self.handler,
+                               self.elapsed)
+
+    @property
+    def elapsed(self):
+        """The duration of the request, or the time elapsed since its
+        start if it is still being processed.
+        """
+        if self.duration is not None:
+            return self.duration
+        return time.perf_counter() - self.start
+
+    def finish(self):
+        """Mark the end of the request."""
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.start
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Context manager adding the time spent in its block to the
+        phase `name`.
+        """
+        if name in self._running:
+            # Nested block, accounted for by the enclosing one
+            yield
+            return
+        start = self._running[name] = time.perf_counter()
+        try:
+            yield
+        finally:
+            del self._running[name]
+            self.phases[name] = self.phases.get(name, 0.0) + \
+                                time.perf_counter() - start
+
+    def add_sql(self, sql, duration, count=1):
+        """Account for the execution of an SQL statement."""
+        self.sql_count += count
+        self.sql_time += duration
+        stats = self.statements.get(sql)
+        if stats is None:
+            self.statements[sql] = [count, duration, duration]
+        else:
+            stats[0] += count
+            stats[1] += duration
+            if duration > stats[2]:
+                stats[2] = duration
+
+    def add_cache(self, hit):
+        """Account for a cache lookup."""
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+    def add_statement_cache(self, hit):
+        """Account for a lookup in a cache of translated SQL
+        statements.
+        """
+        if hit:
+            self.statement_cache_hits += 1
+        else:
+            self.statement_cache_misses += 1
+
+    def add_gc(self, duration):
+        """Account for a garbage collection."""
+        self.gc_count += 1
+        self.gc_time += duration
+
+    def get_statements(self, limit=None):
+        """Return `(statement, count, total, max)` tuples for the SQL
+        statements, by decreasing total time, with the normalized
+        statement text.
+        """
+        stats = {}
+        for sql, (count, total, max_) in self.statements.items():
+            sql = normalize_sql(sql)
+            s = stats.get(sql)
+            if s is None:
+                stats[sql] = [count, total, max_]
+            else:
+                s[0] += count
+                s[1] += total
+                s[2] = max(s[2], max_)
+        items = [(sql, count, total, max_)
+                 for sql, (count, total, max_) in stats.items()]
+        items.sort(key=lambda item: item[2], reverse=True)
+        return items[:limit] if limit is not None else items
+
+    def get_server_timing(self):
+        """Return the value of a `Server-Timing` HTTP header for the
+        profile. The phases which are still running are included with
+        their duration so far.
+        """
+        phases = dict(self.phases)
+        now = time.perf_counter()
+        for name, start in self._running.items():
+            phases[name] = phases.get(name, 0.0) + now - start
+        metrics = ['%s;dur=%.1f' % (name, phases[name] * 1000)
+                   for name in sorted(phases)]
+        metrics.append('sql;dur=%.1f;desc="%d queries"'
+                       % (self.sql_time * 1000, self.sql_count))
+        metrics.append('cache;desc="%d hits, %d misses"'
+                       % (self.cache_hits, self.cache_misses))
+        metrics.append('sqlcache;desc="%d hits, %d misses"'
+                       % (self.statement_cache_hits,
+                          self.statement_cache_misses))
+        if self.gc_count:
+            metrics.append('gc;dur=%.1f;desc="%d collections"'
+                           % (self.gc_time * 1000, self.gc_count))
+        if self.queue_time is not None:
+            metrics.append('queue;dur=%.1f' % (self.queue_time * 1000))
+        metrics.append('total;dur=%.1f' % (self.elapsed * 1000))
+        return ', '.join(metrics)
+
+
+def get_profile():
+    """Return the `RequestProfile` active in the current thread, or
+    `None`.
+    """
+    return _local.profile
+
+
+def start_profile():
+    """Create a `RequestProfile` and make it active in the current
+    thread.
+    """
+    profile = _local.profile = RequestProfile()
+    return profile
+
+
+def stop_profile():
+    """Deactivate and finish the `RequestProfile` of the current
+    thread, and return it.
+    """
+    profile = _local.profile
+    _local.profile = None
+    if profile is not None:
+        profile.finish()
+    return profile
+
+
+def phase(name):
+    """Context manager adding the time spent in its block to the phase
+    `name` of the active profile, if any.
+    """
+    profile = _local.profile
+    if profile is None:
+        return contextlib.nullcontext()
+    return profile.phase(name)
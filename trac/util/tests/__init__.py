@@ -24,8 +24,8 @@ import unittest
 import trac
 from trac import util
 from trac.test import makeSuite, mkdtemp, rmtree
-from trac.util.tests import (concurrency, datefmt, presentation, text,
-                             translation, html)
+from trac.util.tests import (archive, concurrency, datefmt, presentation,
+                             profiling, text, translation, html)
 
 
 class AtomicFileTestCase(unittest.TestCase):
@@ -444,9 +444,11 @@ def test_suite():
     suite.addTest(makeSuite(LazyTestCase))
     suite.addTest(makeSuite(FileTestCase))
     suite.addTest(makeSuite(UtilitiesTestCase))
+    suite.addTest(archive.test_suite())
     suite.addTest(concurrency.test_suite())
     suite.addTest(datefmt.test_suite())
     suite.addTest(presentation.test_suite())
+    suite.addTest(profiling.test_suite())
     suite.addTest(doctest.DocTestSuite(util))
     suite.addTest(text.test_suite())
     suite.addTest(translation.test_suite())
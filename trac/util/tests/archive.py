@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/.
+
+import io
+import tarfile
+import unittest
+import zipfile
+from datetime import datetime
+
+from trac.test import makeSuite
+from trac.util.archive import TarGzArchiveWriter, ZipArchiveWriter, \
+                              open_stream
+from trac.util.datefmt import to_timestamp, utc
+
+
+class OpenStreamTestCase(unittest.TestCase):
+
+    def test_buffered(self):
+        chunks = []
+        with open_stream(chunks.append, 16) as f:
+            self.assertFalse(f.seekable())
+            for i in range(10):
+                f.write(b'%d' % i)
+            self.assertEqual([], chunks)
+            f.write(b'x' * 10)
+            f.write(b'y' * 20)
+
+        self.assertEqual(b'0123456789' + b'x' * 10 + b'y' * 20,
+                         b''.join(chunks))
+        self.assertLess(len(chunks), 12)
+
+
+class ArchiveWriterTestCaseBase(unittest.TestCase):
+
+    writer_class = None
+    mtime = datetime(2017, 3, 31, 12, 34, 56, tzinfo=utc)
+
+    def _write(self, entries):
+        out = io.BytesIO()
+        with open_stream(out.write, 32) as f:
+            with self.writer_class(f) as writer:
+                for args, kwargs in entries:
+                    if len(args) > 1:
+                        writer.add_file(*args, **kwargs)
+                    else:
+                        writer.add_dir(*args, **kwargs)
+        out.seek(0)
+        return out
+
+
+class ZipArchiveWriterTestCase(ArchiveWriterTestCaseBase):
+
+    writer_class = ZipArchiveWriter
+
+    def _read(self, entries):
+        return zipfile.ZipFile(self._write(entries))
+
+    def test_entries(self):
+        data = b'line\r\n' * 1000
+        z = self._read([
+            (('dir',), {'mtime': self.mtime}),
+            (('dir/file.txt', data), {'mtime': self.mtime}),
+            (('dir/script.sh', io.BytesIO(b'#!/bin/sh\n'), 10),
+             {'executable': True, 'comment': 'Blah'}),
+            (('dir/image.png', b'\x89PNG'), {'compress': False}),
+        ])
+
+        self.assertIsNone(z.testzip())
+        self.assertEqual(['dir/', 'dir/file.txt', 'dir/script.sh',
+                          'dir/image.png'], z.namelist())
+        zinfo = z.getinfo('dir/')
+        self.assertEqual((0o40755 << 16) | 0x10, zinfo.external_attr)
+        self.assertEqual((2017, 3, 31, 12, 34, 56), zinfo.date_time)
+        zinfo = z.getinfo('dir/file.txt')
+        self.assertEqual(data, z.read('dir/file.txt'))
+        self.assertEqual(zipfile.ZIP_DEFLATED, zinfo.compress_type)
+        self.assertLess(zinfo.compress_size, len(data))
+        self.assertEqual(0x08, zinfo.flag_bits & 0x08)  # data descriptor
+        zinfo = z.getinfo('dir/script.sh')
+        self.assertEqual(b'#!/bin/sh\n', z.read('dir/script.sh'))
+        self.assertEqual(0o755 << 16, zinfo.external_attr)
+        self.assertEqual(b'Blah', zinfo.comment)
+        zinfo = z.getinfo('dir/image.png')
+        self.assertEqual(b'\x89PNG', z.read('dir/image.png'))
+        self.assertEqual(zipfile.ZIP_STORED, zinfo.compress_type)
+
+    def test_empty(self):
+        z = self._read([])
+        self.assertEqual([], z.namelist())
+
+
+class TarGzArchiveWriterTestCase(ArchiveWriterTestCaseBase):
+
+    writer_class = TarGzArchiveWriter
+
+    def _read(self, entries):
+        return tarfile.open(fileobj=self._write(entries), mode='r:gz')
+
+    def test_entries(self):
+        data = b'line\r\n' * 1000
+        t = self._read([
+            (('dir/',), {'mtime': self.mtime}),
+            (('dir/file.txt', data), {'mtime': self.mtime}),
+            (('dir/script.sh', io.BytesIO(b'#!/bin/sh\n'), 10),
+             {'executable': True}),
+            (('dir/link', b'file.txt'), {'symlink': True}),
+            (('dir/föö.txt', b''), {}),
+        ])
+
+        self.assertEqual(['dir', 'dir/file.txt', 'dir/script.sh', 'dir/link',
+                          'dir/föö.txt'], t.getnames())
+        tarinfo = t.getmember('dir')
+        self.assertTrue(tarinfo.isdir())
+        self.assertEqual(0o755, tarinfo.mode)
+        self.assertEqual(to_timestamp(self.mtime), tarinfo.mtime)
+        tarinfo = t.getmember('dir/file.txt')
+        self.assertEqual(0o644, tarinfo.mode)
+        self.assertEqual(data, t.extractfile(tarinfo).read())
+        tarinfo = t.getmember('dir/script.sh')
+        self.assertEqual(0o755, tarinfo.mode)
+        self.assertEqual(b'#!/bin/sh\n', t.extractfile(tarinfo).read())
+        tarinfo = t.getmember('dir/link')
+        self.assertTrue(tarinfo.issym())
+        self.assertEqual('file.txt', tarinfo.linkname)
+        tarinfo = t.getmember('dir/föö.txt')
+        self.assertEqual(0, tarinfo.size)
+
+
+def test_suite():
+    suite = unittest.TestSuite()
+    suite.addTest(makeSuite(OpenStreamTestCase))
+    suite.addTest(makeSuite(ZipArchiveWriterTestCase))
+    suite.addTest(makeSuite(TarGzArchiveWriterTestCase))
+    return suite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
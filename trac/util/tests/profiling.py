@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+import doctest
+import unittest
+
+from trac.test import EnvironmentStub, makeSuite
+from trac.util import profiling
+from trac.util.profiling import RequestProfile, get_profile, normalize_sql, \
+                                phase, start_profile, stop_profile
+
+
+class NormalizeSqlTestCase(unittest.TestCase):
+
+    def test_whitespace(self):
+        self.assertEqual('SELECT id FROM ticket WHERE id=?',
+                         normalize_sql("""
+                            SELECT id
+                            FROM ticket  WHERE id=%s
+                            """))
+
+    def test_literals(self):
+        self.assertEqual("SELECT * FROM t WHERE a=? AND b=? AND c=?",
+                         normalize_sql("SELECT * FROM t WHERE a='it''s' "
+                                       "AND b=42 AND c=1.5"))
+
+    def test_quoted_identifiers(self):
+        self.assertEqual('SELECT "t1"."a" FROM `t2`',
+                         normalize_sql('SELECT "t1"."a" FROM `t2`'))
+
+    def test_identifiers_with_digits(self):
+        self.assertEqual("SELECT c1 FROM t2 WHERE x=?",
+                         normalize_sql("SELECT c1 FROM t2 WHERE x=2"))
+
+    def test_in_list(self):
+        self.assertEqual("SELECT * FROM t WHERE id IN (?)",
+                         normalize_sql("SELECT * FROM t WHERE id IN "
+                                       "(%s,%s, %s)"))
+        self.assertEqual("SELECT * FROM t WHERE id IN (?)",
+                         normalize_sql("SELECT * FROM t WHERE id IN (1,2)"))
+
+
+class RequestProfileTestCase(unittest.TestCase):
+
+    def tearDown(self):
+        stop_profile()
+
+    def test_start_stop(self):
+        self.assertIsNone(get_profile())
+        profile = start_profile()
+        self.assertIs(profile, get_profile())
+        self.assertIsNone(profile.duration)
+        self.assertIs(profile, stop_profile())
+        self.assertIsNone(get_profile())
+        self.assertIsNotNone(profile.duration)
+        self.assertEqual(profile.duration, profile.elapsed)
+
+    def test_phase(self):
+        with phase('render'):
+            pass
+        profile = start_profile()
+        with phase('handler'):
+            pass
+        with phase('filters'):
+            pass
+        with phase('filters'):
+            pass
+        self.assertEqual(['filters', 'handler'], sorted(profile.phases))
+
+    def test_nested_phase(self):
+        profile = RequestProfile()
+        with profile.phase('handler'):
+            with profile.phase('handler'):
+                pass
+            self.assertEqual({}, profile.phases)
+            self.assertIn('handler;dur=', profile.get_server_timing())
+        self.assertEqual(['handler'], list(profile.phases))
+
+    def test_statements(self):
+        profile = RequestProfile()
+        profile.add_sql("SELECT * FROM t WHERE id=%s", 0.5)
+        profile.add_sql("SELECT * FROM t WHERE id=%s", 1.5)
+        profile.add_sql("SELECT * FROM t WHERE id=1", 0.25)
+        profile.add_sql("INSERT INTO t VALUES (%s)", 3.0, 10)
+
+        self.assertEqual(13, profile.sql_count)
+        self.assertEqual(5.25, profile.sql_time)
+        self.assertEqual([("INSERT INTO t VALUES (?)", 10, 3.0, 3.0),
+                          ("SELECT * FROM t WHERE id=?", 3, 2.25, 1.5)],
+                         profile.get_statements())
+        self.assertEqual([("INSERT INTO t VALUES (?)", 10, 3.0, 3.0)],
+                         profile.get_statements(1))
+
+    def test_server_timing(self):
+        profile = RequestProfile()
+        profile.phases.update(handler=0.0125, filters=0.002)
+        profile.add_sql("SELECT 1", 0.003)
+        profile.add_cache(True)
+        profile.add_cache(True)
+        profile.add_cache(False)
+        profile.add_statement_cache(True)
+        profile.duration = 0.02
+
+        self.assertEqual('filters;dur=2.0, handler;dur=12.5, '
+                         'sql;dur=3.0;desc="1 queries", '
+                         'cache;desc="2 hits, 1 misses", '
+                         'sqlcache;desc="1 hits, 0 misses", total;dur=20.0',
+                         profile.get_server_timing())
+
+    def test_server_timing_queue(self):
+        profile = RequestProfile()
+        profile.queue_time = 0.0042
+        profile.duration = 0.01
+
+        self.assertTrue(profile.get_server_timing()
+                        .endswith(', queue;dur=4.2, total;dur=10.0'))
+
+
+class InstrumentationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub()
+
+    def tearDown(self):
+        stop_profile()
+        self.env.reset_db()
+
+    def test_sql_not_recorded_without_profile(self):
+        self.env.db_query("SELECT value FROM system WHERE name=%s",
+                          ('database_version',))
+        profile = start_profile()
+        self.assertEqual(0, profile.sql_count)
+
+    def test_sql_recorded(self):
+        profile = start_profile()
+        for name in ('database_version', 'youngest_rev'):
+            self.env.db_query("SELECT value FROM system WHERE name=%s",
+                              (name,))
+        with self.env.db_transaction as db:
+            db.executemany("INSERT INTO system VALUES (%s,%s)",
+                           [('profile1', '1'), ('profile2', '2')])
+        stop_profile()
+
+        statements = {statement: count for statement, count, total, max_
+                      in profile.get_statements()}
+        self.assertEqual(2, statements['SELECT value FROM system '
+                                       'WHERE name=?'])
+        self.assertEqual(2, statements['INSERT INTO system VALUES (?)'])
+        self.assertEqual(4, profile.sql_count)
+
+    def test_cache_recorded(self):
+        from trac.wiki.api import WikiSystem
+        profile = start_profile()
+        WikiSystem(self.env).pages
+        WikiSystem(self.env).pages
+        self.assertEqual(1, profile.cache_misses)
+        self.assertEqual(1, profile.cache_hits)
+
+
+def test_suite():
+    suite = unittest.TestSuite()
+    suite.addTest(makeSuite(NormalizeSqlTestCase))
+    suite.addTest(makeSuite(RequestProfileTestCase))
+    suite.addTest(makeSuite(InstrumentationTestCase))
+    suite.addTest(doctest.DocTestSuite(profiling))
+    return suite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
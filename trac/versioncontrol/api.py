@@ -16,10 +16,12 @@
 
 import os.path
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 
 from trac.admin import AdminCommandError, IAdminCommandProvider, get_dir_list
-from trac.config import ConfigSection, Option
+from trac.config import BoolOption, ConfigSection, IntOption, Option
 from trac.core import *
 from trac.resource import IResourceManager, Resource, ResourceNotFound
 from trac.util import as_bool, native_path
@@ -271,6 +273,8 @@ class DbRepositoryProvider(Component):
             db("DELETE FROM repository WHERE id=%s", (id,))
             db("DELETE FROM revision WHERE repos=%s", (id,))
             db("DELETE FROM node_change WHERE repos=%s", (id,))
+            db("DELETE FROM node_last_change WHERE repos=%s", (id,))
+            db("DELETE FROM node_diff_stats WHERE repos=%s", (id,))
         rm.reload_repositories()
 
     def modify_repository(self, reponame, changes):
@@ -353,53 +357,142 @@ class RepositoryManager(Component):
         or using the "Repositories" admin panel.
         """)
 
+    sync_workers = IntOption('versioncontrol', 'sync_workers', 1,
+        """Number of threads synchronizing concurrently the repositories
+        for which `sync_per_request` is set. With the default of `1`, the
+        repositories are synchronized one after the other in the thread
+        processing the request. (''since 1.7.1'')
+        """)
+
+    background_sync = BoolOption('versioncontrol', 'background_sync',
+                                 'false',
+        """Whether the repositories for which `sync_per_request` is set
+        should be synchronized by background threads (see `sync_workers`),
+        instead of before processing the request. The request doesn't wait
+        for the synchronization to complete, so the latest changesets may
+        not be shown yet. (''since 1.7.1'')
+        """)
+
+    sync_batch_size = IntOption('versioncontrol', 'sync_batch_size', 100,
+        """Maximum number of changesets retrieved and added to the cache
+        in a single transaction when synchronizing a repository.
+        (''since 1.7.1'')
+        """)
+
     def __init__(self):
         self._cache = {}
         self._lock = threading.Lock()
         self._connectors = None
         self._all_repositories = None
+        self._sync_executor = None
+        self._pending_syncs = set()
 
     # IRequestFilter methods
 
     def pre_process_request(self, req, handler):
         if handler is not Chrome(self.env):
-            for repo_info in self.get_all_repositories().values():
-                if not as_bool(repo_info.get('sync_per_request')):
-                    continue
-                start = time_now()
-                repo_name = repo_info['name'] or '(default)'
-                try:
-                    repo = self.get_repository(repo_info['name'])
-                    repo.sync()
-                except InvalidConnector:
-                    continue
-                except TracError as e:
-                    add_warning(req,
-                        _("Can't synchronize with repository \"%(name)s\" "
-                          "(%(error)s). Look in the Trac log for more "
-                          "information.", name=repo_name,
-                          error=to_unicode(e)))
-                except Exception as e:
-                    add_warning(req,
-                        _("Failed to sync with repository \"%(name)s\": "
-                          "%(error)s; repository information may be out of "
-                          "date. Look in the Trac log for more information "
-                          "including mitigation strategies.",
-                          name=repo_name, error=to_unicode(e)))
-                    self.log.error(
-                        "Failed to sync with repository \"%s\"; You may be "
-                        "able to reduce the impact of this issue by "
-                        "configuring the sync_per_request option; see "
-                        "https://trac.edgewall.org/wiki/TracRepositoryAdmin"
-                        "#ExplicitSync for more detail: %s", repo_name,
-                        exception_to_unicode(e, traceback=True))
-                self.log.info("Synchronized '%s' repository in %0.2f seconds",
-                              repo_name, time_now() - start)
+            reponames = [repo_info['name'] for repo_info
+                         in self.get_all_repositories().values()
+                         if as_bool(repo_info.get('sync_per_request'))]
+            if self.background_sync:
+                for reponame in reponames:
+                    self._schedule_sync(reponame)
+            elif self.sync_workers > 1 and len(reponames) > 1:
+                executor = self._get_sync_executor()
+                futures = [(reponame, executor.submit(self._sync_repository,
+                                                      reponame, True))
+                           for reponame in reponames]
+                for reponame, future in futures:
+                    self._check_sync(req, reponame, future.result)
+            else:
+                for reponame in reponames:
+                    self._check_sync(req, reponame,
+                                     partial(self._sync_repository, reponame))
         return handler
 
     def post_process_request(self, req, template, data, metadata):
         return template, data, metadata
 
+    def _sync_repository(self, reponame, worker=False):
+        """Synchronize the repository, releasing the `Repository`
+        instances bound to the thread afterwards if `worker` is `True`,
+        as the threads of the executor don't serve requests.
+        """
+        try:
+            start = time_now()
+            repo = self.get_repository(reponame)
+            repo.sync()
+            self.log.info("Synchronized '%s' repository in %0.2f seconds",
+                          reponame or '(default)', time_now() - start)
+        finally:
+            if worker:
+                self.shutdown(get_thread_id())
+
+    def _check_sync(self, req, reponame, sync):
+        """Call `sync` and report its failure, as a warning for `req`
+        or only in the log if `req` is `None`.
+        """
+        repo_name = reponame or '(default)'
+        try:
+            sync()
+        except InvalidConnector:
+            pass
+        except TracError as e:
+            if req:
+                add_warning(req,
+                    _("Can't synchronize with repository \"%(name)s\" "
+                      "(%(error)s). Look in the Trac log for more "
+                      "information.", name=repo_name, error=to_unicode(e)))
+            else:
+                self.log.warning("Can't synchronize with repository \"%s\""
+                                 ": %s", repo_name, exception_to_unicode(e))
+        except Exception as e:
+            if req:
+                add_warning(req,
+                    _("Failed to sync with repository \"%(name)s\": "
+                      "%(error)s; repository information may be out of "
+                      "date. Look in the Trac log for more information "
+                      "including mitigation strategies.",
+                      name=repo_name, error=to_unicode(e)))
+            self.log.error(
+                "Failed to sync with repository \"%s\"; You may be "
+                "able to reduce the impact of this issue by "
+                "configuring the sync_per_request option; see "
+                "https://trac.edgewall.org/wiki/TracRepositoryAdmin"
+                "#ExplicitSync for more detail: %s", repo_name,
+                exception_to_unicode(e, traceback=True))
+
+    def _get_sync_executor(self):
+        with self._lock:
+            if self._sync_executor is None:
+                self._sync_executor = ThreadPoolExecutor(
+                    max(1, self.sync_workers),
+                    thread_name_prefix='RepositorySync')
+            return self._sync_executor
+
+    def _schedule_sync(self, reponame):
+        """Synchronize the repository in a background thread, unless
+        its synchronization is already pending.
+        """
+        with self._lock:
+            if reponame in self._pending_syncs:
+                return
+            self._pending_syncs.add(reponame)
+
+        def sync():
+            try:
+                self._check_sync(None, reponame,
+                                 partial(self._sync_repository, reponame,
+                                         True))
+            finally:
+                with self._lock:
+                    self._pending_syncs.discard(reponame)
+        try:
+            self._get_sync_executor().submit(sync)
+        except RuntimeError:  # executor shut down
+            with self._lock:
+                self._pending_syncs.discard(reponame)
+
     # IResourceManager methods
 
     def get_resource_realms(self):
@@ -751,13 +844,21 @@ class RepositoryManager(Component):
         return errors
 
     def shutdown(self, tid=None):
-        """Free `Repository` instances bound to a given thread identifier"""
+        """Free `Repository` instances bound to a given thread identifier,
+        or stop the synchronization threads if `tid` is `None`.
+        """
         if tid:
             assert tid == get_thread_id()
             with self._lock:
                 repositories = self._cache.pop(tid, {})
                 for reponame, repos in repositories.items():
                     repos.close()
+        else:
+            with self._lock:
+                executor = self._sync_executor
+                self._sync_executor = None
+            if executor is not None:
+                executor.shutdown(wait=True)
 
     def read_file_by_path(self, path):
         """Read the file specified by `path`
@@ -945,6 +1046,25 @@ class Repository(object, metaclass=ABCMeta):
         the ''very same'' changeset (e.g. the repositories are clones).
         """
 
+    def get_changesets_batch(self, revs):
+        """Retrieve the changesets corresponding to the revisions `revs`.
+
+        Return a `dict` mapping each revision of `revs` to its
+        `Changeset`. The revisions which don't exist are left out.
+
+        The default implementation calls `get_changeset` for each
+        revision, the backends can retrieve the changesets in bulk.
+
+        :since: 1.7.1
+        """
+        changesets = {}
+        for rev in set(revs):
+            try:
+                changesets[rev] = self.get_changeset(rev)
+            except NoSuchChangeset:
+                pass
+        return changesets
+
     def get_changesets(self, start, stop):
         """Generate Changeset belonging to the given time period (start, stop).
         """
@@ -18,9 +18,11 @@ import os
 
 from trac.cache import cached
 from trac.core import TracError
+from trac.db.util import chunked_params
 from trac.util.datefmt import from_utimestamp, to_utimestamp
 from trac.util.translation import _
 from trac.versioncontrol import Changeset, Node, Repository, NoSuchChangeset
+from trac.versioncontrol.api import RepositoryManager
 
 
 _kindmap = {'D': Node.DIRECTORY, 'F': Node.FILE}
@@ -71,6 +73,27 @@ class CachedRepository(Repository):
     def get_changeset(self, rev):
         return CachedChangeset(self, self.normalize_rev(rev), self.env)
 
+    def get_changesets_batch(self, revs):
+        drevs = {}
+        for rev in set(revs):
+            try:
+                nrev = self.normalize_rev(rev)
+            except NoSuchChangeset:
+                continue
+            drevs.setdefault(self.db_rev(nrev), []).append((rev, nrev))
+
+        changesets = {}
+        with self.env.db_query as db:
+            for subset, holders in chunked_params(list(drevs), reserved=1):
+                for drev, time, author, message in db("""
+                        SELECT rev, time, author, message FROM revision
+                        WHERE repos=%%s AND rev IN (%s)
+                        """ % holders, [self.id] + subset):
+                    for rev, nrev in drevs.get(drev, ()):
+                        changesets[rev] = self._create_changeset(
+                            nrev, (time, author, message))
+        return changesets
+
     def get_changeset_uid(self, rev):
         return self.repos.get_changeset_uid(rev)
 
@@ -176,16 +199,26 @@ class CachedRepository(Repository):
 
             # prepare for resyncing (there might still be a race
             # condition at this point)
+            batch_size = max(1, RepositoryManager(self.env).sync_batch_size)
             while next_youngest is not None:
-                srev = self.db_rev(next_youngest)
+                # retrieve the changesets of the next batch of revisions
+                revs = [next_youngest]
+                while len(revs) < batch_size:
+                    rev = self.repos.next_rev(revs[-1])
+                    if rev is None:
+                        break
+                    revs.append(rev)
+                changesets = self.repos.get_changesets_batch(revs)
 
                 with self.env.db_transaction as db:
-                    self.log.info("Trying to sync revision [%s] in '%s'",
-                                  next_youngest, _norm_reponame(self))
-                    cset = self.repos.get_changeset(next_youngest)
+                    self.log.info("Trying to sync revisions [%s:%s] in '%s'",
+                                  revs[0], revs[-1], _norm_reponame(self))
                     try:
-                        # steps 1. and 2.
-                        self.insert_changeset(next_youngest, cset)
+                        for next_youngest in revs:
+                            cset = changesets.get(next_youngest) or \
+                                   self.repos.get_changeset(next_youngest)
+                            # steps 1. and 2.
+                            self.insert_changeset(next_youngest, cset)
                     except Exception as e: # *another* 1.1. resync attempt won
                         if isinstance(e, self.env.db_exc.IntegrityError):
                             self.log.warning("Revision %s in '%s' already "
@@ -218,7 +251,8 @@ class CachedRepository(Repository):
 
                 # 5. provide some feedback
                 if feedback:
-                    feedback(youngest)
+                    for rev in revs:
+                        feedback(rev)
 
     def remove_cache(self):
         """Remove the repository cache."""
@@ -228,6 +262,10 @@ class CachedRepository(Repository):
                (self.id,))
             db("DELETE FROM node_change WHERE repos=%s",
                (self.id,))
+            db("DELETE FROM node_last_change WHERE repos=%s",
+               (self.id,))
+            db("DELETE FROM node_diff_stats WHERE repos=%s",
+               (self.id,))
             db.executemany("DELETE FROM repository WHERE id=%s AND name=%s",
                            [(self.id, k) for k in CACHE_METADATA_KEYS])
             db.executemany("""
@@ -294,18 +332,20 @@ class CachedRepository(Repository):
                       cset.author, cset.message))
             # 2. now *only* one process was able to get there (i.e. there
             # *shouldn't* be any race condition here)
+            changes = []
             for path, kind, action, bpath, brev in cset.get_changes():
                 self.log.debug("Caching node change in [%s] in '%s': %r",
                                rev, _norm_reponame(self.repos),
                                (path, kind, action, bpath, brev))
-                kind = _inverted_kindmap[kind]
-                action = _inverted_actionmap[action]
-                db("""
+                changes.append((self.id, srev, path, _inverted_kindmap[kind],
+                                _inverted_actionmap[action], bpath, brev))
+            if changes:
+                db.executemany("""
                     INSERT INTO node_change
                         (repos,rev,path,node_type,change_type,base_path,
                          base_rev)
                     VALUES (%s,%s,%s,%s,%s,%s,%s)
-                    """, (self.id, srev, path, kind, action, bpath, brev))
+                    """, changes)
 
     def get_node(self, path, rev=None):
         return self.repos.get_node(path, self.normalize_rev(rev))
@@ -344,18 +384,11 @@ class CachedRepository(Repository):
         path_infos = {node.path: (node, first) for node, first in node_infos}
         path_revs = {node.path: [] for node, first in node_infos}
 
-        # Prevent "too many SQL variables" since max number of parameters is
-        # 999 on SQLite. No limitation on PostgreSQL and MySQL.
-        idx = 0
-        delta = (999 - 3) // 5
         with self.env.db_query as db:
             prefix_match = db.prefix_match()
-            while idx < len(node_infos):
-                subset = node_infos[idx:idx + delta]
-                idx += delta
+            for subset, holders in chunked_params(node_infos, reserved=3,
+                                                  per_value=5):
                 count = len(subset)
-
-                holders = ','.join(('%s',) * count)
                 query = """\
                     SELECT DISTINCT
                       rev, (CASE WHEN path IN (%s) THEN path %s END) AS path
@@ -488,24 +521,31 @@ class CachedRepository(Repository):
                                       new_path, self.normalize_rev(new_rev),
                                       ignore_ancestry)
 
+    def _create_changeset(self, rev, row):
+        """Create the changeset for the normalized `rev` from the
+        `(time, author, message)` row of the `revision` table.
+        """
+        return CachedChangeset(self, rev, self.env, row)
+
 
 class CachedChangeset(Changeset):
 
-    def __init__(self, repos, rev, env):
+    def __init__(self, repos, rev, env, row=None):
         self.env = env
-        drev = repos.db_rev(rev)
-        for _date, author, message in self.env.db_query("""
-                SELECT time, author, message FROM revision
-                WHERE repos=%s AND rev=%s
-                """, (repos.id, drev)):
-            date = from_utimestamp(_date)
-            Changeset.__init__(self, repos, repos.rev_db(rev), message, author,
-                               date)
-            break
-        else:
-            repos.log.debug("Missing revision record (%r, %r) in '%s'",
-                            repos.id, drev, _norm_reponame(repos))
-            raise NoSuchChangeset(rev)
+        if row is None:
+            drev = repos.db_rev(rev)
+            for row in self.env.db_query("""
+                    SELECT time, author, message FROM revision
+                    WHERE repos=%s AND rev=%s
+                    """, (repos.id, drev)):
+                break
+            else:
+                repos.log.debug("Missing revision record (%r, %r) in '%s'",
+                                repos.id, drev, _norm_reponame(repos))
+                raise NoSuchChangeset(rev)
+        _date, author, message = row
+        Changeset.__init__(self, repos, repos.rev_db(rev), message, author,
+                           from_utimestamp(_date))
 
     def get_changes(self):
         for path, kind, change, base_path, base_rev in sorted(
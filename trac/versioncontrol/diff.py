@@ -16,12 +16,14 @@
 
 import difflib
 import re
+from bisect import bisect_left
+from collections.abc import Sequence
 
 from trac.util.html import Markup, escape
 from trac.util.text import expandtabs
 
-__all__ = ['diff_blocks', 'get_change_extent', 'get_diff_options',
-           'unified_diff']
+__all__ = ['LineMatcher', 'diff_blocks', 'get_change_extent',
+           'get_diff_options', 'unified_diff']
 
 _whitespace_split = re.compile(r'\s+', re.UNICODE).split
 
@@ -50,9 +52,203 @@ def get_change_extent(str1, str2):
     return start, end + 1
 
 
+class LineMatcher(object):
+    """Compute the differences between two sequences of lines, with
+    the `get_matching_blocks`, `get_opcodes` and `get_grouped_opcodes`
+    methods of `difflib.SequenceMatcher`.
+
+    Unlike `difflib.SequenceMatcher`, which is quadratic in the worst
+    case, the matching uses the O(ND) algorithm of Myers, where D is
+    the number of differences, after stripping the common prefix and
+    suffix. The total of the differences computed that way is bounded
+    by `max_cost`: beyond it, the remaining regions are split on the
+    lines which appear once on both sides, like in the "patience"
+    diff, and the lines in between are reported as replaced.
+
+    :since: 1.7.1
+    """
+
+    max_cost = 1000
+
+    def __init__(self, a, b, max_cost=None):
+        self.a = a
+        self.b = b
+        if max_cost is not None:
+            self.max_cost = max_cost
+        self.matching_blocks = self.opcodes = None
+
+    def get_matching_blocks(self):
+        """Return the list of `(i, j, n)` triples describing the
+        matching lines, `a[i:i+n] == b[j:j+n]`, with a last dummy
+        triple `(len(a), len(b), 0)`.
+        """
+        if self.matching_blocks is not None:
+            return self.matching_blocks
+        ids = {}
+        a = [ids.setdefault(line, len(ids)) for line in self.a]
+        b = [ids.setdefault(line, len(ids)) for line in self.b]
+        self._budget = self.max_cost
+        blocks = []
+        self._match(a, 0, len(a), b, 0, len(b), blocks)
+        matching_blocks = []
+        i1 = j1 = n1 = 0
+        for i2, j2, n2 in blocks:
+            if i1 + n1 == i2 and j1 + n1 == j2:
+                n1 += n2
+            else:
+                if n1:
+                    matching_blocks.append((i1, j1, n1))
+                i1, j1, n1 = i2, j2, n2
+        if n1:
+            matching_blocks.append((i1, j1, n1))
+        matching_blocks.append((len(a), len(b), 0))
+        self.matching_blocks = matching_blocks
+        return matching_blocks
+
+    def get_opcodes(self):
+        """Return the list of `(tag, i1, i2, j1, j2)` tuples describing
+        how to turn `a` into `b`, see `difflib.SequenceMatcher`.
+        """
+        if self.opcodes is not None:
+            return self.opcodes
+        i = j = 0
+        opcodes = []
+        for ai, bj, size in self.get_matching_blocks():
+            if i < ai and j < bj:
+                opcodes.append(('replace', i, ai, j, bj))
+            elif i < ai:
+                opcodes.append(('delete', i, ai, j, bj))
+            elif j < bj:
+                opcodes.append(('insert', i, ai, j, bj))
+            i, j = ai + size, bj + size
+            if size:
+                opcodes.append(('equal', ai, i, bj, j))
+        self.opcodes = opcodes
+        return opcodes
+
+    # Only relies on `get_opcodes`
+    get_grouped_opcodes = difflib.SequenceMatcher.get_grouped_opcodes
+
+    def _match(self, a, alo, ahi, b, blo, bhi, blocks):
+        n = 0
+        while alo + n < ahi and blo + n < bhi and a[alo + n] == b[blo + n]:
+            n += 1
+        if n:
+            blocks.append((alo, blo, n))
+            alo += n
+            blo += n
+        m = 0
+        while alo < ahi - m and blo < bhi - m and \
+                a[ahi - m - 1] == b[bhi - m - 1]:
+            m += 1
+        ahi -= m
+        bhi -= m
+        if alo < ahi and blo < bhi:
+            snakes = self._myers(a, alo, ahi, b, blo, bhi)
+            if snakes is not None:
+                blocks.extend(snakes)
+            else:
+                self._split(a, alo, ahi, b, blo, bhi, blocks)
+        if m:
+            blocks.append((ahi, bhi, m))
+
+    def _myers(self, a, alo, ahi, b, blo, bhi):
+        """Return the matching `(i, j, n)` triples of the shortest edit
+        script, or `None` if it has more differences than allowed by
+        the remaining budget.
+        """
+        n = ahi - alo
+        m = bhi - blo
+        max_d = min(n + m, self._budget)
+        offset = max_d + 1
+        v = [0] * (2 * max_d + 3)
+        trace = []
+        for d in range(max_d + 1):
+            trace.append(v[:])
+            for k in range(-d, d + 1, 2):
+                if k == -d or k != d and v[offset + k - 1] < \
+                                         v[offset + k + 1]:
+                    x = v[offset + k + 1]
+                else:
+                    x = v[offset + k - 1] + 1
+                y = x - k
+                while x < n and y < m and a[alo + x] == b[blo + y]:
+                    x += 1
+                    y += 1
+                v[offset + k] = x
+                if x >= n and y >= m:
+                    self._budget -= d
+                    return self._backtrack(trace, offset, n, m, alo, blo)
+        self._budget = 0
+        return None
+
+    def _backtrack(self, trace, offset, x, y, alo, blo):
+        snakes = []
+        for d in range(len(trace) - 1, -1, -1):
+            v = trace[d]
+            k = x - y
+            if k == -d or k != d and v[offset + k - 1] < v[offset + k + 1]:
+                prev_k = k + 1
+            else:
+                prev_k = k - 1
+            prev_x = v[offset + prev_k]
+            prev_y = prev_x - prev_k
+            size = min(x - max(prev_x, 0), y - max(prev_y, 0))
+            if size > 0:
+                snakes.append((alo + x - size, blo + y - size, size))
+            x, y = prev_x, prev_y
+        snakes.reverse()
+        return snakes
+
+    def _split(self, a, alo, ahi, b, blo, bhi, blocks):
+        """Match the lines appearing once in both `a[alo:ahi]` and
+        `b[blo:bhi]`, in the longest increasing sequence, and match the
+        regions in between.
+        """
+        counts = {}
+        for i in range(alo, ahi):
+            c = counts.get(a[i])
+            counts[a[i]] = [i, -1, 1, 0] if c is None else \
+                           [c[0], -1, c[2] + 1, 0]
+        for j in range(blo, bhi):
+            c = counts.get(b[j])
+            if c is not None:
+                c[1] = j
+                c[3] += 1
+        pairs = sorted((c[0], c[1]) for c in counts.values()
+                       if c[2] == 1 and c[3] == 1)
+        if not pairs:
+            return
+        # Longest increasing subsequence of the positions in b
+        tails = []
+        tail_idx = []
+        prev = [None] * len(pairs)
+        for idx, (i, j) in enumerate(pairs):
+            pos = bisect_left(tails, j)
+            if pos == len(tails):
+                tails.append(j)
+                tail_idx.append(idx)
+            else:
+                tails[pos] = j
+                tail_idx[pos] = idx
+            prev[idx] = tail_idx[pos - 1] if pos else None
+        anchors = []
+        idx = tail_idx[-1]
+        while idx is not None:
+            anchors.append(pairs[idx])
+            idx = prev[idx]
+        anchors.reverse()
+        for i, j in anchors:
+            self._match(a, alo, i, b, blo, j, blocks)
+            blocks.append((i, j, 1))
+            alo = i + 1
+            blo = j + 1
+        self._match(a, alo, ahi, b, blo, bhi, blocks)
+
+
 def get_filtered_hunks(fromlines, tolines, context=None,
                        ignore_blank_lines=False, ignore_case=False,
-                       ignore_space_changes=False):
+                       ignore_space_changes=False, matcher=None):
     """Retrieve differences in the form of `difflib.SequenceMatcher`
     opcodes, grouped according to the ``context`` and ``ignore_*``
     parameters.
@@ -64,11 +260,16 @@ def get_filtered_hunks(fromlines, tolines, context=None,
     :param ignore_space_changes: differences in amount of spaces are ignored
     :param context: the number of "equal" lines kept for representing
                     the context of the change
+    :param matcher: callable creating the object computing the
+                    differences from the two lists of lines, which
+                    must have the `get_opcodes` and
+                    `get_grouped_opcodes` methods of
+                    `difflib.SequenceMatcher`; `LineMatcher` by default
+                    (''since 1.7.1'')
     :return: generator of grouped `difflib.SequenceMatcher` opcodes
 
     If none of the ``ignore_*`` parameters is `True`, there's nothing
-    to filter out the results will come straight from the
-    SequenceMatcher.
+    to filter out the results will come straight from the matcher.
     """
     if ignore_space_changes:
         fromlines = list(map(_norm_space_changes, fromlines))
@@ -76,19 +277,19 @@ def get_filtered_hunks(fromlines, tolines, context=None,
     if ignore_case:
         fromlines = [l.lower() for l in fromlines]
         tolines = [l.lower() for l in tolines]
-    hunks = get_hunks(fromlines, tolines, context)
+    hunks = get_hunks(fromlines, tolines, context, matcher)
     if ignore_blank_lines:
         hunks = filter_ignorable_lines(hunks, fromlines, tolines, context,
                                        ignore_blank_lines, False, False)
     return hunks
 
 
-def get_hunks(fromlines, tolines, context=None):
+def get_hunks(fromlines, tolines, context=None, matcher=None):
     """Generator yielding grouped opcodes describing differences .
 
     See `get_filtered_hunks` for the parameter descriptions.
     """
-    matcher = difflib.SequenceMatcher(None, fromlines, tolines)
+    matcher = (matcher or LineMatcher)(fromlines, tolines)
     if context is None:
         return (hunk for hunk in [matcher.get_opcodes()])
     else:
@@ -185,10 +386,42 @@ def filter_ignorable_lines(hunks, fromlines, tolines, context,
             yield hunk
 
 
+class _DiffLines(Sequence):
+    """Lines of one side of a diff block, converted to HTML only when
+    accessed, i.e. while the template is being rendered.
+    """
+
+    def __init__(self, render, start, stop):
+        self._render = render
+        self._start = start
+        self._stop = stop
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return self._render(self._start + idx)
+
+    def __iter__(self):
+        for idx in range(self._start, self._stop):
+            yield self._render(idx)
+
+
 def diff_blocks(fromlines, tolines, context=None, tabwidth=8,
-                ignore_blank_lines=0, ignore_case=0, ignore_space_changes=0):
+                ignore_blank_lines=0, ignore_case=0, ignore_space_changes=0,
+                matcher=None):
     """Return an array that is adequate for adding to the data dictionary
 
+    The lines of the blocks are sequences which produce the HTML markup
+    of each line upon access, so that the markup is generated while the
+    template is streamed rather than for the whole diff upfront.
+
     See `get_filtered_hunks` for the parameter descriptions.
 
     See also the diff_div.html template.
@@ -202,75 +435,69 @@ def diff_blocks(fromlines, tolines, context=None, tabwidth=8,
         div, mod = divmod(len(match.group(0)), 2)
         return Markup(div * '&nbsp; ' + mod * '&nbsp;')
 
-    def markup_intraline_changes(opcodes):
-        for tag, i1, i2, j1, j2 in opcodes:
-            if tag == 'replace' and i2 - i1 == j2 - j1:
-                for i in range(i2 - i1):
-                    fromline, toline = fromlines[i1 + i], tolines[j1 + i]
-                    (start, end) = get_change_extent(fromline, toline)
-                    if start != 0 or end != 0:
-                        last = end + len(fromline)
-                        fromlines[i1 + i] = (
-                            fromline[:start] + '\0' + fromline[start:last] +
-                            '\1' + fromline[last:])
-                        last = end+len(toline)
-                        tolines[j1 + i] = (
-                            toline[:start] + '\0' + toline[start:last] +
-                            '\1' + toline[last:])
-            yield tag, i1, i2, j1, j2
-
+    def unmodified(lines):
+        def render(idx):
+            line = lines[idx].expandtabs(tabwidth)
+            line = space_re.sub(htmlify, escape(line, quotes=False))
+            return Markup(str(line))
+        return render
+
+    def modified(lines, others, delta, tag):
+        # `delta` maps the index of a line to the index of its
+        # counterpart in `others`, for intraline changes
+        def render(idx):
+            line = lines[idx]
+            if delta is not None:
+                start, end = get_change_extent(line, others[idx + delta])
+                if start != 0 or end != 0:
+                    last = end + len(line)
+                    line = line[:start] + '\0' + line[start:last] + '\1' + \
+                           line[last:]
+            line = expandtabs(line, tabwidth, '\0\1')
+            line = escape(line, quotes=False)
+            line = ('<%s>' % tag).join(space_re.sub(htmlify, seg)
+                                       for seg in line.split('\0'))
+            line = line.replace('\1', '</%s>' % tag)
+            return Markup(str(line))
+        return render
+
+    render_from = unmodified(fromlines)
+    render_to = unmodified(tolines)
     changes = []
     for group in get_filtered_hunks(fromlines, tolines, context,
                                     ignore_blank_lines, ignore_case,
-                                    ignore_space_changes):
+                                    ignore_space_changes, matcher):
         blocks = []
-        last_tag = None
-        for tag, i1, i2, j1, j2 in markup_intraline_changes(group):
-            if tag != last_tag:
-                blocks.append({'type': type_map[tag],
-                               'base': {'offset': i1, 'lines': []},
-                               'changed': {'offset': j1, 'lines': []}})
+        for tag, i1, i2, j1, j2 in group:
             if tag == 'equal':
-                for line in fromlines[i1:i2]:
-                    line = line.expandtabs(tabwidth)
-                    line = space_re.sub(htmlify, escape(line, quotes=False))
-                    blocks[-1]['base']['lines'].append(Markup(str(line)))
-                for line in tolines[j1:j2]:
-                    line = line.expandtabs(tabwidth)
-                    line = space_re.sub(htmlify, escape(line, quotes=False))
-                    blocks[-1]['changed']['lines'].append(Markup(str(line)))
+                base = _DiffLines(render_from, i1, i2)
+                changed = _DiffLines(render_to, j1, j2)
             else:
-                if tag in ('replace', 'delete'):
-                    for line in fromlines[i1:i2]:
-                        line = expandtabs(line, tabwidth, '\0\1')
-                        line = escape(line, quotes=False)
-                        line = '<del>'.join(space_re.sub(htmlify, seg)
-                                            for seg in line.split('\0'))
-                        line = line.replace('\1', '</del>')
-                        blocks[-1]['base']['lines'].append(
-                            Markup(str(line)))
-                if tag in ('replace', 'insert'):
-                    for line in tolines[j1:j2]:
-                        line = expandtabs(line, tabwidth, '\0\1')
-                        line = escape(line, quotes=False)
-                        line = '<ins>'.join(space_re.sub(htmlify, seg)
-                                            for seg in line.split('\0'))
-                        line = line.replace('\1', '</ins>')
-                        blocks[-1]['changed']['lines'].append(
-                            Markup(str(line)))
+                intraline = tag == 'replace' and i2 - i1 == j2 - j1
+                base = _DiffLines(
+                    modified(fromlines, tolines,
+                             j1 - i1 if intraline else None, 'del'),
+                    i1, i2 if tag != 'insert' else i1)
+                changed = _DiffLines(
+                    modified(tolines, fromlines,
+                             i1 - j1 if intraline else None, 'ins'),
+                    j1, j2 if tag != 'delete' else j1)
+            blocks.append({'type': type_map[tag],
+                           'base': {'offset': i1, 'lines': base},
+                           'changed': {'offset': j1, 'lines': changed}})
         changes.append(blocks)
     return changes
 
 
 def unified_diff(fromlines, tolines, context=None, ignore_blank_lines=0,
-                 ignore_case=0, ignore_space_changes=0):
+                 ignore_case=0, ignore_space_changes=0, matcher=None):
     """Generator producing lines corresponding to a textual diff.
 
     See `get_filtered_hunks` for the parameter descriptions.
     """
     for group in get_filtered_hunks(fromlines, tolines, context,
                                     ignore_blank_lines, ignore_case,
-                                    ignore_space_changes):
+                                    ignore_space_changes, matcher):
         i1, i2, j1, j2 = group[0][1], group[-1][2], group[0][3], group[-1][4]
         if i1 == 0 and i2 == 0:
             i1, i2 = -1, -1 # support for 'A'dd changes
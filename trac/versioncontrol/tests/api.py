@@ -14,16 +14,17 @@
 #
 # Author: Eli Carter <eli.carter@commprove.com>
 
+import threading
 import unittest
 from datetime import datetime
 
-from trac.core import TracError
+from trac.core import Component, ComponentMeta, TracError, implements
 from trac.resource import Resource, get_resource_description, get_resource_url
 from trac.test import EnvironmentStub, Mock, MockRequest, makeSuite
 from trac.util.datefmt import utc
 from trac.versioncontrol.api import Changeset, DbRepositoryProvider, \
-                                    EmptyChangeset, Node, Repository, \
-                                    RepositoryManager
+                                    EmptyChangeset, IRepositoryConnector, \
+                                    Node, Repository, RepositoryManager
 
 
 class ApiTestCase(unittest.TestCase):
@@ -263,12 +264,116 @@ class RepositoryManagerTestCase(unittest.TestCase):
         self.assertEqual([], req.chrome['warnings'])
 
 
+class RepositorySyncTestCase(unittest.TestCase):
+
+    connector = None
+    sync = None
+
+    @classmethod
+    def setUpClass(cls):
+        class SyncTestConnector(Component):
+            implements(IRepositoryConnector)
+
+            def get_supported_types(self):
+                yield 'sync-test', 1
+
+            def get_repository(self, repos_type, repos_dir, params):
+                return Mock(Repository, params['name'], params, self.log,
+                            sync=lambda: cls.sync(params['name']),
+                            close=lambda: None)
+
+        cls.connector = SyncTestConnector
+
+    @classmethod
+    def tearDownClass(cls):
+        ComponentMeta.deregister(cls.connector)
+
+    def setUp(self):
+        self.env = EnvironmentStub(enable=('trac.*', self.connector))
+        for name in ('repos1', 'repos2'):
+            self.env.config.set('repositories', name + '.dir', '/' + name)
+            self.env.config.set('repositories', name + '.type', 'sync-test')
+            self.env.config.set('repositories', name + '.sync_per_request',
+                                True)
+        self.rm = RepositoryManager(self.env)
+        self.synced = []
+
+    def tearDown(self):
+        self.rm.shutdown()
+        self.env.reset_db()
+
+    def _set_sync(self, sync):
+        def wrapper(name):
+            self.synced.append((name, threading.current_thread().name))
+            sync(name)
+        type(self).sync = staticmethod(wrapper)
+
+    def test_sync_sequentially(self):
+        self._set_sync(lambda name: None)
+        req = MockRequest(self.env)
+
+        self.rm.pre_process_request(req, Mock())
+
+        self.assertEqual(['repos1', 'repos2'],
+                         sorted(name for name, thread in self.synced))
+        self.assertEqual({threading.current_thread().name},
+                         {thread for name, thread in self.synced})
+
+    def test_sync_concurrently(self):
+        self.env.config.set('versioncontrol', 'sync_workers', 2)
+        barrier = threading.Barrier(2, timeout=10)
+        def sync(name):
+            barrier.wait()
+            if name == 'repos2':
+                raise TracError("sync error")
+        self._set_sync(sync)
+        req = MockRequest(self.env)
+
+        self.rm.pre_process_request(req, Mock())
+
+        self.assertEqual(['repos1', 'repos2'],
+                         sorted(name for name, thread in self.synced))
+        self.assertNotIn(threading.current_thread().name,
+                         {thread for name, thread in self.synced})
+        self.assertEqual(1, len(req.chrome['warnings']))
+        self.assertIn('repos2', str(req.chrome['warnings'][0]))
+
+    def test_sync_concurrently_releases_repositories(self):
+        self.env.config.set('versioncontrol', 'sync_workers', 2)
+        self._set_sync(lambda name: None)
+
+        self.rm.pre_process_request(MockRequest(self.env), Mock())
+
+        self.assertEqual(2, len(self.synced))
+        self.assertEqual({}, self.rm._cache)
+
+    def test_sync_in_background(self):
+        self.env.config.set('versioncontrol', 'background_sync', True)
+        self.env.config.set('repositories', 'repos2.sync_per_request', False)
+        started = threading.Event()
+        proceed = threading.Event()
+        def sync(name):
+            started.set()
+            proceed.wait(10)
+        self._set_sync(sync)
+
+        self.rm.pre_process_request(MockRequest(self.env), Mock())
+        self.assertTrue(started.wait(10))
+        # not scheduled again while pending
+        self.rm.pre_process_request(MockRequest(self.env), Mock())
+        proceed.set()
+        self.rm.shutdown()
+
+        self.assertEqual(['repos1'], [name for name, thread in self.synced])
+
+
 def test_suite():
     suite = unittest.TestSuite()
     suite.addTest(makeSuite(ApiTestCase))
     suite.addTest(makeSuite(ResourceManagerTestCase))
     suite.addTest(makeSuite(DbRepositoryProviderTestCase))
     suite.addTest(makeSuite(RepositoryManagerTestCase))
+    suite.addTest(makeSuite(RepositorySyncTestCase))
     return suite
 
 
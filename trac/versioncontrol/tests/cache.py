@@ -18,6 +18,7 @@ from datetime import datetime
 
 from trac.test import EnvironmentStub, Mock, makeSuite
 from trac.util.datefmt import to_utimestamp, utc
+from trac.util.profiling import start_profile, stop_profile
 from trac.versioncontrol import Repository, Changeset, Node, NoSuchChangeset
 from trac.versioncontrol.cache import CachedRepository
 
@@ -343,6 +344,35 @@ class CacheTestCase(unittest.TestCase):
                          next(changes))
         self.assertRaises(StopIteration, next, changes)
 
+    def test_get_changesets_batch(self):
+        t1 = datetime(2001, 1, 1, 1, 1, 1, 0, utc)
+        t2 = datetime(2002, 1, 1, 1, 1, 1, 0, utc)
+        self.preset_cache(
+            (('0', to_utimestamp(t1), '', ''), []),
+            (('1', to_utimestamp(t2), 'joe', 'Import'), []),
+            )
+        repos = self.get_repos()
+        cache = CachedRepository(self.env, repos, self.log)
+        cache.youngest_rev  # read the youngest revision before profiling
+        profile = start_profile()
+        try:
+            changesets = cache.get_changesets_batch([1, '0', 1, 2, 'x'])
+        finally:
+            stop_profile()
+        self.assertEqual(1, profile.sql_count)
+        self.assertEqual({1, '0'}, set(changesets))
+        self.assertEqual(1, changesets[1].rev)
+        self.assertEqual('joe', changesets[1].author)
+        self.assertEqual('Import', changesets[1].message)
+        self.assertEqual(t2, changesets[1].date)
+        self.assertEqual(0, changesets['0'].rev)
+        self.assertEqual(t1, changesets['0'].date)
+
+    def test_get_changesets_batch_empty(self):
+        cache = CachedRepository(self.env, self.get_repos(), self.log)
+        self.assertEqual({}, cache.get_changesets_batch([]))
+        self.assertEqual({}, cache.get_changesets_batch([1]))
+
 
 def test_suite():
     return makeSuite(CacheTestCase)
@@ -10,6 +10,8 @@
 # This software consists of voluntary contributions made by many
 # individuals. For the exact contribution history, see the revision
 # history and logs, available at https://trac.edgewall.org/log/.
+import difflib
+import random
 import textwrap
 
 from trac.test import makeSuite
@@ -257,8 +259,121 @@ class DiffTestCase(unittest.TestCase):
         self.assertEqual(str(block['changed']['lines'][0]),
                          'aa<ins>x</ins>b')
 
+    def test_diff_blocks_lines_rendered_on_access(self):
+        fromlines = ['a', '<b>', 'c']
+        tolines = ['a', '<x>', 'c']
+        changes = diff.diff_blocks(fromlines, tolines)
+        blocks = changes[0]
+        self.assertEqual(['unmod', 'mod', 'unmod'],
+                         [block['type'] for block in blocks])
+        lines = blocks[1]['base']['lines']
+        self.assertEqual(1, len(lines))
+        self.assertEqual(['&lt;<del>b</del>&gt;'], [str(l) for l in lines])
+        self.assertEqual('&lt;<ins>x</ins>&gt;',
+                         str(blocks[1]['changed']['lines'][-1]))
+        self.assertRaises(IndexError, lines.__getitem__, 1)
+        self.assertEqual(['a', '<b>', 'c'], fromlines)
+        self.assertEqual(['a', '<x>', 'c'], tolines)
+
+    def test_diff_blocks_with_matcher(self):
+        def matcher(a, b):
+            return difflib.SequenceMatcher(None, a, b)
+        fromlines = ['a', 'b', 'c']
+        tolines = ['a', 'c', 'd']
+        changes = diff.diff_blocks(fromlines, tolines, matcher=matcher)
+        self.assertEqual(['unmod', 'rem', 'unmod', 'add'],
+                         [block['type'] for block in changes[0]])
+        self.assertEqual(['b'], list(changes[0][1]['base']['lines']))
+        self.assertEqual([], list(changes[0][1]['changed']['lines']))
+
+
+class LineMatcherTestCase(unittest.TestCase):
+
+    def _apply(self, a, b, opcodes):
+        result = []
+        i = j = 0
+        for tag, i1, i2, j1, j2 in opcodes:
+            self.assertEqual((i, j), (i1, j1))
+            if tag == 'equal':
+                self.assertEqual(a[i1:i2], b[j1:j2])
+            result.extend(b[j1:j2])
+            i, j = i2, j2
+        self.assertEqual((len(a), len(b)), (i, j))
+        return result
+
+    def _matched(self, opcodes):
+        return sum(i2 - i1 for tag, i1, i2, j1, j2 in opcodes
+                   if tag == 'equal')
+
+    def _lcs(self, a, b):
+        row = [0] * (len(b) + 1)
+        for x in a:
+            prev = 0
+            for j, y in enumerate(b):
+                prev, row[j + 1] = row[j + 1], \
+                    prev + 1 if x == y else max(row[j + 1], row[j])
+        return row[-1]
+
+    def test_opcodes(self):
+        matcher = diff.LineMatcher(['a', 'b', 'c', 'd'], ['a', 'x', 'c', 'e'])
+        self.assertEqual([('equal', 0, 1, 0, 1), ('replace', 1, 2, 1, 2),
+                          ('equal', 2, 3, 2, 3), ('replace', 3, 4, 3, 4)],
+                         matcher.get_opcodes())
+        self.assertEqual([(0, 0, 1), (2, 2, 1), (4, 4, 0)],
+                         matcher.get_matching_blocks())
+
+    def test_empty(self):
+        self.assertEqual([], diff.LineMatcher([], []).get_opcodes())
+        self.assertEqual([('insert', 0, 0, 0, 2)],
+                         diff.LineMatcher([], ['a', 'b']).get_opcodes())
+        self.assertEqual([('delete', 0, 2, 0, 0)],
+                         diff.LineMatcher(['a', 'b'], []).get_opcodes())
+
+    def test_grouped_opcodes(self):
+        a = [str(i) for i in range(20)]
+        b = a[:]
+        b[2] = 'x'
+        b[15] = 'y'
+        groups = list(diff.LineMatcher(a, b).get_grouped_opcodes(2))
+        self.assertEqual(list(difflib.SequenceMatcher(None, a, b)
+                              .get_grouped_opcodes(2)), groups)
+
+    def test_minimal_diff(self):
+        rnd = random.Random(42)
+        for _ in range(200):
+            a = [rnd.choice('abcd') for _ in range(rnd.randrange(15))]
+            b = [rnd.choice('abcd') for _ in range(rnd.randrange(15))]
+            opcodes = diff.LineMatcher(a, b).get_opcodes()
+            self.assertEqual(b, self._apply(a, b, opcodes))
+            self.assertEqual(self._lcs(a, b), self._matched(opcodes))
+
+    def test_max_cost_exceeded(self):
+        """Beyond `max_cost` differences, the lines unique on both sides
+        are used as anchors."""
+        rnd = random.Random(42)
+        a = ['%d' % i for i in range(300)]
+        b = []
+        for line in a:
+            if rnd.random() < 0.5:
+                b.append('x%s' % line)
+            b.append(line if rnd.random() < 0.6 else 'y%s' % line)
+        opcodes = diff.LineMatcher(a, b, max_cost=10).get_opcodes()
+        self.assertEqual(b, self._apply(a, b, opcodes))
+        self.assertEqual(self._lcs(a, b), self._matched(opcodes))
+
+    def test_max_cost_no_anchors(self):
+        a = ['a'] * 10 + ['b'] * 10
+        b = ['b'] * 10 + ['a'] * 10
+        opcodes = diff.LineMatcher(a, b, max_cost=2).get_opcodes()
+        self.assertEqual(b, self._apply(a, b, opcodes))
+        self.assertEqual([('replace', 0, 20, 0, 20)], opcodes)
+
+
 def test_suite():
-    return makeSuite(DiffTestCase)
+    suite = unittest.TestSuite()
+    suite.addTest(makeSuite(DiffTestCase))
+    suite.addTest(makeSuite(LineMatcherTestCase))
+    return suite
 
 if __name__ == '__main__':
     unittest.main(defaultTest='test_suite')
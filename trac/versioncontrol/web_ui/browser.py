@@ -22,9 +22,11 @@ from fnmatch import fnmatchcase
 from trac.config import BoolOption, ListOption, Option
 from trac.core import *
 from trac.mimeview.api import IHTMLPreviewAnnotator, Mimeview, is_binary
+from trac.mimeview.cache import RenderCache
 from trac.perm import IPermissionRequestor, PermissionError
 from trac.resource import Resource, ResourceNotFound
 from trac.util import as_bool, embedded_numbers
+from trac.util.archive import archive_writers
 from trac.util.datefmt import datetime_now, http_date, to_datetime, utc
 from trac.util.html import Markup, escape, tag
 from trac.util.text import exception_to_unicode, shorten_line
@@ -191,6 +193,13 @@ class BrowserModule(Component):
         performed on the paths, so aliases won't get automatically resolved.
         """)
 
+    archive_formats = ListOption('browser', 'archive_formats', 'zip',
+        doc="""Comma-separated list of the archive formats in which the
+        directories and the changesets can be downloaded, among `zip`
+        and `tar.gz`. The first format is used for the download links.
+        (''since 1.7.1'')
+        """)
+
     color_scale = BoolOption('browser', 'color_scale', True,
         doc="""Enable colorization of the ''age'' column.
 
@@ -397,8 +406,8 @@ class BrowserModule(Component):
                 raise PermissionError('BROWSER_VIEW' if node.isdir else
                                       'FILE_VIEW', node.resource, self.env)
             if node.isdir:
-                if format in ('zip',): # extension point here...
-                    self._render_zip(req, context, repos, node, rev)
+                if format in self.get_archive_formats():
+                    self._render_zip(req, context, repos, node, rev, format)
                     # not reached
                 dir_data = self._render_dir(req, repos, node, rev, order, desc)
             elif node.isfile:
@@ -623,11 +632,12 @@ class BrowserModule(Component):
             return dir_order if a.isdir else 0, file_order(a)
         entries = sorted(entries, key=browse_order, reverse=desc)
 
-        # ''Zip Archive'' alternate link
-        zip_href = self._get_download_href(req.href, repos, node, rev)
-        if zip_href:
-            add_link(req, 'alternate', zip_href, _('Zip Archive'),
-                     'application/zip', 'zip')
+        # ''Zip Archive'' alternate links
+        for format in self.get_archive_formats():
+            zip_href = self._get_download_href(req.href, repos, node, rev,
+                                               format)
+            if zip_href:
+                add_archive_link(req, zip_href, format)
 
         return {'entries': entries, 'changes': changes,
                 'timerange': timerange, 'colorize_age': custom_colorizer,
@@ -647,7 +657,8 @@ class BrowserModule(Component):
                                     key=lambda x: x.name,
                                     reverse=True))
 
-    def _render_zip(self, req, context, repos, root_node, rev=None):
+    def _render_zip(self, req, context, repos, root_node, rev=None,
+                    format='zip'):
         if not self.is_path_downloadable(repos, root_node.path):
             raise TracError(_("Path not available for download"))
         req.perm(context.resource).require('FILE_VIEW')
@@ -656,8 +667,10 @@ class BrowserModule(Component):
             archive_name = root_node.name
         else:
             archive_name = repos.reponame or 'repository'
-        filename = '%s-%s.zip' % (archive_name, root_node.rev)
-        render_zip(req, filename, repos, root_node, self._iter_nodes)
+        filename = '%s-%s.%s' % (archive_name, root_node.rev,
+                                 archive_writers[format].extension)
+        render_archive(req, filename, repos, root_node, self._iter_nodes,
+                       format, Mimeview(self.env).is_compressible)
 
     def _render_file(self, req, context, repos, node, rev=None):
         req.perm(node.resource).require('FILE_VIEW')
@@ -737,18 +750,31 @@ class BrowserModule(Component):
             'annotate': annotate,
             }
 
-    def _get_download_href(self, href, repos, node, rev):
-        """Return the URL for downloading a file, or a directory as a ZIP."""
+    def _get_download_href(self, href, repos, node, rev, format=None):
+        """Return the URL for downloading a file, or a directory as an
+        archive in the given `format` or the first of `archive_formats`.
+        """
         if node is not None and node.isfile:
             return href.export(rev or 'HEAD', repos.reponame or None,
                                node.path)
         path = '' if node is None else node.path.strip('/')
         if self.is_path_downloadable(repos, path):
             return href.browser(repos.reponame or None, path,
-                                rev=rev or repos.youngest_rev, format='zip')
+                                rev=rev or repos.youngest_rev,
+                                format=format or
+                                       self.get_archive_formats()[0])
 
     # public methods
 
+    def get_archive_formats(self):
+        """Return the list of the enabled archive formats.
+
+        :since: 1.7.1
+        """
+        formats = [format for format in self.archive_formats
+                   if format in archive_writers]
+        return formats or ['zip']
+
     def is_path_downloadable(self, repos, path):
         if repos.reponame:
             path = repos.reponame + '/' + path
@@ -820,6 +846,7 @@ class BrowserModule(Component):
                 ('browser', self._format_browser_link)]
 
     def _format_export_link(self, formatter, ns, export, label):
+        formatter.depends_on('changeset')
         export, query, fragment = formatter.split_link(export)
         if ':' in export:
             rev, path = export.split(':', 1)
@@ -835,6 +862,7 @@ class BrowserModule(Component):
         return tag.a(label, class_='missing export')
 
     def _format_browser_link(self, formatter, ns, path, label):
+        formatter.depends_on('changeset')
         path, query, fragment = formatter.split_link(path)
         rev = marks = None
         match = self.PATH_LINK_RE.match(path)
@@ -989,31 +1017,40 @@ class BlameAnnotator(object):
     def reset(self):
         rev = self.rev
         node = self.repos.get_node(self.path, rev)
-        # FIXME: get_annotations() should be in the Resource API
-        # -- get revision numbers for each line
-        self.annotations = node.get_annotations()
+        # -- the blame of the node only depends on the revision in which it
+        # was last changed
+        cache = RenderCache(self.env)
+        key = cache.make_key(self.repos.get_base(), node.created_path,
+                             node.created_rev)
+        blame = cache.get('blame', key)
+        if blame is None:
+            # FIXME: get_annotations() should be in the Resource API
+            # -- get revision numbers for each line, and the original path
+            # of the source for each rev (support for copy/renames)
+            blame = {'annotations': list(node.get_annotations()),
+                     'paths': [(r, path) for path, r, chg
+                               in node.get_history()]}
+            cache.set('blame', key, blame)
+        self.annotations = blame['annotations']
         # -- from the annotations, retrieve changesets and
         # determine the span of dates covered, for the color code.
         # Note: changesets[i].rev can differ from annotations[i]
         # (long form vs. compact, short rev form for the latter).
         self.changesets = []
-        chgset = self.repos.get_changeset(rev)
-        chgsets = {rev: chgset}
-        self.timerange = TimeRange(chgset.date)
-        for idx in range(len(self.annotations)):
-            rev = self.annotations[idx]
+        chgsets = self.repos.get_changesets_batch(set(self.annotations) |
+                                                  {rev})
+        def get_changeset(rev):
             chgset = chgsets.get(rev)
             if not chgset:
-                chgset = self.repos.get_changeset(rev)
-                chgsets[rev] = chgset
-                self.timerange.insert(chgset.date)
-            # get list of changeset parallel to annotations
-            self.changesets.append(chgset)
-        # -- retrieve the original path of the source, for each rev
-        # (support for copy/renames)
-        self.paths = {}
-        for path, rev, chg in node.get_history():
-            self.paths[rev] = path
+                # raises NoSuchChangeset
+                chgset = chgsets[rev] = self.repos.get_changeset(rev)
+            return chgset
+        self.timerange = TimeRange(get_changeset(rev).date)
+        for rev in set(self.annotations):
+            self.timerange.insert(get_changeset(rev).date)
+        # get list of changeset parallel to annotations
+        self.changesets = [get_changeset(rev) for rev in self.annotations]
+        self.paths = dict(blame['paths'])
         # -- get custom colorize function
         browser = BrowserModule(self.env)
         self.colorize_age = browser.get_custom_colorizer()
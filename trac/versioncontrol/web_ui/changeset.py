@@ -18,32 +18,39 @@
 #         Christopher Lenz <cmlenz@gmx.de>
 #         Christian Boos <cboos@edgewall.org>
 
+from collections import namedtuple
 from functools import partial
 from itertools import groupby
+from operator import itemgetter
 import os
 import posixpath
 import re
 
 from trac.config import BoolOption, IntOption, Option
 from trac.core import *
+from trac.db.util import chunked_params
 from trac.mimeview.api import Mimeview
 from trac.perm import IPermissionRequestor
 from trac.resource import ResourceNotFound
 from trac.search import ISearchSource, search_to_sql, shorten_result
-from trac.timeline.api import ITimelineEventProvider
+from trac.search.index import SearchIndex
+from trac.timeline.api import ITimelineEventProvider, merge_timeline_events
 from trac.util import as_bool, content_disposition, embedded_numbers, pathjoin
+from trac.util.archive import archive_writers
 from trac.util.datefmt import from_utimestamp, pretty_timedelta
 from trac.util.html import tag
 from trac.util.presentation import to_json
 from trac.util.text import CRLF, exception_to_unicode, shorten_line, \
                            to_unicode, unicode_urlencode
 from trac.util.translation import _, ngettext, tag_
-from trac.versioncontrol.api import Changeset, NoSuchChangeset, Node, \
-                                    RepositoryManager
-from trac.versioncontrol.diff import diff_blocks, get_diff_options, \
-                                     unified_diff
+from trac.versioncontrol.api import Changeset, IRepositoryChangeListener, \
+                                    NoSuchChangeset, Node, RepositoryManager
+from trac.versioncontrol.cache import CachedRepository
+from trac.versioncontrol.diff import LineMatcher, diff_blocks, \
+                                     get_diff_options, unified_diff
 from trac.versioncontrol.web_ui.browser import BrowserModule
-from trac.versioncontrol.web_ui.util import content_closing, render_zip
+from trac.versioncontrol.web_ui.util import add_archive_link, \
+                                           content_closing, render_archive
 from trac.web import IRequestHandler, RequestDone
 from trac.web.chrome import (Chrome, INavigationContributor, add_ctxtnav,
                              add_link, add_script, add_stylesheet,
@@ -52,6 +59,16 @@ from trac.wiki.api import IWikiSyntaxProvider, WikiParser
 from trac.wiki.formatter import format_to
 
 
+DiffStats = namedtuple('DiffStats',
+                       'old_size new_size is_binary added removed')
+DiffStats.__doc__ = """Statistics of the changes made to a file in a
+changeset. `added` and `removed` are the numbers of lines added and
+removed, `None` for binary files.
+
+:since: 1.7.1
+"""
+
+
 class IPropertyDiffRenderer(Interface):
     """Render node properties in TracBrowser and TracChangeset views."""
 
@@ -120,7 +137,8 @@ class ChangesetModule(Component):
     """
 
     implements(INavigationContributor, IPermissionRequestor, IRequestHandler,
-               ITimelineEventProvider, IWikiSyntaxProvider, ISearchSource)
+               ITimelineEventProvider, IWikiSyntaxProvider, ISearchSource,
+               IRepositoryChangeListener)
 
     property_diff_renderers = ExtensionPoint(IPropertyDiffRenderer)
 
@@ -158,6 +176,13 @@ class ChangesetModule(Component):
         plus their new size) for which the changeset view will attempt to show
         the diffs inlined.""")
 
+    diff_stats_on_sync = BoolOption('changeset', 'diff_stats_on_sync',
+                                    'false',
+        """Whether the statistics of the changes made to the files
+        (sizes, lines added and removed) should be computed when a
+        changeset is added to the repository, rather than the first time
+        the changeset is viewed. (''since 1.7.1'')""")
+
     wiki_format_messages = BoolOption('changeset', 'wiki_format_messages',
                                       'true',
         """Whether wiki formatting should be applied to changeset messages.
@@ -324,8 +349,9 @@ class ChangesetModule(Component):
                 pretty_timedelta(chgset.date, None, 3600)])
 
         format = req.args.get('format')
+        archive_formats = BrowserModule(self.env).get_archive_formats()
 
-        if format in ['diff', 'zip']:
+        if format == 'diff' or format in archive_formats:
             # choosing an appropriate filename
             rpath = new_path.replace('/', '_')
             if chgset:
@@ -341,9 +367,12 @@ class ChangesetModule(Component):
                                % (old_path.replace('/', '_'), old, rpath, new)
             if format == 'diff':
                 self._render_diff(req, filename, repos, data)
-            elif format == 'zip':
-                render_zip(req, filename + '.zip', repos, None,
-                           partial(self._zip_iter_nodes, req, repos, data))
+            else:
+                filename += '.' + archive_writers[format].extension
+                render_archive(req, filename, repos, None,
+                               partial(self._zip_iter_nodes, req, repos,
+                                       data),
+                               format, Mimeview(self.env).is_compressible)
 
         # -- HTML format
         self._render_html(req, repos, chgset, restricted, data)
@@ -356,8 +385,9 @@ class ChangesetModule(Component):
                 'old_path': full_old_path, 'old': old})
         add_link(req, 'alternate', '?format=diff&' + diff_params,
                  _('Unified Diff'), 'text/plain', 'diff')
-        add_link(req, 'alternate', '?format=zip&' + diff_params,
-                 _('Zip Archive'), 'application/zip', 'zip')
+        for format in archive_formats:
+            add_archive_link(req, '?format=%s&%s' % (format, diff_params),
+                             format)
         add_script(req, 'common/js/diff.js')
         add_stylesheet(req, 'common/css/changeset.css')
         add_stylesheet(req, 'common/css/diff.css')
@@ -528,11 +558,35 @@ class ChangesetModule(Component):
                                                        'old': None})
             return changed_properties
 
+        # Statistics of the changes stored for the changeset, and those
+        # computed from the diffs shown
+        diff_stats = self._get_diff_stats(repos, chgset.rev) if chgset \
+                     else {}
+        new_diff_stats = {}
+        record_stats = chgset and not (options.get('ignoreblanklines') or
+                                       options.get('ignorecase') or
+                                       options.get('ignorewhitespace'))
+
         def _estimate_changes(old_node, new_node):
+            stats = diff_stats.get(new_node.path)
+            if stats:
+                return stats.old_size + stats.new_size
             old_size = old_node.get_content_length()
             new_size = new_node.get_content_length()
             return old_size + new_size
 
+        def _diff_stats_from_blocks(old_node, new_node, diffs):
+            added = removed = None
+            if diffs is not None:
+                added = removed = 0
+                for block in (block for blocks in diffs for block in blocks
+                              if block['type'] != 'unmod'):
+                    removed += len(block['base']['lines'])
+                    added += len(block['changed']['lines'])
+            return DiffStats(old_node.get_content_length(),
+                             new_node.get_content_length(), diffs is None,
+                             added, removed)
+
         def _content_changes(old_node, new_node):
             """Returns the list of differences.
 
@@ -540,20 +594,10 @@ class ChangesetModule(Component):
             are detected, but the return value is None for non-comparable
             files.
             """
-            mview = Mimeview(self.env)
-            if mview.is_binary(old_node.content_type, old_node.path):
-                return None
-            if mview.is_binary(new_node.content_type, new_node.path):
-                return None
-            old_content = _read_content(old_node)
-            if mview.is_binary(content=old_content):
-                return None
-            new_content = _read_content(new_node)
-            if mview.is_binary(content=new_content):
+            contents = self._read_diff_contents(old_node, new_node)
+            if contents is None:
                 return None
-
-            old_content = mview.to_unicode(old_content, old_node.content_type)
-            new_content = mview.to_unicode(new_content, new_node.content_type)
+            old_content, new_content = contents
 
             if old_content != new_content:
                 context = options.get('contextlines', 3)
@@ -614,6 +658,9 @@ class ChangesetModule(Component):
                     show_entry = True
                 if kind == Node.FILE and show_diff:
                     diffs = _content_changes(old_node, new_node)
+                    if record_stats and new_node.path not in diff_stats:
+                        new_diff_stats[new_node.path] = \
+                            _diff_stats_from_blocks(old_node, new_node, diffs)
                     if diffs != []:
                         if diffs:
                             has_diffs = True
@@ -624,7 +671,10 @@ class ChangesetModule(Component):
                         'old': old_node and node_info(old_node, annotated),
                         'new': new_node and node_info(new_node, annotated),
                         'props': props,
-                        'diffs': diffs}
+                        'diffs': diffs,
+                        'stats': new_node and
+                                 (diff_stats.get(new_node.path) or
+                                  new_diff_stats.get(new_node.path))}
                 files.append(new_node.path if new_node else
                              old_node.path if old_node else '')
                 filestats[change] += 1
@@ -655,6 +705,9 @@ class ChangesetModule(Component):
                 info = None
             changes.append(info)  # the sequence should be immutable
 
+        if new_diff_stats:
+            self._save_diff_stats(repos, chgset.rev, new_diff_stats)
+
         data.update({
             'has_diffs': has_diffs,
             'show_diffs': show_diffs,
@@ -678,6 +731,104 @@ class ChangesetModule(Component):
 
         return data
 
+    def _read_diff_contents(self, old_node, new_node):
+        """Return the old and new contents of a file as text, or `None`
+        if either of them is binary.
+        """
+        mview = Mimeview(self.env)
+        if mview.is_binary(old_node.content_type, old_node.path):
+            return None
+        if mview.is_binary(new_node.content_type, new_node.path):
+            return None
+        old_content = _read_content(old_node)
+        if mview.is_binary(content=old_content):
+            return None
+        new_content = _read_content(new_node)
+        if mview.is_binary(content=new_content):
+            return None
+        return (mview.to_unicode(old_content, old_node.content_type),
+                mview.to_unicode(new_content, new_node.content_type))
+
+    # Diff statistics
+    #
+    # The `node_diff_stats` table stores the `DiffStats` of the files
+    # modified in a changeset, computed from the diffs the first time the
+    # changeset is viewed, or when the changeset is added to the
+    # repository (see `diff_stats_on_sync`).
+
+    def _get_diff_stats(self, repos, rev):
+        """Return a `dict` mapping the paths of the files changed in
+        `rev` to their `DiffStats`, for those which are known.
+        """
+        return self._get_diff_stats_batch(repos, [rev]).get(str(rev), {})
+
+    def _get_diff_stats_batch(self, repos, revs):
+        """Return a `dict` mapping the revisions of `revs` for which
+        diff stats are known to the `dict` returned by `_get_diff_stats`.
+        """
+        revs = sorted({str(rev) for rev in revs})
+        diff_stats = {}
+        with self.env.db_query as db:
+            for subset, holders in chunked_params(revs, reserved=1):
+                for rev, path, old_size, new_size, is_binary, added, \
+                        removed in db("""
+                        SELECT rev, path, old_size, new_size, is_binary,
+                               added, removed
+                        FROM node_diff_stats WHERE repos=%%s AND rev IN (%s)
+                        """ % holders, [repos.id] + subset):
+                    diff_stats.setdefault(rev, {})[path] = \
+                        DiffStats(old_size, new_size, bool(is_binary), added,
+                                  removed)
+        return diff_stats
+
+    def _save_diff_stats(self, repos, rev, stats):
+        try:
+            with self.env.db_transaction as db:
+                db.executemany("""
+                    INSERT INTO node_diff_stats
+                      (repos, rev, path, old_size, new_size, is_binary,
+                       added, removed)
+                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
+                    """, [(repos.id, str(rev), path, s.old_size, s.new_size,
+                           int(s.is_binary), s.added, s.removed)
+                          for path, s in stats.items()])
+        except self.env.db_exc.IntegrityError:
+            # Concurrently stored by another request
+            pass
+
+    def _compute_diff_stats(self, old_node, new_node):
+        contents = self._read_diff_contents(old_node, new_node)
+        if contents is None:
+            added = removed = None
+        else:
+            matcher = LineMatcher(contents[0].splitlines(),
+                                  contents[1].splitlines())
+            added = removed = 0
+            for op, i1, i2, j1, j2 in matcher.get_opcodes():
+                if op != 'equal':
+                    removed += i2 - i1
+                    added += j2 - j1
+        return DiffStats(old_node.get_content_length(),
+                         new_node.get_content_length(), contents is None,
+                         added, removed)
+
+    # IRepositoryChangeListener methods
+
+    def changeset_added(self, repos, changeset):
+        if not self.diff_stats_on_sync:
+            return
+        stats = {}
+        for path, kind, change, base_path, base_rev in changeset.get_changes():
+            if kind == Node.FILE and change in Changeset.DIFF_CHANGES:
+                stats[path] = self._compute_diff_stats(
+                    repos.get_node(base_path, base_rev),
+                    repos.get_node(path, changeset.rev))
+        if stats:
+            self._save_diff_stats(repos, changeset.rev, stats)
+
+    def changeset_modified(self, repos, changeset, old_changeset):
+        pass
+
     def _render_diff(self, req, filename, repos, data):
         """Raw Unified Diff version"""
 
@@ -866,6 +1017,8 @@ class ChangesetModule(Component):
         else:
             return []
 
+    timeline_events_sorted = True
+
     def get_timeline_events(self, req, start, stop, filters):
         all_repos = 'changeset' in filters
         repo_filters = {f for f in filters if f.startswith('repo-')}
@@ -884,6 +1037,22 @@ class ChangesetModule(Component):
             else:
                 collapse_changesets = lambda c: c.rev
 
+            # The diff stats of the changesets shown in the timeline are
+            # fetched at once, when rendering the first event.
+            pending_revs = {}
+            diff_stats = {}
+            def get_diff_stats(repos, rev):
+                key = (repos.id, str(rev))
+                if key not in diff_stats:
+                    pending_revs.setdefault(repos, set()).add(rev)
+                    for r, revs in pending_revs.items():
+                        batch = self._get_diff_stats_batch(r, revs)
+                        for rev_ in revs:
+                            diff_stats[(r.id, str(rev_))] = \
+                                batch.get(str(rev_), {})
+                    pending_revs.clear()
+                return diff_stats[key]
+
             uids_seen = {}
             def generate_changesets(repos):
                 for _, changesets in groupby(repos.get_changesets(start, stop),
@@ -901,26 +1070,40 @@ class ChangesetModule(Component):
                                 uids_seen[uid] = repos_for_uid
                             viewable_changesets.append((cset, cset.resource,
                                                         repos_for_uid))
+                            if show_location:
+                                pending_revs.setdefault(repos, set()) \
+                                            .add(cset.rev)
                     if viewable_changesets:
                         cset = viewable_changesets[-1][0]
                         yield ('changeset', cset.date, cset.author,
                                (viewable_changesets,
-                                show_location, show_files))
+                                show_location, show_files, get_diff_stats))
+
+            def generate_events(repos):
+                try:
+                    events = generate_changesets(repos)
+                    if not isinstance(repos, CachedRepository):
+                        # only the cache guarantees the order by date
+                        events = sorted(events, key=itemgetter(1),
+                                        reverse=True)
+                    for event in events:
+                        yield event
+                except TracError as e:
+                    self.log.error("Timeline event provider for repository"
+                                   " '%s' failed: %r",
+                                   repos.reponame, exception_to_unicode(e))
 
             rm = RepositoryManager(self.env)
-            for repos in sorted(rm.get_real_repositories(),
-                                key=lambda repos: repos.reponame):
-                if all_repos or ('repo-' + repos.reponame) in repo_filters:
-                    try:
-                        for event in generate_changesets(repos):
-                            yield event
-                    except TracError as e:
-                        self.log.error("Timeline event provider for repository"
-                                       " '%s' failed: %r",
-                                       repos.reponame, exception_to_unicode(e))
+            for event in merge_timeline_events(*[
+                    generate_events(repos)
+                    for repos in sorted(rm.get_real_repositories(),
+                                        key=lambda repos: repos.reponame)
+                    if all_repos or ('repo-' + repos.reponame) in repo_filters
+                    ]):
+                yield event
 
     def render_timeline_event(self, context, field, event):
-        changesets, show_location, show_files = event[3]
+        changesets, show_location, show_files, get_diff_stats = event[3]
         cset, cset_resource, repos_for_uid = changesets[0]
         older_cset = changesets[-1][0]
         message = cset.message or ''
@@ -948,7 +1131,9 @@ class ChangesetModule(Component):
                 files = []
                 if show_location:
                     filestats = self._prepare_filestats()
+                    added = removed = 0
                     for c, r, repos_for_c in changesets:
+                        diff_stats = get_diff_stats(c.repos, c.rev)
                         for chg in c.get_changes():
                             resource = c.resource.parent.child('source',
                                                                chg[0] or '/',
@@ -957,6 +1142,10 @@ class ChangesetModule(Component):
                                 continue
                             filestats[chg[2]] += 1
                             files.append(chg[0])
+                            file_stats = diff_stats.get(chg[0])
+                            if file_stats and not file_stats.is_binary:
+                                added += file_stats.added
+                                removed += file_stats.removed
                     stats = [(tag.div(class_=kind),
                               tag.span(count, ' ',
                                        count > 1 and
@@ -964,6 +1153,10 @@ class ChangesetModule(Component):
                                         'copies' or kind + 's') or kind))
                              for kind in Changeset.ALL_CHANGES
                              for count in (filestats[kind],) if count]
+                    if added or removed:
+                        stats.append(tag.span(
+                            '(+%d/-%d)' % (added, removed), class_='lines',
+                            title=_("Lines added/removed")))
                     markup = tag.ul(
                         tag.li(stats, ' in ',
                                tag.strong(self._get_location(files) or '/')),
@@ -1047,6 +1240,7 @@ class ChangesetModule(Component):
 
     def _format_changeset_link(self, formatter, ns, chgset, label,
                                fullmatch=None):
+        formatter.depends_on('changeset')
         intertrac = formatter.shorthand_intertrac_helper(ns, chgset, label,
                                                          fullmatch)
         if intertrac:
@@ -1091,6 +1285,7 @@ class ChangesetModule(Component):
         return tag.a(label, class_="missing changeset", title=errmsg)
 
     def _format_diff_link(self, formatter, ns, target, label):
+        formatter.depends_on('changeset')
         params, query, fragment = formatter.split_link(target)
         def pathrev(path):
             if '@' in path:
@@ -1135,14 +1330,39 @@ class ChangesetModule(Component):
         repositories = {repos.params['id']: repos
                         for repos in rm.get_real_repositories()}
         uids_seen = set()
+        hits = SearchIndex(self.env).search(self.realm, terms, 'repository')
+        select = """
+            SELECT repos, rev, time, author, message
+            FROM revision WHERE """
         with self.env.db_query as db:
-            sql, args = search_to_sql(db, ['rev', 'message', 'author'], terms)
-            for id, rev, ts, author, log in db("""
-                    SELECT repos, rev, time, author, message
-                    FROM revision WHERE """ + sql, args):
+            if hits is None:
+                sql, args = search_to_sql(db, ['rev', 'message', 'author'],
+                                          terms)
+                rows = db(select + sql, args)
+                scores = {}
+            else:
+                scores = {}
+                revs = {}
+                for rev, id, score in hits:
+                    repos = repositories.get(int(id))
+                    if repos and hasattr(repos, 'db_rev'):
+                        # The index stores the revisions as strings
+                        try:
+                            rev = repos.db_rev(repos.normalize_rev(rev))
+                        except NoSuchChangeset:
+                            continue
+                        scores[(repos.id, rev)] = score
+                        revs.setdefault(repos.id, []).append(rev)
+                rows = []
+                for id, drevs in revs.items():
+                    for subset, holders in chunked_params(drevs, reserved=1):
+                        rows.extend(db(select + 'repos=%%s AND rev IN (%s)' %
+                                       holders, [id] + subset))
+            for id, rev, ts, author, log in rows:
                 repos = repositories.get(id)
                 if not repos:
                     continue  # revisions for a no longer active repository
+                score = scores.get((id, rev))
                 try:
                     rev = repos.normalize_rev(rev)
                     drev = repos.display_rev(rev)
@@ -1154,10 +1374,13 @@ class ChangesetModule(Component):
                 cset = repos.resource.child(self.realm, rev)
                 if 'CHANGESET_VIEW' in req.perm(cset):
                     uids_seen.add(uid)
-                    yield (req.href.changeset(rev, repos.reponame or None),
-                           '[%s]: %s' % (drev, shorten_line(log)),
-                           from_utimestamp(ts), author,
-                           shorten_result(log, terms))
+                    result = (req.href.changeset(rev, repos.reponame or None),
+                              '[%s]: %s' % (drev, shorten_line(log)),
+                              from_utimestamp(ts), author,
+                              shorten_result(log, terms))
+                    if score is not None:
+                        result += (score,)
+                    yield result
 
 
 class AnyDiffModule(Component):
@@ -361,6 +361,7 @@ class LogModule(Component):
     LOG_LINK_RE = re.compile(r"([^@:]*)[@:]%s?" % REV_RANGE)
 
     def _format_link(self, formatter, ns, match, label, fullmatch=None):
+        formatter.depends_on('changeset')
         if ns == 'log1':
             groups = fullmatch.groupdict()
             it_log = groups.get('it_log')
@@ -13,21 +13,24 @@
 
 import io
 import posixpath
+import tarfile
 import unittest
 import zipfile
 from datetime import datetime
 
-from trac.core import Component, TracError, implements
+from trac.core import Component, ComponentMeta, TracError, implements
 from trac.perm import PermissionError
-from trac.resource import ResourceNotFound
-from trac.test import Mock, MockRequest, makeSuite
+from trac.resource import Resource, ResourceNotFound
+from trac.test import EnvironmentStub, Mock, MockRequest, makeSuite, mkdtemp
 from trac.util.datefmt import utc
 from trac.util.text import to_utf8
 from trac.versioncontrol.api import (
     Changeset, DbRepositoryProvider, IRepositoryConnector, Node, NoSuchNode,
     Repository, RepositoryManager)
-from trac.versioncontrol.web_ui.browser import BrowserModule, IPropertyRenderer
+from trac.versioncontrol.web_ui.browser import BlameAnnotator, BrowserModule, \
+                                              IPropertyRenderer
 from trac.web.api import RequestDone
+from trac.web.chrome import web_context
 from trac.web.tests.api import RequestHandlerPermissionsTestCaseBase
 
 
@@ -440,6 +443,49 @@ anonymous = !BROWSER_VIEW, !FILE_VIEW
                          z.read('trunk/dir2/file.txt'))
         self.assertEqual((2017, 3, 31, 12, 34, 56), zi.date_time)
 
+    def test_zip_archive_not_modified(self):
+        req = MockRequest(self.env, path_info='/browser/trunk',
+                          args={'format': 'zip'})
+        self.assertRaises(RequestDone, self.process_request, req)
+        self.assertEqual(['200 Ok'], req.status_sent)
+        self.assertIn('Last-Modified', req.headers_sent)
+        etag = req.headers_sent['ETag']
+
+        req = MockRequest(self.env, path_info='/browser/trunk',
+                          args={'format': 'zip'})
+        req.environ['HTTP_IF_NONE_MATCH'] = etag
+        self.assertRaises(RequestDone, self.process_request, req)
+        self.assertEqual(['304 Not Modified'], req.status_sent)
+
+    def test_tar_gz_archive(self):
+        req = MockRequest(self.env, path_info='/browser/trunk',
+                          args={'format': 'tar.gz'})
+        rv = self.process_request(req)
+        self.assertEqual('browser.html', rv[0])
+        self.assertEqual(['zip'], [link['class'] for link
+                                   in req.chrome['links']['alternate']])
+
+        self.env.config.set('browser', 'archive_formats', 'zip, tar.gz')
+        req = MockRequest(self.env, path_info='/browser/trunk')
+        self.process_request(req)
+        self.assertEqual(['zip', 'tar.gz'],
+                         [link['class'] for link
+                          in req.chrome['links']['alternate']])
+
+        req = MockRequest(self.env, path_info='/browser/trunk',
+                          args={'format': 'tar.gz'})
+        self.assertRaises(RequestDone, self.process_request, req)
+        self.assertEqual('application/gzip',
+                         req.headers_sent['Content-Type'])
+        self.assertIn('trunk-', req.headers_sent['Content-Disposition'])
+        t = tarfile.open(fileobj=io.BytesIO(req.response_sent.getvalue()),
+                         mode='r:gz')
+        self.assertEqual(['trunk/dir1', 'trunk/dir1/file.txt',
+                          'trunk/dir2', 'trunk/dir2/file.txt'],
+                         sorted(t.getnames()))
+        self.assertEqual(b'Contents for trunk/dir1/file.txt',
+                         t.extractfile('trunk/dir1/file.txt').read())
+
     def test_properties_with_property_renderer(self):
         req = MockRequest(self.env, path_info='/browser/properties/file.txt')
         rv = self.process_request(req)
@@ -450,9 +496,85 @@ anonymous = !BROWSER_VIEW, !FILE_VIEW
                          rv[1]['properties'])
 
 
+class BlameAnnotatorTestCase(unittest.TestCase):
+
+    connector = None
+    calls = []
+
+    @classmethod
+    def setUpClass(cls):
+        t = datetime(2017, 3, 31, 12, 34, 56, tzinfo=utc)
+        calls = cls.calls
+
+        class BlameRepositoryConnector(Component):
+            implements(IRepositoryConnector)
+
+            def get_supported_types(self):
+                yield 'blame-mock', 8
+
+            def get_repository(self, repos_type, repos_dir, params):
+                def get_annotations():
+                    calls.append('get_annotations')
+                    return [1, 2, 1]
+
+                def get_history():
+                    calls.append('get_history')
+                    yield 'file.txt', 2, Changeset.EDIT
+                    yield 'old.txt', 1, Changeset.ADD
+
+                def get_node(path, rev):
+                    return Mock(Node, repos, path, rev, Node.FILE,
+                                created_path=path, created_rev=2,
+                                get_annotations=get_annotations,
+                                get_history=get_history)
+
+                repos = Mock(Repository, params['name'], params, self.log,
+                             get_base=lambda: 'mock:' + repos_dir,
+                             get_node=get_node,
+                             get_changeset=lambda rev: Mock(
+                                 Changeset, repos, rev, 'message', 'author',
+                                 t))
+                return repos
+
+        cls.connector = BlameRepositoryConnector
+
+    @classmethod
+    def tearDownClass(cls):
+        ComponentMeta.deregister(cls.connector)
+
+    def setUp(self):
+        self.env = EnvironmentStub(enable=('trac.*', self.connector),
+                                   path=mkdtemp())
+        self.env.config.set('repositories', 'repos.dir', '/repos')
+        self.env.config.set('repositories', 'repos.type', 'blame-mock')
+        del self.calls[:]
+
+    def tearDown(self):
+        RepositoryManager(self.env).reload_repositories()
+        self.env.reset_db_and_disk()
+
+    def _annotator(self, rev):
+        resource = Resource('source', 'file.txt', version=rev,
+                            parent=Resource('repository', 'repos'))
+        return BlameAnnotator(self.env,
+                              web_context(MockRequest(self.env), resource))
+
+    def test_blame_cached(self):
+        annotator = self._annotator(3)
+        self.assertEqual([1, 2, 1], annotator.annotations)
+        self.assertEqual({1: 'old.txt', 2: 'file.txt'}, annotator.paths)
+        self.assertEqual(['get_annotations', 'get_history'], self.calls)
+
+        annotator = self._annotator(4)  # same created_rev
+        self.assertEqual([1, 2, 1], annotator.annotations)
+        self.assertEqual({1: 'old.txt', 2: 'file.txt'}, annotator.paths)
+        self.assertEqual(['get_annotations', 'get_history'], self.calls)
+
+
 def test_suite():
     suite = unittest.TestSuite()
     suite.addTest(makeSuite(BrowserModulePermissionsTestCase))
+    suite.addTest(makeSuite(BlameAnnotatorTestCase))
     return suite
 
 
@@ -11,11 +11,13 @@
 # individuals. For the exact contribution history, see the revision
 # history and logs, available at https://trac.edgewall.org/.
 
+import io
 import unittest
 
 from trac.core import TracError
-from trac.test import EnvironmentStub, MockRequest, makeSuite
-from trac.versioncontrol.web_ui.changeset import ChangesetModule
+from trac.test import EnvironmentStub, Mock, MockRequest, makeSuite, mkdtemp
+from trac.versioncontrol.api import Changeset, Node, Repository
+from trac.versioncontrol.web_ui.changeset import ChangesetModule, DiffStats
 
 
 class ChangesetModuleTestCase(unittest.TestCase):
@@ -30,9 +32,73 @@ class ChangesetModuleTestCase(unittest.TestCase):
         self.assertRaises(TracError, self.cm.process_request, req)
 
 
+class DiffStatsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub(path=mkdtemp())
+        self.cm = ChangesetModule(self.env)
+        contents = {
+            ('file.txt', 1): b'a\nb\nc\n',
+            ('file.txt', 2): b'a\nB\nc\nd\n',
+            ('image.png', 1): b'\x89PNG\x00\x01',
+            ('image.png', 2): b'\x89PNG\x00\x02\x03',
+        }
+
+        def get_node(path, rev):
+            content = contents[(path, rev)]
+            return Mock(Node, None, path, rev, Node.FILE, path=path,
+                        get_content_type=lambda: None,
+                        get_content=lambda: io.BytesIO(content),
+                        get_content_length=lambda: len(content))
+        self.repos = Mock(Repository, 'repos', {'name': 'repos', 'id': 1},
+                          None, get_node=get_node)
+        self.changeset = Mock(Changeset, self.repos, 2, 'message', 'joe',
+                              None, get_changes=lambda: iter([
+            ('file.txt', Node.FILE, Changeset.EDIT, 'file.txt', 1),
+            ('image.png', Node.FILE, Changeset.EDIT, 'image.png', 1),
+            ('new.txt', Node.FILE, Changeset.ADD, None, None),
+        ]))
+
+    def tearDown(self):
+        self.env.reset_db_and_disk()
+
+    def test_diff_stats_on_sync(self):
+        self.env.config.set('changeset', 'diff_stats_on_sync', 'enabled')
+        self.cm.changeset_added(self.repos, self.changeset)
+
+        self.assertEqual({'file.txt': DiffStats(6, 8, False, 2, 1),
+                          'image.png': DiffStats(6, 7, True, None, None)},
+                         self.cm._get_diff_stats(self.repos, 2))
+        self.assertEqual({}, self.cm._get_diff_stats(self.repos, 1))
+
+    def test_diff_stats_not_on_sync(self):
+        self.cm.changeset_added(self.repos, self.changeset)
+
+        self.assertEqual({}, self.cm._get_diff_stats(self.repos, 2))
+
+    def test_diff_stats_saved_once(self):
+        stats = {'file.txt': DiffStats(6, 8, False, 2, 1)}
+        self.cm._save_diff_stats(self.repos, 2, stats)
+        self.cm._save_diff_stats(self.repos, 2, stats)
+
+        self.assertEqual(stats, self.cm._get_diff_stats(self.repos, 2))
+
+    def test_diff_stats_batch(self):
+        stats2 = {'file.txt': DiffStats(6, 8, False, 2, 1)}
+        stats3 = {'file.txt': DiffStats(8, 6, False, 1, 2),
+                  'image.png': DiffStats(6, 7, True, None, None)}
+        self.cm._save_diff_stats(self.repos, 2, stats2)
+        self.cm._save_diff_stats(self.repos, 3, stats3)
+
+        self.assertEqual({'2': stats2, '3': stats3},
+                         self.cm._get_diff_stats_batch(self.repos,
+                                                       [1, 2, 3]))
+
+
 def test_suite():
     suite = unittest.TestSuite()
     suite.addTest(makeSuite(ChangesetModuleTestCase))
+    suite.addTest(makeSuite(DiffStatsTestCase))
     return suite
 
 
@@ -14,7 +14,8 @@
 import unittest
 
 from trac.test import Mock, makeSuite
-from trac.versioncontrol.api import EmptyChangeset, NoSuchChangeset
+from trac.versioncontrol.api import EmptyChangeset, NoSuchChangeset, \
+                                    Repository
 from trac.versioncontrol.web_ui import util
 
 
@@ -23,7 +24,8 @@ class UtilTestCase(unittest.TestCase):
     def test_get_changes_raises_nosuchchangeset(self):
         def get_changeset(rev):
             raise NoSuchChangeset(rev)
-        repos = Mock(get_changeset=lambda rev: get_changeset(rev))
+        repos = Mock(Repository, 'repos', {'name': 'repos', 'id': 1}, None,
+                     get_changeset=lambda rev: get_changeset(rev))
 
         rev = 1
         changes = util.get_changes(repos, (rev, ))
@@ -16,21 +16,20 @@
 # Author: Jonas Borgström <jonas@edgewall.com>
 #         Christian Boos <cboos@edgewall.org>
 
-from tempfile import TemporaryFile
-from zipfile import ZipFile, ZIP_DEFLATED
-
 from trac.resource import ResourceNotFound
-from trac.util import content_disposition, create_zipinfo
+from trac.util import content_disposition
+from trac.util.archive import archive_writers, open_stream
 from trac.util.datefmt import http_date
 from trac.util.html import tag
 from trac.util.translation import tag_, _
 from trac.versioncontrol.api import EmptyChangeset, NoSuchChangeset, \
                                     NoSuchNode
 from trac.web.api import RequestDone
+from trac.web.chrome import add_link
 
-__all__ = ['content_closing', 'get_changes', 'get_path_links',
-           'get_existing_node', 'get_allowed_node', 'make_log_graph',
-           'render_zip']
+__all__ = ['add_archive_link', 'content_closing', 'get_changes',
+           'get_path_links', 'get_existing_node', 'get_allowed_node',
+           'make_log_graph', 'render_archive', 'render_zip']
 
 
 class content_closing(object):
@@ -47,18 +46,14 @@ class content_closing(object):
 
 
 def get_changes(repos, revs, log=None):
-    changes = {}
+    revs = set(revs)
+    changes = repos.get_changesets_batch(revs)
     for rev in revs:
-        if rev in changes:
-            continue
-        try:
-            changeset = repos.get_changeset(rev)
-        except NoSuchChangeset:
-            changeset = EmptyChangeset(repos, rev)
+        if rev not in changes:
+            changes[rev] = EmptyChangeset(repos, rev)
             if log is not None:
                 log.warning("Unable to get changeset [%s] in %s", rev,
                             repos.reponame or '(default)')
-        changes[rev] = changeset
     return changes
 
 
@@ -185,7 +180,21 @@ def make_log_graph(repos, revs):
     return threads, vertices, columns
 
 
-def render_zip(req, filename, repos, root_node, iter_nodes):
+def add_archive_link(req, href, format):
+    """Add an alternate link for downloading an archive in the given
+    `format`.
+
+    :since: 1.7.1
+    """
+    title = {'zip': _("Zip Archive"),
+             'tar.gz': _("Tar.gz Archive")}.get(format, format)
+    writer_class = archive_writers[format]
+    add_link(req, 'alternate', href, title, writer_class.mimetype,
+             writer_class.extension)
+
+
+def render_zip(req, filename, repos, root_node, iter_nodes,
+               is_compressible=None):
     """Send a ZIP file containing the data corresponding to the `nodes`
     iterable.
 
@@ -195,9 +204,36 @@ def render_zip(req, filename, repos, root_node, iter_nodes):
     :param iter_nodes: callable taking the optional *root_node* as input
                        and generating the `~trac.versioncontrol.api.Node`
                        for which the content should be added into the zip.
+
+    :param is_compressible: optional callable taking a path and
+                            returning whether its content should be
+                            compressed (''since 1.7.1'')
     """
+    render_archive(req, filename, repos, root_node, iter_nodes, 'zip',
+                   is_compressible)
+
+
+def render_archive(req, filename, repos, root_node, iter_nodes,
+                   format='zip', is_compressible=None):
+    """Send an archive in the given `format` containing the data
+    corresponding to the `nodes` iterable, as `render_zip` does.
+
+    The archive is streamed to the client while it is generated. When
+    *root_node* is given, the response is cacheable using the
+    "ETag" and "Last-Modified" headers.
+
+    :param format: one of the formats of `trac.util.archive`, `zip` or
+                   `tar.gz`.
+
+    :since: 1.7.1
+    """
+    writer_class = archive_writers[format]
+    if root_node:
+        req.check_modified(root_node.last_modified,
+                           [format, repos.reponame, root_node.path,
+                            root_node.rev])
     req.send_response(200)
-    req.send_header('Content-Type', 'application/zip')
+    req.send_header('Content-Type', writer_class.mimetype)
     req.send_header('Content-Disposition',
                     content_disposition('inline', filename))
     if root_node:
@@ -213,45 +249,31 @@ def render_zip(req, filename, repos, root_node, iter_nodes):
     root_len = len(root_path)
     req.end_headers()
 
-    def write_partial(fileobj, start):
-        end = fileobj.tell()
-        fileobj.seek(start, 0)
-        remaining = end - start
-        while remaining > 0:
-            chunk = fileobj.read(min(remaining, 4096))
-            req.write(chunk)
-            remaining -= len(chunk)
-        fileobj.seek(end, 0)
-        return end
-
-    pos = 0
-    with TemporaryFile(prefix='trac-', suffix='.zip') as fileobj:
-        with ZipFile(fileobj, 'w', ZIP_DEFLATED) as zipfile:
+    with open_stream(req.write) as fileobj:
+        with writer_class(fileobj) as writer:
             for node in iter_nodes(root_node):
                 if node is root_node:
                     continue
                 path = node.path.strip('/')
                 assert path.startswith(root_path)
                 path = root_name + path[root_len:]
-                kwargs = {'mtime': node.last_modified}
-                data = None
+                mtime = node.last_modified
                 if node.isfile:
                     with content_closing(
                             node.get_processed_content(eol_hint='CRLF')) \
                             as content:
                         data = content.read()
                     props = node.get_properties()
+                    symlink = False
                     # Subversion specific
-                    if 'svn:special' in props and data.startswith('link '):
+                    if 'svn:special' in props and data.startswith(b'link '):
                         data = data[5:]
-                        kwargs['symlink'] = True
-                    if 'svn:executable' in props:
-                        kwargs['executable'] = True
+                        symlink = True
+                    compress = is_compressible is None or \
+                               is_compressible(path)
+                    writer.add_file(path, data, mtime=mtime,
+                                    executable='svn:executable' in props,
+                                    symlink=symlink, compress=compress)
                 elif node.isdir and path:
-                    kwargs['dir'] = True
-                    data = ''
-                if data is not None:
-                    zipfile.writestr(create_zipinfo(path, **kwargs), data)
-                    pos = write_partial(fileobj, pos)
-        write_partial(fileobj, pos)
+                    writer.add_dir(path, mtime=mtime)
     raise RequestDone
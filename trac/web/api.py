@@ -795,6 +795,7 @@ class Request(object):
             # Disable XSS protection (#12926)
             self.send_header('X-XSS-Protection', 0)
         self._send_configurable_headers()
+        self._send_server_timing_header()
         self._send_cookie_headers()
         self._write = self._start_response(self._status, self._outheaders,
                                            exc_info)
@@ -1073,6 +1074,11 @@ class Request(object):
             if name.lower() not in sent_headers:
                 self.send_header(name, val)
 
+    def _send_server_timing_header(self):
+        server_timing = getattr(self, 'server_timing', None)
+        if server_timing:
+            self.send_header('Server-Timing', server_timing)
+
     def _send_cookie_headers(self):
         for name in list(self.outcookie):
             path = self.outcookie[name].get('path')
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+import gc
+import threading
+import time
+
+from trac.config import BoolOption, ChoiceOption, FloatOption, IntOption
+from trac.core import Component
+from trac.util.profiling import get_profile
+
+__all__ = ['GarbageCollector', 'get_gc_stats']
+
+
+class _Stats(object):
+    """Process-wide state of the garbage collection."""
+
+    lock = threading.Lock()
+    active_requests = 0
+    served_requests = 0
+    last_request = 0.0
+    last_collection = 0.0
+    forced_collections = 0
+    frozen = False
+    idle_thread = None
+
+    # Measured by `_gc_callback` for all collections, automatic or not
+    collections = 0
+    pause_time = 0.0
+    max_pause = 0.0
+
+
+_local = threading.local()
+
+
+def _gc_callback(phase, info):
+    # No lock must be taken here, as the collection can be triggered
+    # by any allocation, including one made while holding the lock.
+    if phase == 'start':
+        _local.start = time.perf_counter()
+        return
+    start = getattr(_local, 'start', None)
+    if start is None:
+        return
+    _local.start = None
+    duration = time.perf_counter() - start
+    _Stats.collections += 1
+    _Stats.pause_time += duration
+    if duration > _Stats.max_pause:
+        _Stats.max_pause = duration
+    profile = get_profile()
+    if profile is not None:
+        profile.add_gc(duration)
+
+
+def get_gc_stats():
+    """Return a dictionary with the number of garbage collections
+    done by the process (`collections`), the number of those forced
+    after requests (`forced`), and the total and maximum pause times
+    in seconds (`pause_time`, `max_pause`).
+
+    :since: 1.7.1
+    """
+    return {'collections': _Stats.collections,
+            'forced': _Stats.forced_collections,
+            'pause_time': _Stats.pause_time,
+            'max_pause': _Stats.max_pause}
+
+
+class GarbageCollector(Component):
+    """Schedule the full garbage collections of the web front-ends.
+
+    A full collection of a large heap can take tens of milliseconds,
+    during which the other threads of the process are stalled. The
+    `[trac] gc_policy` option selects when it is done:
+
+     - `request`: after every request (the historical behavior),
+     - `interval`: every `gc_interval` requests,
+     - `threshold`: after a request when more than `gc_threshold`
+       collections of the younger generations happened since the
+       last full collection,
+     - `idle`: in a background thread, when no request has been
+       processed for `gc_idle_delay` seconds,
+     - `off`: never, leaving it to the automatic collection.
+
+    The collections and their pause times are reported to the request
+    profiles and by `get_gc_stats`.
+
+    :since: 1.7.1
+    """
+
+    policy = ChoiceOption('trac', 'gc_policy',
+                          ['request', 'interval', 'threshold', 'idle', 'off'],
+        """When to do a full garbage collection in the web front-ends:
+        `request` after every request, `interval` every `gc_interval`
+        requests, `threshold` when the number of collections of the
+        younger generations since the last full collection exceeds
+        `gc_threshold`, `idle` when the process has been idle for
+        `gc_idle_delay` seconds, or `off` to rely on the automatic
+        collection only. The policy applies to the whole process.
+        (''since 1.7.1'')
+        """)
+
+    interval = IntOption('trac', 'gc_interval', 100,
+        """Number of requests between two full garbage collections
+        with the `interval` policy. (''since 1.7.1'')
+        """)
+
+    threshold = IntOption('trac', 'gc_threshold', 10,
+        """Number of collections of the younger generations after which
+        a full garbage collection is done with the `threshold` policy.
+        (''since 1.7.1'')
+        """)
+
+    idle_delay = FloatOption('trac', 'gc_idle_delay', 30,
+        """Number of seconds without request after which a full garbage
+        collection is done with the `idle` policy. At most one
+        collection is done per delay. (''since 1.7.1'')
+        """)
+
+    freeze = BoolOption('trac', 'gc_freeze', 'false',
+        """Move the objects existing after the first request of the
+        process to a permanent generation ignored by the garbage
+        collector, so that the modules, components and templates
+        loaded while warming up are not scanned again by each full
+        collection. (''since 1.7.1'')
+        """)
+
+    def __init__(self):
+        with _Stats.lock:
+            if _gc_callback not in gc.callbacks:
+                gc.callbacks.append(_gc_callback)
+
+    def start_request(self, req):
+        """Note the start of the processing of a request."""
+        with _Stats.lock:
+            _Stats.active_requests += 1
+
+    def end_request(self, req):
+        """Note the end of the processing of a request, and do a full
+        collection if the policy says so.
+        """
+        with _Stats.lock:
+            _Stats.active_requests -= 1
+            _Stats.served_requests += 1
+            _Stats.last_request = time.time()
+            served = _Stats.served_requests
+            warm_up = self.freeze and not _Stats.frozen
+            if warm_up:
+                _Stats.frozen = True
+        if warm_up:
+            self.collect()
+            gc.freeze()
+            self.log.info("%d objects moved to the permanent generation "
+                          "of the garbage collector", gc.get_freeze_count())
+            return
+
+        policy = self.policy
+        if policy == 'request':
+            self.collect()
+        elif policy == 'interval':
+            if served % max(self.interval, 1) == 0:
+                self.collect()
+        elif policy == 'threshold':
+            if gc.get_count()[2] >= self.threshold:
+                self.collect()
+        elif policy == 'idle':
+            self._start_idle_thread()
+
+    def collect(self):
+        """Do a full garbage collection."""
+        # Note: enable the '##' lines as soon as there's a suspicion
+        #       of memory leak due to uncollectable objects (typically
+        #       objects with a __del__ method caught in a cycle)
+        #
+        ##gc.set_debug(gc.DEBUG_UNCOLLECTABLE)
+        unreachable = gc.collect()
+        ##self.log.debug("%d unreachable objects found.", unreachable)
+        ##uncollectable = len(gc.garbage)
+        ##if uncollectable:
+        ##    del gc.garbage[:]
+        ##    self.log.warning("%d uncollectable objects found.",
+        ##                     uncollectable)
+        with _Stats.lock:
+            _Stats.forced_collections += 1
+            _Stats.last_collection = time.time()
+        return unreachable
+
+    # Internal methods
+
+    def _start_idle_thread(self):
+        with _Stats.lock:
+            if _Stats.idle_thread is not None:
+                return
+            thread = _Stats.idle_thread = \
+                threading.Thread(target=self._idle_loop,
+                                 name='GarbageCollector')
+            thread.daemon = True
+        thread.start()
+
+    def _idle_loop(self):
+        while True:
+            delay = max(self.idle_delay, 1)
+            time.sleep(delay)
+            with _Stats.lock:
+                idle = _Stats.active_requests == 0 and \
+                       time.time() - _Stats.last_request >= delay and \
+                       _Stats.last_collection < _Stats.last_request
+            if idle:
+                self.collect()
@@ -18,7 +18,6 @@
 
 import fnmatch
 from functools import partial
-import gc
 import io
 import locale
 import os
@@ -26,24 +25,28 @@ import pkg_resources
 from pprint import pformat, pprint
 import re
 import sys
+import time
 import traceback
 from urllib.parse import urlparse
 
 from jinja2 import FileSystemLoader
 
 from trac import __version__ as TRAC_VERSION
-from trac.config import BoolOption, ChoiceOption, ConfigSection, \
-                        ConfigurationError, ExtensionOption, Option, \
-                        OrderedExtensionsOption
+from trac.config import BoolOption, ChoiceOption, Configuration, \
+                        ConfigSection, ConfigurationError, ExtensionOption, \
+                        Option, OrderedExtensionsOption
 from trac.core import *
+import trac.env
 from trac.env import open_environment
 from trac.loader import get_plugin_info, match_plugins_to_frames
 from trac.perm import PermissionCache, PermissionError
 from trac.resource import ResourceNotFound
-from trac.util import arity, get_frame_info, get_last_traceback, hex_entropy, \
-                      lazy, read_file, safe_repr, translation
+from trac.util import arity, as_int, get_frame_info, get_last_traceback, \
+                      hex_entropy, lazy, read_file, safe_repr, translation
 from trac.util.concurrency import get_thread_id
-from trac.util.datefmt import format_datetime, localtz, timezone, user_time
+from trac.util.datefmt import datetime_now, format_datetime, localtz, \
+                              timezone, user_time, utc
+from trac.util.profiling import get_profile, phase
 from trac.util.html import tag, valid_html_bytes
 from trac.util.text import (exception_to_unicode, jinja2env, shorten_line,
                             to_unicode, to_utf8, unicode_quote)
@@ -56,7 +59,9 @@ from trac.web.api import HTTPBadRequest, HTTPException, HTTPForbidden, \
                          is_valid_default_handler, parse_header
 from trac.web.chrome import Chrome, ITemplateProvider, add_notice, \
                             add_stylesheet, add_warning
+from trac.web.gcpolicy import GarbageCollector
 from trac.web.href import Href
+from trac.web.profiling import RequestProfiler
 from trac.web.session import SessionDict, Session
 
 #: This URL is used for semi-automatic bug reports (see
@@ -87,6 +92,9 @@ class FakePerm(object):
 
     __contains__ = has_permission
 
+    def filter(self, action, resources):
+        return []
+
     def require(self, action, realm_or_resource=None, id=False, version=False,
                 message=None):
         if message is None:
@@ -211,7 +219,12 @@ class RequestDispatcher(Component):
             # pre-process any incoming request, whether a handler
             # was found or not
             self.log.debug("Chosen handler is %s", chosen_handler)
-            chosen_handler = self._pre_process_request(req, chosen_handler)
+            with phase('filters'):
+                chosen_handler = self._pre_process_request(req,
+                                                           chosen_handler)
+            profile = get_profile()
+            if profile is not None and chosen_handler:
+                profile.handler = chosen_handler.__class__.__name__
             if not chosen_handler:
                 if req.path_info.endswith('/'):
                     # Strip trailing / and redirect
@@ -244,10 +257,12 @@ class RequestDispatcher(Component):
                                            ' %(msg)s', msg=msg))
 
             # Process the request and render the template
-            resp = chosen_handler.process_request(req)
+            with phase('handler'):
+                resp = chosen_handler.process_request(req)
             if resp:
-                template, data, metadata = \
-                    self._post_process_request(req, *resp)
+                with phase('filters'):
+                    template, data, metadata = \
+                        self._post_process_request(req, *resp)
                 if 'hdfdump' in req.args:
                     req.perm.require('TRAC_ADMIN')
                     # debugging helper - no need to render first
@@ -262,19 +277,23 @@ class RequestDispatcher(Component):
                 self.log.debug("Rendering response with template %s", template)
                 metadata.setdefault('iterable', chrome.use_chunked_encoding)
                 content_type = metadata.get('content_type')
-                output = chrome.render_template(req, template, data, metadata)
+                with phase('render'):
+                    output = chrome.render_template(req, template, data,
+                                                    metadata)
                 req.send(output, content_type or 'text/html')
             else:
                 self.log.debug("Empty or no response from handler. "
                                "Entering post_process_request.")
-                self._post_process_request(req)
+                with phase('filters'):
+                    self._post_process_request(req)
         except RequestDone:
             raise
         except Exception as e:
             # post-process the request in case of errors
             err = sys.exc_info()
             try:
-                self._post_process_request(req)
+                with phase('filters'):
+                    self._post_process_request(req)
             except RequestDone:
                 raise
             except TracError as e2:
@@ -325,6 +344,7 @@ class RequestDispatcher(Component):
             'use_xsendfile': self._get_use_xsendfile,
             'xsendfile_header': self._get_xsendfile_header,
             'configurable_headers': self._get_configurable_headers,
+            'server_timing': self._get_server_timing,
         })
 
     @lazy
@@ -451,6 +471,9 @@ class RequestDispatcher(Component):
     def _get_configurable_headers(self, req):
         return iter(self._configurable_headers)
 
+    def _get_server_timing(self, req):
+        return RequestProfiler(self.env).get_server_timing()
+
     def _pre_process_request(self, req, chosen_handler):
         for filter_ in self.filters:
             chosen_handler = filter_.pre_process_request(req, chosen_handler)
@@ -502,6 +525,8 @@ def dispatch_request(environ, start_response):
                        os.getenv('TRAC_ENV_PARENT_DIR'))
     environ.setdefault('trac.env_index_template',
                        os.getenv('TRAC_ENV_INDEX_TEMPLATE'))
+    environ.setdefault('trac.env_cache_size',
+                       os.getenv('TRAC_ENV_CACHE_SIZE'))
     environ.setdefault('trac.template_vars',
                        os.getenv('TRAC_TEMPLATE_VARS'))
     environ.setdefault('trac.locale', '')
@@ -509,6 +534,9 @@ def dispatch_request(environ, start_response):
                        os.getenv('TRAC_BASE_URL'))
 
     locale.setlocale(locale.LC_ALL, environ['trac.locale'])
+    if environ['trac.env_cache_size']:
+        trac.env.env_cache_size = as_int(environ['trac.env_cache_size'], 0,
+                                         min=0)
 
     # Determine the environment
     env_path = environ.get('trac.env_path')
@@ -574,6 +602,7 @@ def dispatch_request(environ, start_response):
     except Exception as e:
         env_error = e
     else:
+        _env_activity[env_path] = datetime_now(utc)
         if env.base_url_for_redirect:
             environ['trac.base_url'] = env.base_url
 
@@ -600,11 +629,17 @@ def dispatch_request(environ, start_response):
         env.abs_href = req.abs_href
     translation.make_activable(lambda: req.locale, env.path if env else None)
     resp = []
+    profiler = collector = None
     try:
         if env_error:
             raise HTTPInternalServerError(env_error)
         dispatcher = RequestDispatcher(env)
         dispatcher.set_default_callbacks(req)
+        profiler = RequestProfiler(env)
+        profiler.start_request(req)
+        if not run_once:
+            collector = GarbageCollector(env)
+            collector.start_request(req)
         try:
             dispatcher.dispatch(req)
         except RequestDone as req_done:
@@ -617,22 +652,13 @@ def dispatch_request(environ, start_response):
         resp = resp or req._response or []
     finally:
         translation.deactivate()
+        if profiler is not None:
+            profiler.end_request(req)
         if env and not run_once:
             env.shutdown(get_thread_id())
             # Now it's a good time to do some clean-ups
-            #
-            # Note: enable the '##' lines as soon as there's a suspicion
-            #       of memory leak due to uncollectable objects (typically
-            #       objects with a __del__ method caught in a cycle)
-            #
-            ##gc.set_debug(gc.DEBUG_UNCOLLECTABLE)
-            unreachable = gc.collect()
-            ##env.log.debug("%d unreachable objects found.", unreachable)
-            ##uncollectable = len(gc.garbage)
-            ##if uncollectable:
-            ##    del gc.garbage[:]
-            ##    env.log.warning("%d uncollectable objects found.",
-            ##                    uncollectable)
+            if collector is not None:
+                collector.end_request(req)
         return resp
 
 
@@ -823,20 +849,17 @@ def send_project_index(environ, start_response, parent_dir=None,
             data[key] = val
 
     href = Href(req.base_path)
+    use_cache = not environ['wsgi.run_once']
     projects = []
     for env_name, env_path in get_environments(environ).items():
         try:
-            env = open_environment(env_path,
-                                   use_cache=not environ['wsgi.run_once'])
+            name, description = get_project_info(env_path)
         except Exception as e:
             proj = {'name': env_name, 'description': to_unicode(e)}
         else:
-            proj = {
-                'env': env,
-                'name': env.project_name,
-                'description': env.project_description,
-                'href': href(env_name)
-            }
+            proj = _Project(env_path, use_cache, name=name,
+                            description=description, href=href(env_name),
+                            last_activity=_env_activity.get(env_path))
         projects.append(proj)
     projects.sort(key=lambda proj: proj['name'].lower())
 
@@ -853,6 +876,99 @@ def send_project_index(environ, start_response, parent_dir=None,
         pass
 
 
+class _Project(dict):
+    """Project listed in the index page.
+
+    The environment is only opened when the `env` key is accessed, for
+    example by a custom index template.
+    """
+
+    def __init__(self, env_path, use_cache, **kwargs):
+        dict.__init__(self, **kwargs)
+        self._env_path = env_path
+        self._use_cache = use_cache
+
+    def __missing__(self, key):
+        if key != 'env':
+            raise KeyError(key)
+        env = self['env'] = open_environment(self._env_path,
+                                             use_cache=self._use_cache)
+        return env
+
+
+#: Time of the last request to each environment served by the process
+_env_activity = {}
+
+#: Configuration of the environments listed in the index page
+_project_configs = {}
+
+#: Names of the environment directories of the parent directories
+_env_dirs = {}
+
+#: Modification times more recent than this number of seconds are not
+#: trusted for caching, as a change in the same clock tick goes unnoticed
+_mtime_granularity = 2
+
+
+def get_project_info(env_path):
+    """Return the name and description of the project at `env_path`.
+
+    The environment is not opened: its configuration file is read and
+    cached until it is modified. An environment already opened by the
+    process is used directly.
+
+    :since: 1.7.1
+    """
+    env = trac.env.env_cache.get(env_path)
+    if env is not None:
+        return env.project_name, env.project_description
+    config = _project_configs.get(env_path)
+    if config is None:
+        with open(os.path.join(env_path, 'VERSION'), encoding='utf-8') as f:
+            version = f.readline().rstrip()
+        if version != trac.env._VERSION:
+            raise TracError(_("Unknown Trac environment type '%(type)s'",
+                              type=version))
+        config = Configuration(os.path.join(env_path, 'conf', 'trac.ini'))
+        _project_configs[env_path] = config
+    else:
+        config.parse_if_needed()
+    return config.get('project', 'name'), config.get('project', 'descr')
+
+
+def _get_env_dirs(env_parent_dir):
+    """Return the names of the directories in `env_parent_dir` which
+    don't match the `.tracignore` patterns.
+
+    The names are cached until the modification time of the directory,
+    which changes when entries are added, removed or renamed, or of
+    its `.tracignore` file changes.
+    """
+    try:
+        st = os.stat(os.path.join(env_parent_dir, '.tracignore'))
+    except OSError:
+        tracignore = None
+    else:
+        tracignore = (st.st_mtime_ns, st.st_size)
+    mtime = os.stat(env_parent_dir).st_mtime_ns
+    key = (mtime, tracignore)
+    cached = _env_dirs.get(env_parent_dir)
+    if cached and cached[0] == key:
+        return cached[1]
+    ignore_patterns = get_tracignore_patterns(env_parent_dir)
+    names = [name for name in os.listdir(env_parent_dir)
+                  if os.path.isdir(os.path.join(env_parent_dir, name)) and
+                  not any(fnmatch.fnmatch(name, pattern)
+                          for pattern in ignore_patterns)]
+    recent = time.time() - _mtime_granularity
+    if mtime / 1e9 < recent and (not tracignore or
+                                 tracignore[0] / 1e9 < recent):
+        _env_dirs[env_parent_dir] = key, names
+    else:
+        _env_dirs.pop(env_parent_dir, None)
+    return names
+
+
 def get_tracignore_patterns(env_parent_dir):
     """Return the list of patterns from env_parent_dir/.tracignore or
     a default pattern of `".*"` if the file doesn't exist.
@@ -871,23 +987,18 @@ def get_environments(environ, warn=False):
     The environments may not be all valid environments, but they are
     good candidates.
     """
-    env_paths = environ.get('trac.env_paths', [])
+    env_paths = [os.path.normpath(env_path)
+                 for env_path in environ.get('trac.env_paths') or []]
+    env_paths = [env_path for env_path in env_paths
+                 if os.path.isdir(env_path)]
     env_parent_dir = environ.get('trac.env_parent_dir')
     if env_parent_dir:
         env_parent_dir = os.path.normpath(env_parent_dir)
         # Filter paths that match the .tracignore patterns
-        ignore_patterns = get_tracignore_patterns(env_parent_dir)
-        paths = [name for name in os.listdir(env_parent_dir)
-                      if os.path.isdir(os.path.join(env_parent_dir, name)) and
-                      not any(fnmatch.fnmatch(name, pattern)
-                              for pattern in ignore_patterns)]
         env_paths.extend(os.path.join(env_parent_dir, project)
-                         for project in paths)
+                         for project in _get_env_dirs(env_parent_dir))
     envs = {}
     for env_path in env_paths:
-        env_path = os.path.normpath(env_path)
-        if not os.path.isdir(env_path):
-            continue
         env_name = os.path.split(env_path)[1]
         if env_name in envs:
             if warn:
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+import hashlib
+import threading
+import time
+
+from trac.admin.api import IAdminCommandProvider, IAdminPanelProvider
+from trac.config import BoolOption, FloatOption
+from trac.core import Component, implements
+from trac.util import as_int
+from trac.util.profiling import get_profile, start_profile, stop_profile
+from trac.util.text import exception_to_unicode, print_table, shorten_line
+from trac.util.translation import _
+from trac.web.chrome import add_notice
+
+__all__ = ['RequestProfiler']
+
+
+def _usec(seconds):
+    return int(seconds * 1000000)
+
+
+def _msec(usec, count=1):
+    return '%.1f' % (usec / 1000.0 / count) if count else '0.0'
+
+
+class RequestProfiler(Component):
+    """Collect the timings of the requests.
+
+    When enabled, the time spent in the request filters, the request
+    handler and the template rendering, the number and duration of the
+    SQL statements and the cache hits and misses are recorded for each
+    request. The statistics are aggregated by request handler and by
+    normalized SQL statement, and saved periodically in the database,
+    from where they are reported by the ''Profiling'' admin panel and
+    the `profile report` command of `trac-admin`.
+
+    :since: 1.7.1
+    """
+
+    implements(IAdminCommandProvider, IAdminPanelProvider)
+
+    request_profiling = BoolOption('trac', 'request_profiling', 'false',
+        """Record the timings of the requests and aggregate them by
+        request handler and by SQL statement. The statistics are
+        shown in the ''Profiling'' admin panel and by the
+        `profile report` command of `trac-admin`.
+        (''since 1.7.1'')
+        """)
+
+    server_timing_header = BoolOption('trac', 'server_timing_header',
+                                      'false',
+        """Send a `Server-Timing` header with the duration of the
+        request filters, the request handler, the SQL statements and
+        the template rendering done before the response headers are
+        sent. The header is visible in the developer tools of the
+        browsers. (''since 1.7.1'')
+        """)
+
+    slow_request_threshold = FloatOption('trac', 'slow_request_threshold',
+                                         0,
+        """Requests taking longer than this number of seconds are
+        logged as warnings, with their timings and their slowest SQL
+        statements. `0` disables the logging. (''since 1.7.1'')
+        """)
+
+    slow_query_threshold = FloatOption('trac', 'slow_query_threshold', 0,
+        """SQL statements taking longer than this number of seconds
+        are logged as warnings, with the request which executed them.
+        `0` disables the logging. (''since 1.7.1'')
+        """)
+
+    #: Seconds between two saves of the statistics in the database
+    flush_interval = 60
+
+    #: Number of statements reported for a slow request
+    slow_statements = 5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers = {}
+        self._statements = {}
+        self._last_flush = time.time()
+
+    @property
+    def enabled(self):
+        """Whether the requests are profiled."""
+        return self.request_profiling or self.server_timing_header or \
+               self.slow_request_threshold > 0 or \
+               self.slow_query_threshold > 0
+
+    # IAdminCommandProvider methods
+
+    def get_admin_commands(self):
+        yield ('profile report', '[limit]',
+               """Show the aggregated request profiling statistics
+
+               The timings are averaged over the requests served by each
+               request handler, and the SQL statements taking the most
+               time overall are listed, up to `limit` statements
+               (default: 20).
+               """,
+               None, self._do_report)
+        yield ('profile reset', '',
+               'Reset the request profiling statistics',
+               None, self._do_reset)
+
+    def _do_report(self, limit=None):
+        limit = as_int(limit, 20, min=1)
+        print_table(self._handler_rows(), [
+            _("Handler"), _("Requests"), _("Slow"), _("Mean (ms)"),
+            _("Max (ms)"), _("Filters (ms)"), _("Handler (ms)"),
+            _("Render (ms)"), _("Queries"), _("SQL (ms)"),
+            _("Cache hits"), _("Cache misses")])
+        print_table([(shorten_line(statement, 60), executions,
+                      _msec(total), _msec(total, executions), _msec(max_))
+                     for statement, executions, total, max_
+                     in self.get_statement_stats(limit)],
+                    [_("Statement"), _("Executions"), _("Total (ms)"),
+                     _("Mean (ms)"), _("Max (ms)")])
+
+    def _do_reset(self):
+        self.reset()
+
+    # IAdminPanelProvider methods
+
+    def get_admin_panels(self, req):
+        if 'TRAC_ADMIN' in req.perm('admin', 'general/profiling'):
+            yield ('general', _("General"), 'profiling', _("Profiling"))
+
+    def render_admin_panel(self, req, cat, page, path_info):
+        if req.method == 'POST':
+            if 'reset' in req.args:
+                self.reset()
+                add_notice(req, _("The profiling statistics have been "
+                                  "reset."))
+            req.redirect(req.href.admin(cat, page))
+
+        data = {
+            'enabled': self.request_profiling,
+            'handlers': self._handler_rows(),
+            'statements': [(statement, executions, _msec(total),
+                            _msec(total, executions), _msec(max_))
+                           for statement, executions, total, max_
+                           in self.get_statement_stats(50)],
+        }
+        return 'admin_profiling.html', {'profiling': data}
+
+    # Public methods
+
+    def start_request(self, req):
+        """Start profiling the request `req`, if enabled."""
+        if self.enabled:
+            profile = start_profile()
+            profile.queue_time = req.environ.get('trac.queue_wait')
+
+    def end_request(self, req):
+        """Finish profiling the current request, log it if it is slow,
+        and record it in the statistics.
+        """
+        profile = stop_profile()
+        if profile is None:
+            return
+        slow = 0 < self.slow_request_threshold <= profile.duration
+        if slow:
+            self._log_slow_request(req, profile)
+        if self.slow_query_threshold > 0:
+            for statement, count, total, max_ in profile.get_statements():
+                if max_ >= self.slow_query_threshold:
+                    self.log.warning("Slow SQL statement (%.3fs) in %s "
+                                     "%s: %s", max_, req.method,
+                                     req.path_info, statement)
+        if self.request_profiling:
+            self.record(profile, slow)
+            if time.time() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def get_server_timing(self):
+        """Return the value of the `Server-Timing` header for the current
+        request, or `None`.
+        """
+        if self.server_timing_header:
+            profile = get_profile()
+            if profile is not None:
+                return profile.get_server_timing()
+
+    def record(self, profile, slow=False):
+        """Add the `RequestProfile` to the statistics of this process."""
+        phases = profile.phases
+        values = (1, 1 if slow else 0, _usec(profile.duration),
+                  _usec(profile.duration), _usec(phases.get('handler', 0)),
+                  _usec(phases.get('filters', 0)),
+                  _usec(phases.get('render', 0)), profile.sql_count,
+                  _usec(profile.sql_time), profile.cache_hits,
+                  profile.cache_misses)
+        statements = profile.get_statements()
+        with self._lock:
+            key = profile.handler or ''
+            stats = self._handlers.get(key)
+            if stats is None:
+                self._handlers[key] = list(values)
+            else:
+                for idx, value in enumerate(values):
+                    if idx == 3:
+                        stats[idx] = max(stats[idx], value)
+                    else:
+                        stats[idx] += value
+            for statement, count, total, max_ in statements:
+                stats = self._statements.get(statement)
+                if stats is None:
+                    self._statements[statement] = \
+                        [count, _usec(total), _usec(max_)]
+                else:
+                    stats[0] += count
+                    stats[1] += _usec(total)
+                    stats[2] = max(stats[2], _usec(max_))
+
+    def flush(self):
+        """Save the statistics of this process in the database."""
+        with self._lock:
+            handlers, self._handlers = self._handlers, {}
+            statements, self._statements = self._statements, {}
+            self._last_flush = time.time()
+        if not handlers and not statements:
+            return
+        try:
+            with self.env.db_transaction as db:
+                cursor = db.cursor()
+                for handler, values in handlers.items():
+                    self._save_handler(cursor, handler, values)
+                for statement, values in statements.items():
+                    self._save_statement(cursor, statement, values)
+        except Exception as e:
+            self.log.warning("Cannot save the request profiling "
+                             "statistics: %s", exception_to_unicode(e))
+
+    def get_handler_stats(self):
+        """Return the statistics of each request handler, as
+        `(handler, requests, slow, total_time, max_time, handler_time,
+        filters_time, render_time, sql_count, sql_time, cache_hits,
+        cache_misses)` tuples ordered by decreasing total time. The
+        times are in microseconds.
+        """
+        self.flush()
+        return self.env.db_query("""
+            SELECT handler, requests, slow, total_time, max_time,
+                   handler_time, filters_time, render_time, sql_count,
+                   sql_time, cache_hits, cache_misses
+            FROM request_stats ORDER BY total_time DESC, handler
+            """)
+
+    def get_statement_stats(self, limit=None):
+        """Return the statistics of the normalized SQL statements, as
+        `(statement, executions, total_time, max_time)` tuples ordered
+        by decreasing total time. The times are in microseconds.
+        """
+        self.flush()
+        return self.env.db_query("""
+            SELECT statement, executions, total_time, max_time
+            FROM request_sql_stats ORDER BY total_time DESC, statement
+            %s""" % ('LIMIT %d' % limit if limit else ''))
+
+    def reset(self):
+        """Discard the statistics."""
+        with self._lock:
+            self._handlers = {}
+            self._statements = {}
+        with self.env.db_transaction as db:
+            db("DELETE FROM request_stats")
+            db("DELETE FROM request_sql_stats")
+
+    # Internal methods
+
+    def _handler_rows(self):
+        rows = []
+        for handler, requests, slow, total_time, max_time, handler_time, \
+                filters_time, render_time, sql_count, sql_time, \
+                cache_hits, cache_misses in self.get_handler_stats():
+            rows.append((handler or _("(none)"), requests, slow,
+                         _msec(total_time, requests), _msec(max_time),
+                         _msec(filters_time, requests),
+                         _msec(handler_time, requests),
+                         _msec(render_time, requests),
+                         '%.1f' % (sql_count / requests),
+                         _msec(sql_time, requests), cache_hits,
+                         cache_misses))
+        return rows
+
+    def _log_slow_request(self, req, profile):
+        phases = ', '.join('%s %.3fs' % (name, profile.phases[name])
+                           for name in sorted(profile.phases))
+        statements = ''.join('\n  %d x %.3fs: %s' % (count, total,
+                                                    statement)
+                             for statement, count, total, max_
+                             in profile.get_statements(
+                                 self.slow_statements))
+        self.log.warning("Slow request (%.3fs) %s %s handled by %s: %s, "
+                         "%d SQL statements in %.3fs, %d cache hits, "
+                         "%d cache misses%s", profile.duration, req.method,
+                         req.path_info, profile.handler, phases or '-',
+                         profile.sql_count, profile.sql_time,
+                         profile.cache_hits, profile.cache_misses,
+                         statements)
+
+    def _save_handler(self, cursor, handler, values):
+        requests, slow, total_time, max_time, handler_time, filters_time, \
+            render_time, sql_count, sql_time, cache_hits, cache_misses = \
+            values
+        cursor.execute("""
+            UPDATE request_stats
+            SET requests=requests+%s, slow=slow+%s,
+                total_time=total_time+%s,
+                max_time=CASE WHEN max_time<%s THEN %s ELSE max_time END,
+                handler_time=handler_time+%s,
+                filters_time=filters_time+%s,
+                render_time=render_time+%s, sql_count=sql_count+%s,
+                sql_time=sql_time+%s, cache_hits=cache_hits+%s,
+                cache_misses=cache_misses+%s
+            WHERE handler=%s
+            """, (requests, slow, total_time, max_time, max_time,
+                  handler_time, filters_time, render_time, sql_count,
+                  sql_time, cache_hits, cache_misses, handler))
+        if cursor.rowcount != 1:
+            cursor.execute("""
+                INSERT INTO request_stats
+                  (handler, requests, slow, total_time, max_time,
+                   handler_time, filters_time, render_time, sql_count,
+                   sql_time, cache_hits, cache_misses)
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+                """, (handler,) + tuple(values))
+
+    def _save_statement(self, cursor, statement, values):
+        executions, total_time, max_time = values
+        id = hashlib.sha1(statement.encode('utf-8')).hexdigest()
+        cursor.execute("""
+            UPDATE request_sql_stats
+            SET executions=executions+%s, total_time=total_time+%s,
+                max_time=CASE WHEN max_time<%s THEN %s ELSE max_time END
+            WHERE id=%s
+            """, (executions, total_time, max_time, max_time, id))
+        if cursor.rowcount != 1:
+            cursor.execute("""
+                INSERT INTO request_sql_stats
+                  (id, statement, executions, total_time, max_time)
+                VALUES (%s,%s,%s,%s,%s)
+                """, (id, statement, executions, total_time, max_time))
@@ -21,20 +21,24 @@
 
 import argparse
 import functools
+import gc
 import importlib
 import os
 import pkg_resources
+import signal
 import socket
 import ssl
 import sys
-from socketserver import ThreadingMixIn
+import threading
+import time
 
 from trac import __version__ as VERSION
+from trac.env import open_environment
 from trac.util import autoreload, daemon
-from trac.util.text import printerr
+from trac.util.text import exception_to_unicode, printerr
 from trac.web.auth import BasicAuthentication, DigestAuthentication
-from trac.web.main import dispatch_request
-from trac.web.wsgi import WSGIServer, WSGIRequestHandler
+from trac.web.main import dispatch_request, get_environments
+from trac.web.wsgi import ThreadPoolMixIn, WSGIServer, WSGIRequestHandler
 
 
 class AuthenticationMiddleware(object):
@@ -94,14 +98,88 @@ class TracEnvironMiddleware(object):
         return self.application(environ, start_response)
 
 
-class TracHTTPServer(ThreadingMixIn, WSGIServer):
-    daemon_threads = True
+class TracHTTPServer(ThreadPoolMixIn, WSGIServer):
 
     def __init__(self, server_address, application, env_parent_dir, env_paths,
-                 use_http_11=False):
+                 use_http_11=False, threads=10, queue_size=50,
+                 idle_timeout=30):
         request_handlers = (TracHTTPRequestHandler, TracHTTP11RequestHandler)
         WSGIServer.__init__(self, server_address, application,
                             request_handler=request_handlers[bool(use_http_11)])
+        self.env_parent_dir = env_parent_dir
+        self.env_paths = env_paths
+        self.pool_size = threads
+        self.queue_size = queue_size
+        self.idle_timeout = idle_timeout
+        # Limits of a worker process, see `serve_workers`
+        self.max_requests = 0
+        self.max_memory = 0
+        self.recycling = False
+        self._served = 0
+        self._lock = threading.Lock()
+
+    def get_request(self):
+        request, client_address = WSGIServer.get_request(self)
+        # The accepted socket can inherit the non-blocking mode of the
+        # listening socket, see `serve_workers`
+        request.setblocking(True)
+        return request, client_address
+
+    def request_finished(self):
+        """Count a served request, and stop serving once the process
+        reached its request or memory limit.
+        """
+        with self._lock:
+            self._served += 1
+            if self.recycling:
+                return
+            memory = get_memory_usage() if self.max_memory else 0
+            if self.max_requests and self._served >= self.max_requests:
+                reason = "%d requests served" % self._served
+            elif memory >= self.max_memory > 0:
+                reason = "memory usage of %d MB" % (memory // 1024 // 1024)
+            else:
+                return
+            self.recycling = True
+        printerr("Worker %d recycling after %s." % (os.getpid(), reason))
+        self.stop()
+
+    def stop(self):
+        """Stop the `serve_forever` loop without waiting for it."""
+        thread = threading.Thread(target=self.shutdown)
+        thread.daemon = True
+        thread.start()
+
+    def warm_up(self):
+        """Open the environments and load their components and most
+        commonly used templates, then release the database connections
+        and repositories which must not be shared with forked processes.
+        """
+        from trac.core import ComponentMeta
+        from trac.db.api import DatabaseManager
+        from trac.versioncontrol.api import RepositoryManager
+        from trac.web.chrome import Chrome
+        environ = {'trac.env_parent_dir': self.env_parent_dir,
+                   'trac.env_paths': self.env_paths}
+        for env_path in get_environments(environ).values():
+            try:
+                env = open_environment(env_path, use_cache=True)
+            except Exception as e:
+                printerr("Unable to open environment %s: %s"
+                         % (env_path, exception_to_unicode(e)))
+                continue
+            try:
+                for cls in list(ComponentMeta._components):
+                    env[cls]
+                chrome = Chrome(env)
+                for filename in ('layout.html', 'theme.html', 'error.html'):
+                    chrome.load_template(filename)
+            except Exception as e:
+                printerr("Unable to warm up environment %s: %s"
+                         % (env_path, exception_to_unicode(e)))
+            finally:
+                RepositoryManager(env).shutdown()
+                DatabaseManager(env).shutdown()
 
 
 class TracHTTPRequestHandler(WSGIRequestHandler):
@@ -112,11 +190,132 @@ class TracHTTPRequestHandler(WSGIRequestHandler):
         # Disable reverse name lookups
         return self.client_address[:2][0]
 
+    def setup(self):
+        # Close the connections idle for too long while receiving a
+        # request, the keep-alive connections between two requests are
+        # watched by the server
+        self.timeout = self.server.idle_timeout or None
+        self.queue_wait = self.server.get_queue_wait()
+        WSGIRequestHandler.setup(self)
+
+    def setup_environ(self):
+        environ = WSGIRequestHandler.setup_environ(self)
+        if environ and self.queue_wait is not None:
+            # Only the first request of the connection was queued
+            environ['trac.queue_wait'] = self.queue_wait
+            self.queue_wait = None
+        return environ
+
+    def handle_one_request(self):
+        self.raw_requestline = None
+        WSGIRequestHandler.handle_one_request(self)
+        if self.raw_requestline:
+            self.server.request_finished()
+        if self.server.recycling:
+            self.close_connection = 1
+
 
 class TracHTTP11RequestHandler(TracHTTPRequestHandler):
     protocol_version = 'HTTP/1.1'
 
 
+def get_memory_usage():
+    """Return the resident memory size of the process in bytes, or
+    the peak size when the current one is not available.
+    """
+    try:
+        import resource
+    except ImportError:
+        return 0
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (IOError, IndexError, ValueError):
+        pass
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def serve_workers(httpd, workers):
+    """Serve the requests with `workers` forked processes sharing the
+    listening socket of `httpd`.
+
+    The environments are opened and warmed up before forking, and the
+    objects created so far are moved out of the reach of the garbage
+    collector, so that the pages holding them are shared with the
+    workers. A worker exiting, for instance after reaching the
+    `max_requests` or `max_memory` limits of the server, is replaced.
+    """
+    httpd.warm_up()
+    gc.collect()
+    if hasattr(gc, 'freeze'):  # Python 3.7+
+        gc.freeze()
+    httpd.gateway.wsgi_multiprocess = True
+    # The workers compete for the incoming connections, so `accept`
+    # must not block when another process got the connection first.
+    httpd.socket.setblocking(False)
+
+    children = {}
+    stopping = []
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                status = _run_worker(httpd)
+            finally:
+                os._exit(status)
+        children[pid] = time.time()
+
+    def stop(signum, frame):
+        stopping.append(signum)
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for i in range(workers):
+        spawn()
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        if not os.WIFEXITED(status) or os.WEXITSTATUS(status):
+            printerr("Worker %d exited abnormally (status %d)."
+                     % (pid, status))
+        # Don't fork continuously workers failing on startup
+        if time.time() - started < 1:
+            time.sleep(1)
+        spawn()
+    httpd.server_close()
+
+
+def _run_worker(httpd):
+    from trac.env import env_cache, env_cache_lock
+
+    # Interrupts are forwarded as SIGTERM by the master process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: httpd.stop())
+    httpd.serve_forever()
+    if not httpd.wait_for_requests(timeout=30):
+        printerr("Worker %d exiting with requests in progress."
+                 % os.getpid())
+    with env_cache_lock:
+        envs = list(env_cache.values())
+    for env in envs:
+        env.shutdown()
+    return 0
+
+
 def parse_args(args=None):
     parser = argparse.ArgumentParser()
 
@@ -213,6 +412,17 @@ def parse_args(args=None):
                                    "HTTP/1.1")
     parser_group.add_argument('--http11', action='store_true', default=True,
                               help="use HTTP/1.1 protocol (default)")
+    parser.add_argument('--threads', type=int, default=10, metavar='N',
+                        help="number of threads processing the connections "
+                             "in each process (default: 10)")
+    parser.add_argument('--queue-size', type=int, default=50, metavar='N',
+                        help="number of connections waiting for a thread "
+                             "before rejecting new ones with a 503 status "
+                             "(default: 50)")
+    parser.add_argument('--idle-timeout', type=float, default=30,
+                        metavar='SECONDS',
+                        help="close the connections idle for that many "
+                             "seconds, 0 to disable (default: 30)")
 
     if os.name == 'posix':
         class _GroupAction(argparse.Action):
@@ -271,12 +481,24 @@ def parse_args(args=None):
                             help="the group to run as")
         parser.add_argument('--user', action=_UserAction,
                             help="the user to run as")
+        parser.add_argument('--workers', type=int, default=0, metavar='N',
+                            help="number of processes forked to serve the "
+                                 "requests (http and https protocols only)")
+        parser.add_argument('--max-requests', type=int, default=0,
+                            metavar='N',
+                            help="number of requests after which a worker "
+                                 "process is replaced")
+        parser.add_argument('--max-memory', type=int, default=0,
+                            metavar='MB',
+                            help="resident memory size in megabytes above "
+                                 "which a worker process is replaced")
     else:
         parser.add_argument('-r', '--auto-reload', action='store_true',
                             help="restart automatically when sources are "
                                  "modified")
 
-    parser.set_defaults(daemonize=False, user=None, group=None)
+    parser.set_defaults(daemonize=False, user=None, group=None, workers=0,
+                        max_requests=0, max_memory=0)
     args = parser.parse_args(args)
 
     if not args.env_parent_dir and not args.envs:
@@ -288,6 +510,23 @@ def parse_args(args=None):
     if args.protocol == 'https' and not args.certfile:
         parser.error("the --certfile option is required when using the https "
                      "protocol")
+    if args.threads < 1 or args.queue_size < 1:
+        parser.error("the --threads and --queue-size options must be at "
+                     "least 1")
+    if args.idle_timeout < 0 or args.workers < 0 or \
+            args.max_requests < 0 or args.max_memory < 0:
+        parser.error("the --idle-timeout, --workers, --max-requests and "
+                     "--max-memory options must not be negative")
+    if args.workers:
+        if args.protocol not in ('http', 'https'):
+            parser.error("the --workers option can only be used with the "
+                         "http and https protocols")
+        if args.auto_reload:
+            parser.error("the --workers option cannot be used with the "
+                         "--auto-reload (-r) option")
+    elif args.max_requests or args.max_memory:
+        parser.error("the --max-requests and --max-memory options require "
+                     "the --workers option")
 
     if args.port is None:
         args.port = {
@@ -330,7 +569,10 @@ def main():
             try:
                 httpd = TracHTTPServer(server_address, wsgi_app,
                                        args.env_parent_dir, args.envs,
-                                       use_http_11=args.http11)
+                                       use_http_11=args.http11,
+                                       threads=args.threads,
+                                       queue_size=args.queue_size,
+                                       idle_timeout=args.idle_timeout)
             except socket.error as e:
                 print("Error starting Trac server on %s" % loc)
                 print("[Errno %s] %s" % e.args)
@@ -345,7 +587,13 @@ def main():
                                                certfile=args.certfile,
                                                keyfile=args.keyfile)
                 httpd.environ['HTTPS'] = 'yes'
-            httpd.serve_forever()
+            if args.workers:
+                print("Forking %d worker processes" % args.workers)
+                httpd.max_requests = args.max_requests
+                httpd.max_memory = args.max_memory * 1024 * 1024
+                serve_workers(httpd, args.workers)
+            else:
+                httpd.serve_forever()
     elif args.protocol in ('scgi', 'ajp', 'fcgi'):
         def serve():
             module = 'flup.server.%s' % args.protocol
@@ -13,8 +13,9 @@
 
 import unittest
 
-from trac.web.tests import api, auth, cgi_frontend, chrome, href, session, \
-                           wikisyntax, main
+from trac.web.tests import api, auth, cgi_frontend, chrome, gcpolicy, \
+                           href, session, wikisyntax, main, profiling, \
+                           standalone, wsgi
 
 def test_suite():
     suite = unittest.TestSuite()
@@ -22,10 +23,14 @@ def test_suite():
     suite.addTest(auth.test_suite())
     suite.addTest(cgi_frontend.test_suite())
     suite.addTest(chrome.test_suite())
+    suite.addTest(gcpolicy.test_suite())
     suite.addTest(href.test_suite())
     suite.addTest(session.test_suite())
     suite.addTest(wikisyntax.test_suite())
     suite.addTest(main.test_suite())
+    suite.addTest(profiling.test_suite())
+    suite.addTest(standalone.test_suite())
+    suite.addTest(wsgi.test_suite())
     return suite
 
 if __name__ == '__main__':
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+import gc
+import unittest
+
+from trac.test import EnvironmentStub, MockRequest, makeSuite
+from trac.util.profiling import start_profile, stop_profile
+from trac.web.gcpolicy import GarbageCollector, get_gc_stats
+
+
+class GarbageCollectorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env = EnvironmentStub()
+        self.collector = GarbageCollector(self.env)
+
+    def tearDown(self):
+        stop_profile()
+        self.env.reset_db()
+
+    def _requests(self, count):
+        forced = get_gc_stats()['forced']
+        for idx in range(count):
+            req = MockRequest(self.env)
+            self.collector.start_request(req)
+            self.collector.end_request(req)
+        return get_gc_stats()['forced'] - forced
+
+    def test_request_policy(self):
+        self.assertEqual('request', self.collector.policy)
+        self.assertEqual(3, self._requests(3))
+
+    def test_off_policy(self):
+        self.env.config.set('trac', 'gc_policy', 'off')
+        self.assertEqual(0, self._requests(3))
+
+    def test_interval_policy(self):
+        self.env.config.set('trac', 'gc_policy', 'interval')
+        self.env.config.set('trac', 'gc_interval', 2)
+        self.assertEqual(2, self._requests(4))
+
+    def test_threshold_policy(self):
+        self.env.config.set('trac', 'gc_policy', 'threshold')
+        self.env.config.set('trac', 'gc_threshold', 1000000)
+        self.assertEqual(0, self._requests(3))
+        self.env.config.set('trac', 'gc_threshold', 0)
+        self.assertEqual(3, self._requests(3))
+
+    def test_pauses_recorded(self):
+        stats = get_gc_stats()
+        profile = start_profile()
+        gc.collect()
+        stop_profile()
+
+        self.assertLessEqual(1, profile.gc_count)
+        self.assertLessEqual(0, profile.gc_time)
+        self.assertLess(stats['collections'], get_gc_stats()['collections'])
+        self.assertIn('gc;dur=', profile.get_server_timing())
+
+
+def test_suite():
+    suite = unittest.TestSuite()
+    suite.addTest(makeSuite(GarbageCollectorTestCase))
+    return suite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
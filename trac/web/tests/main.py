@@ -15,6 +15,7 @@ import io
 import os.path
 import re
 import textwrap
+import time
 import unittest
 
 import trac.env
@@ -23,13 +24,15 @@ from trac.core import Component, TracError, implements
 from trac.db.api import DatabaseManager
 from trac.perm import PermissionError, PermissionSystem
 from trac.resource import ResourceNotFound
-from trac.test import EnvironmentStub, MockRequest, makeSuite, mkdtemp
+from trac.test import EnvironmentStub, MockRequest, makeSuite, mkdtemp, \
+                       rmtree
 from trac.util import create_file
 from trac.web.api import (HTTPForbidden, HTTPInternalServerError,
     HTTPNotFound, IRequestFilter, IRequestHandler, RequestDone)
 from trac.web.auth import IAuthenticator
 from trac.web.main import FakeSession, RequestDispatcher, Session, \
-                          dispatch_request, get_environments
+                          dispatch_request, get_environments, \
+                          get_project_info
 
 
 class TestStubRequestHandler(Component):
@@ -220,6 +223,71 @@ class EnvironmentsTestCase(unittest.TestCase):
         self.assertEqual(self.env_paths(['mydir2', '.hidden_dir']),
                          get_environments(self.environ))
 
+    def test_new_environment_found(self):
+        get_environments(self.environ)
+        mydir3 = os.path.join(self.parent_dir, 'mydir3')
+        os.mkdir(mydir3)
+        try:
+            self.assertEqual(self.env_paths(['mydir1', 'mydir2', 'mydir3']),
+                             get_environments(self.environ))
+        finally:
+            os.rmdir(mydir3)
+
+    def test_environments_cached(self):
+        """The parent directory is not scanned again while its
+        modification time is unchanged.
+        """
+        mtime = time.time() - 60
+        os.utime(self.parent_dir, (mtime, mtime))
+        get_environments(self.environ)
+        mydir3 = os.path.join(self.parent_dir, 'mydir3')
+        os.mkdir(mydir3)
+        try:
+            os.utime(self.parent_dir, (mtime, mtime))
+            self.assertEqual(self.env_paths(['mydir1', 'mydir2']),
+                             get_environments(self.environ))
+        finally:
+            os.rmdir(mydir3)
+
+    def test_env_paths_not_modified(self):
+        self.environ['trac.env_paths'] = [os.path.join(self.parent_dir,
+                                                       '.hidden_dir')]
+        self.assertEqual(self.env_paths(['mydir1', 'mydir2', '.hidden_dir']),
+                         get_environments(self.environ))
+        self.assertEqual(1, len(self.environ['trac.env_paths']))
+
+
+class ProjectInfoTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.env_path = mkdtemp()
+        self.env = trac.env.Environment(self.env_path, create=True)
+        self.env.config.set('project', 'name', 'Project 1')
+        self.env.config.set('project', 'descr', 'Description 1')
+        self.env.config.save()
+        self.env.shutdown()
+
+    def tearDown(self):
+        self.env.shutdown()
+        rmtree(self.env_path)
+
+    def test_project_info(self):
+        self.assertEqual(('Project 1', 'Description 1'),
+                         get_project_info(self.env_path))
+        self.assertNotIn(self.env_path, trac.env.env_cache)
+
+    def test_project_info_reloaded(self):
+        get_project_info(self.env_path)
+        self.env.config.set('project', 'name', 'Project 2')
+        self.env.config.save()
+        self.env.config.touch()
+        self.assertEqual(('Project 2', 'Description 1'),
+                         get_project_info(self.env_path))
+
+    def test_not_an_environment(self):
+        os.unlink(os.path.join(self.env_path, 'VERSION'))
+        self.assertRaises(IOError, get_project_info, self.env_path)
+
 
 class PreProcessRequestTestCase(unittest.TestCase):
 
@@ -944,6 +1012,7 @@ def test_suite():
     suite = unittest.TestSuite()
     suite.addTest(makeSuite(AuthenticateTestCase))
     suite.addTest(makeSuite(EnvironmentsTestCase))
+    suite.addTest(makeSuite(ProjectInfoTestCase))
     suite.addTest(makeSuite(PreProcessRequestTestCase))
     suite.addTest(makeSuite(ProcessRequestTestCase))
     suite.addTest(makeSuite(PostProcessRequestTestCase))
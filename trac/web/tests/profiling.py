@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+import unittest
+
+from trac.admin.console import TracAdmin
+from trac.admin.test import TracAdminTestCaseBase
+from trac.core import Component, ComponentMeta, implements
+from trac.test import EnvironmentStub, MockRequest, makeSuite
+from trac.util.profiling import get_profile
+from trac.web.api import IRequestHandler, RequestDone
+from trac.web.main import RequestDispatcher
+from trac.web.profiling import RequestProfiler
+
+
+class RequestProfilerTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        class ProfilingTestHandler(Component):
+            implements(IRequestHandler)
+
+            def match_request(self, req):
+                return req.path_info == '/profiling-test'
+
+            def process_request(self, req):
+                self.profile = get_profile()
+                for name in ('database_version', 'youngest_rev'):
+                    self.env.db_query("""
+                        SELECT value FROM system WHERE name=%s
+                        """, (name,))
+                req.send(b'OK', 'text/plain')
+
+        cls.handler_class = ProfilingTestHandler
+
+    @classmethod
+    def tearDownClass(cls):
+        ComponentMeta.deregister(cls.handler_class)
+
+    def setUp(self):
+        self.env = EnvironmentStub(enable=('trac.*', self.handler_class))
+        self.profiler = RequestProfiler(self.env)
+
+    def tearDown(self):
+        self.env.reset_db()
+
+    def _dispatch(self):
+        req = MockRequest(self.env, path_info='/profiling-test')
+        dispatcher = RequestDispatcher(self.env)
+        dispatcher.set_default_callbacks(req)
+        self.profiler.start_request(req)
+        try:
+            self.assertRaises(RequestDone, dispatcher.dispatch, req)
+        finally:
+            self.profiler.end_request(req)
+        return req
+
+    def test_disabled(self):
+        req = self._dispatch()
+
+        self.assertIsNone(self.env[self.handler_class].profile)
+        self.assertNotIn('Server-Timing', req.headers_sent)
+        self.assertEqual([], self.profiler.get_handler_stats())
+
+    def test_server_timing_header(self):
+        self.env.config.set('trac', 'server_timing_header', True)
+        req = self._dispatch()
+
+        profile = self.env[self.handler_class].profile
+        self.assertEqual('ProfilingTestHandler', profile.handler)
+        self.assertIsNotNone(profile.duration)
+        header = req.headers_sent['Server-Timing']
+        self.assertRegex(header, r'^filters;dur=[0-9.]+, '
+                                 r'handler;dur=[0-9.]+, ')
+        self.assertIn(';desc="%d queries", ' % profile.sql_count, header)
+        self.assertEqual([], self.profiler.get_handler_stats())
+
+    def test_statistics(self):
+        self.env.config.set('trac', 'request_profiling', True)
+        self._dispatch()
+        self._dispatch()
+
+        stats = self.profiler.get_handler_stats()
+        self.assertEqual(1, len(stats))
+        self.assertEqual(('ProfilingTestHandler', 2, 0), stats[0][:3])
+        statements = {row[0]: row[1]
+                      for row in self.profiler.get_statement_stats()}
+        self.assertEqual(4, statements['SELECT value FROM system '
+                                       'WHERE name=?'])
+
+        # The statistics are merged with the saved ones
+        self._dispatch()
+        self.profiler.flush()
+        self.assertEqual(3, self.profiler.get_handler_stats()[0][1])
+
+        self.profiler.reset()
+        self.assertEqual([], self.profiler.get_handler_stats())
+        self.assertEqual([], self.profiler.get_statement_stats())
+
+    def test_slow_request_logged(self):
+        self.env.config.set('trac', 'request_profiling', True)
+        self.env.config.set('trac', 'slow_request_threshold', 0.000001)
+        self._dispatch()
+
+        messages = [message for level, message in self.env.log_messages
+                    if level == 'WARNING']
+        self.assertEqual(1, len(messages))
+        self.assertRegex(messages[0],
+                         r'^Slow request \([0-9.]+s\) GET /profiling-test '
+                         r'handled by ProfilingTestHandler: ')
+        self.assertIn('SELECT value FROM system WHERE name=?', messages[0])
+        self.assertEqual(1, self.profiler.get_handler_stats()[0][2])
+
+    def test_slow_query_logged(self):
+        self.env.config.set('trac', 'slow_query_threshold', 0.000001)
+        self._dispatch()
+
+        self.assertIn(('WARNING', 'Slow SQL statement'),
+                      [(level, message[:18])
+                       for level, message in self.env.log_messages])
+
+    def test_admin_panel_reset(self):
+        self.env.config.set('trac', 'request_profiling', True)
+        self._dispatch()
+        req = MockRequest(self.env, method='POST', authname='admin',
+                          args={'reset': 'Reset statistics'})
+
+        self.assertRaises(RequestDone, self.profiler.render_admin_panel,
+                          req, 'general', 'profiling', '')
+        self.assertEqual([], self.profiler.get_handler_stats())
+        self.assertEqual(['The profiling statistics have been reset.'],
+                         req.chrome['notices'])
+
+
+class RequestProfilerCommandTestCase(TracAdminTestCaseBase):
+
+    expected_results_filename = 'profiling-console-tests.txt'
+
+    def setUp(self):
+        self.env = EnvironmentStub(default_data=True, enable=('trac.*',),
+                                   disable=('trac.tests.*',))
+        self.admin = TracAdmin()
+        self.admin.env_set('', self.env)
+
+    def tearDown(self):
+        self.env.reset_db()
+
+    def _insert_stats(self):
+        with self.env.db_transaction as db:
+            db("""INSERT INTO request_stats
+                    (handler, requests, slow, total_time, max_time,
+                     handler_time, filters_time, render_time, sql_count,
+                     sql_time, cache_hits, cache_misses)
+                  VALUES ('WikiModule',4,1,200000,120000,80000,20000,
+                          60000,30,40000,12,2)""")
+            db("""INSERT INTO request_stats
+                    (handler, requests, slow, total_time, max_time,
+                     handler_time, filters_time, render_time, sql_count,
+                     sql_time, cache_hits, cache_misses)
+                  VALUES ('',1,0,5000,5000,0,1000,0,2,1000,0,0)""")
+            db.executemany("""
+                INSERT INTO request_sql_stats
+                  (id, statement, executions, total_time, max_time)
+                VALUES (%s,%s,%s,%s,%s)
+                """, [('1', 'SELECT name FROM wiki WHERE name=?', 20,
+                       30000, 5000),
+                      ('2', 'SELECT id, generation FROM cache', 5, 2500,
+                       1000)])
+
+    def test_report_empty(self):
+        rv, output = self.execute('profile report')
+        self.assertEqual(0, rv, output)
+        self.assertExpectedResult(output)
+
+    def test_report(self):
+        self._insert_stats()
+        rv, output = self.execute('profile report')
+        self.assertEqual(0, rv, output)
+        self.assertExpectedResult(output)
+
+    def test_report_limit(self):
+        self._insert_stats()
+        rv, output = self.execute('profile report 1')
+        self.assertEqual(0, rv, output)
+        self.assertExpectedResult(output)
+
+    def test_reset(self):
+        self._insert_stats()
+        rv, output = self.execute('profile reset')
+        self.assertEqual(0, rv, output)
+        self.assertEqual([], self.env.db_query("""
+            SELECT * FROM request_stats"""))
+        self.assertEqual([], self.env.db_query("""
+            SELECT * FROM request_sql_stats"""))
+
+
+def test_suite():
+    suite = unittest.TestSuite()
+    suite.addTest(makeSuite(RequestProfilerTestCase))
+    suite.addTest(makeSuite(RequestProfilerCommandTestCase))
+    return suite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+import io
+import os
+import socket
+import sys
+import unittest
+
+from trac.test import makeSuite, mkdtemp, rmtree
+from trac.web.standalone import TracHTTPServer, get_memory_usage, \
+                                parse_args
+
+
+class StandaloneTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.stderr = sys.stderr
+        self.errbuf = io.BytesIO()
+        sys.stderr = io.TextIOWrapper(self.errbuf, encoding='utf-8',
+                                      newline='\n', write_through=True)
+        self.tmpdir = mkdtemp()
+
+    def tearDown(self):
+        sys.stderr = self.stderr
+        self.errbuf.close()
+        rmtree(self.tmpdir)
+
+    def _parse_error(self, *args):
+        self.assertRaises(SystemExit, parse_args, (self.tmpdir,) + args)
+        return self.errbuf.getvalue().decode('utf-8')
+
+    def test_parse_args(self):
+        args = parse_args([self.tmpdir, '--threads', '5'])
+        self.assertEqual([self.tmpdir], args.envs)
+        self.assertEqual(5, args.threads)
+        self.assertEqual(50, args.queue_size)
+        self.assertEqual(30, args.idle_timeout)
+        self.assertEqual(80, args.port)
+
+    def test_parse_args_threads(self):
+        self.assertIn("the --threads and --queue-size options must be at "
+                      "least 1", self._parse_error('--threads', '0'))
+
+    def test_parse_args_negative(self):
+        self.assertIn("must not be negative",
+                      self._parse_error('--idle-timeout', '-1'))
+
+    @unittest.skipUnless(os.name == 'posix', "POSIX only")
+    def test_parse_args_workers(self):
+        args = parse_args([self.tmpdir, '--workers', '2',
+                           '--max-requests', '100', '--max-memory', '200'])
+        self.assertEqual(2, args.workers)
+        self.assertEqual(100, args.max_requests)
+        self.assertEqual(200, args.max_memory)
+
+    @unittest.skipUnless(os.name == 'posix', "POSIX only")
+    def test_parse_args_workers_protocol(self):
+        self.assertIn("the --workers option can only be used with the http "
+                      "and https protocols",
+                      self._parse_error('--workers', '2', '--protocol',
+                                        'scgi'))
+
+    @unittest.skipUnless(os.name == 'posix', "POSIX only")
+    def test_parse_args_workers_auto_reload(self):
+        self.assertIn("the --workers option cannot be used with the "
+                      "--auto-reload (-r) option",
+                      self._parse_error('--workers', '2', '-r'))
+
+    @unittest.skipUnless(os.name == 'posix', "POSIX only")
+    def test_parse_args_limits_without_workers(self):
+        self.assertIn("the --max-requests and --max-memory options require "
+                      "the --workers option",
+                      self._parse_error('--max-requests', '100'))
+
+    def test_get_memory_usage(self):
+        # The resource module is only available on POSIX
+        if os.name == 'posix':
+            self.assertLess(0, get_memory_usage())
+        else:
+            self.assertEqual(0, get_memory_usage())
+
+
+class TracHTTPServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.stderr = sys.stderr
+        self.errbuf = io.BytesIO()
+        sys.stderr = io.TextIOWrapper(self.errbuf, encoding='utf-8',
+                                      newline='\n', write_through=True)
+        self.httpd = TracHTTPServer(('127.0.0.1', 0), None, None, [])
+        self.stopped = 0
+
+        def stop():
+            self.stopped += 1
+        self.httpd.stop = stop
+
+    def tearDown(self):
+        self.httpd.server_close()
+        sys.stderr = self.stderr
+        self.errbuf.close()
+
+    def test_no_limits(self):
+        for idx in range(10):
+            self.httpd.request_finished()
+        self.assertFalse(self.httpd.recycling)
+        self.assertEqual(0, self.stopped)
+
+    def test_max_requests(self):
+        self.httpd.max_requests = 2
+        self.httpd.request_finished()
+        self.assertFalse(self.httpd.recycling)
+        self.httpd.request_finished()
+        self.assertTrue(self.httpd.recycling)
+        self.httpd.request_finished()
+        self.assertEqual(1, self.stopped)
+        self.assertIn("recycling after 2 requests served",
+                      self.errbuf.getvalue().decode('utf-8'))
+
+    @unittest.skipUnless(get_memory_usage(), "Memory usage not available")
+    def test_max_memory(self):
+        self.httpd.max_memory = 1
+        self.httpd.request_finished()
+        self.assertTrue(self.httpd.recycling)
+        self.assertEqual(1, self.stopped)
+        self.assertIn("recycling after memory usage of",
+                      self.errbuf.getvalue().decode('utf-8'))
+
+    def test_get_request_non_blocking(self):
+        self.httpd.socket.setblocking(False)
+        self.assertRaises(BlockingIOError, self.httpd.get_request)
+        conn = socket.create_connection(self.httpd.server_address, 5)
+        try:
+            request, client_address = self.httpd.get_request()
+            try:
+                self.assertIsNone(request.gettimeout())
+            finally:
+                request.close()
+        finally:
+            conn.close()
+
+
+def test_suite():
+    suite = unittest.TestSuite()
+    suite.addTest(makeSuite(StandaloneTestCase))
+    suite.addTest(makeSuite(TracHTTPServerTestCase))
+    return suite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+import socket
+import threading
+import time
+import unittest
+
+from trac.test import makeSuite
+from trac.web.wsgi import ThreadPoolMixIn, WSGIRequestHandler, WSGIServer
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class QuietHTTP11RequestHandler(QuietRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+
+class ThreadPoolServer(ThreadPoolMixIn, WSGIServer):
+    pass
+
+
+class ThreadPoolServerTestCaseBase(unittest.TestCase):
+
+    request_handler = QuietRequestHandler
+
+    def setUp(self):
+        self.release = threading.Event()
+        self.server = ThreadPoolServer(('127.0.0.1', 0), self._application,
+                                       request_handler=self.request_handler)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       kwargs={'poll_interval': 0.05})
+        self.thread.daemon = True
+        self.thread.start()
+
+    def tearDown(self):
+        self.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join(5)
+
+    def _application(self, environ, start_response):
+        self.release.wait(5)
+        start_response('200 OK', [('Content-Type', 'text/plain'),
+                                  ('Content-Length', '2')])
+        return [b'OK']
+
+    def _connect(self):
+        conn = socket.create_connection(self.server.server_address, 5)
+        conn.sendall(b'GET / HTTP/1.0\r\nHost: localhost\r\n\r\n')
+        return conn
+
+    def _read_response(self, conn):
+        data = b''
+        while not data.endswith(b'\r\n\r\nOK'):
+            chunk = conn.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def _read(self, conn):
+        chunks = []
+        while True:
+            chunk = conn.recv(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        conn.close()
+        return b''.join(chunks)
+
+    def _wait_for(self, key, value):
+        for idx in range(100):
+            if self.server.get_pool_stats()[key] == value:
+                return
+            time.sleep(0.05)
+        self.fail("%s != %r: %r" % (key, value, self.server.get_pool_stats()))
+
+
+class ThreadPoolMixInTestCase(ThreadPoolServerTestCaseBase):
+
+    def test_request(self):
+        self.release.set()
+        response = self._read(self._connect())
+
+        self.assertTrue(response.startswith(b'HTTP/1.0 200 '))
+        self.assertTrue(response.endswith(b'\r\n\r\nOK'))
+        self.assertTrue(self.server.wait_for_requests(5))
+        stats = self.server.get_pool_stats()
+        self.assertEqual(10, stats['threads'])
+        self.assertEqual(1, stats['served'])
+        self.assertEqual(0, stats['rejected'])
+
+    def test_queue_full(self):
+        self.server.pool_size = 1
+        self.server.queue_size = 1
+        active = self._connect()
+        self._wait_for('active', 1)
+        queued = self._connect()
+        self._wait_for('queued', 1)
+        rejected = self._read(self._connect())
+
+        self.assertTrue(rejected.startswith(
+            b'HTTP/1.0 503 Service Unavailable\r\n'))
+        self.assertIn(b'\r\nRetry-After: 5\r\n', rejected)
+        self.assertEqual(1, self.server.get_pool_stats()['rejected'])
+        self.assertFalse(self.server.wait_for_requests(0.1))
+
+        self.release.set()
+        self.assertTrue(self._read(active).startswith(b'HTTP/1.0 200 '))
+        self.assertTrue(self._read(queued).startswith(b'HTTP/1.0 200 '))
+        self.assertTrue(self.server.wait_for_requests(5))
+        stats = self.server.get_pool_stats()
+        self.assertEqual(2, stats['served'])
+        self.assertEqual(0, stats['queued'])
+        self.assertLess(0, stats['max_wait'])
+
+    def test_rejected_without_blocking(self):
+        conn = socket.create_connection(self.server.server_address, 5)
+        try:
+            request, client_address = self.server.get_request()
+            try:
+                self.server.reject_request(request)
+                self.assertEqual(0, request.gettimeout())
+            finally:
+                request.close()
+            self.assertTrue(self._read(conn).startswith(
+                b'HTTP/1.0 503 Service Unavailable\r\n'))
+        finally:
+            conn.close()
+
+
+class KeepAliveTestCase(ThreadPoolServerTestCaseBase):
+
+    request_handler = QuietHTTP11RequestHandler
+
+    def setUp(self):
+        super().setUp()
+        self.release.set()
+        self.server.pool_size = 1
+
+    def _request(self, conn):
+        conn.sendall(b'GET / HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        return self._read_response(conn)
+
+    def test_idle_connection_releases_thread(self):
+        idle = socket.create_connection(self.server.server_address, 5)
+        try:
+            self.assertTrue(self._request(idle).startswith(
+                b'HTTP/1.1 200 '))
+            self._wait_for('active', 0)
+            other = socket.create_connection(self.server.server_address, 5)
+            try:
+                self.assertTrue(self._request(other).startswith(
+                    b'HTTP/1.1 200 '))
+            finally:
+                other.close()
+            self.assertTrue(self._request(idle).startswith(
+                b'HTTP/1.1 200 '))
+        finally:
+            idle.close()
+        self.assertEqual(0, self.server.get_pool_stats()['rejected'])
+
+    def test_idle_timeout(self):
+        self.server.idle_timeout = 0.1
+        conn = socket.create_connection(self.server.server_address, 5)
+        try:
+            self.assertTrue(self._request(conn).startswith(
+                b'HTTP/1.1 200 '))
+            self.assertEqual(b'', conn.recv(4096))
+        finally:
+            conn.close()
+
+
+def test_suite():
+    suite = unittest.TestSuite()
+    suite.addTest(makeSuite(ThreadPoolMixInTestCase))
+    suite.addTest(makeSuite(KeepAliveTestCase))
+    return suite
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
@@ -16,7 +16,12 @@
 
 from abc import ABCMeta, abstractmethod
 import errno
+import queue
+import selectors
+import socket
 import sys
+import threading
+import time
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from socketserver import ThreadingMixIn
 import urllib.parse
@@ -198,6 +203,31 @@ class WSGIRequestHandler(BaseHTTPRequestHandler):
 
         return environ
 
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+        release = getattr(self.server, 'release_connection', None)
+        while not self.close_connection:
+            # Hand the connection back to the server while waiting for
+            # the next request, unless it has already been received
+            if release is not None and not self._next_request_received() \
+                    and release():
+                return
+            self.handle_one_request()
+
+    def _next_request_received(self):
+        pending = getattr(self.connection, 'pending', None)  # SSL
+        if pending is not None and pending():
+            return True
+        timeout = self.connection.gettimeout()
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(timeout)
+
     def handle_one_request(self):
         try:
             environ = self.setup_environ()
@@ -269,6 +299,257 @@ class WSGIServerGateway(WSGIGateway):
                 raise
 
 
+class ThreadPoolMixIn(object):
+    """Mix-in class processing the connections of a server with a
+    fixed-size pool of threads.
+
+    The accepted connections wait in a queue of at most `queue_size`
+    entries for a thread of the pool. When the queue is full, the
+    connection is rejected with a `503 Service Unavailable` response.
+    The keep-alive connections waiting for their next request don't
+    hold a thread: they are watched by a separate thread, which queues
+    them again when a request arrives and closes them after
+    `idle_timeout` seconds. The threads are started on the first
+    connection, so the server can be created before forking.
+
+    :since: 1.7.1
+    """
+
+    #: Number of threads processing the connections
+    pool_size = 10
+    #: Maximum number of connections waiting for a thread (at least 1)
+    queue_size = 50
+    #: Seconds sent in the `Retry-After` header of rejected connections
+    retry_after = 5
+    #: Seconds after which an idle keep-alive connection is closed, `0`
+    #: for no limit
+    idle_timeout = 30
+
+    _pool = None
+    _pool_local = threading.local()
+
+    def process_request(self, request, client_address):
+        """Queue the connection for the pool, or reject it."""
+        self._start_pool()
+        with self._pool_cond:
+            self._pending += 1
+        try:
+            self._queue.put_nowait((request, client_address,
+                                    time.perf_counter()))
+        except queue.Full:
+            with self._pool_cond:
+                self._pending -= 1
+                self._rejected += 1
+            self.reject_request(request)
+            self.shutdown_request(request)
+
+    def process_request_thread(self, request, client_address):
+        """Process a connection in a thread of the pool."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self._pool_local.release = False
+            self.handle_error(request, client_address)
+        finally:
+            if getattr(self._pool_local, 'release', False):
+                self._pool_local.release = False
+                self._watch_idle(request, client_address)
+            else:
+                self.shutdown_request(request)
+
+    def release_connection(self):
+        """Hand the keep-alive connection processed by the current
+        thread back to the server once the request handler is done, so
+        that the thread is available while waiting for the next
+        request.
+
+        :return: `False` if the current thread is not a thread of the
+                 pool, in which case the handler keeps the connection.
+        """
+        if self.get_queue_wait() is None:
+            return False
+        self._pool_local.release = True
+        return True
+
+    def reject_request(self, request):
+        """Send a `503 Service Unavailable` response on a connection
+        which can't be queued.
+        """
+        body = b'Server too busy, please retry later.\n'
+        response = b'HTTP/1.0 503 Service Unavailable\r\n' \
+                   b'Retry-After: %d\r\n' \
+                   b'Content-Type: text/plain\r\n' \
+                   b'Content-Length: %d\r\n' \
+                   b'Connection: close\r\n\r\n%s' \
+                   % (self.retry_after, len(body), body)
+        # The response is sent without blocking the accept loop, it
+        # fits in the send buffer of a new connection.
+        try:
+            request.setblocking(False)
+            request.send(response)
+            # Consume the request received so far, as closing a socket
+            # with unread data resets the connection.
+            request.recv(65536)
+        except (IOError, ValueError):
+            pass
+
+    def get_queue_wait(self):
+        """Return the number of seconds the connection processed by
+        the current thread waited in the queue, or `None` if the thread
+        is not a thread of the pool.
+        """
+        return getattr(self._pool_local, 'wait', None)
+
+    def get_pool_stats(self):
+        """Return a dictionary with the size of the pool (`threads`),
+        the number of threads processing a connection (`active`), the
+        number of connections waiting in the queue (`queued`), the
+        number of connections processed (`served`) and rejected
+        (`rejected`), and the total and maximum times in seconds spent
+        by the connections in the queue (`wait_time`, `max_wait`).
+        """
+        if self._pool is None:
+            return {'threads': 0, 'active': 0, 'queued': 0, 'served': 0,
+                    'rejected': 0, 'wait_time': 0.0, 'max_wait': 0.0}
+        with self._pool_cond:
+            return {'threads': len(self._pool), 'active': self._active,
+                    'queued': self._pending - self._active,
+                    'served': self._served,
+                    'rejected': self._rejected,
+                    'wait_time': self._wait_time, 'max_wait': self._max_wait}
+
+    def wait_for_requests(self, timeout=None):
+        """Wait until the queued and active connections have been
+        processed.
+
+        :return: `True` if no connection is waiting or being processed.
+        """
+        if self._pool is None:
+            return True
+        with self._pool_cond:
+            return self._pool_cond.wait_for(lambda: not self._pending,
+                                            timeout)
+
+    def server_close(self):
+        super().server_close()
+        if self._pool is not None:
+            for thread in self._pool:
+                try:
+                    self._queue.put_nowait(None)
+                except queue.Full:
+                    break
+            with self._pool_cond:
+                self._idle_closing = True
+            self._wakeup_idle_thread()
+
+    # Internal methods
+
+    def _start_pool(self):
+        if self._pool is not None:
+            return
+        self._queue = queue.Queue(max(self.queue_size, 1))
+        self._pool_cond = threading.Condition()
+        self._pending = self._active = self._served = self._rejected = 0
+        self._wait_time = self._max_wait = 0.0
+        self._idle_new = []
+        self._idle_closing = False
+        self._idle_wakeup = socket.socketpair()
+        for sock in self._idle_wakeup:
+            sock.setblocking(False)
+        thread = threading.Thread(target=self._idle_thread,
+                                  name='%s-idle' % self.__class__.__name__)
+        thread.daemon = True
+        thread.start()
+        self._pool = []
+        for idx in range(max(self.pool_size, 1)):
+            thread = threading.Thread(target=self._pool_thread,
+                                      name='%s-%d' % (self.__class__.__name__,
+                                                      idx + 1))
+            thread.daemon = True
+            thread.start()
+            self._pool.append(thread)
+
+    def _pool_thread(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            request, client_address, queued = item
+            wait = self._pool_local.wait = time.perf_counter() - queued
+            with self._pool_cond:
+                self._active += 1
+                self._wait_time += wait
+                if wait > self._max_wait:
+                    self._max_wait = wait
+            try:
+                self.process_request_thread(request, client_address)
+            finally:
+                self._pool_local.wait = None
+                with self._pool_cond:
+                    self._pending -= 1
+                    self._active -= 1
+                    self._served += 1
+                    self._pool_cond.notify_all()
+
+    def _watch_idle(self, request, client_address):
+        with self._pool_cond:
+            self._idle_new.append((request, client_address))
+        self._wakeup_idle_thread()
+
+    def _wakeup_idle_thread(self):
+        try:
+            self._idle_wakeup[1].send(b'\0')
+        except OSError:
+            pass  # already woken up, or stopped
+
+    def _idle_thread(self):
+        """Watch the idle keep-alive connections, and queue them again
+        for the pool when their next request arrives.
+        """
+        wakeup = self._idle_wakeup[0]
+        idle = {}
+        with selectors.DefaultSelector() as selector:
+            selector.register(wakeup, selectors.EVENT_READ)
+            while True:
+                timeout = None
+                if idle and self.idle_timeout:
+                    timeout = max(0, min(deadline for addr, deadline
+                                                  in idle.values())
+                                     - time.monotonic())
+                for key, events in selector.select(timeout):
+                    if key.fileobj is wakeup:
+                        try:
+                            wakeup.recv(4096)
+                        except OSError:
+                            pass
+                        continue
+                    request = key.fileobj
+                    selector.unregister(request)
+                    client_address, deadline = idle.pop(request)
+                    self.process_request(request, client_address)
+                with self._pool_cond:
+                    new, self._idle_new = self._idle_new, []
+                    closing = self._idle_closing
+                if closing:
+                    break
+                now = time.monotonic()
+                for request, client_address in new:
+                    idle[request] = (client_address,
+                                     now + self.idle_timeout)
+                    selector.register(request, selectors.EVENT_READ)
+                if self.idle_timeout:
+                    for request, (client_address, deadline) \
+                            in list(idle.items()):
+                        if deadline <= now:
+                            del idle[request]
+                            selector.unregister(request)
+                            self.shutdown_request(request)
+        for request in list(idle) + [request for request, addr in new]:
+            self.shutdown_request(request)
+        for sock in self._idle_wakeup:
+            sock.close()
+
+
 class WSGIServer(HTTPServer):
 
     def __init__(self, server_address, application, gateway=WSGIServerGateway,
@@ -277,7 +558,8 @@ class WSGIServer(HTTPServer):
 
         self.application = application
 
-        gateway.wsgi_multithread = isinstance(self, ThreadingMixIn)
+        gateway.wsgi_multithread = isinstance(self, (ThreadingMixIn,
+                                                     ThreadPoolMixIn))
         gateway.wsgi_multiprocess = bool(ForkingMixIn and
                                          isinstance(self, ForkingMixIn))
         self.gateway = gateway
@@ -98,14 +98,17 @@ class WikiAdmin(Component):
             if not filename:
                 printout(wikipage.text)
             else:
-                if os.path.isfile(filename):
-                    raise AdminCommandError(_("File '%(name)s' exists",
-                                              name=path_to_unicode(filename)))
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(wikipage.text)
+                self._write_page(wikipage.text, filename)
         else:
             raise AdminCommandError(_("Page '%(page)s' not found", page=page))
 
+    def _write_page(self, text, filename):
+        if os.path.isfile(filename):
+            raise AdminCommandError(_("File '%(name)s' exists",
+                                      name=path_to_unicode(filename)))
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(text)
+
     def import_page(self, filename, title, create_only=[], replace=False):
         if filename:
             if not os.path.isfile(filename):
@@ -217,13 +220,24 @@ class WikiAdmin(Component):
             else:
                 raise AdminCommandError(_("'%(name)s' is not a directory",
                                           name=path_to_unicode(directory)))
-        for p in pages:
-            if any(p == name or
-                   name.endswith('*') and p.startswith(name[:-1])
-                   for name in names):
+        pages = {p for p in pages
+                 if any(p == name or
+                        name.endswith('*') and p.startswith(name[:-1])
+                        for name in names)}
+        # Stream the latest version of all the pages rather than
+        # fetching each page separately
+        for p, text in self.env.db_query.iterate("""
+                SELECT w.name, w.text FROM wiki AS w
+                INNER JOIN (
+                  SELECT name, max(version) AS version
+                  FROM wiki GROUP BY name) AS m
+                ON w.name=m.name AND w.version=m.version
+                ORDER BY w.name
+                """):
+            if p in pages:
                 dst = os.path.join(directory, unicode_quote(p, ''))
                 printout(" '%s' => '%s'" % (p, dst))
-                self.export_page(p, dst)
+                self._write_page(text, dst)
 
     def _do_load(self, *paths):
         self._load_or_replace(paths, replace=False)
@@ -173,6 +173,18 @@ class IWikiMacroProvider(Interface):
           `parse_args` function to conveniently extract them.
         """
 
+    def is_cacheable(name, content):
+        """Return `True` if the output of the macro only depends on
+        `content`, the rendering context and the realms declared with
+        `Formatter.depends_on`, so that the rendered wiki text can be
+        cached by the `WikiRenderCache`.
+
+        Implementing this method is optional. Macros without it are
+        considered volatile.
+
+        .. versionadded :: 1.7.1
+        """
+
 
 class IWikiSyntaxProvider(Interface):
     """Enrich the Wiki syntax with new markup."""
@@ -198,6 +210,11 @@ class IWikiSyntaxProvider(Interface):
         HTML escaped, whereas the `target` is not. The `fullmatch`
         argument is optional, and is bound to the regexp match object
         for the link.
+
+        Formatters whose output depends on the state of resources, for
+        example on whether the link target exists, should declare it
+        with `formatter.depends_on(realm)`, or call
+        `formatter.set_volatile()` if the output can't be cached.
         """
 
 def parse_args(args, strict=True):
@@ -413,6 +430,7 @@ class WikiSystem(Component):
 
     def _format_link(self, formatter, ns, pagename, label, ignore_missing,
                      original_label=None):
+        formatter.depends_on(self.realm)
         pagename, query, fragment = formatter.split_link(pagename)
         version = None
         if '@' in pagename:
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+import collections
+import hashlib
+import json
+import os
+import threading
+
+from trac.cache import cached
+from trac.config import IntOption, PathOption
+from trac.core import Component
+from trac.perm import PermissionSystem
+from trac.util import AtomicFile
+from trac.util.html import Markup
+from trac.util.text import exception_to_unicode
+
+
+class RealmGeneration(object):
+    """Generation of the resources of a realm, shared between processes
+    through the `cache` table.
+    """
+
+    def __init__(self, env, realm):
+        self.env = env
+        self.realm = realm
+        self._generation_id = realm
+
+    @cached('_generation_id')
+    def generation(self):
+        for generation, in self.env.db_query("""
+                SELECT generation FROM cache WHERE id=%s
+                """, (self._generation_id,)):
+            return generation
+        return -1
+
+
+class WikiRenderCache(Component):
+    """Cache for wiki text rendered to HTML by `format_to_html`.
+
+    Entries are keyed by the wiki text, the resource and version it
+    belongs to, the flavor and the relevant properties of the rendering
+    context. Link resolvers and macros declare the realms of the
+    resources their output depends on with `Formatter.depends_on`, and
+    the entries are invalidated by the `WikiRenderCacheInvalidator`
+    when resources of these realms change.
+    Output of macros which are not declared cacheable is not cached.
+
+    :since: 1.7.1
+    """
+
+    size = IntOption('wiki', 'render_cache_size', 0,
+        """Maximum number of rendered wiki texts kept in memory by each
+        process. The cache is disabled when set to `0` and
+        `render_cache_dir` is empty.
+
+        Wiki text containing links to resources of realms without
+        change notification, or macros which don't declare themselves
+        cacheable, is never cached. (''since 1.7.1'')
+        """)
+
+    cache_dir = PathOption('wiki', 'render_cache_dir', '',
+        """Directory in which rendered wiki texts are additionally
+        stored, so that they can be shared between processes and
+        survive restarts. Relative paths are resolved relative to the
+        `conf` directory of the environment. The directory can be
+        cleared at any time. (''since 1.7.1'')
+        """)
+
+    #: Realms for which changes invalidate the cached entries
+    realms = ('attachment', 'changeset', 'ticket', 'wiki')
+
+    def __init__(self):
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._generations = {realm: RealmGeneration(self.env, realm)
+                             for realm in self.realms}
+        self._config_hash = hashlib.sha1(repr(sorted(
+            (section, name, value)
+            for section in self.config.sections()
+            for name, value in self.config.options(section)))
+            .encode('utf-8')).hexdigest()
+
+    @property
+    def enabled(self):
+        return self.size > 0 or bool(self.cache_dir)
+
+    # Public methods
+
+    def render(self, context, flavor, wikitext, options, renderer):
+        """Return the rendered `wikitext` from the cache, or call
+        `renderer` and cache the returned `Markup` if the output doesn't
+        depend on volatile data.
+
+        :param options: a tuple of the formatting options passed to
+                        `renderer`.
+        """
+        key = self._get_key(context, flavor, wikitext, options)
+        generations = {realm: gen.generation
+                       for realm, gen in self._generations.items()}
+        entry = self._get_entry(key)
+        if entry is not None:
+            deps, html, chrome = entry
+            if all(generations.get(realm) == generation
+                   for realm, generation in deps.items()):
+                # Propagate the dependencies to the enclosing rendering
+                self.depends_on(*deps)
+                _replay_chrome(context.req, chrome)
+                return Markup(html)
+
+        recorder = _Recorder()
+        recorders = self._local.__dict__.setdefault('recorders', [])
+        snapshot = _snapshot_chrome(context.req)
+        recorders.append(recorder)
+        try:
+            html = renderer()
+        finally:
+            recorders.pop()
+        if recorder.volatile or not recorder.realms <= set(self.realms):
+            return html
+        deps = {realm: generations[realm] for realm in recorder.realms}
+        chrome = _diff_chrome(context.req, snapshot)
+        self._put_entry(key, (deps, str(html), chrome))
+        return html
+
+    def depends_on(self, *realms):
+        """Record that the output being rendered depends on the
+        resources of the given `realms`.
+        """
+        for recorder in getattr(self._local, 'recorders', ()):
+            recorder.realms.update(realms)
+
+    def set_volatile(self):
+        """Record that the output being rendered can't be cached."""
+        for recorder in getattr(self._local, 'recorders', ()):
+            recorder.volatile = True
+
+    def invalidate(self, realm):
+        """Invalidate the cached output depending on resources of
+        `realm`.
+        """
+        if self.enabled:
+            del self._generations[realm].generation
+
+    def clear(self):
+        """Remove all entries from the in-memory cache."""
+        with self._lock:
+            self._entries.clear()
+
+    # Internal methods
+
+    def _get_key(self, context, flavor, wikitext, options):
+        locale = getattr(context.req, 'locale', None)
+        hints = context._hints if context._hints is not None \
+                else context._parent_hints()
+        username = context.perm.username if context.perm else None
+        # The permissions are part of the key, as the output can depend
+        # on them, for example through the titles of the links.
+        permissions = PermissionSystem(self.env).store \
+                      .get_user_permissions(username) if username else None
+        key = repr((flavor, options, repr(context.resource),
+                    context.href() if context.href else None,
+                    username, permissions,
+                    str(locale) if locale else None,
+                    sorted(hints.items()) if hints else None,
+                    self._config_hash, wikitext))
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def _get_entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        path = self._get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            entry = data['deps'], data['html'], data['chrome']
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            self.log.warning("Failed to read rendered wiki text %s: %s",
+                             path, exception_to_unicode(e))
+            return None
+        self._put_memory(key, entry)
+        return entry
+
+    def _put_entry(self, key, entry):
+        self._put_memory(key, entry)
+        path = self._get_path(key)
+        if path is None:
+            return
+        deps, html, chrome = entry
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with AtomicFile(path) as f:
+                json.dump({'deps': deps, 'html': html, 'chrome': chrome}, f)
+        except (OSError, TypeError, ValueError) as e:
+            self.log.warning("Failed to write rendered wiki text %s: %s",
+                             path, exception_to_unicode(e))
+
+    def _put_memory(self, key, entry):
+        size = self.size
+        if size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+
+    def _get_path(self, key):
+        cache_dir = self.cache_dir
+        if cache_dir:
+            return os.path.join(cache_dir, key[:2], key + '.json')
+
+
+class _Recorder(object):
+
+    def __init__(self):
+        self.realms = set()
+        self.volatile = False
+
+
+def _get_chrome(req):
+    try:
+        return req.chrome if req is not None else None
+    except AttributeError:
+        return None
+
+
+def _snapshot_chrome(req):
+    chrome = _get_chrome(req)
+    if chrome is None:
+        return None
+    return (set(chrome.get('linkset', ())), set(chrome.get('scriptset', ())),
+            len(chrome.get('scripts', ())), dict(chrome.get('script_data', {})))
+
+
+def _diff_chrome(req, snapshot):
+    """Return the links, scripts and script data added to the chrome of
+    `req` since `snapshot` was taken, as a JSON serializable list.
+    """
+    chrome = _get_chrome(req)
+    if chrome is None or snapshot is None:
+        return []
+    linkset, scriptset, nscripts, script_data = snapshot
+    items = []
+    links = chrome.get('links', {})
+    for linkid in chrome.get('linkset', set()) - linkset:
+        rel, href = linkid.split(':', 1)
+        for link in links.get(rel, ()):
+            if link['href'] == href:
+                items.append(['link', rel, link])
+                break
+    for script in chrome.get('scripts', [])[nscripts:]:
+        items.append(['script', script])
+    filenames = chrome.get('scriptset', set()) - scriptset
+    if filenames:
+        items.append(['scriptset', sorted(filenames)])
+    data = {name: value
+            for name, value in chrome.get('script_data', {}).items()
+            if name not in script_data or script_data[name] != value}
+    if data:
+        items.append(['script_data', data])
+    return items
+
+
+def _replay_chrome(req, items):
+    chrome = _get_chrome(req)
+    if chrome is None:
+        return
+    for item in items:
+        if item[0] == 'link':
+            rel, link = item[1:]
+            linkid = '%s:%s' % (rel, link['href'])
+            linkset = chrome.setdefault('linkset', set())
+            if linkid not in linkset:
+                chrome.setdefault('links', {}).setdefault(rel, []) \
+                      .append(dict(link))
+                linkset.add(linkid)
+        elif item[0] == 'script':
+            scripts = chrome.setdefault('scripts', [])
+            if item[1] not in scripts:
+                scripts.append(item[1])
+        elif item[0] == 'scriptset':
+            chrome.setdefault('scriptset', set()).update(item[1])
+        elif item[0] == 'script_data':
+            chrome.setdefault('script_data', {}).update(item[1])
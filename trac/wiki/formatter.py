@@ -35,6 +35,7 @@ from trac.util.html import (
 )
 from trac.util.translation import _, tag_
 from trac.wiki.api import WikiSystem, parse_args
+from trac.wiki.cache import WikiRenderCache
 from trac.wiki.parser import WikiParser, parse_processor_args
 
 __all__ = ['Formatter', 'MacroError', 'ProcessorError',
@@ -344,6 +345,9 @@ class WikiProcessor(object):
     def _macro_processor(self, text):
         self.env.log.debug('Executing Wiki macro %s by provider %s',
                            self.name, self.macro_provider)
+        is_cacheable = getattr(self.macro_provider, 'is_cacheable', None)
+        if not (is_cacheable and is_cacheable(self.name, text)):
+            self.formatter.set_volatile()
         if arity(self.macro_provider.expand_macro) == 4:
             return self.macro_provider.expand_macro(self.formatter, self.name,
                                                     text, self.args)
@@ -435,6 +439,7 @@ class Formatter(object):
         self.perm = context.perm
         self.wiki = WikiSystem(self.env)
         self.wikiparser = WikiParser(self.env)
+        self.render_cache = self.env[WikiRenderCache]
         self._anchors = {}
         self._open_tags = []
         self._safe_schemes = None
@@ -442,6 +447,28 @@ class Formatter(object):
             self._safe_schemes = set(self.wiki.safe_schemes)
 
 
+    def depends_on(self, *realms):
+        """Declare that the output being rendered depends on the state
+        of resources in the given `realms`, for example on whether the
+        target of a link exists.
+
+        Cached renderings are invalidated when resources of these realms
+        change.
+
+        :since: 1.7.1
+        """
+        if self.render_cache is not None:
+            self.render_cache.depends_on(*realms)
+
+    def set_volatile(self):
+        """Declare that the output being rendered must not be cached,
+        for example because it depends on the current time.
+
+        :since: 1.7.1
+        """
+        if self.render_cache is not None:
+            self.render_cache.set_volatile()
+
     def split_link(self, target):
         return split_url_into_path_query_fragment(target)
 
@@ -1622,7 +1649,14 @@ def format_to_html(env, context, wikidom, escape_newlines=None):
         return Markup()
     if escape_newlines is None:
         escape_newlines = context.get_hint('preserve_newlines', False)
-    return HtmlFormatter(env, context, wikidom).generate(escape_newlines)
+    formatter = HtmlFormatter(env, context, wikidom)
+    if isinstance(wikidom, str):
+        cache = env[WikiRenderCache]
+        if cache is not None and cache.enabled:
+            return cache.render(context, formatter.flavor, wikidom,
+                                (escape_newlines,),
+                                lambda: formatter.generate(escape_newlines))
+    return formatter.generate(escape_newlines)
 
 def format_to_oneliner(env, context, wikidom, shorten=None):
     if not wikidom:
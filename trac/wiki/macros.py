@@ -429,6 +429,9 @@ class PageOutlineMacro(WikiMacroBase):
        default). This parameter only has an effect in `inline` style.
     """)
 
+    def is_cacheable(self, name, content):
+        return True
+
     def expand_macro(self, formatter, name, content):
         min_depth, max_depth = 1, 6
         title = None
@@ -547,6 +550,9 @@ class ImageMacro(WikiMacroBase):
                              in self._split_args_re.split(content or '')[1::2]]
         return 'inline' in args
 
+    def is_cacheable(self, name, content):
+        return True
+
     _split_re = r'''((?:[^%s"']|"[^"]*"|'[^']*')+)'''
     _split_args_re = re.compile(_split_re % ',')
     _split_filespec_re = re.compile(_split_re % ':')
@@ -702,6 +708,8 @@ class ImageMacro(WikiMacroBase):
         else:
             return system_message(_("No filespec given"))
         if attachment:
+            # The output depends on whether the attachment exists
+            formatter.depends_on('attachment')
             try:
                 desc = get_resource_summary(self.env, attachment)
             except ResourceNotFound:
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Edgewall Software
+# All rights reserved.
+#
+# This software is licensed as described in the file COPYING, which
+# you should have received as part of this distribution. The terms
+# are also available at https://trac.edgewall.org/wiki/TracLicense.
+#
+# This software consists of voluntary contributions made by many
+# individuals. For the exact contribution history, see the revision
+# history and logs, available at https://trac.edgewall.org/log/.
+
+import io
+import os
+import unittest
+
+from trac.attachment import Attachment
+from trac.core import Component, ComponentMeta, implements
+from trac.perm import PermissionSystem
+from trac.test import EnvironmentStub, MockRequest, makeSuite, mkdtemp
+from trac.ticket.test import insert_ticket
+from trac.web.chrome import add_stylesheet, web_context
+from trac.wiki.api import IWikiMacroProvider
+from trac.wiki.cache import WikiRenderCache
+from trac.wiki.formatter import format_to_html
+from trac.wiki.model import WikiPage
+
+
+class WikiRenderCacheTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        class CountingMacro(Component):
+            implements(IWikiMacroProvider)
+            calls = 0
+
+            def get_macros(self):
+                yield 'Counting'
+                yield 'Volatile'
+
+            def get_macro_description(self, name):
+                return ''
+
+            def is_cacheable(self, name, content):
+                return name == 'Counting'
+
+            def expand_macro(self, formatter, name, content):
+                CountingMacro.calls += 1
+                add_stylesheet(formatter.req, 'common/css/wiki.css')
+                return str(CountingMacro.calls)
+
+        cls.macro = CountingMacro
+
+    @classmethod
+    def tearDownClass(cls):
+        ComponentMeta.deregister(cls.macro)
+
+    def setUp(self):
+        self.env = EnvironmentStub(path=mkdtemp(), default_data=True,
+                                   enable=['trac.*', self.macro])
+        self.env.config.set('wiki', 'render_cache_size', 10)
+        self.cache = WikiRenderCache(self.env)
+        self.macro.calls = 0
+
+    def tearDown(self):
+        self.env.reset_db_and_disk()
+
+    def _render(self, text, authname='anonymous'):
+        req = MockRequest(self.env, authname=authname)
+        context = web_context(req, 'wiki', 'WikiStart')
+        return str(format_to_html(self.env, context, text)), req
+
+    def test_disabled(self):
+        self.env.config.set('wiki', 'render_cache_size', 0)
+        self._render('[[Counting]]')
+        self._render('[[Counting]]')
+        self.assertEqual(2, self.macro.calls)
+
+    def test_cached(self):
+        html1, req = self._render('[[Counting]]')
+        html2, req = self._render('[[Counting]]')
+        self.assertEqual(1, self.macro.calls)
+        self.assertEqual(html1, html2)
+
+    def test_stylesheets_replayed(self):
+        self._render('[[Counting]]')
+        html, req = self._render('[[Counting]]')
+        self.assertEqual(1, self.macro.calls)
+        self.assertIn('/trac.cgi/chrome/common/css/wiki.css',
+                      [link['href'] for link
+                                    in req.chrome['links']['stylesheet']])
+
+    def test_volatile_macro_not_cached(self):
+        self._render('[[Volatile]] [[Counting]]')
+        self._render('[[Volatile]] [[Counting]]')
+        self.assertEqual(4, self.macro.calls)
+
+    def test_key_includes_user(self):
+        self._render('[[Counting]]', 'user1')
+        self._render('[[Counting]]', 'user2')
+        self.assertEqual(2, self.macro.calls)
+
+    def test_permission_change_invalidates(self):
+        self._render('[[Counting]]', 'user1')
+        PermissionSystem(self.env).grant_permission('user1', 'TICKET_ADMIN')
+        self._render('[[Counting]]', 'user1')
+        self.assertEqual(2, self.macro.calls)
+
+    def test_image_attachment_added_invalidates(self):
+        page = WikiPage(self.env, 'WikiStart')
+        page.text = 'The start page'
+        page.save('joe', 'Added')
+        html1, req = self._render('[[Counting]] [[Image(foo.png)]]')
+        attachment = Attachment(self.env, 'wiki', 'WikiStart')
+        attachment.insert('foo.png', io.BytesIO(b'PNG'), 3)
+        html2, req = self._render('[[Counting]] [[Image(foo.png)]]')
+        self.assertEqual(2, self.macro.calls)
+        self.assertIn('/trac.cgi/raw-attachment/wiki/WikiStart/foo.png',
+                      html2)
+
+    def test_wiki_page_added_invalidates(self):
+        html, req = self._render('[[Counting]] NewPage')
+        self.assertIn('missing wiki', html)
+        page = WikiPage(self.env, 'NewPage')
+        page.text = 'The new page'
+        page.save('joe', 'Added')
+        html, req = self._render('[[Counting]] NewPage')
+        self.assertEqual(2, self.macro.calls)
+        self.assertNotIn('missing wiki', html)
+
+    def test_ticket_changed_invalidates(self):
+        ticket = insert_ticket(self.env, summary='Summary')
+        html, req = self._render('[[Counting]] #1')
+        self.assertIn('class="new ticket"', html)
+        ticket['status'] = 'closed'
+        ticket.save_changes('joe')
+        html, req = self._render('[[Counting]] #1')
+        self.assertEqual(2, self.macro.calls)
+        self.assertIn('class="closed ticket"', html)
+
+    def test_unrelated_change_keeps_entries(self):
+        self._render('[[Counting]] NewPage')
+        insert_ticket(self.env, summary='Summary')
+        self._render('[[Counting]] NewPage')
+        self.assertEqual(1, self.macro.calls)
+
+    def test_volatile_link_not_cached(self):
+        self._render('[[Counting]] milestone:milestone1')
+        self._render('[[Counting]] milestone:milestone1')
+        self.assertEqual(2, self.macro.calls)
+
+    def test_lru_eviction(self):
+        self.env.config.set('wiki', 'render_cache_size', 1)
+        self._render('[[Counting]]')
+        self._render('[[Counting]] text')
+        self._render('[[Counting]]')
+        self.assertEqual(3, self.macro.calls)
+
+    def test_disk_tier(self):
+        cache_dir = os.path.join(self.env.path, 'render-cache')
+        self.env.config.set('wiki', 'render_cache_size', 0)
+        self.env.config.set('wiki', 'render_cache_dir', cache_dir)
+        html1, req = self._render('[[Counting]]')
+        self.assertEqual(1, len(os.listdir(cache_dir)))
+        html2, req = self._render('[[Counting]]')
+        self.assertEqual(1, self.macro.calls)
+        self.assertEqual(html1, html2)
+
+
+def test_suite():
+    return makeSuite(WikiRenderCacheTestCase)
+
+
+if __name__ == '__main__':
+    unittest.main(defaultTest='test_suite')
@@ -19,26 +19,33 @@
 import pkg_resources
 import re
 
-from trac.attachment import AttachmentModule, Attachment
+from trac.attachment import AttachmentModule, Attachment, \
+                           IAttachmentChangeListener
 from trac.config import IntOption
 from trac.core import *
+from trac.db.util import chunked_params
 from trac.mimeview.api import IContentConverter, Mimeview
 from trac.perm import IPermissionPolicy, IPermissionRequestor
 from trac.resource import *
 from trac.search import ISearchSource, search_to_sql, shorten_result
-from trac.timeline.api import ITimelineEventProvider
+from trac.search.index import SearchIndex
+from trac.ticket.api import ITicketChangeListener
+from trac.timeline.api import ITimelineEventProvider, merge_timeline_events
 from trac.util import as_int, get_reporter_id
 from trac.util.datefmt import from_utimestamp, to_utimestamp
 from trac.util.html import tag
 from trac.util.text import shorten_line
 from trac.util.translation import _, tag_
+from trac.versioncontrol.api import IRepositoryChangeListener
 from trac.versioncontrol.diff import get_diff_options, diff_blocks
 from trac.web.api import HTTPBadRequest, IRequestHandler
 from trac.web.chrome import (Chrome, INavigationContributor, ITemplateProvider,
                              accesskey, add_ctxtnav, add_link,
                              add_notice, add_script, add_stylesheet,
                              add_warning, prevnext_nav, web_context)
-from trac.wiki.api import IWikiPageManipulator, WikiSystem, validate_page_name
+from trac.wiki.api import IWikiChangeListener, IWikiPageManipulator, \
+                          WikiSystem, validate_page_name
+from trac.wiki.cache import WikiRenderCache
 from trac.wiki.formatter import format_to, OneLinerFormatter
 from trac.wiki.model import WikiPage
 
@@ -753,22 +760,29 @@ class WikiModule(Component):
         if 'WIKI_VIEW' in req.perm:
             yield ('wiki', _('Wiki changes'))
 
+    timeline_events_sorted = True
+
     def get_timeline_events(self, req, start, stop, filters):
         if 'wiki' in filters:
             wiki_realm = Resource(self.realm)
-            for ts, name, comment, author, version in self.env.db_query("""
-                    SELECT time, name, comment, author, version FROM wiki
-                    WHERE time>=%s AND time<=%s
-                    """, (to_utimestamp(start), to_utimestamp(stop))):
-                wiki_page = wiki_realm(id=name, version=version)
-                if 'WIKI_VIEW' not in req.perm(wiki_page):
-                    continue
-                yield ('wiki', from_utimestamp(ts), author,
-                       (wiki_page, comment))
+
+            def produce_events():
+                for ts, name, comment, author, version in self.env.db_query("""
+                        SELECT time, name, comment, author, version FROM wiki
+                        WHERE time>=%s AND time<=%s ORDER BY time DESC
+                        """, (to_utimestamp(start), to_utimestamp(stop))):
+                    wiki_page = wiki_realm(id=name, version=version)
+                    if 'WIKI_VIEW' not in req.perm(wiki_page):
+                        continue
+                    yield ('wiki', from_utimestamp(ts), author,
+                           (wiki_page, comment))
 
             # Attachments
-            for event in AttachmentModule(self.env).get_timeline_events(
-                    req, wiki_realm, start, stop):
+            attachment_events = AttachmentModule(self.env) \
+                                .get_timeline_events(req, wiki_realm, start,
+                                                     stop)
+            for event in merge_timeline_events(produce_events(),
+                                               attachment_events):
                 yield event
 
     def render_timeline_event(self, context, field, event):
@@ -800,22 +814,36 @@ class WikiModule(Component):
     def get_search_results(self, req, terms, filters):
         if 'wiki' not in filters:
             return
+        wiki_realm = Resource(self.realm)
+        hits = SearchIndex(self.env).search(self.realm, terms)
+        select = """
+            SELECT w1.name, w1.time, w1.author, w1.text
+            FROM wiki w1,(SELECT name, max(version) AS ver
+                          FROM wiki GROUP BY name) w2
+            WHERE w1.version = w2.ver AND w1.name = w2.name AND """
         with self.env.db_query as db:
-            sql_query, args = search_to_sql(db, ['w1.name', 'w1.author',
-                                                 'w1.text'], terms)
-            wiki_realm = Resource(self.realm)
-            for name, ts, author, text in db("""
-                    SELECT w1.name, w1.time, w1.author, w1.text
-                    FROM wiki w1,(SELECT name, max(version) AS ver
-                                  FROM wiki GROUP BY name) w2
-                    WHERE w1.version = w2.ver AND w1.name = w2.name
-                    AND """ + sql_query, args):
+            if hits is None:
+                sql_query, args = search_to_sql(db, ['w1.name', 'w1.author',
+                                                     'w1.text'], terms)
+                rows = db(select + sql_query, args)
+                scores = {}
+            else:
+                scores = {id: score for id, parent_id, score in hits}
+                names = list(scores)
+                rows = []
+                for subset, holders in chunked_params(names):
+                    rows.extend(db(select + 'w1.name IN (%s)' % holders,
+                                   subset))
+            for name, ts, author, text in rows:
                 page = wiki_realm(id=name)
                 if 'WIKI_VIEW' in req.perm(page):
-                    yield (get_resource_url(self.env, page, req.href),
-                           '%s: %s' % (name, shorten_line(text)),
-                           from_utimestamp(ts), author,
-                           shorten_result(text, terms))
+                    result = (get_resource_url(self.env, page, req.href),
+                              '%s: %s' % (name, shorten_line(text)),
+                              from_utimestamp(ts), author,
+                              shorten_result(text, terms))
+                    if name in scores:
+                        result += (scores[name],)
+                    yield result
 
         # Attachments
         for result in AttachmentModule(self.env).get_search_results(
@@ -844,3 +872,82 @@ class DefaultWikiPolicy(Component):
                 page = WikiPage(self.env, resource)
                 if page.readonly and 'WIKI_ADMIN' not in perm(resource):
                     return False
+
+    def check_permissions_batch(self, action, username, resources, perm):
+        if action not in ('WIKI_CHANGE_READONLY', 'WIKI_DELETE',
+                          'WIKI_MODIFY', 'WIKI_RENAME'):
+            return [None] * len(resources)
+        return [self.check_permission(action, username, resource, perm)
+                for resource in resources]
+
+
+class WikiRenderCacheInvalidator(Component):
+    """Invalidates the wiki texts cached by the `WikiRenderCache` when
+    resources of the realms they depend on change.
+
+    :since: 1.7.1
+    """
+
+    implements(IAttachmentChangeListener, IRepositoryChangeListener,
+               ITicketChangeListener, IWikiChangeListener)
+
+    # IAttachmentChangeListener methods
+
+    def attachment_added(self, attachment):
+        self._invalidate('attachment')
+
+    def attachment_deleted(self, attachment):
+        self._invalidate('attachment')
+
+    def attachment_moved(self, attachment, old_parent_realm, old_parent_id,
+                         old_filename):
+        self._invalidate('attachment')
+
+    # IRepositoryChangeListener methods
+
+    def changeset_added(self, repos, changeset):
+        self._invalidate('changeset')
+
+    def changeset_modified(self, repos, changeset, old_changeset):
+        self._invalidate('changeset')
+
+    # ITicketChangeListener methods
+
+    def ticket_created(self, ticket):
+        self._invalidate('ticket')
+
+    def ticket_changed(self, ticket, comment, author, old_values):
+        self._invalidate('ticket')
+
+    def ticket_deleted(self, ticket):
+        self._invalidate('ticket')
+
+    def ticket_comment_modified(self, ticket, cdate, author, comment,
+                                old_comment):
+        pass
+
+    def ticket_change_deleted(self, ticket, cdate, changes):
+        self._invalidate('ticket')
+
+    # IWikiChangeListener methods
+
+    def wiki_page_added(self, page):
+        self._invalidate('wiki')
+
+    def wiki_page_changed(self, page, version, t, comment, author):
+        pass
+
+    def wiki_page_deleted(self, page):
+        self._invalidate('wiki')
+
+    def wiki_page_version_deleted(self, page):
+        pass
+
+    def wiki_page_renamed(self, page, old_name):
+        self._invalidate('wiki')
+
+    def wiki_page_comment_modified(self, page, old_comment):
+        pass
+
+    def _invalidate(self, realm):
+        WikiRenderCache(self.env).invalidate(realm)
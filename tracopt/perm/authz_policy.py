@@ -147,6 +147,29 @@ class AuthzPolicy(Component):
         resource_key = self.normalise_resource(resource)
         self.log.debug('Checking %s on %s', action, resource_key)
         permissions = self.authz_permissions(resource_key, username)
+        return self._decide(action, permissions)
+
+    def check_permissions_batch(self, action, username, resources, perm):
+        if not self.authz_mtime or \
+                os.path.getmtime(self.authz_file) != self.authz_mtime:
+            self.parse_authz()
+        self.log.debug('Checking %s on %d resources', action, len(resources))
+        # Many resources match the same section, so evaluate each of the
+        # matched rules only once.
+        decisions = {}
+        results = []
+        for resource in resources:
+            resource_key = self.normalise_resource(resource)
+            permissions = self.authz_permissions(resource_key, username)
+            rule = tuple(permissions) if permissions is not None else None
+            if rule not in decisions:
+                decisions[rule] = self._decide(action, permissions)
+            results.append(decisions[rule])
+        return results
+
+    # Internal methods
+
+    def _decide(self, action, permissions):
         if permissions is None:
             return None                 # no match, can't decide
         elif permissions == []:
@@ -163,8 +186,6 @@ class AuthzPolicy(Component):
 
         return None                     # no match for action, can't decide
 
-    # Internal methods
-
     def parse_authz(self):
         self.log.debug("Parsing authz security policy %s",
                        self.authz_file)
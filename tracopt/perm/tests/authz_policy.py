@@ -187,6 +187,21 @@ class AuthzPolicyTestCase(unittest.TestCase):
         self.assertIn('TICKET_VIEW', perm('ticket', 42))
         self.assertNotIn('TICKET_VIEW', perm('ticket', 43))
 
+    def test_check_permissions_batch(self):
+        authz_policy = AuthzPolicy(self.env)
+        resources = [Resource('ticket', id) for id in (42, 43, 44)] + \
+                    [Resource('wiki', 'WikiStart'), None]
+
+        for user in ('anonymous', 'änon', 'éat'):
+            self.assertEqual(
+                [self.check_permission('TICKET_VIEW', user, resource)
+                 for resource in resources],
+                authz_policy.check_permissions_batch('TICKET_VIEW', user,
+                                                     resources, None))
+        self.assertEqual([resources[1]],
+                         self.get_perm('änon').filter('TICKET_VIEW',
+                                                     resources[:3]))
+
     def test_default_repository(self):
         repos = self.get_repository('')
         self.assertFalse(repos.is_viewable(self.get_perm('anonymous')))
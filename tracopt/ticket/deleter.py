@@ -13,6 +13,7 @@
 
 from trac.attachment import Attachment
 from trac.core import Component, TracError, implements
+from trac.ticket.api import QueryResultStore
 from trac.ticket.model import Ticket
 from trac.ticket.web_ui import TicketModule
 from trac.util import get_reporter_id
@@ -94,9 +95,10 @@ class TicketDeleter(Component):
                 add_notice(req, _("Ticket #%(num)s and all associated data "
                                   "removed.", num=ticket.id))
                 redirect_to = req.href.query()
-                if 'query_tickets' in req.session:
-                    tickets = req.session['query_tickets'].split()
-                    if str(ticket.id) in tickets:
+                if 'query_result' in req.session:
+                    store = QueryResultStore(self.env)
+                    if store.get_neighbors(req.session['query_result'],
+                                           ticket.id) is not None:
                         redirect_to = req.session['query_href']
                 req.redirect(redirect_to)
 
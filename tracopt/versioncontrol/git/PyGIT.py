@@ -12,26 +12,38 @@
 # individuals. For the exact contribution history, see the revision
 # history and logs, available at https://trac.edgewall.org/log/.
 
+import binascii
 import codecs
 import contextlib
 import io
+import mmap
 import os
 import re
+import struct
 import subprocess
+import sys
 import tempfile
 import weakref
+from array import array
 from collections import deque
+from collections.abc import Mapping
 from functools import partial
 from subprocess import DEVNULL, PIPE
-from threading import Lock
+from threading import Condition, Lock
 
 from trac.core import TracBaseError
-from trac.util import as_int, terminate
+from trac.util import AtomicFile, as_int, terminate
 from trac.util.compat import close_fds
 from trac.util.datefmt import time_now
 from trac.util.text import exception_to_unicode, to_unicode
 
-__all__ = ['GitError', 'GitErrorSha', 'Storage', 'StorageFactory']
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+__all__ = ['CommitGraph', 'GitError', 'GitErrorSha', 'GitProcessPool',
+           'Storage', 'StorageFactory']
 
 
 class GitError(TracBaseError):
@@ -150,13 +162,17 @@ class GitCore(object):
         return subprocess.Popen(self.__build_git_cmd(git_cmd, *cmd_args),
                                 close_fds=close_fds, **kw)
 
-    def __execute(self, *args):
-        """execute git command and return file-like object of stdout"""
+    def __execute(self, *args, input=None):
+        """execute git command and return file-like object of stdout
+
+        `input` is written to the standard input of the command if given.
+        """
 
         #print("DEBUG:", args, file=sys.stderr)
 
-        with self.__pipe(*args, stdin=DEVNULL) as p:
-            stdout_data, stderr_data = p.communicate()
+        with self.__pipe(*args,
+                         stdin=DEVNULL if input is None else PIPE) as p:
+            stdout_data, stderr_data = p.communicate(input)
         if self.__log and (p.returncode != 0 or stderr_data):
             self.__log.debug('%s exits with %d, dir: %r, args: %r, stderr: %r',
                              self.__git_bin, p.returncode, self.__git_dir,
@@ -167,6 +183,9 @@ class GitCore(object):
     def cat_file_batch(self):
         return self.__pipe('cat-file', '--batch')
 
+    def cat_file_batch_check(self):
+        return self.__pipe('cat-file', '--batch-check')
+
     def log_pipe(self, *cmd_args):
         return self.__pipe('log', *cmd_args)
 
@@ -175,7 +194,8 @@ class GitCore(object):
 
     def __getattr__(self, name):
         if name.startswith('_') or \
-                name in ('cat_file_batch', 'log_pipe', 'diff_tree_pipe'):
+                name in ('cat_file_batch', 'cat_file_batch_check',
+                         'log_pipe', 'diff_tree_pipe'):
             raise AttributeError(name)
         return partial(self.__execute, name.replace('_','-'))
 
@@ -194,6 +214,102 @@ class GitCore(object):
         return bool(cls.__is_sha_pat.match(sha))
 
 
+def _cleanup_proc(proc):
+    if proc:
+        for f in (proc.stdin, proc.stdout, proc.stderr):
+            if f:
+                f.close()
+        terminate(proc)
+        proc.wait()
+
+
+class GitProcessPool(object):
+    """Pool of long-lived git processes reading requests from their
+    standard input and writing the responses to their standard output,
+    like `git cat-file --batch`.
+
+    A process is used by one thread at a time, through `acquire`. Up to
+    `max_size` processes are started on demand, so the pool should be
+    sized to the number of threads serving requests. The processes
+    which exited are replaced, and a process is recycled after
+    `max_uses` uses, after being idle for `max_idle_time` seconds, or
+    when an error occurred while it was used, as its output is then in
+    an unknown state.
+    """
+
+    max_uses = 10000
+    max_idle_time = 300
+
+    def __init__(self, factory, max_size=8):
+        self.factory = factory
+        self.max_size = max(1, max_size)
+        self._cond = Condition(Lock())
+        self._idle = []  # [(proc, uses, last_used)]
+        self._busy = 0
+
+    def __len__(self):
+        with self._cond:
+            return len(self._idle) + self._busy
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """Context manager providing a process of the pool."""
+        proc, uses = self._get()
+        try:
+            yield proc
+        except:
+            self._put(proc, None)
+            raise
+        else:
+            self._put(proc, uses + 1)
+
+    def close(self):
+        """Terminate the idle processes."""
+        with self._cond:
+            idle = self._idle
+            self._idle = []
+        for proc, uses, last_used in idle:
+            _cleanup_proc(proc)
+
+    def _get(self):
+        expired = []
+        try:
+            with self._cond:
+                while True:
+                    now = time_now()
+                    while self._idle:
+                        proc, uses, last_used = self._idle.pop()
+                        if proc.poll() is None and \
+                                now - last_used < self.max_idle_time:
+                            self._busy += 1
+                            return proc, uses
+                        expired.append(proc)
+                    if self._busy < self.max_size:
+                        self._busy += 1
+                        break
+                    self._cond.wait()
+        finally:
+            for proc in expired:
+                _cleanup_proc(proc)
+        try:
+            return self.factory(), 0
+        except:
+            with self._cond:
+                self._busy -= 1
+                self._cond.notify()
+            raise
+
+    def _put(self, proc, uses):
+        recycle = uses is None or uses >= self.max_uses
+        with self._cond:
+            self._busy -= 1
+            if not recycle:
+                self._idle.append((proc, uses, time_now()))
+            self._cond.notify()
+        if recycle:
+            _cleanup_proc(proc)
+
+
 class SizedDict(dict):
     """Size-bounded dictionary with FIFO replacement strategy"""
 
@@ -223,6 +339,355 @@ class SizedDict(dict):
         raise NotImplementedError("SizedDict has no setdefault() method")
 
 
+class CommitGraph(Mapping):
+    """Commit graph of a repository stored in a file which is mapped into
+    memory, so that it is shared by all the processes serving the
+    repository and survives restarts.
+
+    The commits are stored in reverse topological order (parents before
+    children) as arrays of binary sha ids, parent and child indices and
+    a short-rev table, followed by the snapshot of the refs the graph was
+    built from. The file is never modified in place: when the refs change,
+    the commits added since the snapshot are appended to a copy of the
+    arrays, which is then renamed over the file.
+
+    The graph is a mapping from sha ids to `(children, parents, ordinal,
+    rheads)` entries, like the `rev_dict` built in memory by `Storage`.
+
+    :since: 1.7.1
+    """
+
+    _magic = b'TGRAPH1' + sys.byteorder[:1].encode('ascii')
+    _header = struct.Struct('=8sQQQ')
+    _nkeys = 0x10000  # number of short-rev buckets
+
+    def __init__(self, buf=None):
+        if buf is None:
+            buf = self._serialize(bytearray(), array('I', [0]), array('I'),
+                                  array('i'), array('i'), array('I'),
+                                  array('i', [-1]) * self._nkeys,
+                                  array('i'), {})
+        magic, nrevs, nedges, refs_len = self._header.unpack_from(buf, 0)
+        if magic != self._magic:
+            raise ValueError("Invalid commit graph")
+        view = memoryview(buf)
+        offset = self._header.size
+
+        def section(size, format=None):
+            nonlocal offset
+            data = view[offset:offset + size]
+            if len(data) != size:
+                raise ValueError("Truncated commit graph")
+            offset += size
+            return data.cast(format) if format else data
+
+        self._nrevs = nrevs
+        self._shas = section(20 * nrevs)
+        self._parent_ptr = section(4 * (nrevs + 1), 'I')
+        self._parents = section(4 * nedges, 'I')
+        self._first_child = section(4 * nrevs, 'i')
+        self._next_sibling = section(4 * nedges, 'i')
+        self._edge_child = section(4 * nedges, 'I')
+        self._srev_head = section(4 * self._nkeys, 'i')
+        self._srev_next = section(4 * nrevs, 'i')
+        self.refs = self._parse_refs(bytes(section(refs_len)))
+        self.short_revs = _ShortRevTable(self)
+        self._buf = buf
+        self._rheads = None
+
+    @classmethod
+    def load(cls, path):
+        """Return the graph stored in the file at `path`, or `None` if the
+        file doesn't exist or is invalid.
+        """
+        try:
+            with open(path, 'rb') as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            return cls(buf)
+        except (ValueError, struct.error):
+            return None
+
+    @classmethod
+    def update(cls, path, repo, refs, log):
+        """Return the graph of `repo` for the given `refs`, extending the
+        graph stored at `path` with the commits added since its refs
+        snapshot, or rebuilding it if commits became unreachable.
+
+        :param repo: the `GitCore` instance of the repository.
+        :raise OSError: if the file can't be written.
+        """
+        graph = cls.load(path)
+        if graph is not None and graph.refs == refs:
+            return graph
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.lock', 'ab') as lock:
+            if fcntl:
+                fcntl.lockf(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                # The graph may have been updated while waiting for the lock
+                graph = cls.load(path)
+                if graph is not None and graph.refs == refs:
+                    return graph
+                data = None
+                if graph is not None and len(graph):
+                    data = graph._extend(repo, refs, log)
+                if data is None:
+                    data = cls()._extend(repo, refs, log)
+                with AtomicFile(path, 'wb') as f:
+                    f.write(data)
+            finally:
+                if fcntl:
+                    fcntl.lockf(lock.fileno(), fcntl.LOCK_UN)
+        return cls.load(path) or cls(data)
+
+    # Mapping methods
+
+    def __len__(self):
+        return self._nrevs
+
+    def __iter__(self):
+        for idx in range(self._nrevs - 1, -1, -1):
+            yield self._sha(idx)
+
+    def __contains__(self, sha):
+        return self._index(sha) is not None
+
+    def __getitem__(self, sha):
+        idx = self._index(sha)
+        if idx is None:
+            raise KeyError(sha)
+        return _CommitGraphEntry(self, idx)
+
+    # Public methods
+
+    @property
+    def youngest_rev(self):
+        return self._sha(self._nrevs - 1) if self._nrevs else None
+
+    @property
+    def oldest_rev(self):
+        return self._sha(0) if self._nrevs else None
+
+    def rev_by_ordinal(self, ordinal):
+        """Return the sha id of the commit with the given ordinal, `1` being
+        the youngest commit, or `None` if out of range.
+        """
+        if 1 <= ordinal <= self._nrevs:
+            return self._sha(self._nrevs - ordinal)
+
+    def children(self, idx):
+        children = self._first_child
+        next_sibling = self._next_sibling
+        edge_child = self._edge_child
+        edge = children[idx]
+        while edge != -1:
+            yield edge_child[edge]
+            edge = next_sibling[edge]
+
+    def parents(self, idx):
+        ptr = self._parent_ptr
+        return self._parents[ptr[idx]:ptr[idx + 1]]
+
+    def rheads(self, idx):
+        """Return the heads of the branches containing the commit."""
+        rheads = self._rheads
+        if rheads is None:
+            rheads = self._rheads = self._get_all_rheads()
+        return rheads[idx]
+
+    # Internal methods
+
+    def _get_all_rheads(self):
+        """Return the list of the heads of the branches containing each
+        commit, computed in a single pass from the youngest commit, as
+        the children are stored after their parents.
+        """
+        heads = {}
+        for refname, rev in self.refs.items():
+            if refname.startswith(b'refs/heads/'):
+                head = self._index(rev)
+                if head is not None:
+                    heads[head] = rev
+        empty = frozenset()
+        seen = {empty: empty}
+        rheads = [empty] * self._nrevs
+        for idx in range(self._nrevs - 1, -1, -1):
+            children = list(self.children(idx))
+            if len(children) == 1 and idx not in heads:
+                rheads[idx] = rheads[children[0]]
+                continue
+            current = set()
+            if idx in heads:
+                current.add(heads[idx])
+            for child in children:
+                current.update(rheads[child])
+            current = frozenset(current)
+            rheads[idx] = seen.setdefault(current, current)
+        return rheads
+
+    def _sha(self, idx):
+        return binascii.hexlify(self._shas[20 * idx:20 * idx + 20])
+
+    def _index(self, sha):
+        if not isinstance(sha, bytes) or len(sha) != 40:
+            return None
+        try:
+            binsha = binascii.unhexlify(sha)
+        except (binascii.Error, ValueError):
+            return None
+        shas = self._shas
+        srev_next = self._srev_next
+        idx = self._srev_head[binsha[0] << 8 | binsha[1]]
+        while idx != -1:
+            if shas[20 * idx:20 * idx + 20] == binsha:
+                return idx
+            idx = srev_next[idx]
+        return None
+
+    def _extend(self, repo, refs, log):
+        """Return the serialized graph extended with the commits added
+        since the refs snapshot, or `None` if it can't be extended.
+        """
+        tips = {rev for refname, rev in self.refs.items()
+                    if refname != b'HEAD' and rev in self}
+        if tips:
+            tips = b''.join(rev + b'\n' for rev in sorted(tips))
+            # Commits of the snapshot must still be reachable
+            count = repo.rev_list('--count', '--stdin', '--not', '--all',
+                                  input=tips)
+            if count.strip() != b'0':
+                log.debug("Commit graph of '%s' has unreachable commits",
+                          repo)
+                return None
+            tips = b''.join(b'^' + rev for rev in tips.splitlines(True))
+            rev_list = repo.rev_list('--parents', '--topo-order', '--all',
+                                     '--stdin', input=tips)
+        else:
+            rev_list = repo.rev_list('--parents', '--topo-order', '--all')
+
+        shas = bytearray(self._shas)
+        parent_ptr = array('I', self._parent_ptr.tobytes())
+        parents = array('I', self._parents.tobytes())
+        first_child = array('i', self._first_child.tobytes())
+        next_sibling = array('i', self._next_sibling.tobytes())
+        edge_child = array('I', self._edge_child.tobytes())
+        srev_head = array('i', self._srev_head.tobytes())
+        srev_next = array('i', self._srev_next.tobytes())
+
+        new_revs = {}
+        for line in reversed(rev_list.splitlines()):
+            revs = line.split()
+            rev = revs[0]
+            idx = len(first_child)
+            for parent in revs[1:]:
+                pidx = new_revs.get(parent)
+                if pidx is None:
+                    pidx = self._index(parent)
+                    if pidx is None:
+                        log.debug("Commit graph of '%s' misses parent %s "
+                                  "of %s", repo, parent, rev)
+                        return None
+                next_sibling.append(first_child[pidx])
+                first_child[pidx] = len(parents)
+                edge_child.append(idx)
+                parents.append(pidx)
+            parent_ptr.append(len(parents))
+            first_child.append(-1)
+            binsha = binascii.unhexlify(rev)
+            shas += binsha
+            key = binsha[0] << 8 | binsha[1]
+            srev_next.append(srev_head[key])
+            srev_head[key] = idx
+            new_revs[rev] = idx
+        log.debug("Added %d commits to the commit graph of '%s'",
+                  len(new_revs), repo)
+        return self._serialize(shas, parent_ptr, parents, first_child,
+                               next_sibling, edge_child, srev_head,
+                               srev_next, refs)
+
+    @classmethod
+    def _serialize(cls, shas, parent_ptr, parents, first_child,
+                   next_sibling, edge_child, srev_head, srev_next, refs):
+        refs = b''.join(refname + b'\0' + rev + b'\0'
+                        for refname, rev in sorted(refs.items()))
+        header = cls._header.pack(cls._magic, len(first_child),
+                                  len(parents), len(refs))
+        return b''.join([header, shas, parent_ptr.tobytes(),
+                         parents.tobytes(), first_child.tobytes(),
+                         next_sibling.tobytes(), edge_child.tobytes(),
+                         srev_head.tobytes(), srev_next.tobytes(), refs])
+
+    @staticmethod
+    def _parse_refs(data):
+        items = data.split(b'\0')[:-1]
+        return dict(zip(items[::2], items[1::2]))
+
+
+class _CommitGraphEntry(object):
+    """`(children, parents, ordinal, rheads)` entry of a commit in a
+    `CommitGraph`, computed on access.
+    """
+
+    __slots__ = ('_graph', '_idx')
+
+    def __init__(self, graph, idx):
+        self._graph = graph
+        self._idx = idx
+
+    def __len__(self):
+        return 4
+
+    def __iter__(self):
+        for i in range(4):
+            yield self[i]
+
+    def __getitem__(self, i):
+        graph = self._graph
+        idx = self._idx
+        if i == 0:
+            return frozenset(graph._sha(child)
+                             for child in graph.children(idx))
+        if i == 1:
+            return tuple(graph._sha(parent)
+                         for parent in graph.parents(idx))
+        if i == 2:
+            return len(graph) - idx
+        if i == 3:
+            return graph.rheads(idx)
+        raise IndexError(i)
+
+
+class _ShortRevTable(object):
+    """Mapping from the short-rev key of `Storage` to the sha ids of the
+    commits of a `CommitGraph`.
+    """
+
+    __slots__ = ('_graph',)
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __bool__(self):
+        return len(self._graph) > 0
+
+    def __len__(self):
+        return sum(1 for idx in self._graph._srev_head if idx != -1)
+
+    def __getitem__(self, key):
+        graph = self._graph
+        revs = []
+        idx = graph._srev_head[key]
+        while idx != -1:
+            revs.append(graph._sha(idx))
+            idx = graph._srev_next[idx]
+        if not revs:
+            raise KeyError(key)
+        return tuple(revs)
+
+
 class StorageFactory(object):
     __dict = weakref.WeakValueDictionary()
     __dict_nonweak = {}
@@ -230,7 +695,7 @@ class StorageFactory(object):
     __dict_lock = Lock()
 
     def __init__(self, repo, log, weak=True, git_bin='git',
-                 git_fs_encoding=None):
+                 git_fs_encoding=None, graph_path=None, pool_size=8):
         self.logger = log
 
         with self.__dict_lock:
@@ -245,7 +710,8 @@ class StorageFactory(object):
                 i = self.__dict[repo]
             except KeyError:
                 rev_cache = self.__dict_rev_cache.get(repo)
-                i = Storage(repo, log, git_bin, git_fs_encoding, rev_cache)
+                i = Storage(repo, log, git_bin, git_fs_encoding, rev_cache,
+                            graph_path, pool_size)
                 self.__dict[repo] = i
 
             # create additional reference depending on 'weak' argument
@@ -277,6 +743,7 @@ class Storage(object):
     """High-level wrapper around GitCore with in-memory caching"""
 
     __SREV_MIN = 4 # minimum short-rev length
+    __CAT_FILE_CHUNK = 256 # objects requested at once by cat_files
 
     class RevCache(object):
 
@@ -360,7 +827,7 @@ class Storage(object):
         }
 
     def __init__(self, git_dir, log, git_bin='git', git_fs_encoding=None,
-                 rev_cache=None):
+                 rev_cache=None, graph_path=None, pool_size=8):
         """Initialize PyGit.Storage instance
 
         `git_dir`: path to .git folder;
@@ -375,6 +842,14 @@ class Storage(object):
                 if `None`, no implicit decoding/encoding to/from
                 unicode objects is performed, and bytestrings are
                 returned instead
+
+        `graph_path`: path of the file in which the commit graph is
+                stored and shared between processes, see `CommitGraph`;
+                if `None`, the commit graph is built in memory
+
+        `pool_size`: maximum number of each kind of long-lived git
+                processes, like `git cat-file --batch`, see
+                `GitProcessPool`
         """
 
         self.logger = log
@@ -385,15 +860,13 @@ class Storage(object):
         self.__rev_cache = rev_cache or self.RevCache.empty()
         self.__rev_cache_refresh = True
         self.__rev_cache_lock = Lock()
+        self.__graph_path = graph_path
 
         # cache the last 200 commit messages
         self.__commit_msg_cache = SizedDict(200)
         self.__commit_msg_lock = Lock()
 
-        self.__cat_file_pipe = None
-        self.__cat_file_pipe_lock = Lock()
-        self.__diff_tree_pipe = None
-        self.__diff_tree_pipe_lock = Lock()
+        self.__pools = []
 
         if git_fs_encoding is not None:
             # validate encoding name
@@ -437,22 +910,24 @@ class Storage(object):
         self.repo = GitCore(git_dir, git_bin, log, git_fs_encoding)
         self.repo_path = git_dir
 
+        self.__cat_file_pool = GitProcessPool(self.repo.cat_file_batch,
+                                              pool_size)
+        self.__cat_file_check_pool = GitProcessPool(
+            self.repo.cat_file_batch_check, pool_size)
+        self.__diff_tree_pool = GitProcessPool(self.repo.diff_tree_pipe,
+                                               pool_size)
+        self.__pools = [self.__cat_file_pool, self.__cat_file_check_pool,
+                        self.__diff_tree_pool]
+
         self.logger.debug("PyGIT.Storage instance for '%s' is constructed",
                           git_dir)
 
     def _cleanup_proc(self, proc):
-        if proc:
-            for f in (proc.stdin, proc.stdout, proc.stderr):
-                if f:
-                    f.close()
-            terminate(proc)
-            proc.wait()
+        _cleanup_proc(proc)
 
     def __del__(self):
-        with self.__cat_file_pipe_lock:
-            self._cleanup_proc(self.__cat_file_pipe)
-        with self.__diff_tree_pipe_lock:
-            self._cleanup_proc(self.__diff_tree_pipe)
+        for pool in self.__pools:
+            pool.close()
 
     #
     # cache handling
@@ -492,6 +967,14 @@ class Storage(object):
         return refreshed
 
     def _build_rev_cache(self, refs):
+        if self.__graph_path:
+            try:
+                return self._update_commit_graph(refs)
+            except OSError as e:
+                self.logger.warning("Failed to update commit graph %s: %s",
+                                    self.__graph_path,
+                                    exception_to_unicode(e))
+
         self.logger.debug("triggered rebuild of commit tree db for '%s'",
                           self.repo_path)
         ts0 = time_now()
@@ -583,6 +1066,17 @@ class Storage(object):
                           1000 * (time_now() - ts0))
         return rev_cache
 
+    def _update_commit_graph(self, refs):
+        ts0 = time_now()
+        graph = CommitGraph.update(self.__graph_path, self.repo, refs,
+                                   self.logger)
+        rev_cache = self.RevCache(graph.youngest_rev, graph.oldest_rev,
+                                  graph, refs, graph.short_revs)
+        self.logger.debug("updated commit graph for '%s' with %d entries "
+                          "(took %.1f ms)", self.repo_path, len(graph),
+                          1000 * (time_now() - ts0))
+        return rev_cache
+
     def _get_refs(self):
         refs = {}
         tags = {}
@@ -673,6 +1167,9 @@ class Storage(object):
             if lin_rev < 1 or lin_rev > len(rev_dict):
                 return None
 
+            if isinstance(rev_dict, CommitGraph):
+                return rev_dict.rev_by_ordinal(lin_rev)
+
             for k, v in rev_dict.items():
                 if v[2] == lin_rev:
                     return k
@@ -704,59 +1201,88 @@ class Storage(object):
     def cat_file(self, kind, sha):
         return self._cat_file_reader(kind, sha).read()
 
-    def _cat_file_reader(self, kind, sha):
-        with self.__cat_file_pipe_lock:
-            if self.__cat_file_pipe is None:
-                self.__cat_file_pipe = self.repo.cat_file_batch()
-
-            try:
-                self.__cat_file_pipe.stdin.write(sha + b'\n')
-                self.__cat_file_pipe.stdin.flush()
-
-                split_stdout_line = self.__cat_file_pipe.stdout.readline() \
-                                                               .split()
-                if len(split_stdout_line) != 3:
-                    raise GitError("internal error (could not split line %s)" %
-                                   repr(split_stdout_line))
-
-                _sha, _type, _size = split_stdout_line
-
-                if _type != kind:
-                    raise GitError("internal error (got unexpected object "
-                                   "kind %r, expected %r)" % (_type, kind))
+    def cat_files(self, kind, shas):
+        """Return the list of the contents of the objects `shas`, which
+        must all be of the given `kind`.
 
-                size = int(_size)
+        The objects are requested by chunks to the `git cat-file --batch`
+        process, which saves a round trip per object.
+        """
+        shas = list(shas)
+        contents = []
+        step = self.__CAT_FILE_CHUNK
+        with self.__cat_file_pool.acquire() as proc:
+            for idx in range(0, len(shas), step):
+                chunk = shas[idx:idx + step]
+                proc.stdin.write(b''.join(sha + b'\n' for sha in chunk))
+                proc.stdin.flush()
+                for sha in chunk:
+                    buf = self._read_cat_file_object(proc, kind)
+                    contents.append(buf.read())
+        return contents
 
-                # stdout.read() can return fewer bytes than requested,
-                # especially if a pipe buffers because the contents are
-                # larger than 64k.
-                stdout_read = self.__cat_file_pipe.stdout.read
-                if size > 32 * 1024 * 1024:
-                    buf = tempfile.TemporaryFile()
-                else:
-                    buf = io.BytesIO()
-                remaining = size + 1
-                while remaining > 0:
-                    chunk = stdout_read(min(remaining, 65536))
-                    if not chunk:
-                        # No new data, let's abort
-                        raise GitError("internal error (expected to read %d "
-                                       "bytes, but only got %d)" %
-                                       (size + 1, size + 1 - remaining))
-                    remaining -= len(chunk)
-                    buf.write(chunk if remaining > 0 else chunk[:-1])
-
-                buf.seek(0)
-                return buf
-
-            except EnvironmentError as e:
-                # There was an error, we should close the pipe to get to a
-                # consistent state (Otherwise it happens that next time we
-                # call cat_file we get payload from previous call)
-                self.logger.warning("closing cat_file pipe: %s",
-                                    exception_to_unicode(e))
-                self._cleanup_proc(self.__cat_file_pipe)
-                self.__cat_file_pipe = None
+    def _cat_file_reader(self, kind, sha):
+        try:
+            with self.__cat_file_pool.acquire() as proc:
+                proc.stdin.write(sha + b'\n')
+                proc.stdin.flush()
+                return self._read_cat_file_object(proc, kind)
+        except EnvironmentError as e:
+            # The process has been discarded by the pool, so that the
+            # next call doesn't get the payload from this call
+            self.logger.warning("closing cat_file pipe: %s",
+                                exception_to_unicode(e))
+
+    def _read_cat_file_header(self, proc):
+        """Read the `<sha> <type> <size>` line written by `git cat-file
+        --batch` or `--batch-check`, and return the type and the size,
+        or `None` if the object is missing.
+        """
+        split_stdout_line = proc.stdout.readline().split()
+        if len(split_stdout_line) == 2 and \
+                split_stdout_line[1] in (b'missing', b'ambiguous'):
+            return None
+        if len(split_stdout_line) != 3:
+            raise GitError("internal error (could not split line %s)" %
+                           repr(split_stdout_line))
+
+        _sha, _type, _size = split_stdout_line
+        return _type, int(_size)
+
+    def _read_cat_file_object(self, proc, kind):
+        header = self._read_cat_file_header(proc)
+        if header is None:
+            raise GitErrorSha("object not found")
+        _type, size = header
+
+        if _type != kind:
+            raise GitError("internal error (got unexpected object "
+                           "kind %r, expected %r)" % (_type, kind))
+
+        return self._read_cat_file_content(proc, size)
+
+    def _read_cat_file_content(self, proc, size):
+        # stdout.read() can return fewer bytes than requested,
+        # especially if a pipe buffers because the contents are
+        # larger than 64k.
+        stdout_read = proc.stdout.read
+        if size > 32 * 1024 * 1024:
+            buf = tempfile.TemporaryFile()
+        else:
+            buf = io.BytesIO()
+        remaining = size + 1
+        while remaining > 0:
+            chunk = stdout_read(min(remaining, 65536))
+            if not chunk:
+                # No new data, let's abort
+                raise GitError("internal error (expected to read %d "
+                               "bytes, but only got %d)" %
+                               (size + 1, size + 1 - remaining))
+            remaining -= len(chunk)
+            buf.write(chunk if remaining > 0 else chunk[:-1])
+
+        buf.seek(0)
+        return buf
 
     def verifyrev(self, rev):
         """verify/lookup given revision object and return a sha id or None
@@ -866,7 +1392,9 @@ class Storage(object):
     def ls_tree(self, rev, path='', recursive=False):
         rev = self._fs_from_unicode(rev) if rev else b'HEAD'  # paranoia
         path = self._fs_from_unicode(path).lstrip(b'/') or b'.'
-        tree = self.repo.ls_tree('-zlr' if recursive else '-zl',
+        if not recursive and b'\n' not in rev and b'\n' not in path:
+            return self._ls_tree_batch(rev, path)
+        tree = self.repo.ls_tree('-zl' + ('r' if recursive else ''),
                                  rev, '--', path).split(b'\0')
 
         def split_ls_tree_line(l):
@@ -883,6 +1411,59 @@ class Storage(object):
 
         return [split_ls_tree_line(e) for e in tree if e]
 
+    def _ls_tree_batch(self, rev, path):
+        """Emulate `git ls-tree -l <rev> -- <path>` by reading the tree
+        objects through `git cat-file --batch` and the sizes of the
+        blobs through `git cat-file --batch-check`.
+        """
+        if path == b'.':
+            prefix = name = b''
+            treeish = rev + b'^{tree}'
+        elif path.endswith(b'/'):
+            prefix, name = path, b''
+            treeish = rev + b':' + path.rstrip(b'/')
+        else:
+            parent, _, name = path.rpartition(b'/')
+            prefix = parent + b'/' if parent else b''
+            treeish = rev + b':' + parent if parent else rev + b'^{tree}'
+
+        with self.__cat_file_pool.acquire() as proc:
+            proc.stdin.write(treeish + b'\n')
+            proc.stdin.flush()
+            header = self._read_cat_file_header(proc)
+            if header is None:
+                return []
+            _type, size = header
+            data = self._read_cat_file_content(proc, size).read()
+        if _type != b'tree':
+            return []
+
+        entries = []
+        pos = 0
+        while pos < len(data):
+            sp = data.index(b' ', pos)
+            nul = data.index(b'\0', sp)
+            fname = data[sp + 1:nul]
+            if not name or fname == name:
+                mode = int(data[pos:sp], 8)
+                sha = binascii.hexlify(data[nul + 1:nul + 21])
+                if mode & 0o170000 == 0o040000:
+                    kind = 'tree'
+                elif mode & 0o170000 == 0o160000:
+                    kind = 'commit'
+                else:
+                    kind = 'blob'
+                entries.append([mode, kind, sha, None,
+                                self._fs_to_unicode(prefix + fname)])
+            pos = nul + 21
+
+        blobs = [entry for entry in entries if entry[1] == 'blob']
+        for entry, size in zip(blobs,
+                               self._get_obj_sizes([e[2] for e in blobs])):
+            entry[3] = size
+        return [(mode, kind, _rev_u(sha), size, fname)
+                for mode, kind, sha, size, fname in entries]
+
     def read_commit(self, commit_id):
         if not commit_id:
             raise GitError("read_commit called with empty commit_id")
@@ -910,18 +1491,77 @@ class Storage(object):
             self.__commit_msg_cache[commit_id] = result
         return result[0], dict(result[1])
 
+    def read_commits(self, commit_ids):
+        """Read several commits, retrieving the ones which are not cached
+        in a single pass through `git cat-file --batch`.
+
+        Return a `dict` mapping the given commit ids to `(message,
+        properties)` tuples, as returned by `read_commit`. The unknown
+        commits are left out.
+        """
+        rev_dict = self.get_commits()
+        fullrevs = {}
+        for commit_id in commit_ids:
+            fullrev = self.fullrev(_rev_b(commit_id))
+            if fullrev is not None and fullrev in rev_dict:
+                fullrevs[commit_id] = fullrev
+
+        results = {}
+        missing = []
+        with self.__commit_msg_lock:
+            for fullrev in set(fullrevs.values()):
+                if fullrev in self.__commit_msg_cache:
+                    results[fullrev] = self.__commit_msg_cache[fullrev]
+                else:
+                    missing.append(fullrev)
+
+        if missing:
+            encoding = self.get_commit_encoding()
+            for fullrev, raw in zip(missing,
+                                    self.cat_files(b'commit', missing)):
+                results[fullrev] = parse_commit(str(raw, encoding,
+                                                    'replace'))
+            with self.__commit_msg_lock:
+                for fullrev in missing:
+                    self.__commit_msg_cache[fullrev] = results[fullrev]
+
+        return {commit_id: (results[fullrev][0], dict(results[fullrev][1]))
+                for commit_id, fullrev in fullrevs.items()}
+
     def get_file(self, sha):
         sha = _rev_b(sha)
         return self._cat_file_reader(b'blob', sha)
 
     def get_obj_size(self, sha):
-        sha = _rev_b(sha)
-        try:
-            obj_size = int(self.repo.cat_file(b'-s', sha).strip())
-        except ValueError:
+        obj_size = self.get_obj_sizes([sha])[0]
+        if obj_size is None:
             raise GitErrorSha("object '%s' not found" % sha)
         return obj_size
 
+    def get_obj_sizes(self, shas):
+        """Return the list of the sizes of the objects `shas`, with
+        `None` for the missing objects, requested by chunks to the
+        `git cat-file --batch-check` process.
+        """
+        return self._get_obj_sizes([_rev_b(sha) for sha in shas])
+
+    def _get_obj_sizes(self, shas):
+        if not shas:
+            return []
+        sizes = []
+        step = self.__CAT_FILE_CHUNK
+        with self.__cat_file_check_pool.acquire() as proc:
+            # The replies of a chunk are read before writing the next
+            # one, as git stops reading when its output pipe is full
+            for idx in range(0, len(shas), step):
+                chunk = shas[idx:idx + step]
+                proc.stdin.write(b''.join(sha + b'\n' for sha in chunk))
+                proc.stdin.flush()
+                for sha in chunk:
+                    header = self._read_cat_file_header(proc)
+                    sizes.append(header[1] if header else None)
+        return sizes
+
     def children(self, sha):
         sha = _rev_b(sha)
         rev_dict = self.get_commits()
@@ -1082,35 +1722,27 @@ class Storage(object):
         assert not in_metadata
 
     def get_changes(self, tree1, tree2):
-        with self.__diff_tree_pipe_lock:
-            if self.__diff_tree_pipe is None:
-                self.__diff_tree_pipe = self.repo.diff_tree_pipe()
-            proc = self.__diff_tree_pipe
-            try:
-                proc.stdin.write(b'%s %s\n\n' % (_rev_b(tree2), _rev_b(tree1))
-                                 if tree1 else
-                                 b'%s\n\n' % _rev_b(tree2))
-                proc.stdin.flush()
-                read = proc.stdout.read
-                entries = []
-                c = read(1)
-                if not c:
-                    raise EOFError()
-                while c != b'\n':
-                    entry = bytearray()
-                    while c != b'\0':
-                        entry.append(c[0])
-                        c = read(1)
-                        if not c:
-                            raise EOFError()
-                    entries.append(bytes(entry))
+        with self.__diff_tree_pool.acquire() as proc:
+            proc.stdin.write(b'%s %s\n\n' % (_rev_b(tree2), _rev_b(tree1))
+                             if tree1 else
+                             b'%s\n\n' % _rev_b(tree2))
+            proc.stdin.flush()
+            read = proc.stdout.read
+            entries = []
+            c = read(1)
+            if not c:
+                raise EOFError()
+            while c != b'\n':
+                entry = bytearray()
+                while c != b'\0':
+                    entry.append(c[0])
                     c = read(1)
                     if not c:
                         raise EOFError()
-            except:
-                self.__diff_tree_pipe = None
-                self._cleanup_proc(proc)
-                raise
+                entries.append(bytes(entry))
+                c = read(1)
+                if not c:
+                    raise EOFError()
         if not entries:
             return
         # skip first entry as a sha
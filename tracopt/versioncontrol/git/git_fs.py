@@ -13,6 +13,7 @@
 # history and logs, available at https://trac.edgewall.org/log/.
 
 from datetime import datetime
+import hashlib
 import itertools
 import os
 
@@ -20,6 +21,7 @@ from trac.api import ISystemInfoProvider
 from trac.cache import cached
 from trac.config import BoolOption, IntOption, ListOption, PathOption, Option
 from trac.core import Component, TracError, implements
+from trac.db.util import chunked_params
 from trac.util.datefmt import FixedOffset, to_timestamp, format_datetime
 from trac.util.html import Markup, tag
 from trac.util.text import exception_to_unicode, shorten_line, to_unicode
@@ -80,6 +82,9 @@ class GitCachedRepository(CachedRepository):
     def get_changeset(self, rev):
         return GitCachedChangeset(self, self.normalize_rev(rev), self.env)
 
+    def _create_changeset(self, rev, row):
+        return GitCachedChangeset(self, rev, self.env, row)
+
     def sync(self, feedback=None, clean=False):
         if clean:
             self.remove_cache()
@@ -97,12 +102,8 @@ class GitCachedRepository(CachedRepository):
             return False
 
         def needs_sync():
-            max_holders = 999
             revs = sorted(set(rev for refname, rev in repos.git.get_refs()))
-            step = max_holders - 1
-            for idx in range(0, len(revs), step):
-                revs_ = revs[idx:idx + step]
-                holders = ','.join(('%s',) * len(revs_))
+            for revs_, holders in chunked_params(revs, reserved=1):
                 args = [self.id]
                 args.extend(revs_)
                 query = """SELECT COUNT(*) FROM revision
@@ -133,27 +134,51 @@ class GitCachedRepository(CachedRepository):
                     revs[idx:idx] = traverse(rev, seen)
             return revs
 
+        def insert_changesets(revs):
+            # insert the changesets in a single transaction, or one by one
+            # if some of them are already cached
+            self.log.info("Trying to sync revisions [%s:%s]",
+                          revs[0], revs[-1])
+            changesets = repos.get_changesets_batch(revs)
+
+            def get_changeset(rev):
+                return changesets.get(rev) or repos.get_changeset(rev)
+
+            try:
+                with self.env.db_transaction:
+                    for rev in revs:
+                        self.insert_changeset(rev, get_changeset(rev))
+                inserted = revs
+            except self.env.db_exc.IntegrityError:
+                inserted = []
+                for rev in revs:
+                    try:
+                        self.insert_changeset(rev, get_changeset(rev))
+                    except self.env.db_exc.IntegrityError as e:
+                        self.log.info('Revision %s already cached: %r',
+                                      rev, e)
+                    else:
+                        inserted.append(rev)
+            for rev in inserted:
+                repos._update_last_change_index(rev)
+                if feedback:
+                    feedback(rev)
+            return bool(inserted)
+
         def sync_revs():
             updated = False
             seen = set()
+            batch_size = max(1, RepositoryManager(self.env).sync_batch_size)
 
             for rev in repos.git.all_revs():
                 if repos.child_revs(rev):
                     continue
                 revs = traverse(rev, seen)  # topology ordered
-                while revs:
-                    # sync revision from older revision to newer revision
-                    rev = revs.pop()
-                    self.log.info("Trying to sync revision [%s]", rev)
-                    cset = repos.get_changeset(rev)
-                    try:
-                        self.insert_changeset(rev, cset)
+                # sync revision from older revision to newer revision
+                revs.reverse()
+                for idx in range(0, len(revs), batch_size):
+                    if insert_changesets(revs[idx:idx + batch_size]):
                         updated = True
-                    except self.env.db_exc.IntegrityError as e:
-                        self.log.info('Revision %s already cached: %r', rev, e)
-                        continue
-                    if feedback:
-                        feedback(rev)
 
             return updated
 
@@ -198,6 +223,9 @@ def _last_iterable(iterable):
         v = nextv
     yield True, v
 
+def _basename(path):
+    return path.rsplit('/', 1)[-1]
+
 def intersperse(sep, iterable):
     """The 'intersperse' generator takes an element and an iterable and
     intersperses that element between the elements of the iterable.
@@ -264,6 +292,7 @@ class GitConnector(Component):
     # IWikiSyntaxProvider methods
 
     def _format_sha_link(self, formatter, sha, label):
+        formatter.depends_on('changeset')
         # FIXME: this function needs serious rethinking...
 
         reponame = ''
@@ -308,6 +337,15 @@ class GitConnector(Component):
     cached_repository = BoolOption('git', 'cached_repository', 'false',
         """Wrap `GitRepository` in `CachedRepository`.""")
 
+    commit_graph_dir = PathOption('git', 'commit_graph_dir', '',
+        """Directory in which the commit graph of each repository is
+        stored in a file mapped into memory, so that it is shared between
+        processes and only extended with the new commits when the
+        repository changes. Relative paths are resolved relative to the
+        `conf` directory of the environment. The commit graph is built in
+        the memory of each process when empty. (''since 1.7.1'')
+        """)
+
     shortrev_len = IntOption('git', 'shortrev_len', 7,
         """The length at which a sha1 is abbreviated (must be >= 4
         and <= 40).
@@ -343,6 +381,14 @@ class GitConnector(Component):
     git_bin = Option('git', 'git_bin', 'git',
         """Path to the git executable.""")
 
+    worker_pool_size = IntOption('git', 'worker_pool_size', 8,
+        """Maximum number of long-lived `git cat-file` and `git diff-tree`
+        processes of each kind per repository, which are shared by the
+        requests. It should be at least the number of threads serving
+        requests, as the requests wait for a free process otherwise.
+        (''since 1.7.1'')
+        """)
+
 
     def get_supported_types(self):
         yield ('git', 8)
@@ -393,14 +439,22 @@ class GitConnector(Component):
             def rlookup_uid(_):
                 return None
 
+        if self.commit_graph_dir:
+            graph_path = os.path.join(self.commit_graph_dir, hashlib.sha1(
+                os.path.normcase(dir).encode('utf-8')).hexdigest())
+        else:
+            graph_path = None
+
         repos = GitRepository(self.env, dir, params, self.log,
                               persistent_cache=self.persistent_cache,
+                              graph_path=graph_path,
                               git_bin=self.git_bin,
                               git_fs_encoding=self.git_fs_encoding,
                               shortrev_len=self.shortrev_len,
                               rlookup_uid=rlookup_uid,
                               use_committer_id=self.use_committer_id,
                               use_committer_time=self.use_committer_time,
+                              pool_size=self.worker_pool_size,
                               )
 
         if self.cached_repository:
@@ -504,12 +558,14 @@ class GitRepository(Repository):
 
     def __init__(self, env, path, params, log,
                  persistent_cache=False,
+                 graph_path=None,
                  git_bin='git',
                  git_fs_encoding='utf-8',
                  shortrev_len=7,
                  rlookup_uid=lambda _: None,
                  use_committer_id=False,
                  use_committer_time=False,
+                 pool_size=8,
                  ):
 
         self.env = env
@@ -525,7 +581,9 @@ class GitRepository(Repository):
         try:
             factory = PyGIT.StorageFactory(path, log, not persistent_cache,
                                            git_bin=git_bin,
-                                           git_fs_encoding=git_fs_encoding)
+                                           git_fs_encoding=git_fs_encoding,
+                                           graph_path=graph_path,
+                                           pool_size=pool_size)
             self._git = factory.getInstance()
         except PyGIT.GitError as e:
             log.error(exception_to_unicode(e))
@@ -584,6 +642,96 @@ class GitRepository(Repository):
     def _get_node(self, path, rev, ls_tree_info=None, historian=None):
         return GitNode(self, path, rev, self.log, ls_tree_info, historian)
 
+    # Last change index
+    #
+    # The `node_last_change` table maps the entries of a directory to the
+    # revisions in which they were last changed. The entries of a directory
+    # only change with the directory itself, so they are keyed by the
+    # revision in which the directory was last changed (its `created_rev`)
+    # and are shared by all the revisions up to its next change.
+
+    def _get_entry_changes(self, rev, path, entries):
+        """Return a `dict` mapping the paths of the `entries` of the
+        directory `path` last changed in `rev` to their last changes,
+        or `None` if they are not in the index and can't be derived
+        from the index of the parent revision.
+        """
+        changes = self._load_entry_changes(rev, path)
+        if not changes:
+            changes = self._derive_entry_changes(rev, path, entries)
+            if changes is None:
+                return None
+            self._save_entry_changes(rev, path, changes)
+        try:
+            return {entry[-1]: changes[_basename(entry[-1])]
+                    for entry in entries}
+        except KeyError:
+            self.log.warning("Inconsistent last change index for '%s' in "
+                             "[%s]", path, rev)
+            return None
+
+    def _load_entry_changes(self, rev, path):
+        return dict(self.env.db_query("""
+            SELECT name, change_rev FROM node_last_change
+            WHERE repos=%s AND rev=%s AND path=%s
+            """, (self.id, rev, path)))
+
+    def _derive_entry_changes(self, rev, path, entries):
+        """Compute the last changes of the `entries` of the directory
+        `path` last changed in `rev`, from the index of the directory
+        in the parent revision.
+        """
+        parents = self.git.parents(rev)
+        if len(parents) > 1:
+            return None  # merges are left to the historian
+        parent_changes = parent_entries = {}
+        if parents:
+            parent = parents[0]
+            parent_rev = self.git.last_change(parent, path) \
+                         if path else parent
+            if parent_rev:
+                parent_changes = self._load_entry_changes(parent_rev, path)
+                if not parent_changes:
+                    return None
+                parent_entries = {
+                    entry[-1]: entry[:3]
+                    for entry in self.git.ls_tree(parent,
+                                                  path and path + '/')}
+        changes = {}
+        for entry in entries:
+            name = _basename(entry[-1])
+            if name in parent_changes and \
+                    parent_entries.get(entry[-1]) == entry[:3]:
+                changes[name] = parent_changes[name]
+            else:
+                changes[name] = rev
+        return changes
+
+    def _save_entry_changes(self, rev, path, changes):
+        if not changes or None in changes.values():
+            return
+        try:
+            with self.env.db_transaction as db:
+                db.executemany("""
+                    INSERT INTO node_last_change
+                      (repos, rev, path, name, change_rev)
+                    VALUES (%s,%s,%s,%s,%s)
+                    """, [(self.id, rev, path, name, change)
+                          for name, change in changes.items()])
+        except self.env.db_exc.IntegrityError:
+            pass  # indexed concurrently
+
+    def _update_last_change_index(self, rev):
+        """Index the root directory of `rev`, if it can be derived from
+        the index of its parent.
+        """
+        parents = self.git.parents(rev)
+        if len(parents) != 1 or not self._load_entry_changes(parents[0], ''):
+            return  # the index is started by browsing the repository
+        changes = self._derive_entry_changes(rev, '', self.git.ls_tree(rev))
+        if changes is not None:
+            self._save_entry_changes(rev, '', changes)
+
     def get_quickjump_entries(self, rev):
         for bname, bsha in self.git.get_branches():
             yield 'branches', bname, '/', bsha
@@ -602,6 +750,12 @@ class GitRepository(Repository):
         """GitChangeset factory method"""
         return GitChangeset(self, rev)
 
+    def get_changesets_batch(self, revs):
+        revs = set(revs)
+        commits = self.git.read_commits(rev for rev in revs if rev)
+        return {rev: GitChangeset(self, rev, commits[rev])
+                for rev in revs if rev in commits}
+
     def get_changeset_uid(self, rev):
         return self.normalize_rev(rev)
 
@@ -776,11 +930,24 @@ class GitNode(Node):
         if _is_submodule(self.fs_perm):
             return
 
-        with self.repos.git.get_historian(self.rev,
-                                          self.path.strip('/')) as historian:
-            for ent in self.repos.git.ls_tree(self.rev, self.__git_path()):
+        path = self.path.strip('/')
+        entries = self.repos.git.ls_tree(self.rev, self.__git_path())
+        changes = self.repos._get_entry_changes(self.created_rev, path,
+                                                entries)
+        if changes is not None:
+            for ent in entries:
                 yield GitNode(self.repos, ent[-1], self.rev, self.log, ent,
-                              historian)
+                              changes.get)
+            return
+
+        changes = {}
+        with self.repos.git.get_historian(self.rev, path) as historian:
+            for ent in entries:
+                node = GitNode(self.repos, ent[-1], self.rev, self.log, ent,
+                               historian)
+                changes[_basename(ent[-1])] = node.created_rev
+                yield node
+        self.repos._save_entry_changes(self.created_rev, path, changes)
 
     def get_content_type(self):
         if self.isdir:
@@ -836,14 +1003,16 @@ class GitChangeset(Changeset):
         'C': Changeset.COPY
         } # TODO: U, X, B
 
-    def __init__(self, repos, sha):
+    def __init__(self, repos, sha, commit=None):
         if sha is None:
             raise NoSuchChangeset(sha)
 
-        try:
-            msg, props = repos.git.read_commit(sha)
-        except PyGIT.GitErrorSha:
-            raise NoSuchChangeset(sha)
+        if commit is None:
+            try:
+                commit = repos.git.read_commit(sha)
+            except PyGIT.GitErrorSha:
+                raise NoSuchChangeset(sha)
+        msg, props = commit
 
         self.props = props
 
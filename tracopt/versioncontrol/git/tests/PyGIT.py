@@ -13,6 +13,7 @@
 
 import os
 import tempfile
+import threading
 import unittest
 from datetime import datetime
 
@@ -20,9 +21,10 @@ from trac.test import EnvironmentStub, makeSuite, mkdtemp, rmtree
 from trac.util import create_file
 from trac.versioncontrol.api import Changeset, DbRepositoryProvider, \
                                     RepositoryManager
-from tracopt.versioncontrol.git.PyGIT import GitCore, GitError, Storage, \
-                                             SizedDict, StorageFactory, \
-                                             parse_commit
+from tracopt.versioncontrol.git.PyGIT import CommitGraph, GitCore, \
+                                             GitError, GitProcessPool, \
+                                             SizedDict, Storage, \
+                                             StorageFactory, parse_commit
 from tracopt.versioncontrol.git.tests.git_fs import GitCommandMixin
 
 
@@ -331,6 +333,72 @@ class NormalTestCase(unittest.TestCase, GitCommandMixin):
         validate(paths[1], 'true')
         validate(paths[1], 'false')
 
+    def test_ls_tree_using_cat_file(self):
+        os.makedirs(os.path.join(self.repos_path, 'dir', 'sub'))
+        for path, content in (('dir/a.txt', 'a' * 42), ('dir/b.txt', ''),
+                              ('dir/sub/c.txt', 'c'), ('top.txt', 'top')):
+            create_file(os.path.join(self.repos_path, path), content)
+            self._git('add', path)
+        self._git_commit('-m', 'add files',
+                         date=datetime(2026, 10, 17, 10, 0, 0))
+
+        storage = self._storage()
+        rev = storage.head()
+
+        def ls_tree_cmd(path):
+            entries = []
+            for line in storage.repo.ls_tree('-zl', rev, '--', path) \
+                               .split(b'\0'):
+                if line:
+                    meta, fname = line.split(b'\t', 1)
+                    mode, kind, sha, size = meta.split()
+                    entries.append((int(mode, 8), str(kind, 'utf-8'),
+                                    str(sha, 'ascii'),
+                                    None if size == b'-' else int(size),
+                                    str(fname, 'utf-8')))
+            return entries
+
+        for path in ('.', 'dir', 'dir/', 'dir/sub/', 'dir/a.txt',
+                     'top.txt', 'top.txt/', 'missing', 'dir/missing/'):
+            self.assertEqual(ls_tree_cmd(path), storage.ls_tree(rev, path),
+                             path)
+        self.assertEqual(
+            [(0o100644, 'blob', 42, 'dir/a.txt'),
+             (0o100644, 'blob', 0, 'dir/b.txt'),
+             (0o40000, 'tree', None, 'dir/sub')],
+            [(mode, kind, size, name) for mode, kind, sha, size, name
+                                      in storage.ls_tree(rev, 'dir/')])
+        self.assertEqual([], storage.ls_tree('0' * 40, 'dir/'))
+
+    def test_get_obj_sizes(self):
+        create_file(os.path.join(self.repos_path, 'file.txt'), 'x' * 42)
+        self._git('add', 'file.txt')
+        self._git_commit('-m', 'add file.txt',
+                         date=datetime(2026, 10, 17, 10, 0, 0))
+
+        storage = self._storage()
+        entries = storage.ls_tree(storage.head(), '.')
+        shas = [entry[2] for entry in entries]
+        self.assertEqual([0, 42], storage.get_obj_sizes(shas))
+        self.assertEqual(42, storage.get_obj_size(shas[1]))
+        self.assertEqual([None, 42],
+                         storage.get_obj_sizes(['0' * 40, shas[1]]))
+        self.assertRaises(GitError, storage.get_obj_size, '0' * 40)
+
+    def test_get_obj_sizes_larger_than_pipe_buffer(self):
+        # The replies for 6000 objects don't fit in the pipe buffer
+        os.makedirs(os.path.join(self.repos_path, 'dir'))
+        for idx in range(6000):
+            create_file(os.path.join(self.repos_path, 'dir',
+                                     'file%04d.txt' % idx), 'x' * idx)
+        self._git('add', 'dir')
+        self._git_commit('-m', 'add files',
+                         date=datetime(2026, 10, 17, 10, 0, 0))
+
+        storage = self._storage()
+        entries = storage.ls_tree(storage.head(), 'dir/')
+        self.assertEqual(list(range(6000)), [entry[3] for entry in entries])
+
     def test_cat_file_with_large_files(self):
         # regression test for #13327
         # Note that you may want to run this with gevent, by installing gevent
@@ -474,6 +542,244 @@ class UnicodeNameTestCase(unittest.TestCase, GitCommandMixin):
         validate(paths[1], 'false')
 
 
+class CommitGraphTestCase(unittest.TestCase, GitCommandMixin):
+
+    def setUp(self):
+        self.env = EnvironmentStub()
+        self.repos_path = mkdtemp()
+        self.graph_dir = mkdtemp()
+        self.graph_path = os.path.join(self.graph_dir, 'graph')
+        self._git('init')
+        self._git('config', 'user.name', "Joe")
+        self._git('config', 'user.email', "joe@example.com")
+        self._commit('root', datetime(2013, 1, 1, 9, 4, 56))
+
+    def tearDown(self):
+        StorageFactory._clean()
+        self.env.reset_db()
+        for path in (self.repos_path, self.graph_dir):
+            if os.path.isdir(path):
+                rmtree(path)
+
+    def _commit(self, message, date):
+        self._git_commit('--allow-empty', '-m', message, date=date)
+
+    def _storage(self, graph_path=None):
+        path = os.path.join(self.repos_path, '.git')
+        return Storage(path, self.env.log, self.git_bin, 'utf-8',
+                       graph_path=graph_path)
+
+    def _create_branches(self):
+        self._git('checkout', '-b', 'b1')
+        self._commit('b1-1', datetime(2013, 1, 2, 9, 0, 0))
+        self._commit('b1-2', datetime(2013, 1, 3, 9, 0, 0))
+        self._git('checkout', 'master')
+        self._commit('master-1', datetime(2013, 1, 4, 9, 0, 0))
+        self._git('merge', '--no-ff', '-m', 'merge b1', 'b1')
+        self._git('tag', 'v1.0')
+
+    def _assert_same_graph(self, expected, storage):
+        commits = storage.get_commits()
+        self.assertIsInstance(commits, CommitGraph)
+        self.assertEqual(set(expected.all_revs()), set(storage.all_revs()))
+        for rev in expected.all_revs():
+            self.assertEqual(expected.children(rev), storage.children(rev))
+            self.assertEqual(expected.parents(rev), storage.parents(rev))
+            self.assertEqual(expected.get_branch_contains(rev, True),
+                             storage.get_branch_contains(rev, True))
+            self.assertEqual(rev.encode('ascii'),
+                             storage.fullrev(rev[:7].encode('ascii')))
+            self.assertEqual(expected.shortrev(rev), storage.shortrev(rev))
+            self.assertEqual(rev[:7], storage.shortrev(rev))
+            self.assertEqual(rev, storage.verifyrev(rev[:7]))
+            for parent in storage.parents(rev):
+                self.assertLess(commits[rev.encode('ascii')][2],
+                                commits[parent.encode('ascii')][2])
+        self.assertEqual(expected.get_branches(), storage.get_branches())
+        self.assertEqual(expected.get_tags(), storage.get_tags())
+        self.assertIsNone(storage.verifyrev('0' * 40))
+
+    def _assert_linear_history(self, storage):
+        revs = set()
+        rev = storage.youngest_rev()
+        while rev:
+            revs.add(rev)
+            rev = storage.hist_prev_revision(rev)
+        self.assertEqual(set(storage.all_revs()), revs)
+        self.assertIsNone(storage.hist_next_revision(storage.youngest_rev()))
+
+    def test_same_as_in_memory(self):
+        self._create_branches()
+        storage = self._storage(self.graph_path)
+        self._assert_same_graph(self._storage(), storage)
+        self._assert_linear_history(storage)
+        self.assertTrue(os.path.isfile(self.graph_path))
+
+    def test_empty_repository(self):
+        rmtree(self.repos_path)
+        self.repos_path = mkdtemp()
+        self._git('init')
+        storage = self._storage(self.graph_path)
+        self.assertEqual([], list(storage.all_revs()))
+        self.assertIsNone(storage.youngest_rev())
+        self.assertEqual([], storage.get_branches())
+
+    def test_shared_between_instances(self):
+        self._create_branches()
+        storage = self._storage(self.graph_path)
+        storage.sync()
+        mtime = os.stat(self.graph_path).st_mtime_ns
+        other = self._storage(self.graph_path)
+        self._assert_same_graph(storage, other)
+        self.assertFalse(other.sync())
+        self.assertEqual(mtime, os.stat(self.graph_path).st_mtime_ns)
+
+    def test_extend_with_new_commits(self):
+        storage = self._storage(self.graph_path)
+        root = storage.youngest_rev()
+        self._create_branches()
+        self.assertTrue(storage.sync())
+        commits = storage.get_commits()
+        self.assertEqual(5, len(commits))
+        # the existing commits keep their position in the graph
+        self.assertEqual(root.encode('ascii'), commits.oldest_rev)
+        self._commit('master-2', datetime(2013, 1, 5, 9, 0, 0))
+        self.assertTrue(storage.sync())
+        self.assertEqual(6, len(storage.get_commits()))
+        self._assert_same_graph(self._storage(), storage)
+        self._assert_linear_history(storage)
+
+    def test_rebuild_after_removing_branch(self):
+        self._create_branches()
+        self._git('checkout', '-b', 'b2')
+        self._commit('b2-1', datetime(2013, 1, 6, 9, 0, 0))
+        self._git('checkout', 'master')
+        storage = self._storage(self.graph_path)
+        storage.sync()
+        self.assertEqual(6, len(storage.get_commits()))
+        b2 = dict(storage.get_branches())['b2']
+
+        self._git('branch', '-D', 'b2')
+        self.assertTrue(storage.sync())
+        self.assertEqual(5, len(storage.get_commits()))
+        self.assertNotIn(b2.encode('ascii'), storage.get_commits())
+        self._assert_same_graph(self._storage(), storage)
+
+    def test_rebuild_invalid_file(self):
+        self._create_branches()
+        create_file(self.graph_path, b'invalid', 'wb')
+        self.assertIsNone(CommitGraph.load(self.graph_path))
+        storage = self._storage(self.graph_path)
+        self._assert_same_graph(self._storage(), storage)
+        self.assertIsNotNone(CommitGraph.load(self.graph_path))
+
+    def test_unwritable_graph_path(self):
+        self._create_branches()
+        create_file(self.graph_dir + '/file')
+        storage = self._storage(os.path.join(self.graph_dir, 'file',
+                                             'graph'))
+        self.assertEqual(5, len(storage.get_commits()))
+        self.assertNotIsInstance(storage.get_commits(), CommitGraph)
+
+
+class GitProcessPoolTestCase(unittest.TestCase, GitCommandMixin):
+
+    def setUp(self):
+        self.env = EnvironmentStub()
+        self.repos_path = mkdtemp()
+        self._git('init')
+        self.repo = GitCore(os.path.join(self.repos_path, '.git'),
+                            self.git_bin)
+        self.procs = []
+
+    def tearDown(self):
+        for proc in self.procs:
+            if proc.poll() is None:
+                proc.kill()
+            for f in (proc.stdin, proc.stdout, proc.stderr):
+                f.close()
+            proc.wait()
+        self.env.reset_db()
+        rmtree(self.repos_path)
+
+    def _factory(self):
+        proc = self.repo.cat_file_batch_check()
+        self.procs.append(proc)
+        return proc
+
+    def _check(self, proc):
+        proc.stdin.write(b'HEAD\n')
+        proc.stdin.flush()
+        return proc.stdout.readline()
+
+    def test_reuse(self):
+        pool = GitProcessPool(self._factory, 2)
+        for idx in range(3):
+            with pool.acquire() as proc:
+                self.assertEqual(b'HEAD missing\n', self._check(proc))
+        self.assertEqual(1, len(self.procs))
+        self.assertEqual(1, len(pool))
+        pool.close()
+        self.assertEqual(0, len(pool))
+        self.assertIsNotNone(self.procs[0].poll())
+
+    def test_concurrent(self):
+        pool = GitProcessPool(self._factory, 2)
+        with pool.acquire() as proc1:
+            with pool.acquire() as proc2:
+                self.assertIsNot(proc1, proc2)
+        self.assertEqual(2, len(self.procs))
+
+        acquired = []
+
+        def worker():
+            with pool.acquire() as proc:
+                acquired.append(proc)
+
+        with pool.acquire() as proc1:
+            with pool.acquire() as proc2:
+                thread = threading.Thread(target=worker)
+                thread.start()
+                thread.join(0.2)
+                self.assertTrue(thread.is_alive())  # waiting for a process
+                self.assertEqual([], acquired)
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(1, len(acquired))
+        self.assertEqual(2, len(self.procs))
+
+    def test_discard_on_error(self):
+        pool = GitProcessPool(self._factory, 2)
+        with self.assertRaises(ValueError):
+            with pool.acquire() as proc:
+                proc.stdin.write(b'HEAD\n')
+                raise ValueError
+        self.assertIsNotNone(proc.poll())
+        with pool.acquire() as proc:
+            self.assertEqual(b'HEAD missing\n', self._check(proc))
+        self.assertEqual(2, len(self.procs))
+
+    def test_replace_exited_process(self):
+        pool = GitProcessPool(self._factory, 2)
+        with pool.acquire() as proc:
+            pass
+        proc.kill()
+        proc.wait()
+        with pool.acquire() as proc:
+            self.assertEqual(b'HEAD missing\n', self._check(proc))
+        self.assertEqual(2, len(self.procs))
+
+    def test_recycle(self):
+        pool = GitProcessPool(self._factory, 2)
+        pool.max_uses = 2
+        for idx in range(5):
+            with pool.acquire() as proc:
+                self._check(proc)
+        self.assertEqual(3, len(self.procs))
+        self.assertEqual([True, True, False],
+                         [proc.poll() is not None for proc in self.procs])
+
+
 class SizedDictTestCase(unittest.TestCase):
 
     def test_setdefault_raises(self):
@@ -636,6 +942,8 @@ def test_suite():
         suite.addTest(makeSuite(TestParseCommit))
         suite.addTest(makeSuite(NormalTestCase))
         suite.addTest(makeSuite(UnicodeNameTestCase))
+        suite.addTest(makeSuite(CommitGraphTestCase))
+        suite.addTest(makeSuite(GitProcessPoolTestCase))
     else:
         print("SKIP: tracopt/versioncontrol/git/tests/PyGIT.py (git cli "
               "binary, 'git', not found)")
@@ -483,6 +483,116 @@ class GitRepositoryTestCase(BaseTestCase):
         self.assertEqual(['0.0.1', 'initial'], get_tags(repos, 'initial'))
         self.assertEqual(['0.1.0a', '0.1.0dev'], get_tags(repos, '0.1.0dev'))
 
+    def test_get_changesets_batch(self):
+        self._git_init()
+        self._create_merge_commit()
+        self._add_repository('gitrepos')
+        repos = self._repomgr.get_repository('gitrepos')
+        repos.sync()
+        revs = [entry[1] for entry in repos.get_node('').get_history()]
+        self.assertEqual(6, len(revs))
+
+        changesets = repos.get_changesets_batch(revs + [revs[0], '1' * 40])
+        self.assertEqual(set(revs), set(changesets))
+        for rev in revs:
+            changeset = repos.get_changeset(rev)
+            batched = changesets[rev]
+            self.assertEqual(changeset.rev, batched.rev)
+            self.assertEqual(changeset.message, batched.message)
+            self.assertEqual(changeset.author, batched.author)
+            self.assertEqual(changeset.date, batched.date)
+            self.assertEqual(list(changeset.get_changes()),
+                             list(batched.get_changes()))
+        self.assertEqual({}, repos.get_changesets_batch([]))
+
+    def _commit_files(self, message, second, **files):
+        for name, content in files.items():
+            path = os.path.join(self.repos_path, *name.split('__'))
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            create_file(path, content)
+            self._git('add', os.path.relpath(path, self.repos_path))
+        self._git_commit('-a', '-m', message,
+                         date=datetime(2014, 2, 2, 17, 12, second))
+
+    def _get_revs(self, repos):
+        revs = [entry[1] for entry in repos.get_node('').get_history()]
+        revs.reverse()
+        return revs
+
+    def _get_entry_revs(self, repos, path, rev=None):
+        node = repos.get_node(path, rev)
+        return {entry.name: entry.created_rev for entry in node.get_entries()}
+
+    def _get_index(self, rev, path):
+        return dict(self.env.db_query("""
+            SELECT name, change_rev FROM node_last_change
+            WHERE rev=%s AND path=%s""", (rev, path)))
+
+    def _disable_historian(self, repos):
+        if isinstance(repos, GitCachedRepository):
+            repos = repos.repos
+        def get_historian(sha, base_path):
+            self.fail("Historian used for %r in [%s]" % (base_path, sha))
+        repos.git.get_historian = get_historian
+
+    def test_last_change_index(self):
+        self._git_init()
+        self._commit_files('add', 1, a__x='x', b__y='y')
+        self._commit_files('edit a', 2, a__x='x2')
+        self._add_repository('gitrepos')
+        repos = self._repomgr.get_repository('gitrepos')
+        repos.sync()
+        rev0, rev1, rev2 = self._get_revs(repos)
+
+        expected = {'.gitignore': rev0, 'a': rev2, 'b': rev1}
+        self.assertEqual(expected, self._get_entry_revs(repos, ''))
+        self.assertEqual(expected, self._get_index(rev2, ''))
+        self.assertEqual({'x': rev2}, self._get_entry_revs(repos, 'a'))
+        self.assertEqual({'x': rev2}, self._get_index(rev2, 'a'))
+
+        # The listings are resolved from the index
+        self._disable_historian(repos)
+        self.assertEqual(expected, self._get_entry_revs(repos, ''))
+        self.assertEqual({'x': rev2}, self._get_entry_revs(repos, 'a'))
+
+    def test_last_change_index_updated(self):
+        self._git_init()
+        self._commit_files('add', 1, a__x='x', b__y='y')
+        self._add_repository('gitrepos')
+        repos = self._repomgr.get_repository('gitrepos')
+        repos.sync()
+        rev0, rev1 = self._get_revs(repos)
+        self.assertEqual({'x': rev1}, self._get_entry_revs(repos, 'a'))
+        self.assertEqual({'.gitignore': rev0, 'a': rev1, 'b': rev1},
+                         self._get_entry_revs(repos, ''))
+
+        self._commit_files('edit', 2, a__z='z', c='c')
+        repos.sync()
+        rev2 = repos.youngest_rev
+        expected = {'.gitignore': rev0, 'a': rev2, 'b': rev1, 'c': rev2}
+        if self.cached_repository == 'enabled':
+            # The index of the root directory is maintained by the sync
+            self.assertEqual(expected, self._get_index(rev2, ''))
+        # The index is derived from the index of the parent revision
+        self._disable_historian(repos)
+        self.assertEqual(expected, self._get_entry_revs(repos, ''))
+        self.assertEqual({'x': rev1, 'z': rev2},
+                         self._get_entry_revs(repos, 'a'))
+
+    def test_last_change_index_merge(self):
+        self._git_init()
+        self._create_merge_commit()
+        self._add_repository('gitrepos')
+        repos = self._repomgr.get_repository('gitrepos')
+        repos.sync()
+        merge = repos.youngest_rev
+        expected = {node.name: repos.get_node(node.path).created_rev
+                    for node in repos.get_node('').get_entries()}
+
+        self.assertEqual(expected, self._get_entry_revs(repos, ''))
+        self.assertEqual(expected, self._get_index(merge, ''))
+
     def test_parent_child_revs(self):
         self._git_init()
         self._git('branch', 'initial')  # root commit
@@ -992,6 +1102,8 @@ class GitCachedRepositoryTestCase(GitRepositoryTestCase):
             revs2.append(rev)
             if len(revs2) == 2:
                 raise StopSync
+        # interrupt the sync after the 2nd revision is committed
+        self.env.config.set('versioncontrol', 'sync_batch_size', '1')
         def feedback_2(rev):
             revs2.append(rev)
         try:
@@ -1033,6 +1145,32 @@ from :2
         self.assertEqual(1, len(changes))
         self.assertEqual('\ufffd\u05b7\ufffd\ufffd\ufffd.txt', changes[0][0])
 
+    def test_sync_batches(self):
+        self._git_init()
+        self._create_merge_commit()
+        self.env.config.set('versioncontrol', 'sync_batch_size', '4')
+        self._add_repository('gitrepos')
+        repos = self._repomgr.get_repository('gitrepos')
+
+        revs = []
+        def feedback(rev):
+            revs.append(rev)
+        repos.sync(feedback=feedback)
+        self.assertEqual(6, len(revs))
+        self.assertEqual(sorted(revs), self._get_cached_revs(repos))
+
+        revs2 = []
+        def feedback_2(rev):
+            revs2.append(rev)
+        self.env.config.set('versioncontrol', 'sync_batch_size', '1')
+        repos.sync(feedback=feedback_2, clean=True)
+        self.assertEqual(revs, revs2)
+
+    def _get_cached_revs(self, repos):
+        return [rev for rev, in self.env.db_query(
+            "SELECT rev FROM revision WHERE repos=%s ORDER BY rev",
+            (repos.id,))]
+
     def test_sync_merge(self):
         self._git_init()
         self._create_merge_commit()
@@ -1055,6 +1193,8 @@ from :2
             revs2.append(rev)
             if len(revs2) == 3:
                 raise StopSync
+        # interrupt the sync after the 3rd revision is committed
+        self.env.config.set('versioncontrol', 'sync_batch_size', '1')
         def feedback_2(rev):
             revs2.append(rev)
         try:
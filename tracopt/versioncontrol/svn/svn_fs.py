@@ -404,6 +404,20 @@ class SubversionRepository(Repository):
         rev = self.normalize_rev(rev)
         return SubversionChangeset(self, rev, self.scope, self.pool)
 
+    def get_changesets_batch(self, revs):
+        """Produce the `SubversionChangeset`s for the given revisions,
+        reading the revision properties of each revision at once."""
+        changesets = {}
+        for rev in set(revs):
+            try:
+                nrev = self.normalize_rev(rev)
+                revprops = fs.revision_proplist(self.fs_ptr, nrev, self.pool)
+            except (NoSuchChangeset, core.SubversionException):
+                continue
+            changesets[rev] = SubversionChangeset(self, nrev, self.scope,
+                                                  self.pool, revprops)
+        return changesets
+
     def get_changeset_uid(self, rev):
         """Build a value identifying the `rev` in this repository."""
         return self.uuid, rev
@@ -875,21 +889,26 @@ class SubversionNode(Node):
 
 class SubversionChangeset(Changeset):
 
-    def __init__(self, repos, rev, scope, pool=None):
+    def __init__(self, repos, rev, scope, pool=None, revprops=None):
         self.log = repos.log
         self.rev = rev
         self.scope = scope
         self.fs_ptr = repos.fs_ptr
         self.pool = Pool(pool)
-        try:
-            message = self._get_revprop(core.SVN_PROP_REVISION_LOG)
-        except core.SubversionException:
-            raise NoSuchChangeset(rev)
-        author = self._get_revprop(core.SVN_PROP_REVISION_AUTHOR)
+        if revprops is not None:
+            message = revprops.get(core.SVN_PROP_REVISION_LOG)
+            author = revprops.get(core.SVN_PROP_REVISION_AUTHOR)
+            _date = revprops.get(core.SVN_PROP_REVISION_DATE)
+        else:
+            try:
+                message = self._get_revprop(core.SVN_PROP_REVISION_LOG)
+            except core.SubversionException:
+                raise NoSuchChangeset(rev)
+            author = self._get_revprop(core.SVN_PROP_REVISION_AUTHOR)
+            _date = self._get_revprop(core.SVN_PROP_REVISION_DATE)
         # we _hope_ it's UTF-8, but can't be 100% sure (#4321)
         message = _from_svn(message)
         author = _from_svn(author)
-        _date = self._get_revprop(core.SVN_PROP_REVISION_DATE)
         if _date:
             ts = core.svn_time_from_cstring(_date, self.pool)
             date = from_utimestamp(ts)